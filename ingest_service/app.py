@@ -1,14 +1,41 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Response
 from pydantic import BaseModel, Field
-from typing import Union
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
+from typing import Callable, Optional, Union
+from functools import partial
+import asyncio
 import os
 
 from scraper import scrape_content
-from chunk_size_calculator import calculate_dynamic_chunk_params
-from constants import CHROMA_DB_PERSIST_DIRECTORY
+from async_scraper import AsyncScraper, FETCH_ERROR, FetchResult, ResponseCache, scrape_urls
+from crawler import Crawler, CrawlStore
+from text_processor import process_and_store_text, split_into_chunks, store_source_chunks, sync_source, DEFAULT_TEXT_SOURCE
+from batch_ingest import DocumentResult, ingest_ndjson, iter_ndjson_lines
+from stream_chunker import store_byte_stream
+from model_registry import warm_up, is_model_loaded
+from embedding_cache import get_embedding_cache
+from embedding_backend import embedding_model_id
+from snapshot import SnapshotException, current_snapshot, publish_if_stale, publish_snapshot
+from executor import run_blocking, shutdown_executor
+from metrics import CONTENT_TYPE, REGISTRY, Sample, TraceMiddleware
+from job_queue import JobQueue, JobStore, JobQueueFullException, job_throughput
+from constants import (
+    CHROMA_DB_PERSIST_DIRECTORY,
+    HOTMART_BLOG_URL,
+    BULK_INGEST_BATCH_SIZE,
+    EMBEDDING_BATCH_SIZE,
+    JOB_QUEUE_DB_PATH,
+    JOB_QUEUE_WORKERS,
+    JOB_QUEUE_MAX_SIZE,
+    SCRAPER_CACHE_DB_PATH,
+    CRAWL_STATE_DB_PATH,
+    CRAWLER_MAX_PAGES,
+    CRAWLER_QUEUE_SIZE,
+    CRAWLER_REQUEST_DELAY_SECONDS,
+    CRAWLER_USER_AGENT,
+    EXECUTOR_MAX_WORKERS,
+    SNAPSHOT_AUTO_PUBLISH,
+    SNAPSHOT_PUBLISH_INTERVAL_SECONDS,
+)
 
 class TextRequest(BaseModel):
     text: str = Field(
@@ -16,17 +43,133 @@ class TextRequest(BaseModel):
         description="The text content to be ingested and processed",
         example="This is a sample text that needs to be processed and stored in the vector database."
     )
+    source: Optional[str] = Field(
+        None,
+        description="Where the text comes from; chunks already stored for the same source are skipped",
+        example="https://hotmart.com/pt-br/blog/como-funciona-hotmart"
+    )
 
 class IngestResponse(BaseModel):
     status: str = Field(..., description="Status of the ingestion process")
     chunks: int = Field(..., description="Number of chunks created from the text")
+    inserted: int = Field(..., description="Number of new chunks embedded and stored")
+    skipped: int = Field(..., description="Number of chunks skipped because they were already stored")
+
+class SourceSyncRequest(BaseModel):
+    source: str = Field(
+        ...,
+        min_length=1,
+        description="Identifier of the source being re-ingested",
+        example="https://hotmart.com/pt-br/blog/como-funciona-hotmart"
+    )
+    text: str = Field(..., description="Current content of the source")
+    version: Optional[str] = Field(
+        None,
+        description="Version marker of the content (ETag, revision...); defaults to a hash of the text"
+    )
+
+class SyncResponse(BaseModel):
+    status: str = Field(..., description="Status of the ingestion process")
+    source: str = Field(..., description="Source that was synchronized")
+    version: str = Field(..., description="Version of the source now stored")
+    chunks: int = Field(..., description="Number of chunks in the current version")
+    added: int = Field(..., description="Number of new chunks embedded and stored")
+    removed: int = Field(..., description="Number of stale chunks deleted")
+    unchanged: int = Field(..., description="Number of chunks kept as they were")
+    up_to_date: bool = Field(..., description="True if the version was already ingested and nothing was done")
 
 class ErrorResponse(BaseModel):
     status: str = Field(..., description="Error status")
     message: str = Field(..., description="Error message details")
 
+class BatchIngestResponse(BaseModel):
+    status: str = Field(..., description="success if every document was stored, partial or error otherwise")
+    documents: int = Field(..., description="Number of documents received")
+    chunks: int = Field(..., description="Number of chunks created across all documents")
+    inserted: int = Field(..., description="Number of new chunks embedded and stored")
+    skipped: int = Field(..., description="Number of chunks skipped because they were already stored")
+    results: list[DocumentResult] = Field(..., description="Per-document results, in input order")
+
+class UrlIngestRequest(BaseModel):
+    urls: list[str] = Field(
+        ...,
+        min_length=1,
+        description="Pages to scrape and ingest; each URL is used as the source of its chunks",
+        example=["https://hotmart.com/pt-br/blog/como-funciona-hotmart"]
+    )
+
+class UrlIngestResult(BaseModel):
+    url: str = Field(..., description="Scraped URL")
+    status: str = Field(..., description="success or error")
+    fetch: Optional[str] = Field(None, description="fetched, or not_modified when the cached page was reused")
+    version: Optional[str] = Field(None, description="Version of the page now stored (ETag, Last-Modified or content hash)")
+    chunks: int = Field(0, description="Number of chunks in the current version")
+    added: int = Field(0, description="Number of new chunks embedded and stored")
+    removed: int = Field(0, description="Number of stale chunks deleted")
+    up_to_date: bool = Field(False, description="True if the page version was already ingested")
+    message: Optional[str] = Field(None, description="Error message details")
+
+class UrlIngestResponse(BaseModel):
+    status: str = Field(..., description="success if every URL was ingested, partial or error otherwise")
+    results: list[UrlIngestResult] = Field(..., description="Per-URL results, in input order")
+
+class JobAcceptedResponse(BaseModel):
+    job_id: str = Field(..., description="Identifier used to follow the job at /jobs/{job_id}")
+    status: str = Field(..., description="Initial job status")
+
+class CrawlRequest(BaseModel):
+    url: str = Field(
+        ...,
+        min_length=1,
+        description="Sitemap (or sitemap index) URL, or an HTML index page linking to the posts",
+        example="https://hotmart.com/pt-br/blog/sitemap.xml"
+    )
+
+class CrawlAcceptedResponse(JobAcceptedResponse):
+    crawl_id: str = Field(..., description="Identifier used to follow the crawl at /crawls/{crawl_id}")
+
+class CrawlStatusResponse(BaseModel):
+    crawl_id: str = Field(..., description="Crawl identifier")
+    root_url: str = Field(..., description="Sitemap or index page the crawl started from")
+    discovered: bool = Field(..., description="Whether every page of the sitemap has been listed")
+    pages_total: int = Field(..., description="Number of pages discovered")
+    pages_pending: int = Field(..., description="Pages not processed yet")
+    pages_done: int = Field(..., description="Pages ingested")
+    pages_failed: int = Field(..., description="Pages that could not be fetched or ingested (retried on resume)")
+    pages_skipped: int = Field(..., description="Pages disallowed by robots.txt")
+    chunks_added: int = Field(..., description="New chunks embedded and stored by the crawl")
+
+class JobStatusResponse(BaseModel):
+    job_id: str = Field(..., description="Job identifier")
+    kind: str = Field(..., description="Type of ingestion performed by the job")
+    status: str = Field(..., description="One of pending, running, done or failed")
+    chunks_total: int = Field(..., description="Number of chunks to embed (known once splitting is done)")
+    chunks_embedded: int = Field(..., description="Number of chunks embedded and stored so far")
+    throughput: Optional[float] = Field(None, description="Chunks embedded per second since the job started")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+
 class HealthResponse(BaseModel):
     status: str = Field(..., description="Health status")
+    model_loaded: bool = Field(..., description="Whether the embeddings model is loaded in memory")
+
+class EmbeddingCacheStatsResponse(BaseModel):
+    enabled: bool = Field(..., description="Whether the on-disk embedding cache is enabled")
+    model: Optional[str] = Field(None, description="Embeddings model the cache belongs to")
+    hits: int = Field(0, description="Chunks served from the cache since startup")
+    misses: int = Field(0, description="Chunks that had to be embedded since startup")
+    hit_rate: float = Field(0.0, description="hits / (hits + misses)")
+    evictions: int = Field(0, description="Entries evicted to stay within the memory budget")
+    entries: int = Field(0, description="Vectors currently cached")
+    capacity: int = Field(0, description="Maximum number of cached vectors for the configured budget")
+    dtype: Optional[str] = Field(None, description="Storage type of the cached vectors")
+
+class SnapshotResponse(BaseModel):
+    published: bool = Field(..., description="Whether a snapshot of the vector store has been published")
+    name: Optional[str] = Field(None, description="Directory of the snapshot")
+    generation: Optional[int] = Field(None, description="Vector store generation the snapshot holds")
+    chunks: Optional[int] = Field(None, description="Chunks in the snapshot")
+    dim: Optional[int] = Field(None, description="Embedding dimension")
+    seconds: Optional[float] = Field(None, description="Time taken to write and publish it (on publish only)")
 
 app = FastAPI(
     title="Hotmart RAG Ingest Service",
@@ -40,11 +183,118 @@ app = FastAPI(
         "email": "layrfpf@gmail.com",
     },
 )
+# Trace id per request (X-Trace-Id) and request latency metrics
+app.add_middleware(TraceMiddleware)
+
+def run_ingestion_job(kind: str, payload: dict, on_progress: Callable[[int, int], None]) -> int:
+    """Blocking body of a queued ingestion job; returns the number of newly embedded chunks"""
+    if kind == "text":
+        text = payload["text"]
+        source = payload.get("source") or DEFAULT_TEXT_SOURCE
+    elif kind == "blog":
+        return sync_source(scrape_content(), HOTMART_BLOG_URL, on_progress=on_progress).added
+    else:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    return process_and_store_text(text, source=source, on_progress=on_progress).inserted
+
+response_cache = ResponseCache(SCRAPER_CACHE_DB_PATH)
+crawl_store = CrawlStore(CRAWL_STATE_DB_PATH)
+
+async def run_crawl(crawl_id: str, on_progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """Crawl (or resume crawling) every post of a sitemap; returns the number of chunks added"""
+    scraper = AsyncScraper(
+        cache=response_cache,
+        request_delay=CRAWLER_REQUEST_DELAY_SECONDS,
+        user_agent=CRAWLER_USER_AGENT,
+    )
+    crawler = Crawler(
+        crawl_store,
+        scraper,
+        ingest_page=partial(run_blocking, sync_source),
+        max_pages=CRAWLER_MAX_PAGES,
+        queue_size=CRAWLER_QUEUE_SIZE,
+        ingest_workers=EXECUTOR_MAX_WORKERS,
+    )
+    return (await crawler.run(crawl_id, on_progress=on_progress)).chunks_added
+
+async def _run_job(kind: str, payload: dict, on_progress: Callable[[int, int], None]) -> int:
+    # Crawls drive their own fetching and hand pages to the pool as they arrive
+    if kind == "crawl":
+        chunks = await run_crawl(payload["crawl_id"], on_progress)
+    else:
+        chunks = await run_blocking(run_ingestion_job, kind, payload, on_progress)
+    if SNAPSHOT_AUTO_PUBLISH:
+        # Exports only when the job wrote to the store (added or removed chunks), whatever it returned
+        try:
+            await run_blocking(publish_if_stale)
+        except SnapshotException as e:
+            # Not fatal: the query service keeps searching Chroma until a snapshot is published
+            print(f"Warning: {str(e)}")
+    return chunks
+
+job_queue = JobQueue(
+    JobStore(JOB_QUEUE_DB_PATH),
+    runner=_run_job,
+    workers=JOB_QUEUE_WORKERS,
+    max_size=JOB_QUEUE_MAX_SIZE,
+)
+
+def collect_metrics() -> list[Sample]:
+    """Job queue and embedding cache figures, read when /metrics is scraped"""
+    samples = [
+        Sample("job_queue_pending", "gauge", "Jobs waiting for a worker", {}, job_queue.pending()),
+        Sample("job_queue_active", "gauge", "Jobs pending or running", {}, job_queue.store.count_active()),
+    ]
+    cache = get_embedding_cache(embedding_model_id())
+    if cache is not None:
+        stats = cache.stats()
+        samples += [
+            Sample("embedding_cache_hits_total", "counter", "Chunk embeddings served by the embedding cache", {}, stats["hits"]),
+            Sample("embedding_cache_misses_total", "counter", "Chunk embeddings computed by the model", {}, stats["misses"]),
+            Sample("embedding_cache_entries", "gauge", "Embeddings stored in the cache", {}, stats["entries"]),
+        ]
+    return samples
+
+REGISTRY.register_collector(collect_metrics)
+
+_publish_task: Optional[asyncio.Task] = None
+
+async def publish_stale_snapshots(interval: float) -> None:
+    """
+    Every `interval` seconds, publish a snapshot if writes outside jobs (e.g.
+    /ingest_text) left the published one behind, so the query service does
+    not fall back to Chroma for good
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_blocking(publish_if_stale)
+        except Exception as e:
+            print(f"Warning: could not publish snapshot: {str(e)}")
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize necessary directories on startup"""
+    """Initialize necessary directories, warm up the embeddings model and start the background work"""
+    global _publish_task
     os.makedirs(CHROMA_DB_PERSIST_DIRECTORY, exist_ok=True)
+    try:
+        await run_blocking(warm_up)
+    except Exception as e:
+        # Not fatal: the model will be loaded lazily on the first ingestion
+        print(f"Warning: could not warm up embeddings model: {str(e)}")
+    await job_queue.start()
+    if SNAPSHOT_AUTO_PUBLISH and SNAPSHOT_PUBLISH_INTERVAL_SECONDS > 0:
+        _publish_task = asyncio.create_task(publish_stale_snapshots(SNAPSHOT_PUBLISH_INTERVAL_SECONDS))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the job workers and snapshot publishing, wait for in-flight ingestions and release the worker pool"""
+    global _publish_task
+    if _publish_task is not None:
+        _publish_task.cancel()
+        _publish_task = None
+    await job_queue.stop()
+    shutdown_executor()
 
 @app.get(
         '/health',
@@ -54,7 +304,77 @@ async def startup_event():
         description="Returns the status of the ingest service"
 )
 async def health():
-    return HealthResponse(status="ok")
+    return HealthResponse(status="ok", model_loaded=is_model_loaded())
+
+@app.get(
+    "/metrics",
+    tags=["Health"],
+    summary="Prometheus metrics",
+    description="Stage latencies, request latencies, chunks stored, job queue depth and embedding cache hits in the Prometheus text format",
+    response_class=Response,
+)
+async def metrics():
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get(
+    "/embedding_cache/stats",
+    response_model=EmbeddingCacheStatsResponse,
+    tags=["Health"],
+    summary="Embedding cache statistics",
+    description="Hit rate and occupancy of the on-disk embedding cache in this process"
+)
+async def embedding_cache_stats():
+    cache = get_embedding_cache(embedding_model_id())
+    if cache is None:
+        return EmbeddingCacheStatsResponse(enabled=False)
+    return EmbeddingCacheStatsResponse(enabled=True, **cache.stats())
+
+@app.get(
+    "/snapshot",
+    response_model=SnapshotResponse,
+    response_model_exclude_none=True,
+    tags=["Snapshot"],
+    summary="Published vector store snapshot",
+    description="Describe the read-only snapshot of the vector store currently published for the query service"
+)
+async def get_snapshot():
+    manifest = current_snapshot()
+    if manifest is None:
+        return SnapshotResponse(published=False)
+    return SnapshotResponse(
+        published=True,
+        name=manifest["name"],
+        generation=manifest["generation"],
+        chunks=manifest["chunks"],
+        dim=manifest["dim"]
+    )
+
+@app.post(
+    "/snapshot",
+    response_model=SnapshotResponse,
+    tags=["Snapshot"],
+    summary="Publish a vector store snapshot",
+    description="Export the vector store to a memory-mappable snapshot and atomically publish it for the query service"
+)
+async def post_snapshot():
+    """
+    Publish a read-only snapshot of the vector store:
+    - Reads every chunk, vector and metadata from Chroma in pages
+    - Writes normalized vectors to a contiguous float32 file and chunks to SQLite
+    - Atomically points the query service at the new snapshot
+    
+    Returns:
+        - SnapshotResponse describing the published snapshot
+        - HTTPException if the export fails
+    """
+    try:
+        info = await run_blocking(publish_snapshot)
+        return SnapshotResponse(published=True, **info._asdict())
+    except SnapshotException as e:
+        raise HTTPException(
+            status_code=500,
+            detail=str(e)
+        )
 
 @app.post(
     "/ingest_text",
@@ -75,28 +395,16 @@ async def ingest_text(request: TextRequest):
         - Error response if processing fails
     """
     try:
-        chunk_size, chunk_overlap = calculate_dynamic_chunk_params(request.text)
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len
+        stats = await run_blocking(
+            process_and_store_text, request.text, source=request.source or DEFAULT_TEXT_SOURCE
         )
-
-        chunks = text_splitter.split_text(request.text)
-        embeddings = HuggingFaceEmbeddings(model_name="intfloat/multilingual-e5-small")
-        Chroma.from_texts(
-            texts=chunks,
-            embedding=embeddings,
-            persist_directory=CHROMA_DB_PERSIST_DIRECTORY,
-        )
-
-        return IngestResponse(status="success", chunks=len(chunks))
+        return IngestResponse(status="success", **stats._asdict())
     except Exception as e:
         return ErrorResponse(status="error", message=str(e))
 
 @app.get(
     "/ingest_full_blog_content",
-    response_model=Union[IngestResponse, ErrorResponse],
+    response_model=Union[SyncResponse, ErrorResponse],
     tags=["Ingestion"],
     summary="Ingest Hotmart blog content",
     description="Scrape, process and store Hotmart blog content in the vector database"
@@ -106,28 +414,274 @@ async def ingest_full_blog_content():
     Scrape and ingest Hotmart blog content:
     - Scrapes content from predefined blog URL
     - Processes and splits content into chunks
-    - Stores in vector database
+    - Embeds only chunks that changed since the last ingestion and deletes stale ones
+    
+    Returns:
+        - Success response with number of chunks added, removed and unchanged
+        - Error response if processing fails
+    """
+    try:
+        full_text = await run_blocking(scrape_content)
+        stats = await run_blocking(sync_source, full_text, HOTMART_BLOG_URL)
+        return SyncResponse(status="success", source=HOTMART_BLOG_URL, **stats._asdict())
+    except Exception as e:
+        return ErrorResponse(status="error", message=str(e))
+
+@app.post(
+    "/sources/sync",
+    response_model=Union[SyncResponse, ErrorResponse],
+    tags=["Ingestion"],
+    summary="Re-ingest a source incrementally",
+    description="Replace the stored content of a source, embedding only added chunks and deleting removed ones"
+)
+async def sync_source_content(request: SourceSyncRequest):
+    """
+    Synchronize a source with its current content:
+    - Skips everything if the version was already ingested
+    - Diffs chunk hashes against the last ingested version
+    - Embeds added chunks and deletes stale vectors
+    
+    Returns:
+        - Success response with number of chunks added, removed and unchanged
+        - Error response if processing fails
+    """
+    try:
+        stats = await run_blocking(sync_source, request.text, request.source, version=request.version)
+        return SyncResponse(status="success", source=request.source, **stats._asdict())
+    except Exception as e:
+        return ErrorResponse(status="error", message=str(e))
+
+@app.post(
+    "/ingest_batch",
+    response_model=BatchIngestResponse,
+    tags=["Ingestion"],
+    summary="Ingest many documents at once",
+    description="Stream an NDJSON body (one document per line) and store chunks from all documents in large batches"
+)
+async def ingest_batch(request: Request):
+    """
+    Ingest a stream of NDJSON documents:
+    - Reads the body line by line, without buffering it whole
+    - Splits each document into chunks as it arrives
+    - Embeds and stores chunks across documents in fixed-size batches
+    
+    Returns:
+        - Per-document results with the number of chunks stored
+    """
+    results = await ingest_ndjson(
+        iter_ndjson_lines(request.stream()),
+        split=partial(run_blocking, split_into_chunks),
+        store_batch=partial(run_blocking, store_source_chunks),
+        batch_size=BULK_INGEST_BATCH_SIZE,
+    )
+    succeeded = sum(1 for result in results if result.status == "success")
+    if results and succeeded == len(results):
+        status = "success"
+    elif succeeded:
+        status = "partial"
+    else:
+        status = "error"
+    return BatchIngestResponse(
+        status=status,
+        documents=len(results),
+        chunks=sum(result.chunks for result in results),
+        inserted=sum(result.inserted for result in results),
+        skipped=sum(result.skipped for result in results),
+        results=results,
+    )
+
+async def _store_stream_batch(source: str, texts: list[str]) -> int:
+    inserted = await run_blocking(store_source_chunks, texts, [source] * len(texts))
+    return sum(inserted)
+
+async def _sync_fetched_page(page: FetchResult) -> UrlIngestResult:
+    if page.status == FETCH_ERROR:
+        return UrlIngestResult(url=page.url, status="error", message=page.error)
+    try:
+        stats = await run_blocking(sync_source, page.text, page.url, version=page.version)
+    except Exception as e:
+        return UrlIngestResult(url=page.url, status="error", fetch=page.status, message=str(e))
+    return UrlIngestResult(
+        url=page.url,
+        status="success",
+        fetch=page.status,
+        version=stats.version,
+        chunks=stats.chunks,
+        added=stats.added,
+        removed=stats.removed,
+        up_to_date=stats.up_to_date,
+    )
+
+@app.post(
+    "/ingest_urls",
+    response_model=UrlIngestResponse,
+    tags=["Ingestion"],
+    summary="Scrape and ingest many pages",
+    description="Fetch many URLs concurrently and re-ingest each page incrementally, using its URL as the source"
+)
+async def ingest_urls(request: UrlIngestRequest):
+    """
+    Scrape and ingest a list of pages:
+    - Fetches pages concurrently over pooled connections, a few at a time per host
+    - Retries transient failures with exponential backoff
+    - Sends conditional requests, so unchanged pages are not downloaded or parsed again
+    - Synchronizes each page with its stored chunks
+    
+    Returns:
+        - Per-URL results with the number of chunks added and removed
+    """
+    pages = await scrape_urls(request.urls, cache=response_cache)
+    results = await asyncio.gather(*(_sync_fetched_page(page) for page in pages))
+    succeeded = sum(1 for result in results if result.status == "success")
+    if succeeded == len(results):
+        status = "success"
+    elif succeeded:
+        status = "partial"
+    else:
+        status = "error"
+    return UrlIngestResponse(status=status, results=results)
+
+@app.post(
+    "/ingest_stream",
+    response_model=Union[IngestResponse, ErrorResponse],
+    tags=["Ingestion"],
+    summary="Ingest a large plain-text upload",
+    description="Stream a UTF-8 text/plain body of any length, chunking and storing it as it arrives"
+)
+async def ingest_stream(request: Request, source: str = "ingest_stream"):
+    """
+    Ingest a plain-text body without loading it whole:
+    - Reads the upload incrementally
+    - Emits chunks with the same size and overlap rules as /ingest_text
+    - Embeds and stores them batch by batch
     
     Returns:
         - Success response with number of chunks created
         - Error response if processing fails
     """
     try:
-        full_text = scrape_content()
-        chunk_size, chunk_overlap = calculate_dynamic_chunk_params(full_text)
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len
+        chunks, inserted = await store_byte_stream(
+            request.stream(),
+            store_batch=partial(_store_stream_batch, source),
+            batch_size=EMBEDDING_BATCH_SIZE,
         )
-        
-        chunks = text_splitter.split_text(full_text)
-        embeddings = HuggingFaceEmbeddings(model_name="intfloat/multilingual-e5-small")
-        Chroma.from_texts(
-            texts=chunks,
-            embedding=embeddings,
-            persist_directory=CHROMA_DB_PERSIST_DIRECTORY
-        )
-        return IngestResponse(status="success", chunks=len(chunks))
+        if not chunks:
+            return ErrorResponse(status="error", message="No chunks were created from the input text")
+        return IngestResponse(status="success", chunks=chunks, inserted=inserted, skipped=chunks - inserted)
     except Exception as e:
-        return ErrorResponse(status="error", message=str(e))
\ No newline at end of file
+        return ErrorResponse(status="error", message=str(e))
+
+def _submit_job(kind: str, payload: dict) -> JobAcceptedResponse:
+    try:
+        job_id = job_queue.submit(kind, payload)
+    except JobQueueFullException as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    return JobAcceptedResponse(job_id=job_id, status="pending")
+
+@app.post(
+    "/jobs/ingest_text",
+    response_model=JobAcceptedResponse,
+    status_code=202,
+    tags=["Jobs"],
+    summary="Queue text ingestion",
+    description="Queue text content for background ingestion and return a job id immediately"
+)
+async def submit_text_job(request: TextRequest):
+    """
+    Queue text content for ingestion:
+    - Persists the job so it survives a restart
+    - Returns immediately with the job id
+    
+    Returns:
+        - Accepted response with the job id
+        - HTTP 429 if the queue is full
+    """
+    return _submit_job("text", {"text": request.text, "source": request.source})
+
+@app.post(
+    "/jobs/ingest_full_blog_content",
+    response_model=JobAcceptedResponse,
+    status_code=202,
+    tags=["Jobs"],
+    summary="Queue Hotmart blog ingestion",
+    description="Queue scraping and ingestion of the Hotmart blog content and return a job id immediately"
+)
+async def submit_blog_job():
+    """
+    Queue Hotmart blog ingestion:
+    - Scraping, chunking and embedding run in the background
+    
+    Returns:
+        - Accepted response with the job id
+        - HTTP 429 if the queue is full
+    """
+    return _submit_job("blog", {})
+
+@app.post(
+    "/jobs/crawl",
+    response_model=CrawlAcceptedResponse,
+    status_code=202,
+    tags=["Jobs"],
+    summary="Queue a whole-blog crawl",
+    description="Queue a crawl of every post listed by a sitemap or index page and return its job and crawl ids"
+)
+async def submit_crawl_job(request: CrawlRequest):
+    """
+    Queue a crawl:
+    - Lists every post of the sitemap (following sitemap indexes) or index page
+    - Fetches posts concurrently within per-host politeness limits and robots.txt
+    - Chunks and embeds each post as soon as it is fetched
+    - Records progress per page, so a restarted crawl skips pages already done
+    
+    Returns:
+        - Accepted response with the job id and crawl id
+        - HTTP 429 if the queue is full
+    """
+    crawl_id = crawl_store.create(request.url)
+    try:
+        accepted = _submit_job("crawl", {"crawl_id": crawl_id})
+    except Exception:
+        # E.g. the queue is full (429): no job will ever run this crawl
+        crawl_store.delete(crawl_id)
+        raise
+    return CrawlAcceptedResponse(job_id=accepted.job_id, status=accepted.status, crawl_id=crawl_id)
+
+@app.get(
+    "/crawls/{crawl_id}",
+    response_model=CrawlStatusResponse,
+    tags=["Jobs"],
+    summary="Get crawl progress",
+    description="Report how many pages of a crawl were discovered, ingested, failed or skipped"
+)
+async def get_crawl(crawl_id: str):
+    crawl = crawl_store.get(crawl_id)
+    if crawl is None:
+        raise HTTPException(status_code=404, detail=f"Crawl '{crawl_id}' not found")
+    stats = crawl_store.stats(crawl_id)
+    return CrawlStatusResponse(
+        crawl_id=crawl_id,
+        root_url=crawl["root_url"],
+        discovered=crawl["discovered"],
+        **stats._asdict()
+    )
+
+@app.get(
+    "/jobs/{job_id}",
+    response_model=JobStatusResponse,
+    tags=["Jobs"],
+    summary="Get ingestion job status",
+    description="Report the status, progress, throughput and errors of an ingestion job"
+)
+async def get_job(job_id: str):
+    job = job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return JobStatusResponse(
+        job_id=job["id"],
+        kind=job["kind"],
+        status=job["status"],
+        chunks_total=job["chunks_total"],
+        chunks_embedded=job["chunks_embedded"],
+        throughput=job_throughput(job),
+        error=job["error"],
+    )
\ No newline at end of file
@@ -0,0 +1,256 @@
+import asyncio
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from scraper import extract_content
+from executor import run_blocking
+from constants import (
+    SCRAPER_BACKOFF_SECONDS,
+    SCRAPER_MAX_CONNECTIONS,
+    SCRAPER_MAX_RETRIES,
+    SCRAPER_PER_HOST_LIMIT,
+    SCRAPER_TIMEOUT_SECONDS,
+)
+
+FETCH_FETCHED = "fetched"
+FETCH_NOT_MODIFIED = "not_modified"
+FETCH_ERROR = "error"
+
+# Responses worth retrying: throttling and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    text TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+)
+"""
+
+class CachedResponse(NamedTuple):
+    """Validators and extracted text of the last successful response for a URL"""
+    etag: Optional[str]
+    last_modified: Optional[str]
+    text: str
+
+class FetchResult(NamedTuple):
+    """Outcome of scraping one URL"""
+    url: str
+    status: str
+    text: Optional[str] = None
+    version: Optional[str] = None
+    error: Optional[str] = None
+
+class ResponseCache:
+    """
+    SQLite cache of extracted page text keyed by URL, together with the ETag and
+    Last-Modified validators needed for conditional requests.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        if not self._initialized:
+            connection.execute(_SCHEMA)
+            connection.commit()
+            self._initialized = True
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connect()
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Cached response for the URL, or None if it was never cached"""
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT etag, last_modified, text FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        return CachedResponse(*row) if row else None
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], text: str) -> None:
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, text, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, text, time.time())
+            )
+
+def _version(etag: Optional[str], last_modified: Optional[str]) -> Optional[str]:
+    return etag or last_modified
+
+class HostLimiter:
+    """
+    Politeness limits for one host: at most `concurrency` requests in flight,
+    and request starts spaced by at least `min_interval` seconds.
+    """
+
+    def __init__(self, concurrency: int, min_interval: float = 0.0):
+        self.min_interval = min_interval
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._next_start = 0.0
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        if self.min_interval > 0:
+            now = asyncio.get_running_loop().time()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.min_interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._semaphore.release()
+
+class AsyncScraper:
+    """
+    Concurrent scraper built on a pooled httpx.AsyncClient.
+
+    Connections are reused across URLs, concurrency (and optionally request
+    rate) is capped per host, and transient failures are retried with
+    exponential backoff. With a ResponseCache, pages are requested
+    conditionally (If-None-Match / If-Modified-Since); a 304 reuses the cached
+    text, so unchanged pages are neither downloaded nor parsed again.
+
+    Use it as an async context manager to keep one client open across many
+    calls; scrape_many also works on its own and opens a client for the call.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        max_connections: int = SCRAPER_MAX_CONNECTIONS,
+        per_host_limit: int = SCRAPER_PER_HOST_LIMIT,
+        max_retries: int = SCRAPER_MAX_RETRIES,
+        backoff_seconds: float = SCRAPER_BACKOFF_SECONDS,
+        timeout_seconds: float = SCRAPER_TIMEOUT_SECONDS,
+        request_delay: float = 0.0,
+        user_agent: Optional[str] = None,
+    ):
+        self.cache = cache
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout_seconds = timeout_seconds
+        self.request_delay = request_delay
+        self.user_agent = user_agent
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: dict[str, HostLimiter] = {}
+
+    async def __aenter__(self):
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections
+        )
+        headers = {"User-Agent": self.user_agent} if self.user_agent else None
+        self._client = httpx.AsyncClient(
+            limits=limits,
+            timeout=self.timeout_seconds,
+            follow_redirects=True,
+            headers=headers
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        client, self._client = self._client, None
+        self._host_limits = {}
+        await client.aclose()
+
+    def host_limit(self, url: str) -> HostLimiter:
+        """Limiter shared by every request to the host of the URL"""
+        host = urlsplit(url).netloc
+        limiter = self._host_limits.get(host)
+        if limiter is None:
+            limiter = HostLimiter(self.per_host_limit, self.request_delay)
+            self._host_limits[host] = limiter
+        return limiter
+
+    async def scrape_many(self, urls: list[str]) -> list[FetchResult]:
+        """
+        Fetch and extract many pages concurrently.
+
+        Args:
+            urls (list[str]): Pages to scrape; duplicates are fetched once.
+
+        Returns:
+            list[FetchResult]: One result per unique URL, in input order. Failures
+            are reported in the result instead of raised.
+        """
+        if self._client is None:
+            async with self:
+                return await self.scrape_many(urls)
+        return await asyncio.gather(*(self.scrape(url) for url in dict.fromkeys(urls)))
+
+    async def scrape(self, url: str) -> FetchResult:
+        """Fetch and extract one page; requires an open client (see scrape_many)"""
+        try:
+            cached = self.cache.get(url) if self.cache else None
+            headers = {}
+            if cached and cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached and cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+            response = await self.fetch(url, headers)
+            if response.status_code == 304 and cached:
+                return FetchResult(url, FETCH_NOT_MODIFIED, cached.text, _version(cached.etag, cached.last_modified))
+            response.raise_for_status()
+
+            text = await run_blocking(extract_content, response.text)
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if self.cache and (etag or last_modified):
+                self.cache.put(url, etag, last_modified, text)
+            return FetchResult(url, FETCH_FETCHED, text, _version(etag, last_modified))
+        except Exception as e:
+            return FetchResult(url, FETCH_ERROR, error=f"Failed to scrape {url}: {str(e)}")
+
+    async def fetch(self, url: str, headers: Optional[dict] = None) -> httpx.Response:
+        """
+        GET a URL within the host limits, retrying transient failures.
+
+        Returns:
+            httpx.Response: The last response, which may still be an error status.
+
+        Raises:
+            httpx.TransportError: If the request keeps failing at the network level
+        """
+        host_limit = self.host_limit(url)
+        attempt = 0
+        while True:
+            try:
+                # The host slot is released while backing off
+                async with host_limit:
+                    response = await self._client.get(url, headers=headers)
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+            await asyncio.sleep(self.backoff_seconds * 2 ** attempt)
+            attempt += 1
+
+async def scrape_urls(urls: list[str], cache: Optional[ResponseCache] = None) -> list[FetchResult]:
+    """Scrape many URLs concurrently with the configured limits"""
+    return await AsyncScraper(cache=cache).scrape_many(urls)
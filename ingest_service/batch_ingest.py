@@ -0,0 +1,164 @@
+from typing import AsyncIterator, Awaitable, Callable, Optional, Union
+from pydantic import BaseModel, Field, ValidationError
+
+MetadataValue = Union[str, int, float, bool]
+
+class BatchDocument(BaseModel):
+    """One NDJSON line of a batch ingestion request"""
+    id: Optional[str] = Field(None, description="Optional document identifier, defaults to the line number")
+    text: str = Field(..., min_length=1, description="The text content of the document")
+    metadata: Optional[dict[str, MetadataValue]] = Field(
+        None,
+        description="Optional flat metadata copied to every chunk of the document"
+    )
+
+class DocumentResult(BaseModel):
+    id: str = Field(..., description="Document identifier")
+    status: str = Field(..., description="success or error")
+    chunks: int = Field(..., description="Number of chunks created from the document")
+    inserted: int = Field(0, description="Number of new chunks embedded and stored")
+    skipped: int = Field(0, description="Number of chunks skipped because they were already stored")
+    message: Optional[str] = Field(None, description="Error message details")
+
+StoreBatch = Callable[[list[str], list[str], list[dict]], Awaitable[list[bool]]]
+
+async def iter_ndjson_lines(byte_stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Yield non-empty lines from a stream of bytes without reading it whole"""
+    buffer = b""
+    async for piece in byte_stream:
+        buffer += piece
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line.decode("utf-8")
+    if buffer.strip():
+        yield buffer.decode("utf-8")
+
+class _PendingDocument:
+    def __init__(self, doc_id: str):
+        self.doc_id = doc_id
+        self.chunks = 0
+        self.stored = 0
+        self.inserted = 0
+        self.error: Optional[str] = None
+
+class BatchIngestor:
+    """
+    Accumulates chunks from many documents and stores them in fixed-size batches.
+
+    Chunks from consecutive documents share batches, so small documents do not
+    each pay for a separate embedding and storage call. A document succeeds
+    once every batch holding one of its chunks has been stored.
+    """
+
+    def __init__(self, store_batch: StoreBatch, batch_size: int):
+        self.store_batch = store_batch
+        self.batch_size = batch_size
+        self._documents: list[_PendingDocument] = []
+        self._texts: list[str] = []
+        self._sources: list[str] = []
+        self._metadatas: list[dict] = []
+        self._owners: list[_PendingDocument] = []
+
+    def record_error(self, doc_id: str, message: str) -> None:
+        """Register a document that failed before any of its chunks were queued"""
+        document = _PendingDocument(doc_id)
+        document.error = message
+        self._documents.append(document)
+
+    async def add_document(self, doc_id: str, chunks: list[str], metadata: Optional[dict] = None, source: Optional[str] = None) -> None:
+        """Queue the chunks of a document, storing full batches as they fill up"""
+        document = _PendingDocument(doc_id)
+        self._documents.append(document)
+        if not chunks:
+            document.error = "No chunks were created from the input text"
+            return
+
+        document.chunks = len(chunks)
+        for index, chunk in enumerate(chunks):
+            self._texts.append(chunk)
+            self._sources.append(source or doc_id)
+            self._metadatas.append({**(metadata or {}), "document_id": doc_id, "chunk_index": index})
+            self._owners.append(document)
+            if len(self._texts) >= self.batch_size:
+                await self.flush()
+
+    async def flush(self) -> None:
+        """Store whatever is currently queued"""
+        if not self._texts:
+            return
+        texts, sources, metadatas, owners = self._texts, self._sources, self._metadatas, self._owners
+        self._texts, self._sources, self._metadatas, self._owners = [], [], [], []
+        try:
+            inserted = await self.store_batch(texts, sources, metadatas)
+        except Exception as e:
+            for document in owners:
+                document.error = f"Error storing chunks in vector database: {str(e)}"
+            return
+        for document, was_inserted in zip(owners, inserted):
+            document.stored += 1
+            document.inserted += int(was_inserted)
+
+    def results(self) -> list[DocumentResult]:
+        """Per-document outcome, in input order; call after the final flush"""
+        results = []
+        for document in self._documents:
+            if document.error is None and document.stored == document.chunks:
+                results.append(DocumentResult(
+                    id=document.doc_id,
+                    status="success",
+                    chunks=document.chunks,
+                    inserted=document.inserted,
+                    skipped=document.chunks - document.inserted
+                ))
+            else:
+                results.append(DocumentResult(
+                    id=document.doc_id,
+                    status="error",
+                    chunks=0,
+                    message=document.error or "Not all chunks were stored"
+                ))
+        return results
+
+async def ingest_ndjson(
+    lines: AsyncIterator[str],
+    split: Callable[[str], Awaitable[list[str]]],
+    store_batch: StoreBatch,
+    batch_size: int,
+    default_source: str = "ingest_batch",
+) -> list[DocumentResult]:
+    """
+    Ingest a stream of NDJSON documents.
+
+    Args:
+        lines (AsyncIterator[str]): NDJSON lines, one BatchDocument each.
+        split (Callable): Async function splitting a text into chunks.
+        store_batch (Callable): Async function embedding and storing a batch of chunks,
+            returning for each chunk whether it was inserted.
+        batch_size (int): Number of chunks per storage call.
+        default_source (str): Source used for deduplication when a document has no id.
+
+    Returns:
+        list[DocumentResult]: One result per line, in input order.
+    """
+    ingestor = BatchIngestor(store_batch, batch_size)
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        try:
+            document = BatchDocument.model_validate_json(line)
+        except ValidationError as e:
+            ingestor.record_error(str(line_number), f"Invalid document: {str(e)}")
+            continue
+
+        doc_id = document.id or str(line_number)
+        try:
+            chunks = await split(document.text)
+        except Exception as e:
+            ingestor.record_error(doc_id, str(e))
+            continue
+        source = document.id or default_source
+        await ingestor.add_document(doc_id, chunks, document.metadata, source=source)
+
+    await ingestor.flush()
+    return ingestor.results()
@@ -0,0 +1,108 @@
+"""
+Compare the embedding backends (PyTorch fp32, ONNX fp32, ONNX int8) on chunks
+of the saved HTML fixtures: load time, chunks/sec, peak memory and cosine
+agreement with the PyTorch vectors. Each backend runs in its own process so
+memory figures do not leak from one to the next.
+
+Usage (from ingest_service/):
+    python -m benchmarks.bench_embedding_backends --chunks 512 --repeat 3
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+from constants import EMBEDDING_BATCH_SIZE, EMBEDDING_MODEL_NAME, EMBEDDING_ONNX_QUANTIZATION
+from embedding_backend import EMBEDDING_BACKENDS, embeddings_kwargs
+from scraper import extract_content
+from text_processor import split_into_chunks
+
+FIXTURES_DIR = Path(__file__).parent.parent / "tests" / "fixtures"
+PARITY_CHUNKS = 64
+
+def load_chunks(count: int) -> list[str]:
+    """Chunks of the fixtures, repeated (with a distinct suffix) up to count"""
+    base = []
+    for fixture in sorted(FIXTURES_DIR.glob("*.html")):
+        # Silence the fallback warning printed on pages without content__body
+        with contextlib.redirect_stdout(io.StringIO()):
+            text = extract_content(fixture.read_text(encoding="utf-8"))
+        base.extend(split_into_chunks(text))
+    return [f"{base[i % len(base)]} ({i})" for i in range(count)]
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_backend(backend: str, quantization: str, chunks: list[str], batch_size: int, repeat: int) -> dict:
+    """Load one backend in this process and embed the chunks repeat times"""
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    model = HuggingFaceEmbeddings(
+        **embeddings_kwargs(EMBEDDING_MODEL_NAME, backend, quantization),
+        encode_kwargs={"batch_size": batch_size}
+    )
+    model.embed_documents(chunks[:batch_size])
+    load_seconds = time.perf_counter() - start
+    loaded = _peak_rss_mb()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.embed_documents(chunks)
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "load_seconds": load_seconds,
+        "chunks_per_second": len(chunks) / statistics.median(timings),
+        "model_mb": loaded - baseline,
+        "peak_mb": _peak_rss_mb(),
+        "vectors": np.asarray(model.embed_documents(chunks[:PARITY_CHUNKS]), dtype=np.float32),
+    }
+
+def _min_cosine(reference: np.ndarray, candidate: np.ndarray) -> float:
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    return float(np.min(np.sum(reference * candidate, axis=1)))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=EMBEDDING_BACKENDS, default=list(EMBEDDING_BACKENDS))
+    parser.add_argument("--quantization", default=EMBEDDING_ONNX_QUANTIZATION)
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.chunks)
+    results = {}
+    for backend in args.backends:
+        # A fresh process per backend, so peak memory is not inherited from the previous one
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results[backend] = pool.submit(
+                run_backend, backend, args.quantization, chunks, args.batch_size, args.repeat
+            ).result()
+
+    reference = results.get("torch")
+    print(f"{'backend':<10} {'load':>7} {'chunks/s':>9} {'speedup':>8} {'model':>9} {'peak':>9} {'min cos':>8}")
+    for backend, result in results.items():
+        speedup = result["chunks_per_second"] / reference["chunks_per_second"] if reference else float("nan")
+        cosine = _min_cosine(reference["vectors"], result["vectors"]) if reference else float("nan")
+        print(
+            f"{backend:<10} {result['load_seconds']:>6.1f}s {result['chunks_per_second']:>9.1f} {speedup:>7.2f}x "
+            f"{result['model_mb']:>7.0f}MB {result['peak_mb']:>7.0f}MB {cosine:>8.4f}"
+        )
+
+if __name__ == "__main__":
+    main()
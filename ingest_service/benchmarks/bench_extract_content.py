@@ -0,0 +1,73 @@
+"""
+Compare the single-pass extract_content with the original implementation on
+the saved HTML fixtures, optionally scaled up by repeating their sections.
+
+Usage (from ingest_service/):
+    python -m benchmarks.bench_extract_content --scale 1 4 16 --repeat 5
+"""
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from scraper import extract_content
+from benchmarks.legacy_scraper import legacy_extract_content
+
+FIXTURES_DIR = Path(__file__).parent.parent / "tests" / "fixtures"
+
+def scale_page(html: str, factor: int) -> str:
+    """Repeat the <section> blocks of a fixture to build a larger page"""
+    start = html.index("<section>")
+    end = html.rindex("</section>") + len("</section>")
+    return html[:start] + html[start:end] * factor + html[end:]
+
+def _parsers() -> list[str]:
+    parsers = ["html.parser"]
+    try:
+        import lxml  # noqa: F401
+        parsers.append("lxml")
+    except ImportError:
+        pass
+    return parsers
+
+def _time(func, html: str, repeat: int) -> tuple[float, str]:
+    timings = []
+    result = None
+    for _ in range(repeat):
+        # Silence the fallback warning printed on pages without content__body
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func(html)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'fixture':<42} {'scale':>5} {'size':>9} {'implementation':<26} {'median':>9} {'speedup':>8}")
+    for fixture in sorted(FIXTURES_DIR.glob("*.html")):
+        base_html = fixture.read_text(encoding="utf-8")
+        for factor in args.scale:
+            html = scale_page(base_html, factor)
+            legacy_time, expected = _time(legacy_extract_content, html, args.repeat)
+            rows = [("legacy (html.parser)", legacy_time)]
+            for name in _parsers():
+                elapsed, result = _time(lambda page: extract_content(page, parser=name), html, args.repeat)
+                if result != expected:
+                    raise SystemExit(f"Output mismatch on {fixture.name} x{factor} with {name}")
+                rows.append((f"single-pass ({name})", elapsed))
+            for label, elapsed in rows:
+                print(
+                    f"{fixture.name:<42} {factor:>5} {len(html) // 1024:>7}KB {label:<26} "
+                    f"{elapsed * 1000:>7.1f}ms {legacy_time / elapsed:>7.2f}x"
+                )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+from bs4 import BeautifulSoup
+
+from scraper import ScraperException
+
+def legacy_extract_content(html: str) -> str:
+    """
+    Original extraction (one find_parent walk per element, fallback re-parsed into
+    a new tree), kept as the reference for output parity and benchmarks.
+    
+    Args:
+        html (str): Raw HTML of the page.
+    
+    Returns:
+        str: Formatted text content from the page.
+    
+    Raises:
+        ScraperException: If the page cannot be parsed or has no content
+    """
+    try:
+        # Handle parsing errors
+        try:
+            soup = BeautifulSoup(html, 'html.parser')
+        except Exception as e:
+            raise ScraperException(f"Failed to parse HTML content: {str(e)}")
+        
+        # Find main content
+        content_body = soup.find('div', class_='content__body')
+        if not content_body:
+            print("Warning: Default main content not found, using fallback content (every paragraph will be included)")
+            content_body = BeautifulSoup('<div></div>', 'html.parser')
+            paragraphs = soup.find_all('p')
+            if not paragraphs:
+                raise ScraperException("No content found in the page")
+            for p in paragraphs:
+                content_body.div.append(p)
+        
+        # Extract relevant content
+        extracted_text = []
+        relevant_content = content_body.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li'])
+        
+        if not relevant_content:
+            raise ScraperException("No relevant content found in the page")
+        
+        for element in relevant_content:
+            if element.name == 'li' and element.find_parent('li'):
+                continue
+                
+            if element.name == 'p' and element.find_parent(['li', 'div.text', 'span.text']):
+                continue
+                
+            text = element.get_text().strip()
+            if not text:
+                continue
+                
+            if element.name.startswith('h'):
+                extracted_text.append(f"\n\n{text}\n")
+            elif element.name == 'li':
+                extracted_text.append(f"\n{text}")
+            else:
+                extracted_text.append(f"{text}\n")
+        
+        final_text = ''.join(extracted_text)
+        if not final_text.strip():
+            raise ScraperException("Extracted content is empty")
+            
+        return final_text
+        
+    except ScraperException:
+        raise
+    except Exception as e:
+        raise ScraperException(f"Unexpected error during content extraction: {str(e)}")
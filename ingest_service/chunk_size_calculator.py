@@ -12,11 +12,7 @@ def calculate_dynamic_chunk_params(text: str) -> tuple[int, int]:
     if text_length < 2000:
         return (text_length, floor(text_length * 0.1))
     
-    elif text_length < 50000:
-        chunk_size = BASE_CHUNK_SIZE
-        overlap = BASE_OVERLAP_SIZE
-    
-    else:
-        raise ValueError("Text is too long to be processed")
+    chunk_size = BASE_CHUNK_SIZE
+    overlap = BASE_OVERLAP_SIZE
     
     return (chunk_size, max(overlap, 100))
\ No newline at end of file
@@ -1,2 +1,61 @@
+import os
+
 CHROMA_DB_PERSIST_DIRECTORY = "./chroma_db"
+# embedded (Chroma files under CHROMA_DB_PERSIST_DIRECTORY) or remote (the Chroma server of docker-compose)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "embedded")
+CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+CHROMA_SSL = os.getenv("CHROMA_SSL", "false").lower() == "true"
+CHROMA_COLLECTION_NAME = os.getenv("CHROMA_COLLECTION_NAME", "langchain")
 HOTMART_BLOG_URL = "https://hotmart.com/pt-br/blog/como-funciona-hotmart"
+GENERATION_DB_PATH = os.getenv("GENERATION_DB_PATH", os.path.join(CHROMA_DB_PERSIST_DIRECTORY, "generation.sqlite3"))
+SOURCE_REGISTRY_DB_PATH = os.getenv("SOURCE_REGISTRY_DB_PATH", os.path.join(CHROMA_DB_PERSIST_DIRECTORY, "sources.sqlite3"))
+# Read-only snapshots of the vector store published for the query service
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(CHROMA_DB_PERSIST_DIRECTORY, "snapshots"))
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "2"))
+SNAPSHOT_PAGE_SIZE = int(os.getenv("SNAPSHOT_PAGE_SIZE", "5000"))
+SNAPSHOT_AUTO_PUBLISH = os.getenv("SNAPSHOT_AUTO_PUBLISH", "false").lower() == "true"
+# With auto-publish, writes outside jobs are published at most this late (0 only publishes after jobs)
+SNAPSHOT_PUBLISH_INTERVAL_SECONDS = float(os.getenv("SNAPSHOT_PUBLISH_INTERVAL_SECONDS", "30"))
+# Snapshots of at least this many chunks also get an HNSW index (exact search below it)
+SNAPSHOT_ANN_MIN_CHUNKS = int(os.getenv("SNAPSHOT_ANN_MIN_CHUNKS", "50000"))
+SNAPSHOT_ANN_M = int(os.getenv("SNAPSHOT_ANN_M", "16"))
+SNAPSHOT_ANN_EF_CONSTRUCTION = int(os.getenv("SNAPSHOT_ANN_EF_CONSTRUCTION", "100"))
+# "lxml" is faster and gives the same text on well-formed pages, but repairs malformed nesting differently
+SCRAPER_HTML_PARSER = os.getenv("SCRAPER_HTML_PARSER", "html.parser")
+SCRAPER_CACHE_DB_PATH = os.getenv("SCRAPER_CACHE_DB_PATH", os.path.join(CHROMA_DB_PERSIST_DIRECTORY, "responses.sqlite3"))
+SCRAPER_MAX_CONNECTIONS = int(os.getenv("SCRAPER_MAX_CONNECTIONS", "20"))
+SCRAPER_PER_HOST_LIMIT = int(os.getenv("SCRAPER_PER_HOST_LIMIT", "4"))
+SCRAPER_MAX_RETRIES = int(os.getenv("SCRAPER_MAX_RETRIES", "3"))
+SCRAPER_BACKOFF_SECONDS = float(os.getenv("SCRAPER_BACKOFF_SECONDS", "0.5"))
+SCRAPER_TIMEOUT_SECONDS = float(os.getenv("SCRAPER_TIMEOUT_SECONDS", "10"))
+EMBEDDING_MODEL_NAME = "intfloat/multilingual-e5-small"
+# torch, onnx or onnx-int8; must match the query service so vectors stay comparable
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "./onnx_models")
+EMBEDDING_ONNX_QUANTIZATION = os.getenv("EMBEDDING_ONNX_QUANTIZATION", "avx2")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./embedding_cache")
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "512"))
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float16")
+BULK_INGEST_BATCH_SIZE = int(os.getenv("BULK_INGEST_BATCH_SIZE", "256"))
+
+EXECUTOR_TYPE = os.getenv("EXECUTOR_TYPE", "thread")
+EXECUTOR_MAX_WORKERS = int(os.getenv("EXECUTOR_MAX_WORKERS", "2"))
+
+JOB_QUEUE_DB_PATH = os.getenv("JOB_QUEUE_DB_PATH", "./jobs/jobs.sqlite3")
+JOB_QUEUE_WORKERS = int(os.getenv("JOB_QUEUE_WORKERS", "1"))
+JOB_QUEUE_MAX_SIZE = int(os.getenv("JOB_QUEUE_MAX_SIZE", "100"))
+
+CRAWL_STATE_DB_PATH = os.getenv("CRAWL_STATE_DB_PATH", "./jobs/crawls.sqlite3")
+CRAWLER_MAX_PAGES = int(os.getenv("CRAWLER_MAX_PAGES", "50000"))
+CRAWLER_REQUEST_DELAY_SECONDS = float(os.getenv("CRAWLER_REQUEST_DELAY_SECONDS", "0.25"))
+CRAWLER_QUEUE_SIZE = int(os.getenv("CRAWLER_QUEUE_SIZE", "32"))
+CRAWLER_USER_AGENT = os.getenv("CRAWLER_USER_AGENT", "HotmartRAGCrawler/0.1")
+
+# Prometheus metrics on /metrics; disabling them leaves only the endpoint (with collected stats)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "hotmart_ingest")
+# Print every timed stage as a JSON line with the request's trace id
+METRICS_LOG_SPANS = os.getenv("METRICS_LOG_SPANS", "false").lower() == "true"
@@ -0,0 +1,397 @@
+import asyncio
+import gzip
+import os
+import sqlite3
+import time
+import uuid
+import xml.etree.ElementTree as ElementTree
+from contextlib import contextmanager
+from typing import Awaitable, Callable, NamedTuple, Optional
+from urllib.parse import urldefrag, urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+from bs4 import BeautifulSoup
+
+from async_scraper import AsyncScraper, FETCH_ERROR, FetchResult
+from scraper import HTML_PARSER
+
+PAGE_PENDING = "pending"
+PAGE_DONE = "done"
+PAGE_FAILED = "failed"
+PAGE_SKIPPED = "skipped"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawls (
+    id TEXT PRIMARY KEY,
+    root_url TEXT NOT NULL,
+    discovered INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS crawl_pages (
+    crawl_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status TEXT NOT NULL,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    added INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (crawl_id, url)
+);
+CREATE INDEX IF NOT EXISTS crawl_pages_status ON crawl_pages (crawl_id, status);
+"""
+
+class CrawlerException(Exception):
+    """Custom exception for crawler errors"""
+    pass
+
+class CrawlStats(NamedTuple):
+    """Progress of a crawl, by page status"""
+    pages_total: int
+    pages_pending: int
+    pages_done: int
+    pages_failed: int
+    pages_skipped: int
+    chunks_added: int
+
+def parse_sitemap(content: bytes) -> tuple[list[str], list[str]]:
+    """
+    Read the URLs listed in a sitemap (plain or gzipped).
+
+    Args:
+        content (bytes): Body of the sitemap.
+
+    Returns:
+        tuple[list[str], list[str]]: Page URLs of a <urlset>, and child sitemap
+        URLs of a <sitemapindex>; one of the two is always empty.
+
+    Raises:
+        CrawlerException: If the content is not a sitemap
+    """
+    if content[:2] == b"\x1f\x8b":
+        content = gzip.decompress(content)
+    try:
+        root = ElementTree.fromstring(content)
+    except ElementTree.ParseError as e:
+        raise CrawlerException(f"Invalid sitemap: {str(e)}")
+
+    kind = root.tag.rsplit("}", 1)[-1]
+    if kind not in ("urlset", "sitemapindex"):
+        raise CrawlerException(f"Invalid sitemap: unexpected root element '{kind}'")
+    locations = [
+        element.text.strip() for element in root.iter()
+        if element.tag.rsplit("}", 1)[-1] == "loc" and element.text and element.text.strip()
+    ]
+    return (locations, []) if kind == "urlset" else ([], locations)
+
+def parse_index_page(html: str, index_url: str) -> list[str]:
+    """
+    Find the post links of an HTML index page: links on the same host whose
+    path is below the index path (e.g. /pt-br/blog/... for /pt-br/blog).
+
+    Returns:
+        list[str]: Absolute URLs without fragments, in page order.
+    """
+    index = urlsplit(index_url)
+    prefix = index.path.rstrip("/") + "/"
+    soup = BeautifulSoup(html, HTML_PARSER)
+    links = []
+    for anchor in soup.find_all("a", href=True):
+        url = urldefrag(urljoin(index_url, anchor["href"]))[0]
+        parts = urlsplit(url)
+        if parts.netloc != index.netloc or not parts.path.startswith(prefix) or parts.path == prefix:
+            continue
+        links.append(parts._replace(query="").geturl())
+    return list(dict.fromkeys(links))
+
+def _looks_like_sitemap(url: str, content_type: str, content: bytes) -> bool:
+    if content[:2] == b"\x1f\x8b" or "xml" in content_type:
+        return True
+    head = content[:512].lstrip().lower()
+    return head.startswith(b"<?xml") or url.lower().endswith((".xml", ".xml.gz"))
+
+class CrawlStore:
+    """
+    SQLite record of the pages discovered by each crawl and what happened to
+    each of them, so an interrupted crawl resumes where it stopped.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        if not self._initialized:
+            connection.executescript(_SCHEMA)
+            self._initialized = True
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connect()
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def create(self, root_url: str) -> str:
+        """Register a new crawl of a sitemap or index page and return its id"""
+        crawl_id = uuid.uuid4().hex
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO crawls (id, root_url, created_at) VALUES (?, ?, ?)",
+                (crawl_id, root_url, time.time())
+            )
+        return crawl_id
+
+    def delete(self, crawl_id: str) -> None:
+        """Forget a crawl and its pages"""
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM crawl_pages WHERE crawl_id = ?", (crawl_id,))
+            connection.execute("DELETE FROM crawls WHERE id = ?", (crawl_id,))
+
+    def get(self, crawl_id: str) -> Optional[dict]:
+        """Return the crawl as a dict, or None if it does not exist"""
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT id, root_url, discovered FROM crawls WHERE id = ?", (crawl_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "root_url": row[1], "discovered": bool(row[2])}
+
+    def mark_discovered(self, crawl_id: str) -> None:
+        with self._transaction() as connection:
+            connection.execute("UPDATE crawls SET discovered = 1 WHERE id = ?", (crawl_id,))
+
+    def add_pages(self, crawl_id: str, urls: list[str]) -> int:
+        """Record discovered pages, ignoring ones already known; returns how many were new"""
+        now = time.time()
+        with self._transaction() as connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO crawl_pages (crawl_id, url, status, updated_at) VALUES (?, ?, ?, ?)",
+                [(crawl_id, url, PAGE_PENDING, now) for url in urls]
+            )
+            return connection.total_changes - before
+
+    def count_pages(self, crawl_id: str) -> int:
+        with self._transaction() as connection:
+            return connection.execute(
+                "SELECT COUNT(*) FROM crawl_pages WHERE crawl_id = ?", (crawl_id,)
+            ).fetchone()[0]
+
+    def pending_pages(self, crawl_id: str, after: int, limit: int) -> list[tuple[int, str]]:
+        """Next pending pages in discovery order, as (position, url) pairs after the given position"""
+        with self._transaction() as connection:
+            return connection.execute(
+                "SELECT rowid, url FROM crawl_pages WHERE crawl_id = ? AND status = ? AND rowid > ? "
+                "ORDER BY rowid LIMIT ?",
+                (crawl_id, PAGE_PENDING, after, limit)
+            ).fetchall()
+
+    def retry_failed(self, crawl_id: str) -> None:
+        """Make failed pages pending again"""
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE crawl_pages SET status = ?, error = NULL WHERE crawl_id = ? AND status = ?",
+                (PAGE_PENDING, crawl_id, PAGE_FAILED)
+            )
+
+    def mark_page(self, crawl_id: str, url: str, status: str, chunks: int = 0, added: int = 0, error: Optional[str] = None) -> None:
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE crawl_pages SET status = ?, chunks = ?, added = ?, error = ?, updated_at = ? "
+                "WHERE crawl_id = ? AND url = ?",
+                (status, chunks, added, error, time.time(), crawl_id, url)
+            )
+
+    def stats(self, crawl_id: str) -> CrawlStats:
+        with self._transaction() as connection:
+            rows = connection.execute(
+                "SELECT status, COUNT(*), COALESCE(SUM(added), 0) FROM crawl_pages WHERE crawl_id = ? GROUP BY status",
+                (crawl_id,)
+            ).fetchall()
+        counts = {status: count for status, count, _ in rows}
+        return CrawlStats(
+            pages_total=sum(counts.values()),
+            pages_pending=counts.get(PAGE_PENDING, 0),
+            pages_done=counts.get(PAGE_DONE, 0),
+            pages_failed=counts.get(PAGE_FAILED, 0),
+            pages_skipped=counts.get(PAGE_SKIPPED, 0),
+            chunks_added=sum(added for _, _, added in rows),
+        )
+
+IngestPage = Callable[[str, str, Optional[str]], Awaitable[NamedTuple]]
+
+class Crawler:
+    """
+    Crawls every post listed by a sitemap (or linked from an index page) and
+    ingests them as they arrive.
+
+    Posts are fetched concurrently by an AsyncScraper, under its per-host
+    limits, and handed to the ingestion stage through a bounded queue: chunking
+    and embedding start with the first page, and fetching pauses whenever
+    ingestion falls behind, so memory does not grow with the size of the blog.
+    Every page outcome is recorded in a CrawlStore; running a crawl again skips
+    the pages already done.
+    """
+
+    def __init__(
+        self,
+        store: CrawlStore,
+        scraper: AsyncScraper,
+        ingest_page: IngestPage,
+        max_pages: int,
+        queue_size: int,
+        ingest_workers: int = 1,
+        batch_size: int = 200,
+        respect_robots: bool = True,
+    ):
+        self.store = store
+        self.scraper = scraper
+        self.ingest_page = ingest_page
+        self.max_pages = max_pages
+        self.queue_size = queue_size
+        self.ingest_workers = ingest_workers
+        self.batch_size = batch_size
+        self.respect_robots = respect_robots
+        self._robots: dict[str, Optional[RobotFileParser]] = {}
+        self._robots_lock = asyncio.Lock()
+
+    async def run(self, crawl_id: str, on_progress: Optional[Callable[[int, int], None]] = None) -> CrawlStats:
+        """
+        Discover (once) and ingest the pages of a crawl.
+
+        Args:
+            crawl_id (str): Crawl created with CrawlStore.create.
+            on_progress (Callable, optional): Called after each page with
+                (pages finished, pages discovered).
+
+        Returns:
+            CrawlStats: Final page counts.
+
+        Raises:
+            CrawlerException: If the crawl does not exist or its root cannot be read
+        """
+        crawl = self.store.get(crawl_id)
+        if crawl is None:
+            raise CrawlerException(f"Crawl '{crawl_id}' not found")
+
+        async with self.scraper:
+            if not crawl["discovered"]:
+                await self._discover(crawl_id, crawl["root_url"])
+            self.store.retry_failed(crawl_id)
+            total = self.store.count_pages(crawl_id)
+            finished = total - self.store.stats(crawl_id).pages_pending
+
+            def page_finished() -> None:
+                nonlocal finished
+                finished += 1
+                if on_progress:
+                    on_progress(finished, total)
+
+            pages: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+            workers = [
+                asyncio.create_task(self._ingest_worker(crawl_id, pages, page_finished))
+                for _ in range(self.ingest_workers)
+            ]
+            try:
+                await self._fetch_pending(crawl_id, pages, page_finished)
+                for _ in workers:
+                    await pages.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for worker in workers:
+                    worker.cancel()
+        return self.store.stats(crawl_id)
+
+    async def _discover(self, crawl_id: str, root_url: str) -> None:
+        to_visit, seen = [root_url], set()
+        # Pages recorded before an interrupted discovery count towards the limit
+        found = self.store.count_pages(crawl_id)
+        while to_visit and found < self.max_pages:
+            url = to_visit.pop(0)
+            if url in seen:
+                continue
+            seen.add(url)
+            try:
+                response = await self.scraper.fetch(url)
+                response.raise_for_status()
+            except Exception as e:
+                if url == root_url:
+                    raise CrawlerException(f"Failed to fetch {url}: {str(e)}")
+                print(f"Warning: skipping sitemap {url}: {str(e)}")
+                continue
+
+            if _looks_like_sitemap(url, response.headers.get("Content-Type", ""), response.content):
+                page_urls, sitemap_urls = parse_sitemap(response.content)
+                to_visit.extend(sitemap_urls)
+            else:
+                page_urls = parse_index_page(response.text, url)
+            found += self.store.add_pages(crawl_id, page_urls[:self.max_pages - found])
+        self.store.mark_discovered(crawl_id)
+
+    async def _allowed(self, url: str) -> bool:
+        if not self.respect_robots:
+            return True
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        async with self._robots_lock:
+            if origin not in self._robots:
+                self._robots[origin] = await self._load_robots(origin, url)
+        robots = self._robots[origin]
+        return robots is None or robots.can_fetch(self.scraper.user_agent or "*", url)
+
+    async def _load_robots(self, origin: str, url: str) -> Optional[RobotFileParser]:
+        """Read robots.txt once per host, adopting its Crawl-delay when it is stricter"""
+        try:
+            response = await self.scraper.fetch(f"{origin}/robots.txt")
+        except Exception as e:
+            print(f"Warning: could not read {origin}/robots.txt: {str(e)}")
+            return None
+        if response.status_code != 200:
+            return None
+        robots = RobotFileParser()
+        robots.parse(response.text.splitlines())
+        delay = robots.crawl_delay(self.scraper.user_agent or "*")
+        limiter = self.scraper.host_limit(url)
+        if delay and float(delay) > limiter.min_interval:
+            limiter.min_interval = float(delay)
+        return robots
+
+    async def _fetch_pending(self, crawl_id: str, pages: asyncio.Queue, page_finished: Callable[[], None]) -> None:
+        async def fetch_one(url: str) -> None:
+            if not await self._allowed(url):
+                self.store.mark_page(crawl_id, url, PAGE_SKIPPED, error="Disallowed by robots.txt")
+                page_finished()
+                return
+            await pages.put(await self.scraper.scrape(url))
+
+        after = 0
+        while True:
+            batch = self.store.pending_pages(crawl_id, after, self.batch_size)
+            if not batch:
+                return
+            after = batch[-1][0]
+            await asyncio.gather(*(fetch_one(url) for _, url in batch))
+
+    async def _ingest_worker(self, crawl_id: str, pages: asyncio.Queue, page_finished: Callable[[], None]) -> None:
+        while True:
+            page: Optional[FetchResult] = await pages.get()
+            if page is None:
+                return
+            if page.status == FETCH_ERROR:
+                self.store.mark_page(crawl_id, page.url, PAGE_FAILED, error=page.error)
+            else:
+                try:
+                    stats = await self.ingest_page(page.text, page.url, page.version)
+                    self.store.mark_page(crawl_id, page.url, PAGE_DONE, chunks=stats.chunks, added=stats.added)
+                except Exception as e:
+                    self.store.mark_page(crawl_id, page.url, PAGE_FAILED, error=str(e))
+            page_finished()
@@ -0,0 +1,147 @@
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+from constants import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_ONNX_DIR,
+    EMBEDDING_ONNX_QUANTIZATION,
+)
+
+BACKEND_TORCH = "torch"
+BACKEND_ONNX = "onnx"
+BACKEND_ONNX_INT8 = "onnx-int8"
+EMBEDDING_BACKENDS = (BACKEND_TORCH, BACKEND_ONNX, BACKEND_ONNX_INT8)
+
+# Dynamic quantization presets understood by sentence-transformers / optimum
+ONNX_QUANTIZATIONS = ("arm64", "avx2", "avx512", "avx512_vnni")
+
+ONNX_MODEL_FILE = "onnx/model.onnx"
+
+class EmbeddingBackendException(Exception):
+    """Custom exception for embedding backend configuration and export errors"""
+    pass
+
+_export_lock = threading.Lock()
+
+def _check_backend(backend: str, quantization: str) -> None:
+    if backend not in EMBEDDING_BACKENDS:
+        raise EmbeddingBackendException(
+            f"Unknown embedding backend '{backend}' (expected one of: {', '.join(EMBEDDING_BACKENDS)})"
+        )
+    if backend == BACKEND_ONNX_INT8 and quantization not in ONNX_QUANTIZATIONS:
+        raise EmbeddingBackendException(
+            f"Unknown ONNX quantization '{quantization}' (expected one of: {', '.join(ONNX_QUANTIZATIONS)})"
+        )
+
+def embedding_model_id(
+    model_name: str = EMBEDDING_MODEL_NAME,
+    backend: str = EMBEDDING_BACKEND,
+    quantization: str = EMBEDDING_ONNX_QUANTIZATION,
+) -> str:
+    """
+    Identifier of the vectors a backend produces.
+
+    The fp32 ONNX export computes the same vectors as PyTorch up to rounding;
+    int8 weights move them slightly, so each backend gets its own id. The id
+    namespaces the embedding cache and is recorded next to the vector store,
+    so vectors of different backends are never mixed.
+    """
+    _check_backend(backend, quantization)
+    if backend == BACKEND_TORCH:
+        return model_name
+    if backend == BACKEND_ONNX_INT8:
+        return f"{model_name}@{backend}:{quantization}"
+    return f"{model_name}@{backend}"
+
+def onnx_model_file(backend: str, quantization: str = EMBEDDING_ONNX_QUANTIZATION) -> str:
+    """Path of the ONNX graph of a backend, relative to the exported model directory"""
+    if backend == BACKEND_ONNX_INT8:
+        return f"onnx/model_qint8_{quantization}.onnx"
+    return ONNX_MODEL_FILE
+
+def export_onnx_model(
+    model_name: str,
+    backend: str,
+    quantization: str = EMBEDDING_ONNX_QUANTIZATION,
+    directory: str = EMBEDDING_ONNX_DIR,
+) -> str:
+    """
+    Export a sentence-transformers model to ONNX (and quantize it to int8) once.
+
+    The export is built in a temporary directory and renamed into place, so
+    concurrent workers never load a half-written model; a worker losing the
+    race simply discards its copy.
+
+    Args:
+        model_name (str): HuggingFace model identifier.
+        backend (str): BACKEND_ONNX or BACKEND_ONNX_INT8.
+        quantization (str): Quantization preset for BACKEND_ONNX_INT8.
+        directory (str): Where exported models are kept.
+
+    Returns:
+        str: Directory of the exported model, loadable by SentenceTransformer.
+
+    Raises:
+        EmbeddingBackendException: If the export fails
+    """
+    _check_backend(backend, quantization)
+    prefix = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+    target = os.path.join(directory, f"{prefix}.{backend}")
+    if backend == BACKEND_ONNX_INT8:
+        target = f"{target}.{quantization}"
+    if os.path.exists(os.path.join(target, onnx_model_file(backend, quantization))):
+        return target
+
+    with _export_lock:
+        if os.path.exists(os.path.join(target, onnx_model_file(backend, quantization))):
+            return target
+        try:
+            from sentence_transformers import SentenceTransformer
+            from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+
+            os.makedirs(directory, exist_ok=True)
+            staging = tempfile.mkdtemp(prefix=f".{prefix}.", dir=directory)
+            try:
+                # Loading with backend="onnx" exports the PyTorch weights through optimum
+                model = SentenceTransformer(model_name, backend="onnx", device="cpu")
+                model.save_pretrained(staging)
+                if backend == BACKEND_ONNX_INT8:
+                    export_dynamic_quantized_onnx_model(model, quantization, staging)
+                os.rename(staging, target)
+            except OSError:
+                if not os.path.exists(target):
+                    raise
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+        except Exception as e:
+            raise EmbeddingBackendException(f"Failed to export '{model_name}' for the {backend} backend: {str(e)}")
+    return target
+
+def embeddings_kwargs(
+    model_name: str = EMBEDDING_MODEL_NAME,
+    backend: str = EMBEDDING_BACKEND,
+    quantization: str = EMBEDDING_ONNX_QUANTIZATION,
+    directory: str = EMBEDDING_ONNX_DIR,
+) -> dict:
+    """
+    HuggingFaceEmbeddings arguments running the model on the given backend,
+    exporting it to ONNX first when needed.
+
+    Raises:
+        EmbeddingBackendException: If the backend is unknown or the export fails
+    """
+    _check_backend(backend, quantization)
+    if backend == BACKEND_TORCH:
+        return {"model_name": model_name}
+    return {
+        "model_name": export_onnx_model(model_name, backend, quantization, directory),
+        "model_kwargs": {
+            "backend": "onnx",
+            "device": "cpu",
+            "model_kwargs": {"file_name": onnx_model_file(backend, quantization)},
+        },
+    }
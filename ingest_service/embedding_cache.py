@@ -0,0 +1,294 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from constants import (
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_CACHE_DTYPE,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_CACHE_MAX_MB,
+)
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where only threads of one process are coordinated
+    fcntl = None
+
+class EmbeddingCacheException(Exception):
+    """Custom exception for embedding cache errors"""
+    pass
+
+# Lookups record when entries were used in memory and write it to the index at most this often
+TOUCH_FLUSH_SECONDS = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    slot INTEGER NOT NULL UNIQUE,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+def text_hash(text: str) -> str:
+    """Hash identifying a chunk's content in the cache"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+@contextmanager
+def _file_lock(path: str, exclusive: bool):
+    """Lock shared by every process using the cache files (released when the file is closed)"""
+    if fcntl is None:
+        yield
+        return
+    # Opened on each use: a descriptor inherited by a forked worker would share the parent's lock
+    with open(path, "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache for one model.
+
+    Vectors live in a fixed-capacity memory-mapped matrix (float16 or float32)
+    and a small SQLite index maps chunk hashes to rows. The capacity is derived
+    from a byte budget; when full, the least recently used rows are reused.
+
+    Several processes (e.g. a process executor's workers) may share the same
+    files: storing takes an exclusive file lock around allocating rows and
+    writing them, and lookups a shared one, so a row is never handed out
+    twice nor read while it is overwritten.
+    """
+
+    def __init__(self, directory: str, model_name: str, max_bytes: int, dtype: str = "float16"):
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.dtype("float16"), np.dtype("float32")):
+            raise EmbeddingCacheException(f"Unsupported cache dtype '{dtype}' (expected float16 or float32)")
+
+        os.makedirs(directory, exist_ok=True)
+        prefix = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        self._index_path = os.path.join(directory, f"{prefix}.index.sqlite3")
+        self._vectors_path = os.path.join(directory, f"{prefix}.{self.dtype.name}.vectors")
+        self._lock_path = os.path.join(directory, f"{prefix}.lock")
+        self._pid = os.getpid()
+
+        self._lock = threading.Lock()
+        self._index = sqlite3.connect(self._index_path, timeout=30, check_same_thread=False)
+        self._index.executescript(_SCHEMA)
+        self._vectors: Optional[np.memmap] = None
+        self.dim: Optional[int] = None
+        self.capacity = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> last lookup time, not yet written to the index
+        self._touched: dict[str, float] = {}
+        self._last_flush = time.time()
+        with self._lock, _file_lock(self._lock_path, exclusive=False):
+            self._open_existing()
+
+    def _meta(self, name: str) -> Optional[str]:
+        row = self._index.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _open_existing(self) -> None:
+        """Map the vectors file another process (or a previous run) created, if it fits this budget"""
+        dim, capacity = self._meta("dim"), self._meta("capacity")
+        if dim is None or capacity is None or not os.path.exists(self._vectors_path):
+            return
+        dim, capacity = int(dim), int(capacity)
+        if capacity != self._capacity_for(dim):
+            # Budget changed since the cache was created: the next put_many starts over
+            return
+        self.dim, self.capacity = dim, capacity
+        self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode="r+", shape=(capacity, dim))
+
+    def _capacity_for(self, dim: int) -> int:
+        return max(self.max_bytes // (dim * self.dtype.itemsize), 1)
+
+    def _reset(self, dim: int) -> None:
+        self.dim = dim
+        self.capacity = self._capacity_for(dim)
+        self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode="w+", shape=(self.capacity, dim))
+        with self._index:
+            self._index.execute("DELETE FROM entries")
+            self._index.executemany(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                [("dim", str(dim)), ("capacity", str(self.capacity)), ("model", self.model_name)]
+            )
+
+    def _lookup_slots(self, keys: list[str]) -> dict[str, int]:
+        slots = {}
+        # Stay below SQLite's limit on the number of query parameters
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            rows = self._index.execute(
+                f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(part))})", part
+            ).fetchall()
+            slots.update(rows)
+        return slots
+
+    def _flush_touched(self, now: float) -> None:
+        if self._touched:
+            with self._index:
+                self._index.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ? AND last_used < ?",
+                    [(used, key, used) for key, used in self._touched.items()]
+                )
+            self._touched = {}
+        self._last_flush = now
+
+    def get_many(self, texts: list[str]) -> list[Optional[list[float]]]:
+        """Cached vectors for each text, None where the text is not cached"""
+        keys = [text_hash(text) for text in texts]
+        with self._lock, _file_lock(self._lock_path, exclusive=False):
+            if self._vectors is None:
+                self._open_existing()
+            if self._vectors is None:
+                self.misses += len(texts)
+                return [None] * len(texts)
+
+            slots = self._lookup_slots(keys)
+            results = []
+            for key in keys:
+                slot = slots.get(key)
+                results.append(None if slot is None else self._vectors[slot].astype(np.float32).tolist())
+
+            # Lookups do not write to the index every time: eviction order is approximate to TOUCH_FLUSH_SECONDS
+            now = time.time()
+            self._touched.update((key, now) for key in slots)
+            if now - self._last_flush >= TOUCH_FLUSH_SECONDS:
+                self._flush_touched(now)
+            self.hits += len(texts) - results.count(None)
+            self.misses += results.count(None)
+            return results
+
+    def put_many(self, texts: list[str], vectors: list[list[float]]) -> None:
+        """Store vectors, evicting the least recently used entries when the cache is full"""
+        if not texts:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        entries = dict(zip((text_hash(text) for text in texts), matrix))
+
+        with self._lock, _file_lock(self._lock_path, exclusive=True):
+            if self._vectors is None:
+                self._open_existing()
+            if self._vectors is None or self.dim != matrix.shape[1]:
+                self._reset(matrix.shape[1])
+            now = time.time()
+            # Evict by the latest lookups of this process too
+            self._flush_touched(now)
+
+            existing = self._lookup_slots(list(entries))
+            new_keys = [key for key in entries if key not in existing][:self.capacity]
+            if not new_keys:
+                return
+
+            count = self._index.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            free = self.capacity - count
+            slots = list(range(count, count + min(free, len(new_keys))))
+            with self._index:
+                if len(slots) < len(new_keys):
+                    victims = self._index.execute(
+                        "SELECT key, slot FROM entries ORDER BY last_used LIMIT ?", (len(new_keys) - len(slots),)
+                    ).fetchall()
+                    self._index.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in victims])
+                    slots.extend(slot for _, slot in victims)
+                    self.evictions += len(victims)
+                self._index.executemany(
+                    "INSERT INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+                    [(key, slot, now) for key, slot in zip(new_keys, slots)]
+                )
+            for key, slot in zip(new_keys, slots):
+                self._vectors[slot] = entries[key].astype(self.dtype)
+            self._vectors.flush()
+
+    def stats(self) -> dict:
+        """Hit-rate statistics since the process started, plus current occupancy"""
+        with self._lock:
+            entries = self._index.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "capacity": self.capacity,
+                "dtype": self.dtype.name,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._touched:
+                with _file_lock(self._lock_path, exclusive=False):
+                    self._flush_touched(time.time())
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = None
+            self._index.close()
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves document vectors from an EmbeddingCache before calling the model"""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors = self.cache.get_many(texts)
+        missing = [index for index, vector in enumerate(vectors) if vector is None]
+        if missing:
+            # Identical texts in the same batch are embedded once
+            unique_texts = list(dict.fromkeys(texts[index] for index in missing))
+            computed = dict(zip(unique_texts, self.embeddings.embed_documents(unique_texts)))
+            self.cache.put_many(unique_texts, [computed[text] for text in unique_texts])
+            for index in missing:
+                vectors[index] = list(computed[texts[index]])
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embeddings.embed_query(text)
+
+_caches: dict[str, EmbeddingCache] = {}
+_lock = threading.Lock()
+
+def get_embedding_cache(model_name: str) -> Optional[EmbeddingCache]:
+    """Return the process-wide cache for the model, or None when caching is disabled"""
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    cache = _caches.get(model_name)
+    # A forked worker process inherits the parent's caches, whose SQLite connections it must not use
+    if cache is None or cache._pid != os.getpid():
+        with _lock:
+            cache = _caches.get(model_name)
+            if cache is None or cache._pid != os.getpid():
+                cache = EmbeddingCache(
+                    EMBEDDING_CACHE_DIR,
+                    model_name,
+                    max_bytes=EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+                    dtype=EMBEDDING_CACHE_DTYPE,
+                )
+                _caches[model_name] = cache
+    return cache
+
+def reset_embedding_caches() -> None:
+    """Close and drop every cache (mainly useful for tests)"""
+    with _lock:
+        for cache in _caches.values():
+            cache.close()
+        _caches.clear()
@@ -0,0 +1,102 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, NamedTuple, Optional
+
+from constants import EXECUTOR_TYPE, EXECUTOR_MAX_WORKERS
+from metrics import REGISTRY, current_trace_id, reset_trace_id, set_trace_id
+
+class ExecutorException(Exception):
+    """Custom exception for executor configuration errors"""
+    pass
+
+_executor: Optional[Executor] = None
+_lock = threading.Lock()
+
+def _init_process_worker() -> None:
+    """Load the embeddings model once in each worker process"""
+    from model_registry import warm_up
+    # A forked worker starts with a copy of the parent's metrics, which must not be sent back
+    REGISTRY.drain()
+    try:
+        warm_up()
+    except Exception as e:
+        print(f"Warning: could not warm up embeddings model in worker process: {str(e)}")
+
+class _WorkerResult(NamedTuple):
+    """What a worker process sends back: the outcome and the metrics it recorded"""
+    value: Any
+    error: Optional[BaseException]
+    metrics: dict
+
+def _run_in_worker(func: Callable[..., Any], trace_id: Optional[str]) -> _WorkerResult:
+    """Run a task in a worker process under the caller's trace id, returning its metrics with the outcome"""
+    token = set_trace_id(trace_id)
+    try:
+        return _WorkerResult(func(), None, REGISTRY.drain())
+    except Exception as e:
+        return _WorkerResult(None, e, REGISTRY.drain())
+    finally:
+        reset_trace_id(token)
+
+def _create_executor(executor_type: str, max_workers: int) -> Executor:
+    if max_workers < 1:
+        raise ExecutorException("EXECUTOR_MAX_WORKERS must be at least 1")
+    if executor_type == "thread":
+        return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest-worker")
+    if executor_type == "process":
+        return ProcessPoolExecutor(max_workers=max_workers, initializer=_init_process_worker)
+    raise ExecutorException(f"Unknown executor type '{executor_type}' (expected 'thread' or 'process')")
+
+def get_executor() -> Executor:
+    """
+    Return the shared pool used for blocking and CPU-bound work.
+    
+    The pool size bounds how many ingestions run at the same time; extra
+    submissions wait in the pool queue instead of blocking the event loop.
+    
+    Raises:
+        ExecutorException: If the executor configuration is invalid
+    """
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = _create_executor(EXECUTOR_TYPE, EXECUTOR_MAX_WORKERS)
+    return _executor
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a blocking function in the shared pool without blocking the event loop.
+    
+    The caller's trace id is current while the function runs. Metrics a
+    worker process records are sent back and merged into this process's
+    registry, so /metrics covers both pool types.
+    
+    Args:
+        func (Callable): The blocking function. Must be picklable when using a process pool.
+        *args, **kwargs: Arguments forwarded to the function.
+    
+    Returns:
+        Any: Whatever the function returns.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    call = partial(func, *args, **kwargs)
+    if not isinstance(executor, ProcessPoolExecutor):
+        return await loop.run_in_executor(executor, contextvars.copy_context().run, call)
+    result = await loop.run_in_executor(executor, _run_in_worker, call, current_trace_id())
+    REGISTRY.merge(result.metrics)
+    if result.error is not None:
+        raise result.error
+    return result.value
+
+def shutdown_executor() -> None:
+    """Shut down the shared pool, waiting for running tasks to finish"""
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
@@ -0,0 +1,100 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Optional
+
+from constants import GENERATION_DB_PATH
+from embedding_backend import embedding_model_id
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS generation (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+class GenerationMarker:
+    """
+    Counter on the shared chroma_data volume, bumped after every write to the
+    vector store. The query service compares it with the generation its cached
+    answers were computed at, so cached answers never outlive the content they
+    were built from.
+
+    The increment is a single SQLite statement, so bumps from several threads
+    or worker processes are never lost. Each bump also records the embedding
+    model (and backend) the write used, so both services can refuse to mix
+    vectors of different models.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        if not self._initialized:
+            connection.executescript(_SCHEMA)
+            self._initialized = True
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connect()
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def read(self) -> int:
+        """Current generation (0 before the first write)"""
+        with self._transaction() as connection:
+            row = connection.execute("SELECT value FROM generation WHERE id = 0").fetchone()
+        return row[0] if row else 0
+
+    def embedding_model(self) -> Optional[str]:
+        """Embedding model id of the last write, or None before the first one"""
+        with self._transaction() as connection:
+            row = connection.execute("SELECT value FROM meta WHERE name = 'embedding_model'").fetchone()
+        return row[0] if row else None
+
+    def bump(self, embedding_model: Optional[str] = None) -> int:
+        """
+        Advance the generation after the vector store changed.
+
+        Args:
+            embedding_model (str, optional): Embedding model id the write used.
+
+        Returns:
+            int: The new generation.
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO generation (id, value) VALUES (0, 1) "
+                "ON CONFLICT(id) DO UPDATE SET value = value + 1"
+            )
+            if embedding_model is not None:
+                connection.execute(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES ('embedding_model', ?)", (embedding_model,)
+                )
+            return connection.execute("SELECT value FROM generation WHERE id = 0").fetchone()[0]
+
+def bump_generation() -> int:
+    """Advance the shared generation marker; call after every vector store write"""
+    return GenerationMarker(GENERATION_DB_PATH).bump(embedding_model_id())
+
+def current_generation() -> int:
+    """Current value of the shared generation marker"""
+    return GenerationMarker(GENERATION_DB_PATH).read()
+
+def stored_embedding_model() -> Optional[str]:
+    """Embedding model id the vector store was written with, or None if it is empty"""
+    return GenerationMarker(GENERATION_DB_PATH).embedding_model()
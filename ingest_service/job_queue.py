@@ -0,0 +1,245 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from functools import partial
+from typing import Awaitable, Callable, Optional
+
+from metrics import current_trace_id, reset_trace_id, set_trace_id
+
+class JobQueueException(Exception):
+    """Custom exception for job queue errors"""
+    pass
+
+class JobQueueFullException(JobQueueException):
+    """Raised when the queue already holds the maximum number of active jobs"""
+    pass
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    chunks_total INTEGER NOT NULL DEFAULT 0,
+    chunks_embedded INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+)
+"""
+
+class JobStore:
+    """
+    SQLite-backed persistence for ingestion jobs.
+
+    Every operation opens its own short-lived connection, so the store can be
+    used from the event loop and from worker threads (or pickled into worker
+    processes) without sharing a connection.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        if not self._initialized:
+            connection.execute(_SCHEMA)
+            connection.commit()
+            self._initialized = True
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connect()
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def create(self, kind: str, payload: dict) -> str:
+        """Persist a new pending job and return its id"""
+        job_id = uuid.uuid4().hex
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), JOB_PENDING, time.time())
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Return the job as a dict, or None if it does not exist"""
+        with self._transaction() as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def count_active(self) -> int:
+        """Number of jobs that are pending or running"""
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (JOB_PENDING, JOB_RUNNING)
+            ).fetchone()
+        return row[0]
+
+    def mark_running(self, job_id: str) -> None:
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, chunks_embedded = 0, error = NULL WHERE id = ?",
+                (JOB_RUNNING, time.time(), job_id)
+            )
+
+    def update_progress(self, job_id: str, chunks_embedded: int, chunks_total: int) -> None:
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET chunks_embedded = ?, chunks_total = ? WHERE id = ?",
+                (chunks_embedded, chunks_total, job_id)
+            )
+
+    def mark_done(self, job_id: str, chunks: int) -> None:
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, chunks_total = ?, chunks_embedded = ? WHERE id = ?",
+                (JOB_DONE, time.time(), chunks, chunks, job_id)
+            )
+
+    def mark_failed(self, job_id: str, error: str) -> None:
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+                (JOB_FAILED, time.time(), error, job_id)
+            )
+
+    def requeue_interrupted(self) -> list[str]:
+        """
+        Reset jobs left running by a previous process and return every pending
+        job id, oldest first.
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?",
+                (JOB_PENDING, JOB_RUNNING)
+            )
+            rows = connection.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (JOB_PENDING,)
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+def job_throughput(job: dict) -> Optional[float]:
+    """Chunks embedded per second since the job started, or None if it has not started"""
+    if not job.get("started_at"):
+        return None
+    end = job.get("finished_at") or time.time()
+    elapsed = end - job["started_at"]
+    if elapsed <= 0:
+        return None
+    return job["chunks_embedded"] / elapsed
+
+JobRunner = Callable[[str, dict, Callable[[int, int], None]], Awaitable[int]]
+
+class JobQueue:
+    """
+    Background ingestion queue with a fixed number of asyncio workers.
+
+    Jobs are persisted in a JobStore before being acknowledged, so pending
+    jobs survive a restart. Submissions are rejected once the number of
+    active jobs reaches max_size.
+    """
+
+    def __init__(self, store: JobStore, runner: JobRunner, workers: int = 1, max_size: int = 100):
+        if workers < 1:
+            raise JobQueueException("Job queue needs at least one worker")
+        self.store = store
+        self.runner = runner
+        self.workers = workers
+        self.max_size = max_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Recover pending jobs from the store and start the workers"""
+        self._queue = asyncio.Queue()
+        # Queued as (job id, trace id of the request that submitted it); resumed jobs have none
+        for job_id in self.store.requeue_interrupted():
+            self._queue.put_nowait((job_id, None))
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers; unfinished jobs stay persisted and are resumed on next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def submit(self, kind: str, payload: dict) -> str:
+        """
+        Persist a job and schedule it for execution.
+
+        Returns:
+            str: The job id.
+
+        Raises:
+            JobQueueFullException: If the queue is at capacity
+        """
+        if self.store.count_active() >= self.max_size:
+            raise JobQueueFullException(f"Job queue is full ({self.max_size} active jobs)")
+        job_id = self.store.create(kind, payload)
+        if self._queue is not None:
+            self._queue.put_nowait((job_id, current_trace_id()))
+        return job_id
+
+    def pending(self) -> int:
+        """Jobs waiting for a worker"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, trace_id = await self._queue.get()
+            # The job's logs and spans carry the trace id of the request that submitted it
+            token = set_trace_id(trace_id)
+            try:
+                await self._run(job_id)
+            finally:
+                reset_trace_id(token)
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = self.store.get(job_id)
+        if job is None or job["status"] != JOB_PENDING:
+            return
+        self.store.mark_running(job_id)
+        try:
+            chunks = await self.runner(
+                job["kind"], job["payload"], partial(self.store.update_progress, job_id)
+            )
+            self.store.mark_done(job_id, chunks)
+        except asyncio.CancelledError:
+            # Shutting down: leave the job running in the store so it is requeued on restart
+            raise
+        except Exception as e:
+            self.store.mark_failed(job_id, str(e))
+
+    async def join(self) -> None:
+        """Wait until every queued job has been processed"""
+        if self._queue is not None:
+            await self._queue.join()
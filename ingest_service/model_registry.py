@@ -0,0 +1,71 @@
+import threading
+
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from constants import EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME
+from embedding_backend import embedding_model_id, embeddings_kwargs
+from metrics import span
+
+class ModelRegistryException(Exception):
+    """Custom exception for embedding model loading errors"""
+    pass
+
+_models: dict[str, HuggingFaceEmbeddings] = {}
+_lock = threading.Lock()
+
+def get_embeddings(model_name: str = EMBEDDING_MODEL_NAME, backend: str = EMBEDDING_BACKEND) -> HuggingFaceEmbeddings:
+    """
+    Return the process-wide embeddings model for the given name, loading it on first use.
+    
+    Args:
+        model_name (str): HuggingFace model identifier.
+        backend (str): Inference backend (torch, onnx or onnx-int8); ONNX
+            backends export the model on first use.
+    
+    Returns:
+        HuggingFaceEmbeddings: The shared embeddings instance.
+        
+    Raises:
+        ModelRegistryException: If the model cannot be loaded
+    """
+    try:
+        model_id = embedding_model_id(model_name, backend)
+    except Exception as e:
+        raise ModelRegistryException(str(e))
+    model = _models.get(model_id)
+    if model is not None:
+        return model
+
+    with _lock:
+        # Another thread may have loaded it while we were waiting for the lock
+        model = _models.get(model_id)
+        if model is None:
+            try:
+                with span("model_load"):
+                    model = HuggingFaceEmbeddings(**embeddings_kwargs(model_name, backend))
+            except Exception as e:
+                raise ModelRegistryException(f"Failed to load embeddings model '{model_id}': {str(e)}")
+            _models[model_id] = model
+    return model
+
+def is_model_loaded(model_name: str = EMBEDDING_MODEL_NAME, backend: str = EMBEDDING_BACKEND) -> bool:
+    """Check whether the given model is already loaded in this process"""
+    return embedding_model_id(model_name, backend) in _models
+
+def warm_up(model_name: str = EMBEDDING_MODEL_NAME) -> None:
+    """
+    Load the model and run a dummy embedding so the first request does not pay for it.
+    
+    Raises:
+        ModelRegistryException: If the model cannot be loaded or run
+    """
+    model = get_embeddings(model_name)
+    try:
+        model.embed_query("warm-up")
+    except Exception as e:
+        raise ModelRegistryException(f"Failed to warm up embeddings model '{model_name}': {str(e)}")
+
+def clear_registry() -> None:
+    """Drop every loaded model (mainly useful for tests)"""
+    with _lock:
+        _models.clear()
@@ -1,8 +1,9 @@
 import requests
-from bs4 import BeautifulSoup
+from typing import Optional
+from bs4 import BeautifulSoup, Tag
 from requests.exceptions import RequestException
 
-from constants import HOTMART_BLOG_URL
+from constants import HOTMART_BLOG_URL, SCRAPER_HTML_PARSER
 
 class ScraperException(Exception):
     """Custom exception for scraper-related errors"""
@@ -27,48 +28,108 @@ def scrape_content():
         except RequestException as e:
             raise ScraperException(f"Failed to fetch content: {str(e)}")
         
+        return extract_content(response.text)
+        
+    except ScraperException:
+        raise
+    except Exception as e:
+        raise ScraperException(f"Unexpected error during content scraping: {str(e)}")
+
+def _resolve_parser(name: str) -> str:
+    """Use lxml when configured and installed, the built-in html.parser otherwise"""
+    if name == "lxml":
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            print("Warning: lxml is not installed, falling back to html.parser")
+            return "html.parser"
+    return name
+
+HTML_PARSER = _resolve_parser(SCRAPER_HTML_PARSER)
+
+HEADINGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+RELEVANT_TAGS = HEADINGS | {'p', 'li'}
+
+def _extract_elements(roots: list[Tag], inside_li: bool) -> tuple[list[str], bool]:
+    """
+    Walk the given subtrees once, in document order, formatting headings,
+    paragraphs and list items.
+
+    Whether an element is inside a list item is carried down the walk instead
+    of being looked up through its ancestors: nested list items and paragraphs
+    inside list items are skipped, since the enclosing item already holds their
+    text.
+
+    Returns:
+        tuple[list[str], bool]: Formatted text pieces, and whether any relevant
+        element (even an empty or skipped one) was found.
+    """
+    extracted_text = []
+    found = False
+    stack = [(root, inside_li) for root in reversed(roots)]
+    while stack:
+        element, in_li = stack.pop()
+        name = element.name
+        if name in RELEVANT_TAGS:
+            found = True
+            if name in HEADINGS or not in_li:
+                text = element.get_text().strip()
+                if text:
+                    if name in HEADINGS:
+                        extracted_text.append(f"\n\n{text}\n")
+                    elif name == 'li':
+                        extracted_text.append(f"\n{text}")
+                    else:
+                        extracted_text.append(f"{text}\n")
+        children_in_li = in_li or name == 'li'
+        stack.extend(
+            (child, children_in_li) for child in reversed(element.contents) if isinstance(child, Tag)
+        )
+    return extracted_text, found
+
+def extract_content(html: str, parser: Optional[str] = None) -> str:
+    """
+    Extract the relevant text elements of a Hotmart blog page in a single
+    traversal of the parsed tree.
+    
+    Args:
+        html (str): Raw HTML of the page.
+        parser (str, optional): BeautifulSoup parser, defaults to SCRAPER_HTML_PARSER.
+    
+    Returns:
+        str: Formatted text content from the page.
+    
+    Raises:
+        ScraperException: If the page cannot be parsed or has no content
+    """
+    try:
         # Handle parsing errors
         try:
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = BeautifulSoup(html, parser or HTML_PARSER)
         except Exception as e:
             raise ScraperException(f"Failed to parse HTML content: {str(e)}")
         
         # Find main content
         content_body = soup.find('div', class_='content__body')
-        if not content_body:
+        if content_body:
+            roots = [child for child in content_body.contents if isinstance(child, Tag)]
+            inside_li = content_body.find_parent('li') is not None
+        else:
             print("Warning: Default main content not found, using fallback content (every paragraph will be included)")
-            content_body = BeautifulSoup('<div></div>', 'html.parser')
-            paragraphs = soup.find_all('p')
-            if not paragraphs:
+            roots = soup.find_all('p')
+            if not roots:
                 raise ScraperException("No content found in the page")
-            for p in paragraphs:
-                content_body.div.append(p)
+            # Detach every paragraph from the page: each is extracted on its own,
+            # without the text of paragraphs nested in it, which follow it instead
+            for p in roots:
+                p.extract()
+            inside_li = False
         
         # Extract relevant content
-        extracted_text = []
-        relevant_content = content_body.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li'])
-        
-        if not relevant_content:
+        extracted_text, found = _extract_elements(roots, inside_li)
+        if not found:
             raise ScraperException("No relevant content found in the page")
         
-        for element in relevant_content:
-            if element.name == 'li' and element.find_parent('li'):
-                continue
-                
-            if element.name == 'p' and element.find_parent(['li', 'div.text', 'span.text']):
-                continue
-                
-            text = element.get_text().strip()
-            if not text:
-                continue
-                
-            if element.name.startswith('h'):
-                extracted_text.append(f"\n\n{text}\n")
-            elif element.name == 'li':
-                extracted_text.append(f"\n{text}")
-            else:
-                extracted_text.append(f"{text}\n")
-        
         final_text = ''.join(extracted_text)
         if not final_text.strip():
             raise ScraperException("Extracted content is empty")
@@ -78,4 +139,4 @@ def scrape_content():
     except ScraperException:
         raise
     except Exception as e:
-        raise ScraperException(f"Unexpected error during content scraping: {str(e)}")
+        raise ScraperException(f"Unexpected error during content extraction: {str(e)}")
@@ -0,0 +1,224 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+
+from constants import (
+    SNAPSHOT_ANN_EF_CONSTRUCTION,
+    SNAPSHOT_ANN_M,
+    SNAPSHOT_ANN_MIN_CHUNKS,
+    SNAPSHOT_DIR,
+    SNAPSHOT_KEEP,
+    SNAPSHOT_PAGE_SIZE,
+)
+from embedding_backend import embedding_model_id
+from generation import current_generation
+from vector_store import get_vector_store
+
+# Pointer to the published snapshot directory, replaced atomically on publish
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.f32"
+CHUNKS_FILE = "chunks.sqlite3"
+ANN_FILE = "index.hnsw"
+
+_CHUNKS_SCHEMA = """
+CREATE TABLE chunks (
+    row INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    content TEXT NOT NULL,
+    metadata TEXT NOT NULL
+)
+"""
+
+class SnapshotException(Exception):
+    """Custom exception for vector store snapshot errors"""
+    pass
+
+class SnapshotInfo(NamedTuple):
+    """What a published snapshot contains"""
+    name: str
+    generation: int
+    chunks: int
+    dim: int
+    seconds: float
+
+_publish_lock = threading.Lock()
+
+def _build_ann_index(directory: str, count: int, dim: int) -> Optional[dict]:
+    """
+    Build an HNSW index (inner product on the normalized vectors) next to the
+    vector file. hnswlib ships with chromadb; without it the snapshot is
+    served by exact search only.
+    """
+    try:
+        import hnswlib
+    except ImportError:
+        return None
+    vectors = np.memmap(os.path.join(directory, VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, dim))
+    index = hnswlib.Index(space="ip", dim=dim)
+    index.init_index(max_elements=count, ef_construction=SNAPSHOT_ANN_EF_CONSTRUCTION, M=SNAPSHOT_ANN_M)
+    for start in range(0, count, SNAPSHOT_PAGE_SIZE):
+        end = min(start + SNAPSHOT_PAGE_SIZE, count)
+        index.add_items(vectors[start:end], np.arange(start, end))
+    index.save_index(os.path.join(directory, ANN_FILE))
+    return {"file": ANN_FILE, "space": "ip", "M": SNAPSHOT_ANN_M, "ef_construction": SNAPSHOT_ANN_EF_CONSTRUCTION}
+
+def write_snapshot(
+    root: str,
+    pages: Iterable[tuple[list[str], list[list[float]], list[str], list[dict]]],
+    generation: int,
+    embedding_model: str,
+    keep: int = SNAPSHOT_KEEP,
+    ann_min_chunks: int = SNAPSHOT_ANN_MIN_CHUNKS,
+) -> SnapshotInfo:
+    """
+    Write a read-only snapshot of a collection and publish it.
+
+    Vectors are L2-normalized once and appended to one contiguous float32
+    file, which the query service memory-maps; chunk texts and metadata go to
+    a small SQLite table keyed by row. Large snapshots also get a prebuilt
+    HNSW index over the same rows, since an exact scan reads every vector on
+    each search. The snapshot is built in a temporary
+    directory, renamed into place, then published by atomically replacing the
+    CURRENT pointer, so readers only ever see complete snapshots. Older
+    snapshots beyond `keep` are removed (readers still holding one keep their
+    mapping until they switch).
+
+    Args:
+        root (str): Directory holding the snapshots and the CURRENT pointer.
+        pages: Batches of (ids, embeddings, documents, metadatas).
+        generation (int): Vector store generation the content belongs to.
+        embedding_model (str): Embedding model id of the vectors.
+        keep (int): Number of snapshots kept on disk, the new one included.
+        ann_min_chunks (int): Smallest snapshot that gets an HNSW index.
+
+    Returns:
+        SnapshotInfo: The published snapshot.
+    """
+    start = time.perf_counter()
+    os.makedirs(root, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".snapshot-", dir=root)
+    try:
+        count, dim = 0, None
+        with closing(sqlite3.connect(os.path.join(staging, CHUNKS_FILE))) as chunks, \
+             open(os.path.join(staging, VECTORS_FILE), "wb") as vectors_file:
+            chunks.execute(_CHUNKS_SCHEMA)
+            for ids, embeddings, documents, metadatas in pages:
+                if not ids:
+                    continue
+                matrix = np.asarray(embeddings, dtype=np.float32)
+                if dim is None:
+                    dim = matrix.shape[1]
+                elif matrix.shape[1] != dim:
+                    raise SnapshotException(f"Vectors of different sizes in the collection ({dim} and {matrix.shape[1]})")
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                vectors_file.write((matrix / np.where(norms > 0, norms, 1)).tobytes())
+                chunks.executemany(
+                    "INSERT INTO chunks (row, id, content, metadata) VALUES (?, ?, ?, ?)",
+                    [
+                        (count + index, id, document or "", json.dumps(metadata or {}, ensure_ascii=False))
+                        for index, (id, document, metadata) in enumerate(zip(ids, documents, metadatas))
+                    ]
+                )
+                count += len(ids)
+            chunks.commit()
+
+        manifest = {
+            "generation": generation,
+            "embedding_model": embedding_model,
+            "chunks": count,
+            "dim": dim or 0,
+            "created_at": time.time(),
+        }
+        if count and count >= ann_min_chunks:
+            ann = _build_ann_index(staging, count, dim)
+            if ann is not None:
+                manifest["ann"] = ann
+        with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as manifest_file:
+            json.dump(manifest, manifest_file)
+
+        name = f"snapshot-{generation:08d}-{time.time_ns()}"
+        os.rename(staging, os.path.join(root, name))
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    pointer = os.path.join(root, f".{CURRENT_FILE}.{os.getpid()}.{threading.get_ident()}")
+    with open(pointer, "w", encoding="utf-8") as pointer_file:
+        pointer_file.write(name)
+    os.replace(pointer, os.path.join(root, CURRENT_FILE))
+
+    published = sorted(entry for entry in os.listdir(root) if entry.startswith("snapshot-"))
+    for old in published[:-max(keep, 1)]:
+        if old != name:
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return SnapshotInfo(name, generation, count, dim or 0, time.perf_counter() - start)
+
+def _collection_pages(vector_store, page_size: int):
+    offset = 0
+    while True:
+        page = vector_store.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+        ids = page["ids"]
+        if not ids:
+            return
+        yield ids, page["embeddings"], page["documents"], page["metadatas"]
+        if len(ids) < page_size:
+            return
+        offset += len(ids)
+
+def publish_snapshot(vector_store=None, root: str = SNAPSHOT_DIR, page_size: int = SNAPSHOT_PAGE_SIZE) -> SnapshotInfo:
+    """
+    Publish a snapshot of the whole vector store for the query service.
+
+    The snapshot is labeled with the generation read before the export, so a
+    write landing during the export leaves it behind the current generation
+    and the query service keeps using Chroma until the next publish.
+
+    Raises:
+        SnapshotException: If the collection cannot be read or written out
+    """
+    with _publish_lock:
+        try:
+            generation = current_generation()
+            return write_snapshot(
+                root,
+                _collection_pages(vector_store or get_vector_store(), page_size),
+                generation,
+                embedding_model_id(),
+            )
+        except SnapshotException:
+            raise
+        except Exception as e:
+            raise SnapshotException(f"Failed to publish snapshot: {str(e)}")
+
+def publish_if_stale(vector_store=None, root: str = SNAPSHOT_DIR) -> Optional[SnapshotInfo]:
+    """
+    Publish a snapshot if the published one (if any) is behind the vector
+    store's generation; returns None when it is up to date.
+
+    Raises:
+        SnapshotException: If the collection cannot be read or written out
+    """
+    generation = current_generation()
+    published = current_snapshot(root)
+    if generation == 0 or (published is not None and published["generation"] == generation):
+        return None
+    return publish_snapshot(vector_store, root=root)
+
+def current_snapshot(root: str = SNAPSHOT_DIR) -> Optional[dict]:
+    """Manifest of the published snapshot, or None if none was published"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as pointer_file:
+            name = pointer_file.read().strip()
+        with open(os.path.join(root, name, MANIFEST_FILE), encoding="utf-8") as manifest_file:
+            return {"name": name, **json.load(manifest_file)}
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import NamedTuple, Optional
+
+from constants import SOURCE_REGISTRY_DB_PATH
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS source_chunks (
+    source TEXT NOT NULL,
+    chunk_id TEXT NOT NULL,
+    PRIMARY KEY (source, chunk_id)
+);
+"""
+
+class ChunkDiff(NamedTuple):
+    """Chunk ids of a new version of a source compared with the stored one"""
+    added: list[str]
+    removed: list[str]
+    unchanged: list[str]
+
+def diff_chunks(old_ids: set[str], new_ids: list[str]) -> ChunkDiff:
+    """
+    Compare the chunk ids stored for a source with the ids of its new version.
+
+    Args:
+        old_ids (set[str]): Chunk ids recorded for the previous version.
+        new_ids (list[str]): Chunk ids of the new version, in document order.
+
+    Returns:
+        ChunkDiff: Added and unchanged ids keep document order; removed ids are sorted.
+    """
+    new_set = set(new_ids)
+    added, unchanged, seen = [], [], set()
+    for chunk_id in new_ids:
+        if chunk_id in seen:
+            continue
+        seen.add(chunk_id)
+        (unchanged if chunk_id in old_ids else added).append(chunk_id)
+    removed = sorted(old_ids - new_set)
+    return ChunkDiff(added=added, removed=removed, unchanged=unchanged)
+
+class SourceRegistry:
+    """
+    SQLite record of which chunks each source currently has in the vector store,
+    and the last version of the source that was ingested.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        if not self._initialized:
+            connection.executescript(_SCHEMA)
+            self._initialized = True
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connect()
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get_version(self, source: str) -> Optional[str]:
+        """Last ingested version of the source, or None if it was never ingested"""
+        with self._transaction() as connection:
+            row = connection.execute("SELECT version FROM sources WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def get_chunk_ids(self, source: str) -> set[str]:
+        """Chunk ids currently stored for the source"""
+        with self._transaction() as connection:
+            rows = connection.execute("SELECT chunk_id FROM source_chunks WHERE source = ?", (source,)).fetchall()
+        return {row[0] for row in rows}
+
+    def replace(self, source: str, version: str, chunk_ids: list[str]) -> None:
+        """Atomically record the version and chunk ids now stored for the source"""
+        unique_ids = list(dict.fromkeys(chunk_ids))
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM source_chunks WHERE source = ?", (source,))
+            connection.executemany(
+                "INSERT INTO source_chunks (source, chunk_id) VALUES (?, ?)",
+                [(source, chunk_id) for chunk_id in unique_ids]
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO sources (source, version, chunk_count, updated_at) VALUES (?, ?, ?, ?)",
+                (source, version, len(unique_ids), time.time())
+            )
+
+    def add_chunks(self, source: str, chunk_ids: list[str]) -> None:
+        """
+        Record chunks stored for the source outside of a sync (plain /ingest_text or
+        /ingest_stream uploads). The ids are merged into the ones already recorded and
+        the version is cleared, so the next sync diffs against every stored chunk.
+        """
+        with self._transaction() as connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO source_chunks (source, chunk_id) VALUES (?, ?)",
+                [(source, chunk_id) for chunk_id in dict.fromkeys(chunk_ids)]
+            )
+            (chunk_count,) = connection.execute(
+                "SELECT COUNT(*) FROM source_chunks WHERE source = ?", (source,)
+            ).fetchone()
+            connection.execute(
+                "INSERT OR REPLACE INTO sources (source, version, chunk_count, updated_at) VALUES (?, ?, ?, ?)",
+                (source, "", chunk_count, time.time())
+            )
+
+_registry: Optional[SourceRegistry] = None
+_lock = threading.Lock()
+
+def get_source_registry() -> SourceRegistry:
+    """Return the process-wide source registry"""
+    global _registry
+    if _registry is None:
+        with _lock:
+            if _registry is None:
+                _registry = SourceRegistry(SOURCE_REGISTRY_DB_PATH)
+    return _registry
+
+def reset_source_registry() -> None:
+    """Drop the cached registry so the next call reopens it (mainly useful for tests)"""
+    global _registry
+    with _lock:
+        _registry = None
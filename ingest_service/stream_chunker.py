@@ -0,0 +1,111 @@
+import codecs
+from typing import AsyncIterator, Awaitable, Callable
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from chunk_size_calculator import calculate_dynamic_chunk_params, BASE_CHUNK_SIZE, BASE_OVERLAP_SIZE
+
+# Text is split in windows of this many base chunks, so the splitter still
+# finds paragraph and sentence boundaries while only a window is in memory
+WINDOW_CHUNKS = 8
+
+def _make_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len
+    )
+
+class StreamChunker:
+    """
+    Incremental version of the dynamic chunking rules.
+
+    Text is fed piece by piece; complete chunks are returned as soon as they
+    can no longer change. The last chunk of every window is carried over and
+    re-split together with the next window, so chunk sizes and overlaps follow
+    the same rules as splitting the whole text at once. Texts that end up
+    shorter than a window are split with the small-text parameters from
+    calculate_dynamic_chunk_params.
+    """
+
+    def __init__(self, window_size: int = BASE_CHUNK_SIZE * WINDOW_CHUNKS):
+        self.window_size = window_size
+        self._buffer = ""
+        self._emitted = False
+        self._splitter = _make_splitter(BASE_CHUNK_SIZE, BASE_OVERLAP_SIZE)
+
+    def feed(self, piece: str) -> list[str]:
+        """Add text and return the chunks completed by it"""
+        chunks = []
+        # A large piece is buffered one window at a time, so the buffer never holds much more than a window
+        for start in range(0, len(piece), self.window_size):
+            chunks.extend(self._feed_window(piece[start:start + self.window_size]))
+        return chunks
+
+    def _feed_window(self, piece: str) -> list[str]:
+        self._buffer += piece
+        if len(self._buffer) < self.window_size:
+            return []
+
+        chunks = self._splitter.split_text(self._buffer)
+        if len(chunks) < 2:
+            return []
+
+        # Keep the last chunk: more text may extend it
+        start = self._buffer.rfind(chunks[-1])
+        if start <= 0:
+            start = max(len(self._buffer) - BASE_CHUNK_SIZE, 0)
+        self._buffer = self._buffer[start:]
+        self._emitted = True
+        return chunks[:-1]
+
+    def finish(self) -> list[str]:
+        """Return the remaining chunks once the input is exhausted"""
+        buffer, self._buffer = self._buffer, ""
+        if not buffer.strip():
+            return []
+        if self._emitted:
+            return self._splitter.split_text(buffer)
+        chunk_size, chunk_overlap = calculate_dynamic_chunk_params(buffer)
+        return _make_splitter(chunk_size, chunk_overlap).split_text(buffer)
+
+async def store_byte_stream(
+    byte_stream: AsyncIterator[bytes],
+    store_batch: Callable[[list[str]], Awaitable[int]],
+    batch_size: int,
+    encoding: str = "utf-8",
+) -> tuple[int, int]:
+    """
+    Chunk an async stream of encoded text (e.g. an upload) and store it batch by batch.
+
+    Only the current window and one batch of chunks are held in memory.
+
+    Args:
+        byte_stream (AsyncIterator[bytes]): The encoded text.
+        store_batch (Callable): Async function storing a batch and returning how many chunks were new.
+        batch_size (int): Number of chunks per storage call.
+        encoding (str): Text encoding of the stream.
+
+    Returns:
+        tuple[int, int]: Number of chunks created and number of chunks inserted.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    chunker = StreamChunker()
+    batch: list[str] = []
+    stored = 0
+    inserted = 0
+
+    async def store_full_batches(force: bool = False) -> None:
+        nonlocal batch, stored, inserted
+        while batch and (force or len(batch) >= batch_size):
+            current, batch = batch[:batch_size], batch[batch_size:]
+            inserted += await store_batch(current)
+            stored += len(current)
+
+    async for piece in byte_stream:
+        batch.extend(chunker.feed(decoder.decode(piece)))
+        await store_full_batches()
+
+    batch.extend(chunker.feed(decoder.decode(b"", final=True)))
+    batch.extend(chunker.finish())
+    await store_full_batches(force=True)
+    return stored, inserted
@@ -0,0 +1,39 @@
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+import chroma_client
+import embedding_cache
+import generation
+import source_registry
+
+@pytest.fixture(autouse=True)
+def isolated_embedding_cache(tmp_path, monkeypatch):
+    """Fixture keeping the on-disk embedding cache of every test in a temporary directory"""
+    embedding_cache.reset_embedding_caches()
+    monkeypatch.setattr(embedding_cache, "EMBEDDING_CACHE_DIR", str(tmp_path / "embedding_cache"))
+    yield
+    embedding_cache.reset_embedding_caches()
+
+@pytest.fixture(autouse=True)
+def isolated_generation_marker(tmp_path, monkeypatch):
+    """Fixture keeping the generation marker of every test in a temporary directory"""
+    monkeypatch.setattr(generation, "GENERATION_DB_PATH", str(tmp_path / "generation.sqlite3"))
+
+@pytest.fixture(autouse=True)
+def isolated_chroma_client(tmp_path, monkeypatch):
+    """Fixture keeping the embedded vector store of every test in a temporary directory"""
+    chroma_client.reset_chroma_client()
+    monkeypatch.setattr(chroma_client, "VECTOR_STORE_BACKEND", chroma_client.STORE_EMBEDDED)
+    monkeypatch.setattr(chroma_client, "CHROMA_DB_PERSIST_DIRECTORY", str(tmp_path / "chroma_db"))
+    yield
+    chroma_client.reset_chroma_client()
+
+@pytest.fixture(autouse=True)
+def isolated_source_registry(tmp_path, monkeypatch):
+    """Fixture keeping the source registry of every test in a temporary directory"""
+    source_registry.reset_source_registry()
+    monkeypatch.setattr(source_registry, "SOURCE_REGISTRY_DB_PATH", str(tmp_path / "sources.sqlite3"))
+    yield
+    source_registry.reset_source_registry()
@@ -1,14 +1,32 @@
 import pytest
 import sys
+import time
+import asyncio
+import json
+import httpx
 from pathlib import Path
 from fastapi.testclient import TestClient
-from unittest.mock import patch, Mock
+from unittest.mock import patch, Mock, AsyncMock
 
 sys.path.append(str(Path(__file__).parent.parent))
+import app as app_module
 from app import app
+from model_registry import clear_registry
+from vector_store import reset_vector_store
+from job_queue import JobQueue, JobStore
+from text_processor import IngestStats
 
 client = TestClient(app)
 
+@pytest.fixture(autouse=True)
+def reset_model_registry():
+    """Fixture ensuring every test starts without a cached embeddings model or vector store"""
+    clear_registry()
+    reset_vector_store()
+    yield
+    clear_registry()
+    reset_vector_store()
+
 @pytest.fixture
 def sample_text():
     """Fixture providing a sample text for testing"""
@@ -16,8 +34,8 @@ def sample_text():
 
 def test_ingest_text_success(sample_text):
     """Test successful text ingestion"""
-    with patch('app.Chroma.from_texts') as mock_chroma, \
-         patch('app.HuggingFaceEmbeddings') as mock_embeddings:
+    with patch('vector_store.Chroma') as mock_chroma, \
+         patch('model_registry.HuggingFaceEmbeddings') as mock_embeddings:
         
         # Setup mocks
         mock_embeddings.return_value = Mock()
@@ -36,7 +54,7 @@ def test_ingest_text_success(sample_text):
         assert response_data["chunks"] > 0
         
         # Verify mocks
-        mock_chroma.assert_called_once()
+        mock_chroma.return_value.add_texts.assert_called()
         mock_embeddings.assert_called_once_with(model_name="intfloat/multilingual-e5-small")
         print("\n✓ Text ingestion success test passed: content processed correctly")
 
@@ -53,20 +71,44 @@ def test_ingest_text_empty():
     assert "empty" in response_data["message"].lower()
     print("\n✓ Empty text test passed: correctly handled empty input")
 
-def test_ingest_text_too_long(sample_text):
-    """Test handling of text that exceeds length limit"""
+def test_ingest_text_very_long(sample_text):
+    """Test that texts beyond the former 50,000-character limit are ingested"""
     very_long_text = sample_text * 1000
     
-    response = client.post(
-        "/ingest_text",
-        json={"text": very_long_text}
-    )
+    with patch('vector_store.Chroma'), \
+         patch('model_registry.HuggingFaceEmbeddings'):
+        response = client.post(
+            "/ingest_text",
+            json={"text": very_long_text}
+        )
     
-    assert response.status_code == 200  # Due to error handling in route
+    assert response.status_code == 200
     response_data = response.json()
-    assert response_data["status"] == "error"
-    assert "too long" in response_data["message"].lower()
-    print("\n✓ Long text test passed: correctly handled oversized input")
+    assert response_data["status"] == "success"
+    assert response_data["chunks"] > 1000
+    print("\n✓ Long text test passed: oversized input ingested")
+
+def test_ingest_stream(sample_text):
+    """Test streamed plain-text ingestion"""
+    def body():
+        for _ in range(200):
+            yield sample_text.encode("utf-8")
+    
+    with patch('vector_store.Chroma') as mock_chroma, \
+         patch('model_registry.HuggingFaceEmbeddings'):
+        response = client.post(
+            "/ingest_stream",
+            content=body(),
+            headers={"Content-Type": "text/plain"}
+        )
+    
+    assert response.status_code == 200
+    response_data = response.json()
+    assert response_data["status"] == "success"
+    stored = sum(len(call.kwargs["texts"]) for call in mock_chroma.return_value.add_texts.call_args_list)
+    assert stored == response_data["inserted"]
+    assert response_data["inserted"] + response_data["skipped"] == response_data["chunks"]
+    print("\n✓ Stream ingestion test passed: upload chunked and stored")
 
 def test_ingest_text_invalid_request():
     """Test handling of invalid request format"""
@@ -78,9 +120,38 @@ def test_ingest_text_invalid_request():
     assert response.status_code == 422  # FastAPI validation error
     print("\n✓ Invalid request test passed: correctly handled malformed input")
 
+def test_ingest_text_reuses_loaded_model(sample_text):
+    """Test that consecutive ingestions share the same embeddings model"""
+    with patch('vector_store.Chroma') as mock_chroma, \
+         patch('model_registry.HuggingFaceEmbeddings') as mock_embeddings:
+        
+        client.post("/ingest_text", json={"text": sample_text})
+        client.post("/ingest_text", json={"text": sample_text})
+        
+        mock_chroma.assert_called_once()
+        assert mock_chroma.return_value.add_texts.call_count >= 2
+        mock_embeddings.assert_called_once()
+        print("\n✓ Model reuse test passed: embeddings model and vector store opened only once")
+
+def test_health_reports_model_loaded():
+    """Test that the health endpoint reports whether the model is loaded"""
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok", "model_loaded": False}
+    
+    with patch('model_registry.HuggingFaceEmbeddings'):
+        from model_registry import get_embeddings
+        get_embeddings()
+    
+    response = client.get("/health")
+    assert response.json()["model_loaded"] is True
+    print("\n✓ Health test passed: model loading state reported")
+
 def test_startup_event():
-    """Test database directory creation on startup"""
-    with patch('os.makedirs') as mock_makedirs:
+    """Test database directory creation and model warm-up on startup"""
+    with patch('os.makedirs') as mock_makedirs, \
+         patch('app.warm_up') as mock_warm_up, \
+         patch('app.job_queue', new_callable=AsyncMock) as mock_job_queue:
         from app import startup_event
         import asyncio
         
@@ -89,7 +160,390 @@ def test_startup_event():
         
         # Verify directory creation
         mock_makedirs.assert_called_once_with("./chroma_db", exist_ok=True)
+        mock_warm_up.assert_called_once()
+        mock_job_queue.start.assert_awaited_once()
         print("\n✓ Startup event test passed: database directory creation verified")
 
+def test_jobs_publish_only_stale_snapshots():
+    """Test that with auto-publish every finished job publishes through the generation check, not on its chunk count"""
+    with patch('app.SNAPSHOT_AUTO_PUBLISH', True), \
+         patch('app.run_ingestion_job', side_effect=[0, 5]), \
+         patch('app.publish_snapshot') as mock_publish, \
+         patch('app.publish_if_stale') as mock_publish_if_stale:
+        for _ in range(2):
+            asyncio.run(app_module._run_job("blog", {}, Mock()))
+    
+    assert mock_publish_if_stale.call_count == 2
+    mock_publish.assert_not_called()
+    print("\n✓ Job publish test passed: snapshot exported only when the store changed")
+
+def test_stale_snapshots_published_in_background():
+    """Test that the publish loop checks the snapshot periodically and survives a failed publish"""
+    def publish():
+        if mock_publish.call_count == 1:
+            raise Exception("Chroma unavailable")
+    
+    with patch('app.publish_if_stale', side_effect=publish) as mock_publish:
+        async def scenario():
+            task = asyncio.create_task(app_module.publish_stale_snapshots(0.01))
+            await asyncio.sleep(0.1)
+            task.cancel()
+        
+        asyncio.run(scenario())
+    
+    assert mock_publish.call_count >= 2
+    print("\n✓ Snapshot publish loop test passed")
+
+def test_startup_event_warm_up_failure():
+    """Test that a warm-up failure does not prevent the service from starting"""
+    with patch('os.makedirs'), \
+         patch('app.warm_up') as mock_warm_up, \
+         patch('app.job_queue', new_callable=AsyncMock):
+        from app import startup_event
+        import asyncio
+        
+        mock_warm_up.side_effect = Exception("Model download failed")
+        
+        # Should not raise
+        asyncio.run(startup_event())
+        print("\n✓ Warm-up failure test passed: startup not interrupted")
+
+def test_snapshot_publish_and_describe(tmp_path):
+    """Test that /snapshot publishes the vector store and reports the published snapshot"""
+    from snapshot import write_snapshot, current_snapshot
+    
+    def publish():
+        return write_snapshot(str(tmp_path), [(["a", "b"], [[1.0, 0.0], [0.0, 2.0]], ["t1", "t2"], [{}, {}])], 3, "m")
+    
+    with patch('app.current_snapshot', side_effect=lambda: current_snapshot(str(tmp_path))), \
+         patch('app.publish_snapshot', side_effect=publish):
+        assert client.get("/snapshot").json() == {"published": False}
+        response = client.post("/snapshot")
+        described = client.get("/snapshot").json()
+    
+    assert response.status_code == 200
+    assert response.json()["chunks"] == 2
+    assert described["generation"] == 3
+    assert described["name"] == response.json()["name"]
+    print("\n✓ Snapshot endpoint test passed")
+
+def test_embedding_cache_stats():
+    """Test that the cache statistics endpoint reports hits and misses"""
+    from embedding_cache import get_embedding_cache
+    from constants import EMBEDDING_MODEL_NAME
+    cache = get_embedding_cache(EMBEDDING_MODEL_NAME)
+    cache.put_many(["a"], [[0.1, 0.2]])
+    cache.get_many(["a", "b"])
+    
+    response = client.get("/embedding_cache/stats")
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["enabled"] is True
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+    
+    with patch('embedding_cache.EMBEDDING_CACHE_ENABLED', False):
+        assert client.get("/embedding_cache/stats").json()["enabled"] is False
+    print("\n✓ Embedding cache stats test passed")
+
+def test_metrics_report_ingestion_stages(sample_text, tmp_job_queue):
+    """Test that /metrics exposes the stage timings and chunk counts of an ingestion, and echoes the trace id"""
+    from vector_store import CHUNKS_STORED
+    inserted_before = CHUNKS_STORED.value(outcome="inserted")
+    with patch('vector_store.Chroma') as mock_chroma, \
+         patch('model_registry.HuggingFaceEmbeddings'):
+        mock_chroma.return_value.get.return_value = {"ids": []}
+        response = client.post("/ingest_text", json={"text": sample_text}, headers={"X-Trace-Id": "query-7"})
+    chunks = response.json()["chunks"]
+    
+    metrics_response = client.get("/metrics")
+    
+    assert response.headers["X-Trace-Id"] == "query-7"
+    assert metrics_response.headers["content-type"].startswith("text/plain")
+    text = metrics_response.text
+    for stage in ("chunk_params", "split_text", "model_load", "dedup_lookup", "vector_store_add"):
+        assert f'hotmart_ingest_stage_duration_seconds_count{{stage="{stage}"}}' in text
+    assert CHUNKS_STORED.value(outcome="inserted") == inserted_before + chunks
+    assert 'hotmart_ingest_http_request_duration_seconds_count{method="POST",route="/ingest_text",status="200"}' in text
+    assert "hotmart_ingest_job_queue_pending 0" in text
+    print("\n✓ Metrics test passed")
+
+def test_health_responsive_during_long_ingestion(sample_text):
+    """Test that a slow ingestion does not block other requests"""
+    def slow_ingestion(text, source=None):
+        time.sleep(1.0)
+        return IngestStats(chunks=3, inserted=3, skipped=0)
+    
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            ingestion = asyncio.create_task(
+                async_client.post("/ingest_text", json={"text": sample_text})
+            )
+            await asyncio.sleep(0.1)
+            
+            start = time.perf_counter()
+            health_response = await async_client.get("/health")
+            health_elapsed = time.perf_counter() - start
+            
+            ingest_response = await ingestion
+            return health_response, health_elapsed, ingest_response
+    
+    with patch('app.process_and_store_text', side_effect=slow_ingestion):
+        health_response, health_elapsed, ingest_response = asyncio.run(scenario())
+    
+    assert health_response.status_code == 200
+    assert health_elapsed < 0.5
+    assert ingest_response.json() == {"status": "success", "chunks": 3, "inserted": 3, "skipped": 0}
+    print(f"\n✓ Responsiveness test passed: /health answered in {health_elapsed:.3f}s during ingestion")
+
+def test_ingest_batch(sample_text):
+    """Test NDJSON batch ingestion with per-document results"""
+    body = "\n".join([
+        json.dumps({"id": "doc-1", "text": sample_text, "metadata": {"lang": "en"}}),
+        json.dumps({"text": "Texto curto"}),
+        json.dumps({"id": "bad", "text": ""}),
+    ])
+    with patch('vector_store.Chroma') as mock_chroma, \
+         patch('model_registry.HuggingFaceEmbeddings'):
+        
+        response = client.post(
+            "/ingest_batch",
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "partial"
+    assert data["documents"] == 3
+    assert [result["id"] for result in data["results"]] == ["doc-1", "2", "3"]
+    assert [result["status"] for result in data["results"]] == ["success", "success", "error"]
+    stored = sum(len(call.kwargs["texts"]) for call in mock_chroma.return_value.add_texts.call_args_list)
+    assert stored == data["inserted"]
+    assert data["inserted"] + data["skipped"] == data["chunks"]
+    print("\n✓ Batch ingestion test passed: per-document results returned")
+
+@pytest.fixture
+def tmp_job_queue(tmp_path, monkeypatch):
+    """Fixture replacing the application job queue with one persisted in a temporary directory"""
+    queue = JobQueue(
+        JobStore(str(tmp_path / "jobs.sqlite3")),
+        runner=app_module._run_job,
+        workers=1,
+        max_size=2,
+    )
+    monkeypatch.setattr(app_module, "job_queue", queue)
+    return queue
+
+def test_submit_job_and_poll_status(sample_text, tmp_job_queue):
+    """Test that a queued ingestion returns a job id immediately and reports progress when done"""
+    def fake_process(text, source=None, on_progress=None):
+        on_progress(2, 4)
+        on_progress(4, 4)
+        return IngestStats(chunks=4, inserted=4, skipped=0)
+    
+    with patch('app.process_and_store_text', side_effect=fake_process), \
+         patch('app.warm_up'), \
+         TestClient(app) as lifespan_client:
+        
+        response = lifespan_client.post("/jobs/ingest_text", json={"text": sample_text})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            status = lifespan_client.get(f"/jobs/{job_id}").json()
+            if status["status"] == "done":
+                break
+            time.sleep(0.05)
+    
+    assert status["status"] == "done"
+    assert status["chunks_embedded"] == 4
+    assert status["chunks_total"] == 4
+    assert status["throughput"] is not None
+    assert status["error"] is None
+    print("\n✓ Job test passed: job accepted and completed in background")
+
+def test_text_job_counts_only_inserted_chunks(sample_text):
+    """Test that a text job reports the chunks it embedded, not those skipped as duplicates"""
+    with patch('app.process_and_store_text', return_value=IngestStats(chunks=4, inserted=1, skipped=3)):
+        assert app_module.run_ingestion_job("text", {"text": sample_text}, lambda done, total: None) == 1
+    print("\n✓ Text job count test passed: skipped chunks are not reported as embedded")
+
+def test_job_failure_reported(sample_text, tmp_job_queue):
+    """Test that errors raised by a job are reported in its status"""
+    with patch('app.process_and_store_text', side_effect=Exception("Embedding failed")), \
+         patch('app.warm_up'), \
+         TestClient(app) as lifespan_client:
+        
+        job_id = lifespan_client.post("/jobs/ingest_text", json={"text": sample_text}).json()["job_id"]
+        
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            status = lifespan_client.get(f"/jobs/{job_id}").json()
+            if status["status"] == "failed":
+                break
+            time.sleep(0.05)
+    
+    assert status["status"] == "failed"
+    assert "Embedding failed" in status["error"]
+    print("\n✓ Job failure test passed: error reported in job status")
+
+def test_submit_job_queue_full(sample_text, tmp_job_queue):
+    """Test that submissions are rejected with 429 when the queue is full"""
+    # Workers are not started, so submitted jobs stay pending
+    assert client.post("/jobs/ingest_text", json={"text": sample_text}).status_code == 202
+    assert client.post("/jobs/ingest_text", json={"text": sample_text}).status_code == 202
+    
+    response = client.post("/jobs/ingest_text", json={"text": sample_text})
+    
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    print("\n✓ Backpressure test passed: full queue rejected new job")
+
+def test_get_unknown_job(tmp_job_queue):
+    """Test that unknown job ids return 404"""
+    response = client.get("/jobs/does-not-exist")
+    
+    assert response.status_code == 404
+    print("\n✓ Unknown job test passed: 404 returned")
+
+def test_ingest_text_reingestion_skips_stored_chunks(sample_text):
+    """Test that re-ingesting the same text from the same source stores nothing new"""
+    stored_ids = set()
+    
+    def fake_get(ids, include):
+        return {"ids": [id for id in ids if id in stored_ids]}
+    
+    def fake_add_texts(texts, metadatas, ids):
+        stored_ids.update(ids)
+    
+    with patch('vector_store.Chroma') as mock_chroma, \
+         patch('model_registry.HuggingFaceEmbeddings'):
+        mock_chroma.return_value.get.side_effect = fake_get
+        mock_chroma.return_value.add_texts.side_effect = fake_add_texts
+        
+        first = client.post("/ingest_text", json={"text": sample_text, "source": "doc"}).json()
+        second = client.post("/ingest_text", json={"text": sample_text, "source": "doc"}).json()
+        other_source = client.post("/ingest_text", json={"text": sample_text, "source": "other"}).json()
+    
+    assert first["inserted"] == len(stored_ids) // 2
+    assert first["inserted"] > 0
+    assert second["inserted"] == 0
+    assert second["skipped"] == second["chunks"]
+    assert other_source["inserted"] == first["inserted"]
+    print("\n✓ Idempotency test passed: re-ingestion skipped stored chunks")
+
+def test_sync_source_endpoint():
+    """Test incremental source synchronization through the API"""
+    from text_processor import SyncStats
+    stats = SyncStats(version="v2", chunks=10, added=2, removed=1, unchanged=8, up_to_date=False)
+    
+    with patch('app.sync_source', return_value=stats) as mock_sync:
+        response = client.post(
+            "/sources/sync",
+            json={"source": "blog", "text": "Texto atualizado", "version": "v2"}
+        )
+    
+    assert response.status_code == 200
+    assert response.json() == {"status": "success", "source": "blog", **stats._asdict()}
+    mock_sync.assert_called_once_with("Texto atualizado", "blog", version="v2")
+    print("\n✓ Sync endpoint test passed: diff statistics returned")
+
+def test_ingest_urls_endpoint():
+    """Test that scraped pages are synchronized per URL and failures reported per URL"""
+    from text_processor import SyncStats
+    from async_scraper import FetchResult
+    pages = [
+        FetchResult("https://a.test/1", "fetched", "Texto 1", '"e1"'),
+        FetchResult("https://a.test/2", "not_modified", "Texto 2", '"e2"'),
+        FetchResult("https://a.test/3", "error", error="Failed to scrape https://a.test/3: 404"),
+    ]
+    def fake_sync(text, source, version=None):
+        up_to_date = source.endswith("/2")
+        return SyncStats(version=version, chunks=3, added=0 if up_to_date else 3, removed=0, unchanged=3 if up_to_date else 0, up_to_date=up_to_date)
+    
+    with patch('app.scrape_urls', new_callable=AsyncMock, return_value=pages) as mock_scrape, \
+         patch('app.sync_source', side_effect=fake_sync) as mock_sync:
+        response = client.post("/ingest_urls", json={"urls": [page.url for page in pages]})
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "partial"
+    assert [result["status"] for result in data["results"]] == ["success", "success", "error"]
+    assert data["results"][0]["added"] == 3
+    assert data["results"][1]["fetch"] == "not_modified"
+    assert data["results"][1]["up_to_date"] is True
+    assert "404" in data["results"][2]["message"]
+    assert mock_sync.call_count == 2
+    mock_sync.assert_any_call("Texto 1", "https://a.test/1", version='"e1"')
+    assert mock_scrape.call_args.kwargs["cache"] is app_module.response_cache
+    print("\n✓ URL ingestion test passed: per-URL sync results reported")
+
+def test_ingest_urls_requires_urls():
+    """Test that an empty URL list is rejected"""
+    response = client.post("/ingest_urls", json={"urls": []})
+    assert response.status_code == 422
+    print("\n✓ URL validation test passed: empty list rejected")
+
+def test_submit_crawl_job_and_get_progress(tmp_path):
+    """Test that a crawl is registered, queued as a job and reported per page"""
+    from crawler import CrawlStore, PAGE_DONE
+    store = CrawlStore(str(tmp_path / "crawls.sqlite3"))
+    
+    with patch('app.crawl_store', store), \
+         patch('app.job_queue') as mock_queue:
+        mock_queue.submit.return_value = "job-1"
+        response = client.post("/jobs/crawl", json={"url": "https://blog.test/sitemap.xml"})
+        
+        assert response.status_code == 202
+        data = response.json()
+        assert data["job_id"] == "job-1"
+        mock_queue.submit.assert_called_once_with("crawl", {"crawl_id": data["crawl_id"]})
+        
+        store.add_pages(data["crawl_id"], ["https://blog.test/a", "https://blog.test/b"])
+        store.mark_page(data["crawl_id"], "https://blog.test/a", PAGE_DONE, chunks=4, added=3)
+        status = client.get(f"/crawls/{data['crawl_id']}").json()
+        assert status["root_url"] == "https://blog.test/sitemap.xml"
+        assert status["pages_total"] == 2
+        assert status["pages_done"] == 1
+        assert status["pages_pending"] == 1
+        assert status["chunks_added"] == 3
+        
+        assert client.get("/crawls/unknown").status_code == 404
+    print("\n✓ Crawl job test passed: crawl queued and progress reported")
+
+def test_rejected_crawl_job_not_recorded(tmp_path):
+    """Test that a crawl refused because the queue is full leaves no crawl behind"""
+    from crawler import CrawlStore
+    from job_queue import JobQueueFullException
+    store = CrawlStore(str(tmp_path / "crawls.sqlite3"))
+    
+    with patch('app.crawl_store', store), \
+         patch('app.job_queue') as mock_queue:
+        mock_queue.submit.side_effect = JobQueueFullException("Job queue is full")
+        response = client.post("/jobs/crawl", json={"url": "https://blog.test/sitemap.xml"})
+    
+    assert response.status_code == 429
+    with store._transaction() as connection:
+        assert connection.execute("SELECT COUNT(*) FROM crawls").fetchone()[0] == 0
+    print("\n✓ Rejected crawl test passed: no orphan crawl left")
+
+def test_crawl_jobs_run_in_event_loop():
+    """Test that crawl jobs are dispatched to the crawler instead of the worker pool"""
+    async def scenario():
+        with patch('app.run_crawl', new_callable=AsyncMock, return_value=7) as mock_crawl, \
+             patch('app.run_blocking', new_callable=AsyncMock) as mock_blocking:
+            chunks = await app_module._run_job("crawl", {"crawl_id": "c1"}, Mock())
+            mock_blocking.assert_not_called()
+            mock_crawl.assert_awaited_once()
+            assert mock_crawl.call_args.args[0] == "c1"
+        return chunks
+    
+    assert asyncio.run(scenario()) == 7
+    print("\n✓ Crawl dispatch test passed")
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"]) 
\ No newline at end of file
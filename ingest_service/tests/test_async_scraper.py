@@ -0,0 +1,200 @@
+import asyncio
+import pytest
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(str(Path(__file__).parent.parent))
+from async_scraper import (
+    AsyncScraper,
+    ResponseCache,
+    FETCH_ERROR,
+    FETCH_FETCHED,
+    FETCH_NOT_MODIFIED,
+)
+from scraper import extract_content
+
+PAGE_HTML = """
+<html><body><div class="content__body">
+    <h1>Title {name}</h1>
+    <p>Paragraph of page {name}</p>
+</div></body></html>
+"""
+
+class StubState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests: dict[str, int] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.flaky_failures = 2
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Local pages with ETag / Last-Modified support, a flaky page and slow pages"""
+
+    def log_message(self, *args):
+        pass
+
+    def _send_page(self, name: str, headers: dict = None):
+        body = PAGE_HTML.format(name=name).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_status(self, status: int):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        state: StubState = self.server.state
+        with state.lock:
+            state.requests[self.path] = state.requests.get(self.path, 0) + 1
+            count = state.requests[self.path]
+
+        if self.path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                return self._send_status(304)
+            return self._send_page("etag", {"ETag": '"v1"'})
+        if self.path == "/last-modified":
+            stamp = "Wed, 01 Jan 2025 00:00:00 GMT"
+            if self.headers.get("If-Modified-Since") == stamp:
+                return self._send_status(304)
+            return self._send_page("last-modified", {"Last-Modified": stamp})
+        if self.path == "/flaky":
+            if count <= state.flaky_failures:
+                return self._send_status(503)
+            return self._send_page("flaky")
+        if self.path.startswith("/slow/"):
+            with state.lock:
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            time.sleep(0.2)
+            with state.lock:
+                state.in_flight -= 1
+            return self._send_page(self.path)
+        if self.path.startswith("/page/"):
+            return self._send_page(self.path)
+        return self._send_status(404)
+
+@pytest.fixture
+def stub_server():
+    """Fixture for a local HTTP server; yields its base URL and request counters"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.state = StubState()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", server.state
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def cache(tmp_path):
+    """Fixture for a response cache in a temporary directory"""
+    return ResponseCache(str(tmp_path / "responses.sqlite3"))
+
+def test_scrape_many_pages(stub_server):
+    """Test that every page is fetched and extracted, in input order"""
+    base_url, state = stub_server
+    urls = [f"{base_url}/page/{i}" for i in range(5)]
+
+    results = asyncio.run(AsyncScraper().scrape_many(urls + urls[:1]))
+
+    assert [result.url for result in results] == urls
+    assert all(result.status == FETCH_FETCHED for result in results)
+    assert "Paragraph of page /page/3" in results[3].text
+    assert state.requests["/page/0"] == 1
+    print("\n✓ Multi-URL test passed: pages fetched once each, in order")
+
+def test_etag_conditional_request_skips_download_and_parse(stub_server, cache):
+    """Test that an unchanged page is served from the cache without re-parsing"""
+    base_url, state = stub_server
+    scraper = AsyncScraper(cache=cache)
+    url = f"{base_url}/etag"
+
+    first = asyncio.run(scraper.scrape_many([url]))[0]
+    assert first.status == FETCH_FETCHED
+    assert first.version == '"v1"'
+
+    with patch('async_scraper.extract_content', side_effect=extract_content) as mock_extract:
+        second = asyncio.run(scraper.scrape_many([url]))[0]
+        mock_extract.assert_not_called()
+
+    assert second.status == FETCH_NOT_MODIFIED
+    assert second.text == first.text
+    assert second.version == '"v1"'
+    assert state.requests["/etag"] == 2
+    print("\n✓ ETag test passed: 304 reused the cached text")
+
+def test_last_modified_conditional_request(stub_server, cache):
+    """Test that Last-Modified validators are sent back as If-Modified-Since"""
+    base_url, _ = stub_server
+    scraper = AsyncScraper(cache=cache)
+    url = f"{base_url}/last-modified"
+
+    asyncio.run(scraper.scrape_many([url]))
+    result = asyncio.run(scraper.scrape_many([url]))[0]
+
+    assert result.status == FETCH_NOT_MODIFIED
+    assert result.version == "Wed, 01 Jan 2025 00:00:00 GMT"
+    print("\n✓ Last-Modified test passed: unchanged page not downloaded again")
+
+def test_transient_errors_retried_with_backoff(stub_server):
+    """Test that 503 responses are retried until the page is served"""
+    base_url, state = stub_server
+    scraper = AsyncScraper(max_retries=3, backoff_seconds=0.01)
+
+    with patch('async_scraper.asyncio.sleep', wraps=asyncio.sleep) as mock_sleep:
+        result = asyncio.run(scraper.scrape_many([f"{base_url}/flaky"]))[0]
+
+    assert result.status == FETCH_FETCHED
+    assert state.requests["/flaky"] == 3
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [0.01, 0.02]
+    print("\n✓ Retry test passed: exponential backoff until success")
+
+def test_retries_exhausted_reported_as_error(stub_server):
+    """Test that a page still failing after all retries is reported, not raised"""
+    base_url, state = stub_server
+    state.flaky_failures = 10
+    scraper = AsyncScraper(max_retries=2, backoff_seconds=0.01)
+
+    result = asyncio.run(scraper.scrape_many([f"{base_url}/flaky"]))[0]
+
+    assert result.status == FETCH_ERROR
+    assert "503" in result.error
+    assert state.requests["/flaky"] == 3
+    print("\n✓ Retry exhaustion test passed: error reported after 3 attempts")
+
+def test_client_errors_not_retried(stub_server):
+    """Test that a 404 fails immediately"""
+    base_url, state = stub_server
+    result = asyncio.run(AsyncScraper(backoff_seconds=0.01).scrape_many([f"{base_url}/missing"]))[0]
+
+    assert result.status == FETCH_ERROR
+    assert state.requests["/missing"] == 1
+    print("\n✓ Client error test passed: no retries for 404")
+
+def test_concurrency_capped_per_host(stub_server):
+    """Test that pages are fetched in parallel but never above the per-host limit"""
+    base_url, state = stub_server
+    urls = [f"{base_url}/slow/{i}" for i in range(6)]
+
+    start = time.perf_counter()
+    results = asyncio.run(AsyncScraper(per_host_limit=2).scrape_many(urls))
+    elapsed = time.perf_counter() - start
+
+    assert all(result.status == FETCH_FETCHED for result in results)
+    assert state.max_in_flight == 2
+    assert elapsed < 6 * 0.2
+    print(f"\n✓ Per-host limit test passed: 6 slow pages in {elapsed:.2f}s with at most 2 in flight")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
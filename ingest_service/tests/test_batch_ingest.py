@@ -0,0 +1,104 @@
+import pytest
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from batch_ingest import BatchIngestor, ingest_ndjson, iter_ndjson_lines
+
+async def _async_iter(items):
+    for item in items:
+        yield item
+
+async def _collect(async_iterator):
+    return [item async for item in async_iterator]
+
+async def _split_words(text):
+    return text.split()
+
+def test_iter_ndjson_lines_across_pieces():
+    """Test that lines split across stream pieces are reassembled"""
+    pieces = [b'{"text": "a"}\n{"te', b'xt": "b"}\n\n', b'{"text": "c"}']
+    
+    lines = asyncio.run(_collect(iter_ndjson_lines(_async_iter(pieces))))
+    
+    assert lines == ['{"text": "a"}', '{"text": "b"}', '{"text": "c"}']
+    print("\n✓ NDJSON test passed: lines reassembled across pieces")
+
+def test_batches_span_documents():
+    """Test that chunks from several documents are stored together in fixed-size batches"""
+    batches = []
+    
+    async def store_batch(texts, sources, metadatas):
+        batches.append((texts, metadatas))
+        return [True] * len(texts)
+    
+    lines = [
+        json.dumps({"id": "a", "text": "one two three"}),
+        json.dumps({"id": "b", "text": "four five", "metadata": {"source": "blog"}}),
+    ]
+    results = asyncio.run(ingest_ndjson(_async_iter(lines), _split_words, store_batch, batch_size=2))
+    
+    assert [texts for texts, _ in batches] == [["one", "two"], ["three", "four"], ["five"]]
+    assert batches[1][1][1] == {"source": "blog", "document_id": "b", "chunk_index": 0}
+    assert [(result.id, result.status, result.chunks) for result in results] == [("a", "success", 3), ("b", "success", 2)]
+    print("\n✓ Batching test passed: documents shared fixed-size batches")
+
+def test_invalid_lines_reported():
+    """Test that malformed lines fail individually without stopping the batch"""
+    async def store_batch(texts, sources, metadatas):
+        return [True] * len(texts)
+    
+    lines = ["not json", json.dumps({"id": "ok", "text": "fine"}), json.dumps({"id": "empty", "text": ""})]
+    results = asyncio.run(ingest_ndjson(_async_iter(lines), _split_words, store_batch, batch_size=10))
+    
+    assert [(result.id, result.status) for result in results] == [("1", "error"), ("ok", "success"), ("3", "error")]
+    assert "Invalid document" in results[0].message
+    print("\n✓ Invalid line test passed: errors reported per document")
+
+def test_storage_failure_marks_documents_in_batch():
+    """Test that a failed batch marks every document with chunks in it as failed"""
+    calls = 0
+    
+    async def store_batch(texts, sources, metadatas):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise RuntimeError("disk full")
+        return [True] * len(texts)
+    
+    async def scenario():
+        ingestor = BatchIngestor(store_batch, batch_size=2)
+        await ingestor.add_document("a", ["a1", "a2"])
+        await ingestor.add_document("b", ["b1"])
+        await ingestor.add_document("c", ["c1", "c2", "c3"])
+        await ingestor.flush()
+        return ingestor.results()
+    
+    results = asyncio.run(scenario())
+    
+    assert [(result.id, result.status) for result in results] == [("a", "success"), ("b", "error"), ("c", "error")]
+    assert "disk full" in results[1].message
+    print("\n✓ Storage failure test passed: affected documents reported as failed")
+
+def test_results_report_inserted_and_skipped():
+    """Test that per-document results split chunks into inserted and skipped"""
+    sources_seen = []
+    
+    async def store_batch(texts, sources, metadatas):
+        sources_seen.extend(sources)
+        return [text != "dup" for text in texts]
+    
+    lines = [
+        json.dumps({"id": "a", "text": "dup new"}),
+        json.dumps({"text": "dup"}),
+    ]
+    results = asyncio.run(ingest_ndjson(_async_iter(lines), _split_words, store_batch, batch_size=10))
+    
+    assert [(result.inserted, result.skipped) for result in results] == [(1, 1), (0, 1)]
+    assert sources_seen == ["a", "a", "ingest_batch"]
+    print("\n✓ Dedup results test passed: inserted and skipped counted per document")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"]) 
@@ -0,0 +1,130 @@
+import socket
+import subprocess
+import sys
+import time
+import zlib
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+import chroma_client
+from chroma_client import (
+    STORE_EMBEDDED,
+    STORE_REMOTE,
+    ChromaClientException,
+    create_chroma_client,
+    query_by_vectors,
+)
+from model_registry import clear_registry
+from vector_store import chunk_id, get_vector_store, reset_vector_store, store_chunks
+
+def fake_embedding(text: str) -> list[float]:
+    rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+    vector = rng.standard_normal(16)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture(scope="module")
+def chroma_server(tmp_path_factory):
+    """Fixture for a Chroma server started locally (skipped when it cannot start); yields its port"""
+    port = free_port()
+    directory = tmp_path_factory.mktemp("chroma_server")
+    # The server writes chroma.log to its working directory
+    process = subprocess.Popen(
+        [sys.executable, "-c", "from chromadb.cli.cli import app; app()", "run",
+         "--path", str(directory), "--host", "127.0.0.1", "--port", str(port)],
+        cwd=directory, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            create_chroma_client(STORE_REMOTE, host="127.0.0.1", port=port).heartbeat()
+            break
+        except ChromaClientException:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                pytest.skip("Chroma server could not be started")
+            time.sleep(0.3)
+    yield port
+    process.terminate()
+    process.wait(timeout=30)
+
+@pytest.fixture
+def fake_embeddings():
+    """Fixture for a deterministic embeddings model"""
+    clear_registry()
+    reset_vector_store()
+    with patch('model_registry.HuggingFaceEmbeddings') as mock_embeddings:
+        mock_embeddings.return_value.embed_documents.side_effect = lambda texts: [fake_embedding(t) for t in texts]
+        yield mock_embeddings
+    clear_registry()
+    reset_vector_store()
+
+@pytest.fixture
+def remote_store(chroma_server, monkeypatch, fake_embeddings):
+    """Fixture pointing the vector store at the local Chroma server, in a collection of its own"""
+    monkeypatch.setattr(chroma_client, "VECTOR_STORE_BACKEND", STORE_REMOTE)
+    monkeypatch.setattr(chroma_client, "CHROMA_HOST", "127.0.0.1")
+    monkeypatch.setattr(chroma_client, "CHROMA_PORT", chroma_server)
+    monkeypatch.setattr("vector_store.CHROMA_COLLECTION_NAME", f"test-{time.time_ns()}")
+    return get_vector_store()
+
+def test_unknown_backend_and_unreachable_server():
+    """Test that configuration and connection errors are reported as ChromaClientException"""
+    with pytest.raises(ChromaClientException) as exc_info:
+        create_chroma_client("cassandra")
+    assert "Unknown vector store backend" in str(exc_info.value)
+
+    with pytest.raises(ChromaClientException) as exc_info:
+        create_chroma_client(STORE_REMOTE, host="127.0.0.1", port=free_port())
+    assert "127.0.0.1" in str(exc_info.value)
+    print("\n✓ Error test passed")
+
+def test_client_shared_by_process(tmp_path):
+    """Test that the process-wide client is opened once"""
+    with patch('chroma_client.create_chroma_client') as mock_create:
+        assert chroma_client.get_chroma_client() is chroma_client.get_chroma_client()
+    mock_create.assert_called_once_with(STORE_EMBEDDED, str(tmp_path / "chroma_db"), "localhost", 8000, False)
+    print("\n✓ Shared client test passed")
+
+def test_remote_store_round_trip(remote_store, monkeypatch):
+    """Test that chunks stored through the server are found again, with adds split to the server's batch size"""
+    monkeypatch.setattr("vector_store.max_batch_size", lambda client: 4)
+    texts = [f"Trecho {i} sobre a Hotmart" for i in range(10)]
+    with patch.object(remote_store, "add_texts", wraps=remote_store.add_texts) as add_texts:
+        assert store_chunks(texts, ["blog"] * 10) == [True] * 10
+        assert store_chunks(texts[:3], ["blog"] * 3) == [False] * 3
+
+    assert [len(call.kwargs["ids"]) for call in add_texts.call_args_list] == [4, 4, 2]
+    results = remote_store.similarity_search_by_vector_with_relevance_scores(fake_embedding(texts[7]), k=1)
+    assert results[0][0].page_content == texts[7]
+    assert results[0][0].metadata == {"source": "blog"}
+    assert results[0][0].id == chunk_id("blog", texts[7])
+    print("\n✓ Remote round trip test passed: 10 chunks added in 3 calls and found again")
+
+def test_query_by_vectors_matches_single_queries(remote_store):
+    """Test that one batched query returns what one query per vector would"""
+    texts = [f"Chunk {i}" for i in range(20)]
+    store_chunks(texts, ["doc"] * 20)
+    vectors = [fake_embedding(texts[i]) for i in (0, 5, 19)]
+
+    with patch.object(remote_store._collection, "query", wraps=remote_store._collection.query) as query:
+        batched = query_by_vectors(remote_store._collection, vectors, k=3, batch_size=100)
+    single = [remote_store.similarity_search_by_vector_with_relevance_scores(vector, k=3) for vector in vectors]
+
+    assert query.call_count == 1
+    assert [[document.page_content for document, _ in result] for result in batched] == \
+           [[document.page_content for document, _ in result] for result in single]
+    assert [result[0][0].page_content for result in batched] == ["Chunk 0", "Chunk 5", "Chunk 19"]
+    assert np.allclose([d for result in batched for _, d in result], [d for result in single for _, d in result])
+    print("\n✓ Batched query test passed: 3 searches in one call")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
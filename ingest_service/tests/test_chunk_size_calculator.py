@@ -31,10 +31,11 @@ def test_regular_text_chunking():
 
 def test_very_long_text():
     text = "Very long text" * 10000  # >100000 chars
-    with pytest.raises(ValueError) as exc_info:
-        calculate_dynamic_chunk_params(text)
-    assert str(exc_info.value) == "Text is too long to be processed"
-    print("\n✓ Very long text test passed: correctly raised exception")
+    chunk_size, overlap = calculate_dynamic_chunk_params(text)
+    
+    assert chunk_size == BASE_CHUNK_SIZE
+    assert overlap == BASE_OVERLAP_SIZE
+    print(f"\n✓ Very long text test passed: chunk_size={chunk_size}, overlap={overlap}")
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"]) 
\ No newline at end of file
@@ -0,0 +1,272 @@
+import asyncio
+import gzip
+import pytest
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import NamedTuple
+
+sys.path.append(str(Path(__file__).parent.parent))
+from async_scraper import AsyncScraper
+from crawler import (
+    Crawler,
+    CrawlerException,
+    CrawlStore,
+    parse_index_page,
+    parse_sitemap,
+)
+
+POSTS = 12
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+def urlset(urls):
+    entries = "".join(f"<url><loc>{url}</loc></url>" for url in urls)
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="{SITEMAP_NS}">{entries}</urlset>'.encode()
+
+def sitemap_index(urls):
+    entries = "".join(f"<sitemap><loc>{url}</loc></sitemap>" for url in urls)
+    return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="{SITEMAP_NS}">{entries}</sitemapindex>'.encode()
+
+class StubState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests: dict[str, list[float]] = {}
+
+    def count(self, path):
+        return len(self.requests.get(path, []))
+
+class StubHandler(BaseHTTPRequestHandler):
+    """A small blog: robots.txt, a sitemap index with a plain and a gzipped sitemap, and posts"""
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="text/html; charset=utf-8"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        state: StubState = self.server.state
+        base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        with state.lock:
+            state.requests.setdefault(self.path, []).append(time.perf_counter())
+
+        if self.path == "/robots.txt":
+            return self._send(200, self.server.robots.encode(), "text/plain")
+        if self.path == "/sitemap.xml":
+            return self._send(200, sitemap_index([f"{base}/sitemap-1.xml", f"{base}/sitemap-2.xml.gz"]), "application/xml")
+        if self.path == "/sitemap-1.xml":
+            urls = [f"{base}/blog/post-{i}" for i in range(POSTS // 2)]
+            return self._send(200, urlset(urls), "application/xml")
+        if self.path == "/sitemap-2.xml.gz":
+            urls = [f"{base}/blog/post-{i}" for i in range(POSTS // 2, POSTS)] + [f"{base}/private/secret", f"{base}/blog/missing"]
+            return self._send(200, gzip.compress(urlset(urls)), "application/octet-stream")
+        if self.path == "/blog":
+            links = "".join(f'<a href="/blog/post-{i}#top">Post {i}</a>' for i in range(3))
+            links += '<a href="https://other.test/blog/x">External</a><a href="/about">About</a><a href="/blog/">Blog</a>'
+            return self._send(200, f"<html><body>{links}</body></html>".encode())
+        if self.path.startswith("/blog/post-") or self.path == "/private/secret":
+            body = f'<html><body><div class="content__body"><h1>{self.path}</h1><p>Content of {self.path}</p></div></body></html>'
+            return self._send(200, body.encode())
+        return self._send(404)
+
+@pytest.fixture
+def stub_server():
+    """Fixture for a local blog server; yields its base URL, request log and server"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.state = StubState()
+    server.robots = "User-agent: *\nDisallow: /private/\n"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", server.state, server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def store(tmp_path):
+    """Fixture for a crawl store in a temporary directory"""
+    return CrawlStore(str(tmp_path / "crawls.sqlite3"))
+
+class FakeStats(NamedTuple):
+    chunks: int
+    added: int
+
+class FakeIngest:
+    """Records ingested pages; optionally waits or fails"""
+
+    def __init__(self, delay=0.0, fail_for=()):
+        self.calls = []
+        self.times = []
+        self.delay = delay
+        self.fail_for = set(fail_for)
+
+    async def __call__(self, text, source, version):
+        await asyncio.sleep(self.delay)
+        if source in self.fail_for:
+            raise RuntimeError("vector store unavailable")
+        self.calls.append((source, text))
+        self.times.append(time.perf_counter())
+        return FakeStats(chunks=2, added=2)
+
+def make_crawler(store, ingest, **kwargs):
+    scraper = AsyncScraper(
+        per_host_limit=kwargs.pop("per_host_limit", 4),
+        backoff_seconds=0.01,
+        max_retries=0,
+        request_delay=kwargs.pop("request_delay", 0.0),
+        user_agent="TestCrawler"
+    )
+    return Crawler(store, scraper, ingest, max_pages=kwargs.pop("max_pages", 1000), queue_size=kwargs.pop("queue_size", 4), **kwargs)
+
+def test_parse_sitemap_variants():
+    """Test that urlsets, sitemap indexes and gzipped sitemaps are read"""
+    assert parse_sitemap(urlset(["https://a.test/1", "https://a.test/2"])) == (["https://a.test/1", "https://a.test/2"], [])
+    assert parse_sitemap(sitemap_index(["https://a.test/s.xml"])) == ([], ["https://a.test/s.xml"])
+    assert parse_sitemap(gzip.compress(urlset(["https://a.test/1"]))) == (["https://a.test/1"], [])
+
+    with pytest.raises(CrawlerException):
+        parse_sitemap(b"<html><body>not a sitemap</body></html>")
+    with pytest.raises(CrawlerException):
+        parse_sitemap(b"<<<")
+    print("\n✓ Sitemap parsing test passed")
+
+def test_parse_index_page_keeps_posts_below_index():
+    """Test that only same-host links below the index path are kept, without fragments"""
+    html = '<a href="/pt-br/blog/a#x">A</a><a href="b?utm=1">B</a><a href="/pt-br/sobre">S</a>' \
+           '<a href="https://other.test/pt-br/blog/c">C</a><a href="/pt-br/blog/a">A again</a>'
+    links = parse_index_page(html, "https://hotmart.test/pt-br/blog/")
+    assert links == ["https://hotmart.test/pt-br/blog/a", "https://hotmart.test/pt-br/blog/b"]
+    print("\n✓ Index page parsing test passed")
+
+def test_crawl_sitemap_ingests_every_post(stub_server, store):
+    """Test a full crawl: nested sitemaps, robots.txt, failures and per-page ingestion"""
+    base_url, state, _ = stub_server
+    crawl_id = store.create(f"{base_url}/sitemap.xml")
+    ingest = FakeIngest()
+    progress = []
+
+    stats = asyncio.run(make_crawler(store, ingest).run(crawl_id, on_progress=lambda done, total: progress.append((done, total))))
+
+    assert stats.pages_total == POSTS + 2
+    assert stats.pages_done == POSTS
+    assert stats.pages_skipped == 1
+    assert stats.pages_failed == 1
+    assert stats.chunks_added == 2 * POSTS
+    assert state.count("/private/secret") == 0
+    assert state.count("/robots.txt") == 1
+
+    sources = {source for source, _ in ingest.calls}
+    assert sources == {f"{base_url}/blog/post-{i}" for i in range(POSTS)}
+    assert all("Content of /blog/post-" in text for _, text in ingest.calls)
+    assert progress[-1] == (POSTS + 2, POSTS + 2)
+    assert store.get(crawl_id)["discovered"] is True
+    print("\n✓ Crawl test passed: posts ingested, disallowed and missing pages recorded")
+
+def test_crawl_from_index_page(stub_server, store):
+    """Test that an HTML index page can be used instead of a sitemap"""
+    base_url, _, _ = stub_server
+    crawl_id = store.create(f"{base_url}/blog")
+    ingest = FakeIngest()
+
+    stats = asyncio.run(make_crawler(store, ingest).run(crawl_id))
+
+    assert stats.pages_done == 3
+    assert sorted(source for source, _ in ingest.calls) == [f"{base_url}/blog/post-{i}" for i in range(3)]
+    print("\n✓ Index page crawl test passed")
+
+def test_ingestion_starts_before_fetching_ends(stub_server, store):
+    """Test that pages are ingested as they arrive instead of after the whole crawl"""
+    base_url, state, _ = stub_server
+    crawl_id = store.create(f"{base_url}/sitemap.xml")
+    ingest = FakeIngest()
+
+    asyncio.run(make_crawler(store, ingest, per_host_limit=1, request_delay=0.02, queue_size=2).run(crawl_id))
+
+    last_fetch = max(times[-1] for path, times in state.requests.items() if path.startswith("/blog/post-"))
+    assert min(ingest.times) < last_fetch
+    print("\n✓ Streaming test passed: first page ingested before the last one was fetched")
+
+def test_interrupted_crawl_resumes_without_redoing_pages(stub_server, store):
+    """Test that a restarted crawl skips discovery and pages already done"""
+    base_url, state, _ = stub_server
+    crawl_id = store.create(f"{base_url}/sitemap.xml")
+    first = FakeIngest(delay=0.05)
+
+    async def interrupted():
+        task = asyncio.create_task(make_crawler(store, first, per_host_limit=1, ingest_workers=1).run(crawl_id))
+        while len(first.calls) < 4:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(interrupted())
+    done_before = store.stats(crawl_id).pages_done
+    assert 4 <= done_before < POSTS
+
+    second = FakeIngest()
+    stats = asyncio.run(make_crawler(store, second).run(crawl_id))
+
+    assert stats.pages_done == POSTS
+    first_sources = {source for source, _ in first.calls}
+    second_sources = {source for source, _ in second.calls}
+    assert not first_sources & second_sources
+    assert len(first_sources | second_sources) == POSTS
+    assert state.count("/sitemap.xml") == 1
+    print(f"\n✓ Resume test passed: {done_before} pages done before the restart were not redone")
+
+def test_resumed_discovery_respects_max_pages(stub_server, store):
+    """Test that pages recorded before an interrupted discovery count towards max_pages"""
+    base_url, _, _ = stub_server
+    crawl_id = store.create(f"{base_url}/sitemap.xml")
+    store.add_pages(crawl_id, [f"{base_url}/blog/post-{i}" for i in range(3)])
+
+    stats = asyncio.run(make_crawler(store, FakeIngest(), max_pages=5).run(crawl_id))
+
+    assert stats.pages_total == 5
+    print("\n✓ Resumed discovery test passed: page limit kept across runs")
+
+def test_failed_pages_retried_on_next_run(stub_server, store):
+    """Test that pages whose ingestion failed are retried when the crawl runs again"""
+    base_url, _, _ = stub_server
+    crawl_id = store.create(f"{base_url}/sitemap.xml")
+    broken = f"{base_url}/blog/post-3"
+
+    stats = asyncio.run(make_crawler(store, FakeIngest(fail_for={broken})).run(crawl_id))
+    assert stats.pages_failed == 2
+
+    retry = FakeIngest()
+    stats = asyncio.run(make_crawler(store, retry).run(crawl_id))
+    assert [source for source, _ in retry.calls] == [broken]
+    assert stats.pages_done == POSTS
+    print("\n✓ Retry test passed: only failed pages were processed again")
+
+def test_robots_crawl_delay_respected(stub_server, store):
+    """Test that a Crawl-delay in robots.txt spaces out requests to the host"""
+    base_url, state, server = stub_server
+    server.robots = "User-agent: *\nCrawl-delay: 1\n"
+    crawl_id = store.create(f"{base_url}/blog")
+
+    asyncio.run(make_crawler(store, FakeIngest()).run(crawl_id))
+
+    starts = sorted(times[0] for path, times in state.requests.items() if path.startswith("/blog/post-"))
+    gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+    assert len(starts) == 3
+    assert min(gaps) >= 0.9
+    print("\n✓ Crawl-delay test passed: requests spaced by the robots.txt delay")
+
+def test_unknown_crawl_rejected(store):
+    """Test that running a crawl that was never created fails"""
+    with pytest.raises(CrawlerException) as exc_info:
+        asyncio.run(make_crawler(store, FakeIngest()).run("missing"))
+    assert "not found" in str(exc_info.value)
+    print("\n✓ Unknown crawl test passed")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,130 @@
+import numpy as np
+import os
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(str(Path(__file__).parent.parent))
+from embedding_backend import (
+    BACKEND_ONNX,
+    BACKEND_ONNX_INT8,
+    BACKEND_TORCH,
+    EmbeddingBackendException,
+    embedding_model_id,
+    embeddings_kwargs,
+    export_onnx_model,
+)
+from constants import EMBEDDING_MODEL_NAME
+
+PARITY_TEXTS = [
+    "A Hotmart é uma plataforma para criar e vender produtos digitais.",
+    "Produtores podem hospedar cursos online na área de membros.",
+    "Afiliados divulgam produtos e recebem comissões por venda.",
+    "O pagamento pode ser feito por cartão de crédito, boleto ou Pix.",
+    "query: Como funciona a Hotmart?",
+    "query: Quanto custa vender na plataforma?",
+    "passage: A taxa é cobrada apenas quando uma venda é realizada.",
+    "Webinars e lives ajudam a lançar um infoproduto.",
+]
+
+class FakeSentenceTransformer:
+    """Stands in for an ONNX-backed SentenceTransformer; writes the exported files on save"""
+
+    loads = 0
+
+    def __init__(self, model_name, backend, device):
+        FakeSentenceTransformer.loads += 1
+        assert backend == "onnx"
+
+    def save_pretrained(self, path):
+        os.makedirs(os.path.join(path, "onnx"))
+        Path(path, "onnx", "model.onnx").write_bytes(b"onnx")
+
+def fake_quantize(model, quantization, path):
+    Path(path, "onnx", f"model_qint8_{quantization}.onnx").write_bytes(b"int8")
+
+def test_model_id_per_backend():
+    """Test that each backend gets its own id, torch keeping the plain model name"""
+    assert embedding_model_id("m", BACKEND_TORCH) == "m"
+    assert embedding_model_id("m", BACKEND_ONNX) == "m@onnx"
+    assert embedding_model_id("m", BACKEND_ONNX_INT8, "avx2") == "m@onnx-int8:avx2"
+    assert embedding_model_id("m", BACKEND_ONNX_INT8, "arm64") != embedding_model_id("m", BACKEND_ONNX_INT8, "avx2")
+
+    with pytest.raises(EmbeddingBackendException):
+        embedding_model_id("m", "tensorflow")
+    with pytest.raises(EmbeddingBackendException):
+        embedding_model_id("m", BACKEND_ONNX_INT8, "sse2")
+    print("\n✓ Model id test passed")
+
+def test_embeddings_kwargs(tmp_path):
+    """Test the HuggingFaceEmbeddings arguments of each backend"""
+    assert embeddings_kwargs("m", BACKEND_TORCH) == {"model_name": "m"}
+
+    with patch('embedding_backend.export_onnx_model', return_value=str(tmp_path)) as mock_export:
+        kwargs = embeddings_kwargs("m", BACKEND_ONNX_INT8, "avx512_vnni", str(tmp_path))
+
+    mock_export.assert_called_once_with("m", BACKEND_ONNX_INT8, "avx512_vnni", str(tmp_path))
+    assert kwargs["model_name"] == str(tmp_path)
+    assert kwargs["model_kwargs"]["backend"] == "onnx"
+    assert kwargs["model_kwargs"]["model_kwargs"] == {"file_name": "onnx/model_qint8_avx512_vnni.onnx"}
+    print("\n✓ Embeddings kwargs test passed")
+
+def test_export_runs_once(tmp_path):
+    """Test that the model is exported and quantized once, then reused from disk"""
+    FakeSentenceTransformer.loads = 0
+    with patch('sentence_transformers.SentenceTransformer', FakeSentenceTransformer), \
+         patch('sentence_transformers.backend.export_dynamic_quantized_onnx_model', side_effect=fake_quantize):
+        first = export_onnx_model("org/model", BACKEND_ONNX_INT8, "avx2", str(tmp_path))
+        second = export_onnx_model("org/model", BACKEND_ONNX_INT8, "avx2", str(tmp_path))
+
+    assert first == second
+    assert FakeSentenceTransformer.loads == 1
+    assert os.path.exists(os.path.join(first, "onnx", "model.onnx"))
+    assert os.path.exists(os.path.join(first, "onnx", "model_qint8_avx2.onnx"))
+    # Nothing is left behind from the staging directory
+    assert os.listdir(tmp_path) == [os.path.basename(first)]
+    print("\n✓ Export test passed: exported once, published atomically")
+
+def test_export_failure_wrapped(tmp_path):
+    """Test that export errors surface as EmbeddingBackendException"""
+    with patch('sentence_transformers.SentenceTransformer', side_effect=ImportError("optimum is not installed")):
+        with pytest.raises(EmbeddingBackendException) as exc_info:
+            export_onnx_model("org/model", BACKEND_ONNX, directory=str(tmp_path))
+
+    assert "optimum" in str(exc_info.value)
+    assert os.listdir(tmp_path) == []
+    print("\n✓ Export failure test passed")
+
+def _model_available() -> bool:
+    try:
+        import optimum.onnxruntime  # noqa: F401
+        from huggingface_hub import try_to_load_from_cache
+    except ImportError:
+        return False
+    return isinstance(try_to_load_from_cache(EMBEDDING_MODEL_NAME, "config.json"), str)
+
+@pytest.mark.skipif(not _model_available(), reason="needs optimum[onnxruntime] and the model in the HuggingFace cache")
+@pytest.mark.parametrize("backend, min_cosine", [(BACKEND_ONNX, 0.999), (BACKEND_ONNX_INT8, 0.97)])
+def test_backend_parity_with_torch(tmp_path, backend, min_cosine):
+    """Test that the ONNX backends reproduce the PyTorch embeddings of the real model"""
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    reference = np.array(HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME).embed_documents(PARITY_TEXTS))
+    candidate = np.array(
+        HuggingFaceEmbeddings(**embeddings_kwargs(EMBEDDING_MODEL_NAME, backend, directory=str(tmp_path))).embed_documents(PARITY_TEXTS)
+    )
+
+    reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate /= np.linalg.norm(candidate, axis=1, keepdims=True)
+    cosines = np.sum(reference * candidate, axis=1)
+    assert cosines.min() >= min_cosine
+    # Nearest neighbours among the texts are the same with both backends
+    assert np.array_equal(
+        np.argsort(-(reference @ reference.T), axis=1)[:, :2],
+        np.argsort(-(candidate @ candidate.T), axis=1)[:, :2]
+    )
+    print(f"\n✓ Parity test passed for {backend}: min cosine {cosines.min():.4f}")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
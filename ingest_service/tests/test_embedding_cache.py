@@ -0,0 +1,176 @@
+import pytest
+import sys
+import zlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+sys.path.append(str(Path(__file__).parent.parent))
+import embedding_cache
+from embedding_cache import (
+    CachedEmbeddings,
+    EmbeddingCache,
+    EmbeddingCacheException,
+    get_embedding_cache,
+)
+
+DIM = 8
+
+def vector(seed: float) -> list[float]:
+    return [seed + i / 10 for i in range(DIM)]
+
+@pytest.fixture
+def cache(tmp_path):
+    """Fixture for a cache with room for plenty of vectors"""
+    cache = EmbeddingCache(str(tmp_path), "test/model", max_bytes=1024 * 1024)
+    yield cache
+    cache.close()
+
+def test_miss_then_hit(cache):
+    """Test that stored vectors are returned and unknown texts are misses"""
+    assert cache.get_many(["a", "b"]) == [None, None]
+    cache.put_many(["a"], [vector(1)])
+
+    hit, miss = cache.get_many(["a", "b"])
+    assert miss is None
+    assert np.allclose(hit, vector(1), atol=1e-2)
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["entries"] == 1
+    print("\n✓ Hit/miss test passed: only stored texts are served from the cache")
+
+def test_vectors_stored_as_float16(cache, tmp_path):
+    """Test that the memory-mapped matrix uses half precision by default"""
+    cache.put_many(["a"], [vector(1)])
+    files = [path.name for path in tmp_path.iterdir()]
+    assert "test_model.float16.vectors" in files
+    assert cache.stats()["dtype"] == "float16"
+    assert (tmp_path / "test_model.float16.vectors").stat().st_size == cache.capacity * DIM * 2
+    print("\n✓ Dtype test passed: vectors take two bytes per dimension")
+
+def test_cache_persists_across_reopen(tmp_path):
+    """Test that a new process sees vectors cached by a previous one"""
+    first = EmbeddingCache(str(tmp_path), "test/model", max_bytes=1024 * 1024)
+    first.put_many(["a", "b"], [vector(1), vector(2)])
+    first.close()
+
+    second = EmbeddingCache(str(tmp_path), "test/model", max_bytes=1024 * 1024)
+    a, b = second.get_many(["a", "b"])
+    assert np.allclose(a, vector(1), atol=1e-2)
+    assert np.allclose(b, vector(2), atol=1e-2)
+    second.close()
+    print("\n✓ Persistence test passed: cache survives a restart")
+
+def test_cache_is_keyed_by_model(tmp_path):
+    """Test that vectors of one model are never served for another"""
+    first = EmbeddingCache(str(tmp_path), "model-a", max_bytes=1024 * 1024)
+    first.put_many(["a"], [vector(1)])
+    second = EmbeddingCache(str(tmp_path), "model-b", max_bytes=1024 * 1024)
+    assert second.get_many(["a"]) == [None]
+    first.close()
+    second.close()
+    print("\n✓ Model key test passed: models do not share entries")
+
+def test_least_recently_used_entries_evicted(tmp_path):
+    """Test that a full cache reuses the rows of the least recently used entries"""
+    cache = EmbeddingCache(str(tmp_path), "test/model", max_bytes=3 * DIM * 2)
+    with patch('embedding_cache.time.time', side_effect=range(100, 200)):
+        cache.put_many(["a", "b", "c"], [vector(1), vector(2), vector(3)])
+        assert cache.capacity == 3
+        cache.get_many(["a"])
+        cache.put_many(["d"], [vector(4)])
+
+    a, b, c, d = cache.get_many(["a", "b", "c", "d"])
+    assert b is None
+    assert all(v is not None for v in (a, c, d))
+    assert np.allclose(d, vector(4), atol=1e-2)
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["entries"] == 3
+    cache.close()
+    print("\n✓ Eviction test passed: least recently used entry was replaced")
+
+def test_lookups_recorded_in_batches(cache):
+    """Test that lookups do not write to the index until the flush interval passes or vectors are stored"""
+    cache.put_many(["a"], [vector(1)])
+    used_at = lambda: cache._index.execute("SELECT last_used FROM entries").fetchone()[0]
+    stored_at = used_at()
+
+    cache.get_many(["a"])
+    assert used_at() == stored_at
+    cache.put_many(["b"], [vector(2)])
+    assert cache._index.execute("SELECT last_used FROM entries WHERE slot = 0").fetchone()[0] > stored_at
+    print("\n✓ Batched lookup test passed: reads do not take the index write lock")
+
+def content_vector(text: str) -> list[float]:
+    return vector(zlib.crc32(text.encode("utf-8")) % 100 / 100)
+
+def fill_shared_cache(directory: str, worker: int, rounds: int) -> int:
+    """Store and read back batches in a separate process; returns how many vectors read back were wrong"""
+    cache = EmbeddingCache(directory, "test/model", max_bytes=16 * DIM * 2)
+    wrong = 0
+    for round in range(rounds):
+        texts = [f"{worker}-{round}-{i}" for i in range(5)]
+        cache.put_many(texts, [content_vector(text) for text in texts])
+        earlier = [f"{other}-{max(round - 1, 0)}-{i}" for other in range(2) for i in range(5)]
+        for text, found in zip(earlier, cache.get_many(earlier)):
+            if found is not None and not np.allclose(found, content_vector(text), atol=1e-2):
+                wrong += 1
+    cache.close()
+    return wrong
+
+@pytest.mark.skipif(embedding_cache.fcntl is None, reason="processes are only coordinated where fcntl is available")
+def test_processes_share_one_cache(tmp_path):
+    """Test that worker processes storing into the same full cache never hand out a row twice"""
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(fill_shared_cache, str(tmp_path), worker, 150) for worker in range(2)]
+        assert [future.result() for future in futures] == [0, 0]
+
+    cache = EmbeddingCache(str(tmp_path), "test/model", max_bytes=16 * DIM * 2)
+    slots = [slot for (slot,) in cache._index.execute("SELECT slot FROM entries")]
+    assert sorted(slots) == list(range(cache.capacity))
+    cache.close()
+    print("\n✓ Multi-process test passed: rows allocated once across processes")
+
+def test_unsupported_dtype_rejected(tmp_path):
+    """Test that only float16 and float32 storage is accepted"""
+    with pytest.raises(EmbeddingCacheException) as exc_info:
+        EmbeddingCache(str(tmp_path), "test/model", max_bytes=1024, dtype="int8")
+    assert "Unsupported cache dtype" in str(exc_info.value)
+    print("\n✓ Dtype validation test passed")
+
+def test_cached_embeddings_only_embed_misses(cache):
+    """Test that the wrapper calls the model only for texts not in the cache"""
+    model = MagicMock()
+    model.embed_documents.side_effect = lambda texts: [vector(len(text)) for text in texts]
+    embeddings = CachedEmbeddings(model, cache)
+
+    first = embeddings.embed_documents(["a", "bb", "a"])
+    model.embed_documents.assert_called_once_with(["a", "bb"])
+    assert len(first) == 3
+
+    model.embed_documents.reset_mock()
+    second = embeddings.embed_documents(["a", "bb", "ccc"])
+    model.embed_documents.assert_called_once_with(["ccc"])
+    assert np.allclose(second[0], first[0], atol=1e-2)
+    print("\n✓ Wrapper test passed: cached chunks skip the model")
+
+def test_cached_embeddings_pass_queries_through(cache):
+    """Test that queries are always embedded by the model"""
+    model = MagicMock()
+    model.embed_query.return_value = vector(1)
+    assert CachedEmbeddings(model, cache).embed_query("pergunta") == vector(1)
+    model.embed_query.assert_called_once_with("pergunta")
+    print("\n✓ Query passthrough test passed")
+
+def test_get_embedding_cache_shared_and_disableable():
+    """Test that the cache is shared per model and can be disabled"""
+    assert get_embedding_cache("test/model") is get_embedding_cache("test/model")
+    with patch.object(embedding_cache, "EMBEDDING_CACHE_ENABLED", False):
+        assert get_embedding_cache("other/model") is None
+    print("\n✓ Singleton test passed: one cache per model, none when disabled")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
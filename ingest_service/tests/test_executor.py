@@ -0,0 +1,96 @@
+import pytest
+import sys
+import asyncio
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+import executor
+from executor import run_blocking, shutdown_executor, ExecutorException, _create_executor
+
+@pytest.fixture(autouse=True)
+def fresh_executor():
+    """Fixture ensuring every test gets its own pool"""
+    shutdown_executor()
+    yield
+    shutdown_executor()
+
+def test_run_blocking_runs_off_event_loop():
+    """Test that blocking work runs in a pool thread, not the event loop thread"""
+    async def scenario():
+        loop_thread = threading.get_ident()
+        worker_thread = await run_blocking(threading.get_ident)
+        return loop_thread, worker_thread
+    
+    loop_thread, worker_thread = asyncio.run(scenario())
+    
+    assert loop_thread != worker_thread
+    print("\n✓ Offload test passed: work executed in a pool thread")
+
+def test_run_blocking_forwards_arguments():
+    """Test that positional and keyword arguments reach the function"""
+    result = asyncio.run(run_blocking(lambda a, b=0: a + b, 2, b=3))
+    
+    assert result == 5
+    print("\n✓ Arguments test passed: arguments forwarded")
+
+def test_run_blocking_bounded_concurrency(monkeypatch):
+    """Test that no more than EXECUTOR_MAX_WORKERS tasks run at once"""
+    monkeypatch.setattr(executor, "EXECUTOR_MAX_WORKERS", 2)
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+    
+    def task():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        threading.Event().wait(0.05)
+        with lock:
+            running -= 1
+    
+    async def scenario():
+        await asyncio.gather(*(run_blocking(task) for _ in range(6)))
+    
+    asyncio.run(scenario())
+    
+    assert peak == 2
+    print("\n✓ Bounded concurrency test passed: at most 2 tasks ran at once")
+
+def record_stage(stage):
+    from metrics import current_trace_id, span
+    with span(stage):
+        return current_trace_id()
+
+def test_trace_id_and_metrics_cross_the_pool(monkeypatch):
+    """Test that tasks run under the caller's trace id and worker process metrics reach this process"""
+    from metrics import STAGE_SECONDS, reset_trace_id, set_trace_id
+    
+    async def scenario():
+        token = set_trace_id("trace-1")
+        try:
+            return await run_blocking(record_stage, "pool_stage")
+        finally:
+            reset_trace_id(token)
+    
+    assert asyncio.run(scenario()) == "trace-1"
+    shutdown_executor()
+    monkeypatch.setattr(executor, "EXECUTOR_TYPE", "process")
+    monkeypatch.setattr("model_registry.warm_up", lambda: None)
+    before = STAGE_SECONDS.count(stage="pool_stage")
+    
+    assert asyncio.run(scenario()) == "trace-1"
+    assert STAGE_SECONDS.count(stage="pool_stage") == before + 1
+    print("\n✓ Pool propagation test passed: trace id and metrics kept in both pool types")
+
+def test_invalid_executor_configuration():
+    """Test handling of invalid executor settings"""
+    with pytest.raises(ExecutorException):
+        _create_executor("fiber", 2)
+    with pytest.raises(ExecutorException):
+        _create_executor("thread", 0)
+    print("\n✓ Configuration test passed: invalid settings rejected")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"]) 
@@ -0,0 +1,42 @@
+import pytest
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from generation import GenerationMarker
+
+@pytest.fixture
+def marker(tmp_path):
+    """Fixture for a generation marker in a temporary directory"""
+    return GenerationMarker(str(tmp_path / "shared" / "generation.sqlite3"))
+
+def test_generation_starts_at_zero_and_increments(marker):
+    """Test that each bump advances the generation by one"""
+    assert marker.read() == 0
+    assert marker.bump() == 1
+    assert marker.bump() == 2
+    assert GenerationMarker(marker.db_path).read() == 2
+    print("\n✓ Generation test passed: counter advanced on each bump")
+
+def test_concurrent_bumps_not_lost(marker):
+    """Test that bumps from concurrent writers are all counted"""
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: GenerationMarker(marker.db_path).bump(), range(40)))
+
+    assert sorted(results) == list(range(1, 41))
+    assert marker.read() == 40
+    print("\n✓ Concurrency test passed: 40 concurrent bumps counted")
+
+def test_bump_records_embedding_model(marker):
+    """Test that a bump remembers the embedding model of the write"""
+    assert marker.embedding_model() is None
+    marker.bump("model-a@onnx")
+    marker.bump()
+    assert marker.embedding_model() == "model-a@onnx"
+    marker.bump("model-a")
+    assert GenerationMarker(marker.db_path).embedding_model() == "model-a"
+    print("\n✓ Embedding model test passed: last writer's model recorded")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
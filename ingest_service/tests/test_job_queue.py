@@ -0,0 +1,157 @@
+import pytest
+import sys
+import asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from job_queue import (
+    JobQueue,
+    JobStore,
+    JobQueueFullException,
+    job_throughput,
+    JOB_PENDING,
+    JOB_DONE,
+    JOB_FAILED,
+)
+
+@pytest.fixture
+def store(tmp_path):
+    """Fixture providing a job store in a temporary directory"""
+    return JobStore(str(tmp_path / "jobs" / "jobs.sqlite3"))
+
+def test_store_create_and_get(store):
+    """Test that jobs are persisted with their payload"""
+    job_id = store.create("text", {"text": "Olá"})
+    
+    job = store.get(job_id)
+    
+    assert job["status"] == JOB_PENDING
+    assert job["payload"] == {"text": "Olá"}
+    assert store.get("missing") is None
+    print("\n✓ Store test passed: job persisted and retrieved")
+
+def test_store_requeue_interrupted(store, tmp_path):
+    """Test that jobs left running by a crashed process are pending again after restart"""
+    first = store.create("text", {"text": "a"})
+    second = store.create("text", {"text": "b"})
+    store.mark_running(first)
+    
+    restarted = JobStore(str(tmp_path / "jobs" / "jobs.sqlite3"))
+    pending = restarted.requeue_interrupted()
+    
+    assert pending == [first, second]
+    assert restarted.get(first)["status"] == JOB_PENDING
+    print("\n✓ Recovery test passed: interrupted jobs requeued in order")
+
+def test_job_throughput(store):
+    """Test throughput computation from progress and timestamps"""
+    job = {"started_at": 100.0, "finished_at": 110.0, "chunks_embedded": 50}
+    
+    assert job_throughput(job) == 5.0
+    assert job_throughput({"started_at": None, "chunks_embedded": 0}) is None
+    print("\n✓ Throughput test passed: chunks per second computed")
+
+def test_queue_runs_jobs_and_tracks_progress(store):
+    """Test that workers run jobs in the background and record progress and results"""
+    async def runner(kind, payload, on_progress):
+        on_progress(1, 2)
+        on_progress(2, 2)
+        return 2
+    
+    async def scenario():
+        queue = JobQueue(store, runner, workers=2)
+        await queue.start()
+        job_id = queue.submit("text", {"text": "a"})
+        await queue.join()
+        await queue.stop()
+        return job_id
+    
+    job_id = asyncio.run(scenario())
+    job = store.get(job_id)
+    
+    assert job["status"] == JOB_DONE
+    assert job["chunks_embedded"] == 2
+    assert job["finished_at"] is not None
+    print("\n✓ Worker test passed: job executed and completed")
+
+def test_jobs_run_under_submitter_trace_id(store):
+    """Test that a job runs with the trace id of the request that submitted it"""
+    from metrics import current_trace_id, set_trace_id
+    seen = []
+    
+    async def runner(kind, payload, on_progress):
+        seen.append(current_trace_id())
+        return 0
+    
+    async def scenario():
+        queue = JobQueue(store, runner)
+        await queue.start()
+        set_trace_id("request-1")
+        queue.submit("text", {"text": "a"})
+        set_trace_id(None)
+        queue.submit("text", {"text": "b"})
+        assert queue.pending() == 2
+        await queue.join()
+        await queue.stop()
+    
+    asyncio.run(scenario())
+    
+    assert seen == ["request-1", None]
+    print("\n✓ Trace test passed: job logs carry the submitting request's trace id")
+
+def test_queue_records_failures(store):
+    """Test that job errors are stored instead of crashing the worker"""
+    async def runner(kind, payload, on_progress):
+        raise ValueError("boom")
+    
+    async def scenario():
+        queue = JobQueue(store, runner)
+        await queue.start()
+        failed = queue.submit("text", {"text": "a"})
+        second = queue.submit("text", {"text": "b"})
+        await queue.join()
+        await queue.stop()
+        return failed, second
+    
+    failed, second = asyncio.run(scenario())
+    
+    assert store.get(failed)["status"] == JOB_FAILED
+    assert store.get(failed)["error"] == "boom"
+    assert store.get(second)["status"] == JOB_FAILED
+    print("\n✓ Failure test passed: errors recorded and worker kept running")
+
+def test_queue_resumes_pending_jobs_on_start(store):
+    """Test that jobs persisted before a restart are executed once workers start"""
+    job_id = store.create("text", {"text": "a"})
+    executed = []
+    
+    async def runner(kind, payload, on_progress):
+        executed.append(payload["text"])
+        return 1
+    
+    async def scenario():
+        queue = JobQueue(store, runner)
+        await queue.start()
+        await queue.join()
+        await queue.stop()
+    
+    asyncio.run(scenario())
+    
+    assert executed == ["a"]
+    assert store.get(job_id)["status"] == JOB_DONE
+    print("\n✓ Resume test passed: persisted job executed after restart")
+
+def test_queue_backpressure(store):
+    """Test that submissions beyond max_size are rejected"""
+    async def runner(kind, payload, on_progress):
+        return 0
+    
+    queue = JobQueue(store, runner, max_size=1)
+    queue.submit("text", {"text": "a"})
+    
+    with pytest.raises(JobQueueFullException):
+        queue.submit("text", {"text": "b"})
+    print("\n✓ Backpressure test passed: full queue rejected submission")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"]) 
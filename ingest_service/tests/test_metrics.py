@@ -0,0 +1,110 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).parent.parent))
+import metrics
+from metrics import (
+    TRACE_HEADER,
+    MetricsException,
+    MetricsRegistry,
+    Sample,
+    TraceMiddleware,
+    current_trace_id,
+    span,
+)
+
+@pytest.fixture
+def registry():
+    """Fixture for an empty registry"""
+    return MetricsRegistry("test")
+
+def test_counter_and_histogram_rendered(registry):
+    """Test the Prometheus text format of labelled counters and cumulative histogram buckets"""
+    chunks = registry.counter("chunks_total", "Chunks stored", ("outcome",))
+    latency = registry.histogram("stage_duration_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0))
+    chunks.inc(3, outcome="inserted")
+    chunks.inc(outcome="inserted")
+    for value in (0.05, 0.5, 2.0):
+        latency.observe(value, stage="embed")
+
+    text = registry.render()
+
+    assert "# TYPE test_chunks_total counter" in text
+    assert 'test_chunks_total{outcome="inserted"} 4' in text
+    assert 'test_stage_duration_seconds_bucket{stage="embed",le="0.1"} 1' in text
+    assert 'test_stage_duration_seconds_bucket{stage="embed",le="1"} 2' in text
+    assert 'test_stage_duration_seconds_bucket{stage="embed",le="+Inf"} 3' in text
+    assert 'test_stage_duration_seconds_sum{stage="embed"} 2.55' in text
+    assert 'test_stage_duration_seconds_count{stage="embed"} 3' in text
+    with pytest.raises(MetricsException):
+        chunks.inc(stage="embed")
+    print("\n✓ Rendering test passed")
+
+def test_collectors_run_on_scrape(registry):
+    """Test that collector samples are read at scrape time, and a failing collector does not break the others"""
+    depth = [2]
+    registry.register_collector(lambda: [Sample("queue_depth", "gauge", "Jobs waiting", {}, depth[0])])
+    registry.register_collector(lambda: 1 / 0)
+
+    assert "test_queue_depth 2" in registry.render()
+    depth[0] = 5
+    assert "test_queue_depth 5" in registry.render()
+    print("\n✓ Collector test passed")
+
+def test_drained_values_merged(registry):
+    """Test that values drained from a worker's registry add up in the parent's"""
+    worker = MetricsRegistry("test")
+    for target in (registry, worker):
+        target.counter("chunks_total", "Chunks stored").inc(2)
+        target.histogram("stage_duration_seconds", "Stage time", ("stage",)).observe(0.2, stage="split_text")
+
+    registry.merge(worker.drain())
+
+    assert registry.counter("chunks_total", "Chunks stored").value() == 4
+    assert registry.histogram("stage_duration_seconds", "Stage time", ("stage",)).count(stage="split_text") == 2
+    assert worker.drain() == {}
+    print("\n✓ Merge test passed")
+
+def test_span_logs_trace_id(monkeypatch, capsys):
+    """Test that a span is timed into the stage histogram and, when enabled, logged with the trace id"""
+    monkeypatch.setattr(metrics, "METRICS_LOG_SPANS", True)
+    before = metrics.STAGE_SECONDS.count(stage="test_stage")
+    token = metrics.set_trace_id("abc123")
+    try:
+        with span("test_stage"):
+            pass
+    finally:
+        metrics.reset_trace_id(token)
+
+    assert metrics.STAGE_SECONDS.count(stage="test_stage") == before + 1
+    line = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert line["trace_id"] == "abc123" and line["stage"] == "test_stage"
+    print("\n✓ Span test passed")
+
+def test_trace_middleware_propagates_trace_id():
+    """Test that a valid trace id is kept, an invalid or missing one replaced, and the id is current in handlers"""
+    app = FastAPI()
+    app.add_middleware(TraceMiddleware)
+
+    @app.get("/trace")
+    async def trace():
+        return {"trace_id": current_trace_id()}
+
+    client = TestClient(app)
+    response = client.get("/trace", headers={TRACE_HEADER: "query-42"})
+    assert response.headers[TRACE_HEADER] == "query-42"
+    assert response.json()["trace_id"] == "query-42"
+
+    generated = client.get("/trace", headers={TRACE_HEADER: "bad id\n"})
+    assert generated.headers[TRACE_HEADER] != "bad id\n"
+    assert generated.json()["trace_id"] == generated.headers[TRACE_HEADER]
+    assert metrics.HTTP_REQUEST_SECONDS.count(method="GET", route="/trace", status="200") >= 2
+    print("\n✓ Trace middleware test passed")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,83 @@
+import pytest
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(str(Path(__file__).parent.parent))
+from model_registry import (
+    get_embeddings,
+    is_model_loaded,
+    warm_up,
+    clear_registry,
+    ModelRegistryException,
+)
+
+@pytest.fixture(autouse=True)
+def reset_model_registry():
+    """Fixture ensuring every test starts without a cached embeddings model"""
+    clear_registry()
+    yield
+    clear_registry()
+
+def test_get_embeddings_loads_once():
+    """Test that the model is instantiated only once per process"""
+    with patch('model_registry.HuggingFaceEmbeddings') as mock_embeddings:
+        first = get_embeddings()
+        second = get_embeddings()
+        
+        assert first is second
+        mock_embeddings.assert_called_once_with(model_name="intfloat/multilingual-e5-small")
+        print("\n✓ Single load test passed: model instantiated once")
+
+def test_get_embeddings_per_model_name():
+    """Test that different model names get their own instance"""
+    with patch('model_registry.HuggingFaceEmbeddings') as mock_embeddings:
+        get_embeddings("model-a")
+        get_embeddings("model-b")
+        
+        assert mock_embeddings.call_count == 2
+        assert is_model_loaded("model-a")
+        assert is_model_loaded("model-b")
+        print("\n✓ Per-model test passed: each model loaded separately")
+
+def test_get_embeddings_concurrent_access():
+    """Test that concurrent first calls still load the model only once"""
+    with patch('model_registry.HuggingFaceEmbeddings') as mock_embeddings:
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(get_embeddings())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(results) == 8
+        assert all(result is results[0] for result in results)
+        mock_embeddings.assert_called_once()
+        print("\n✓ Concurrency test passed: model loaded once across threads")
+
+def test_get_embeddings_load_error():
+    """Test handling of model loading errors"""
+    with patch('model_registry.HuggingFaceEmbeddings') as mock_embeddings:
+        mock_embeddings.side_effect = Exception("Download failed")
+        
+        with pytest.raises(ModelRegistryException) as exc_info:
+            get_embeddings()
+        
+        assert "Download failed" in str(exc_info.value)
+        assert not is_model_loaded()
+        print("\n✓ Load error test passed: failure not cached")
+
+def test_warm_up():
+    """Test that warm-up loads the model and runs an embedding"""
+    with patch('model_registry.HuggingFaceEmbeddings') as mock_embeddings:
+        assert not is_model_loaded()
+        
+        warm_up()
+        
+        assert is_model_loaded()
+        mock_embeddings.return_value.embed_query.assert_called_once()
+        print("\n✓ Warm-up test passed: model loaded and exercised")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"]) 
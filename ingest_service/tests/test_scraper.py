@@ -5,7 +5,19 @@ from unittest.mock import patch, Mock
 from requests.exceptions import RequestException
 
 sys.path.append(str(Path(__file__).parent.parent))
-from scraper import scrape_content, ScraperException
+from scraper import scrape_content, extract_content, ScraperException
+from benchmarks.legacy_scraper import legacy_extract_content
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+def available_parsers():
+    parsers = ["html.parser"]
+    try:
+        import lxml  # noqa: F401
+        parsers.append("lxml")
+    except ImportError:
+        pass
+    return parsers
 
 @pytest.fixture
 def mock_html():
@@ -114,5 +126,36 @@ def test_scrape_content_malformed_html():
         assert "No content found in the page" in str(exc_info.value)
         print("\n✓ Malformed HTML test passed: correctly handled malformed HTML")
 
+@pytest.mark.parametrize("parser", available_parsers())
+@pytest.mark.parametrize("fixture", ["blog_post.html", "blog_post_without_content_body.html"])
+def test_extract_content_matches_legacy_on_fixtures(fixture, parser):
+    """Test that the single-pass extraction produces the original output on saved pages"""
+    html = (FIXTURES_DIR / fixture).read_text(encoding="utf-8")
+    assert extract_content(html, parser=parser) == legacy_extract_content(html)
+    print(f"\n✓ Parity test passed: {fixture} extracted identically with {parser}")
+
+@pytest.mark.parametrize("parser", available_parsers())
+@pytest.mark.parametrize("html", [
+    # Nested list items and paragraphs inside list items are covered by the outer item
+    '<div class="content__body"><ul><li>Item<ul><li>Nested</li></ul><p>Inner</p></li></ul><p>After</p></div>',
+    # Headings are kept even inside list items
+    '<div class="content__body"><ol><li><h3>Heading in item</h3>Text</li></ol></div>',
+    # Content body itself inside a list item
+    '<ul><li><div class="content__body"><p>Skipped</p><li>Also skipped</li><h2>Kept</h2></div></li></ul>',
+    # Empty elements and whitespace
+    '<div class="content__body"><p> </p><h2></h2><li>\n</li><p>Only text</p></div>',
+])
+def test_extract_content_matches_legacy_on_edge_cases(html, parser):
+    """Test that skipping rules are unchanged with every parser"""
+    assert extract_content(html, parser=parser) == legacy_extract_content(html)
+    print(f"\n✓ Edge case parity test passed with {parser}")
+
+def test_malformed_nesting_matches_legacy_with_default_parser():
+    """Test that fallback ordering of invalid nesting is unchanged with html.parser (lxml repairs it differently)"""
+    # Paragraphs nested in paragraphs come after their parent
+    html = '<div><p>Outer <b>bold</b><p>Nested <li>item</li></p> tail</p><ul><li><p>In list</p></li></ul></div>'
+    assert extract_content(html, parser="html.parser") == legacy_extract_content(html)
+    print("\n✓ Malformed nesting parity test passed")
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"]) 
\ No newline at end of file
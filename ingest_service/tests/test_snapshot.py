@@ -0,0 +1,140 @@
+import json
+import sqlite3
+import numpy as np
+import os
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+import generation
+from snapshot import (
+    ANN_FILE,
+    CHUNKS_FILE,
+    CURRENT_FILE,
+    VECTORS_FILE,
+    SnapshotException,
+    current_snapshot,
+    publish_if_stale,
+    publish_snapshot,
+    write_snapshot,
+)
+
+class FakeVectorStore:
+    """Pages through fixed chunks like Chroma.get(limit, offset)"""
+
+    def __init__(self, count, dim=8):
+        rng = np.random.default_rng(0)
+        self.ids = [f"id-{i}" for i in range(count)]
+        self.embeddings = rng.standard_normal((count, dim)) * 3
+        self.documents = [f"Trecho {i}" for i in range(count)]
+        self.metadatas = [{"source": f"doc-{i % 3}"} for i in range(count)]
+        self.calls = 0
+
+    def get(self, include, limit, offset):
+        self.calls += 1
+        window = slice(offset, offset + limit)
+        return {
+            "ids": self.ids[window],
+            "embeddings": self.embeddings[window],
+            "documents": self.documents[window],
+            "metadatas": self.metadatas[window],
+        }
+
+def read_snapshot(root):
+    manifest = current_snapshot(str(root))
+    directory = Path(root, manifest["name"])
+    vectors = np.fromfile(directory / VECTORS_FILE, dtype=np.float32).reshape(manifest["chunks"], manifest["dim"])
+    return manifest, directory, vectors
+
+def test_publish_snapshot_pages_through_store(tmp_path):
+    """Test that every chunk is exported in order with normalized vectors"""
+    store = FakeVectorStore(25)
+    generation.GenerationMarker(generation.GENERATION_DB_PATH).bump()
+
+    info = publish_snapshot(store, root=str(tmp_path), page_size=10)
+
+    assert info.chunks == 25
+    assert info.generation == 1
+    assert store.calls == 3
+    manifest, directory, vectors = read_snapshot(tmp_path)
+    assert manifest["generation"] == 1
+    assert manifest["embedding_model"] == "intfloat/multilingual-e5-small"
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+    expected = store.embeddings / np.linalg.norm(store.embeddings, axis=1, keepdims=True)
+    assert np.allclose(vectors, expected, atol=1e-5)
+
+    connection = sqlite3.connect(directory / CHUNKS_FILE)
+    row = connection.execute("SELECT id, content, metadata FROM chunks WHERE row = 24").fetchone()
+    connection.close()
+    assert row == ("id-24", "Trecho 24", json.dumps({"source": "doc-0"}))
+    print("\n✓ Publish test passed: 25 chunks exported in 3 pages")
+
+def test_large_snapshot_gets_hnsw_index(tmp_path):
+    """Test that snapshots above the threshold ship an HNSW index over the same rows, smaller ones do not"""
+    hnswlib = pytest.importorskip("hnswlib")
+    store = FakeVectorStore(300, dim=16)
+    pages = lambda: [(store.ids, store.embeddings.tolist(), store.documents, store.metadatas)]
+
+    small = write_snapshot(str(tmp_path / "small"), pages(), generation=1, embedding_model="m", ann_min_chunks=301)
+    assert "ann" not in current_snapshot(str(tmp_path / "small"))
+    assert not (tmp_path / "small" / small.name / ANN_FILE).exists()
+
+    write_snapshot(str(tmp_path / "large"), pages(), generation=1, embedding_model="m", ann_min_chunks=300)
+    manifest, directory, vectors = read_snapshot(tmp_path / "large")
+    assert manifest["ann"]["file"] == ANN_FILE
+    index = hnswlib.Index(space="ip", dim=16)
+    index.load_index(str(directory / ANN_FILE))
+    labels, _ = index.knn_query(vectors[42], k=1)
+    assert labels[0][0] == 42
+    print("\n✓ HNSW test passed: index built only above the threshold")
+
+def test_republish_switches_pointer_and_prunes(tmp_path):
+    """Test that a new snapshot replaces the pointer and only `keep` snapshots stay on disk"""
+    names = []
+    for count in (3, 4, 5):
+        names.append(write_snapshot(str(tmp_path), [(
+            [f"id-{i}" for i in range(count)], np.eye(count, 4).tolist(), ["t"] * count, [{}] * count
+        )], generation=count, embedding_model="m", keep=2).name)
+
+    assert (tmp_path / CURRENT_FILE).read_text() == names[-1]
+    assert current_snapshot(str(tmp_path))["chunks"] == 5
+    assert sorted(entry for entry in os.listdir(tmp_path) if entry.startswith("snapshot-")) == names[1:]
+    assert not [entry for entry in os.listdir(tmp_path) if entry.startswith(".")]
+    print("\n✓ Republish test passed: pointer switched, old snapshot pruned")
+
+def test_failed_export_keeps_previous_snapshot(tmp_path):
+    """Test that an export failing midway publishes nothing and leaves no partial files"""
+    first = write_snapshot(str(tmp_path), [(["a"], [[1.0, 0.0]], ["t"], [{}])], generation=1, embedding_model="m")
+
+    def broken_pages():
+        yield ["b"], [[1.0, 0.0]], ["t"], [{}]
+        yield ["c"], [[1.0, 0.0, 0.0]], ["t"], [{}]
+
+    with pytest.raises(SnapshotException):
+        write_snapshot(str(tmp_path), broken_pages(), generation=2, embedding_model="m")
+
+    assert current_snapshot(str(tmp_path))["name"] == first.name
+    assert sorted(os.listdir(tmp_path)) == [CURRENT_FILE, first.name]
+    print("\n✓ Failure test passed: previous snapshot still published")
+
+def test_stale_snapshot_republished(tmp_path):
+    """Test that a snapshot is published only when a write left the published one behind"""
+    store = FakeVectorStore(4)
+    marker = generation.GenerationMarker(generation.GENERATION_DB_PATH)
+    assert publish_if_stale(store, root=str(tmp_path)) is None
+
+    marker.bump()
+    assert publish_if_stale(store, root=str(tmp_path)).generation == 1
+    assert publish_if_stale(store, root=str(tmp_path)) is None
+    marker.bump()
+    assert publish_if_stale(store, root=str(tmp_path)).generation == 2
+    print("\n✓ Stale snapshot test passed: published once per new generation")
+
+def test_no_snapshot_published(tmp_path):
+    """Test that a missing pointer reads as no snapshot"""
+    assert current_snapshot(str(tmp_path)) is None
+    print("\n✓ Missing snapshot test passed")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,58 @@
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from source_registry import SourceRegistry, diff_chunks
+
+@pytest.fixture
+def registry(tmp_path):
+    """Fixture providing a source registry in a temporary directory"""
+    return SourceRegistry(str(tmp_path / "sources.sqlite3"))
+
+def test_diff_chunks():
+    """Test classification of chunk ids into added, removed and unchanged"""
+    diff = diff_chunks({"a", "b", "c"}, ["b", "d", "a", "d"])
+    
+    assert diff.added == ["d"]
+    assert diff.removed == ["c"]
+    assert diff.unchanged == ["b", "a"]
+    print("\n✓ Diff test passed: chunks classified correctly")
+
+def test_diff_chunks_new_source():
+    """Test that every chunk is added for a source never seen before"""
+    diff = diff_chunks(set(), ["a", "b"])
+    
+    assert diff == (["a", "b"], [], [])
+    print("\n✓ New source test passed: all chunks added")
+
+def test_registry_unknown_source(registry):
+    """Test that an unknown source has no version and no chunks"""
+    assert registry.get_version("missing") is None
+    assert registry.get_chunk_ids("missing") == set()
+    print("\n✓ Unknown source test passed: empty state returned")
+
+def test_registry_replace(registry):
+    """Test that replace overwrites the version and chunk ids of a source"""
+    registry.replace("blog", "v1", ["a", "b"])
+    registry.replace("other", "v1", ["z"])
+    registry.replace("blog", "v2", ["b", "c", "c"])
+    
+    assert registry.get_version("blog") == "v2"
+    assert registry.get_chunk_ids("blog") == {"b", "c"}
+    assert registry.get_chunk_ids("other") == {"z"}
+    print("\n✓ Replace test passed: source state overwritten")
+
+def test_registry_add_chunks(registry):
+    """Test that add_chunks merges ids into a source and clears its version"""
+    registry.replace("blog", "v1", ["a", "b"])
+    registry.add_chunks("blog", ["b", "c"])
+    registry.add_chunks("upload", ["x", "x"])
+    
+    assert registry.get_version("blog") == ""
+    assert registry.get_chunk_ids("blog") == {"a", "b", "c"}
+    assert registry.get_chunk_ids("upload") == {"x"}
+    print("\n✓ Add chunks test passed: ids merged and version cleared")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"]) 
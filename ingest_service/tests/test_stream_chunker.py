@@ -0,0 +1,103 @@
+import pytest
+import sys
+import asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from stream_chunker import StreamChunker, store_byte_stream
+from text_processor import split_into_chunks
+from chunk_size_calculator import BASE_CHUNK_SIZE
+
+@pytest.fixture
+def long_text():
+    """Fixture providing a multi-paragraph text well above a single window"""
+    paragraph = "A Hotmart é uma plataforma de produtos digitais. " * 12
+    return "\n\n".join(f"{index}. {paragraph}" for index in range(200))
+
+def _chunk_pieces(pieces):
+    chunker = StreamChunker()
+    chunks = []
+    for piece in pieces:
+        chunks.extend(chunker.feed(piece))
+    return chunks + chunker.finish()
+
+def test_streamed_chunks_match_full_split(long_text):
+    """Test that streamed chunks match splitting the whole text at once"""
+    pieces = [long_text[i:i + 997] for i in range(0, len(long_text), 997)]
+    
+    streamed = _chunk_pieces(pieces)
+    
+    assert streamed == split_into_chunks(long_text)
+    print(f"\n✓ Parity test passed: {len(streamed)} chunks identical to full split")
+
+def test_streamed_chunks_respect_chunk_size(long_text):
+    """Test that no streamed chunk exceeds the base chunk size"""
+    pieces = [long_text[i:i + 13] for i in range(0, len(long_text), 13)]
+    
+    chunks = _chunk_pieces(pieces)
+    
+    assert chunks
+    assert max(len(chunk) for chunk in chunks) <= BASE_CHUNK_SIZE
+    print("\n✓ Chunk size test passed: all chunks within the base size")
+
+def test_short_text_uses_small_text_rules():
+    """Test that texts shorter than a window get the same chunks as a full split"""
+    text = "Small text example " * 50
+    
+    assert _chunk_pieces([text[:300], text[300:]]) == split_into_chunks(text)
+    print("\n✓ Short text test passed: small-text parameters applied")
+
+def test_buffer_is_bounded(long_text):
+    """Test that the chunker never holds much more than one window of text"""
+    chunker = StreamChunker()
+    peak = 0
+    for i in range(0, len(long_text), 500):
+        chunker.feed(long_text[i:i + 500])
+        peak = max(peak, len(chunker._buffer))
+    
+    assert peak < chunker.window_size + 500
+    print(f"\n✓ Memory test passed: buffer peaked at {peak} characters")
+
+def test_empty_stream():
+    """Test that an empty stream produces no chunks"""
+    assert _chunk_pieces([]) == []
+    assert _chunk_pieces(["   "]) == []
+    print("\n✓ Empty stream test passed: no chunks produced")
+
+def test_large_piece_buffered_one_window_at_a_time(long_text):
+    """Test that a piece much larger than a window is split a window at a time, with the same chunks"""
+    chunker = StreamChunker()
+    split_text = chunker._splitter.split_text
+    split_sizes = []
+    chunker._splitter.split_text = lambda text: split_sizes.append(len(text)) or split_text(text)
+    
+    chunks = chunker.feed(long_text) + chunker.finish()
+    
+    assert chunks == split_into_chunks(long_text)
+    assert max(split_sizes) < chunker.window_size + BASE_CHUNK_SIZE
+    print(f"\n✓ Large piece test passed: at most {max(split_sizes)} characters split at once")
+
+def test_store_byte_stream_batches(long_text):
+    """Test that an encoded stream is chunked and stored in fixed-size batches"""
+    batches = []
+    encoded = long_text.encode("utf-8")
+    
+    async def byte_stream():
+        # Piece boundaries fall inside multi-byte characters on purpose
+        for i in range(0, len(encoded), 1001):
+            yield encoded[i:i + 1001]
+    
+    async def store_batch(batch):
+        batches.append(batch)
+        return len(batch)
+    
+    stored, inserted = asyncio.run(store_byte_stream(byte_stream(), store_batch, batch_size=10))
+    
+    assert inserted == stored
+    assert stored == sum(len(batch) for batch in batches)
+    assert all(len(batch) == 10 for batch in batches[:-1])
+    assert [chunk for batch in batches for chunk in batch] == split_into_chunks(long_text)
+    print("\n✓ Byte stream test passed: chunks stored in batches")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"]) 
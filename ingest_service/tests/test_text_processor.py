@@ -4,7 +4,19 @@ from pathlib import Path
 from unittest.mock import patch, Mock
 
 sys.path.append(str(Path(__file__).parent.parent))
-from text_processor import process_and_store_text, TextProcessorException
+from text_processor import process_and_store_text, sync_source, TextProcessorException
+from model_registry import clear_registry
+from source_registry import SourceRegistry
+from vector_store import reset_vector_store
+
+@pytest.fixture(autouse=True)
+def reset_model_registry():
+    """Fixture ensuring every test starts without a cached embeddings model or vector store"""
+    clear_registry()
+    reset_vector_store()
+    yield
+    clear_registry()
+    reset_vector_store()
 
 @pytest.fixture
 def sample_text():
@@ -13,8 +25,8 @@ def sample_text():
 
 def test_process_and_store_text_success(sample_text):
     """Test successful text processing and storage"""
-    with patch('text_processor.Chroma.from_texts') as mock_chroma, \
-         patch('text_processor.HuggingFaceEmbeddings') as mock_embeddings, \
+    with patch('vector_store.Chroma') as mock_chroma, \
+         patch('model_registry.HuggingFaceEmbeddings') as mock_embeddings, \
          patch('text_processor.calculate_dynamic_chunk_params') as mock_calc:
         
         # Setup mocks
@@ -25,9 +37,9 @@ def test_process_and_store_text_success(sample_text):
         result = process_and_store_text(sample_text)
         
         # Assert
-        assert isinstance(result, int)
-        assert result > 0
-        mock_chroma.assert_called_once()
+        assert result.chunks > 0
+        assert result.inserted + result.skipped == result.chunks
+        mock_chroma.return_value.add_texts.assert_called()
         mock_embeddings.assert_called_once_with(model_name="intfloat/multilingual-e5-small")
         mock_calc.assert_called_once_with(sample_text)
         print("\n✓ Success test passed: text processed and stored correctly")
@@ -62,7 +74,7 @@ def test_chunk_calculation_error():
 def test_embedding_initialization_error():
     """Test handling of embedding model initialization errors"""
     with patch('text_processor.calculate_dynamic_chunk_params') as mock_calc, \
-         patch('text_processor.HuggingFaceEmbeddings') as mock_embeddings:
+         patch('model_registry.HuggingFaceEmbeddings') as mock_embeddings:
         
         mock_calc.return_value = (100, 20)
         mock_embeddings.side_effect = Exception("Embedding initialization failed")
@@ -76,12 +88,12 @@ def test_embedding_initialization_error():
 def test_storage_error():
     """Test handling of vector database storage errors"""
     with patch('text_processor.calculate_dynamic_chunk_params') as mock_calc, \
-         patch('text_processor.HuggingFaceEmbeddings') as mock_embeddings, \
-         patch('text_processor.Chroma.from_texts') as mock_chroma:
+         patch('model_registry.HuggingFaceEmbeddings') as mock_embeddings, \
+         patch('vector_store.Chroma') as mock_chroma:
         
         mock_calc.return_value = (100, 20)
         mock_embeddings.return_value = Mock()
-        mock_chroma.side_effect = Exception("Storage failed")
+        mock_chroma.return_value.add_texts.side_effect = Exception("Storage failed")
         
         with pytest.raises(TextProcessorException) as exc_info:
             process_and_store_text("Sample text")
@@ -89,5 +101,111 @@ def test_storage_error():
         assert "Error storing chunks" in str(exc_info.value)
         print("\n✓ Storage error test passed: correctly handled storage error")
 
+def test_process_and_store_text_batches_and_progress(sample_text):
+    """Test that chunks are stored in batches and progress is reported after each one"""
+    progress = []
+    with patch('vector_store.Chroma') as mock_chroma, \
+         patch('model_registry.HuggingFaceEmbeddings'), \
+         patch('text_processor.calculate_dynamic_chunk_params') as mock_calc, \
+         patch('text_processor.EMBEDDING_BATCH_SIZE', 5):
+        
+        mock_calc.return_value = (100, 20)
+        
+        result = process_and_store_text(sample_text, on_progress=lambda done, total: progress.append((done, total)))
+        
+        add_calls = mock_chroma.return_value.add_texts.call_args_list
+        assert all(len(call.kwargs["texts"]) <= 5 for call in add_calls)
+        assert sum(len(call.kwargs["texts"]) for call in add_calls) == result.inserted
+        assert progress[-1] == (result.chunks, result.chunks)
+        assert len(progress) == len(add_calls)
+        print("\n✓ Batching test passed: chunks stored in batches with progress reported")
+
+@pytest.fixture
+def tracked_store(tmp_path):
+    """Fixture providing a mocked vector store that tracks ids and a temporary source registry"""
+    stored_ids = set()
+    
+    def fake_add_texts(texts, metadatas, ids):
+        stored_ids.update(ids)
+    
+    def fake_delete(ids):
+        stored_ids.difference_update(ids)
+    
+    with patch('vector_store.Chroma') as mock_chroma, \
+         patch('model_registry.HuggingFaceEmbeddings'), \
+         patch('text_processor.get_source_registry', return_value=SourceRegistry(str(tmp_path / "sources.sqlite3"))):
+        mock_chroma.return_value.get.side_effect = lambda ids, include: {"ids": [id for id in ids if id in stored_ids]}
+        mock_chroma.return_value.add_texts.side_effect = fake_add_texts
+        mock_chroma.return_value.delete.side_effect = fake_delete
+        yield mock_chroma, stored_ids
+
+def _paragraphs(count, prefix="Parágrafo"):
+    return "\n\n".join(f"{prefix} {index}. " + "Conteúdo do blog da Hotmart. " * 30 for index in range(count))
+
+def test_sync_source_first_ingestion(tracked_store):
+    """Test that the first sync embeds every chunk"""
+    mock_chroma, stored_ids = tracked_store
+    
+    stats = sync_source(_paragraphs(10), "blog")
+    
+    assert stats.added == stats.chunks
+    assert stats.removed == 0
+    assert len(stored_ids) == stats.chunks
+    print("\n✓ First sync test passed: all chunks embedded")
+
+def test_sync_source_only_embeds_changes(tracked_store):
+    """Test that re-syncing an edited source embeds new chunks and deletes stale ones"""
+    mock_chroma, stored_ids = tracked_store
+    original = _paragraphs(10)
+    sync_source(original, "blog")
+    mock_chroma.return_value.add_texts.reset_mock()
+    
+    edited = original.replace("Parágrafo 3.", "Parágrafo três.") + "\n\nNovo parágrafo no final."
+    stats = sync_source(edited, "blog")
+    
+    embedded = [text for call in mock_chroma.return_value.add_texts.call_args_list for text in call.kwargs["texts"]]
+    assert stats.added == len(embedded)
+    assert 0 < stats.added < stats.chunks
+    assert stats.removed >= 1
+    assert stats.unchanged == stats.chunks - stats.added
+    assert len(stored_ids) == stats.chunks
+    print(f"\n✓ Incremental sync test passed: {stats.added} added, {stats.removed} removed, {stats.unchanged} unchanged")
+
+def test_sync_source_same_version_is_noop(tracked_store):
+    """Test that syncing an unchanged version does nothing"""
+    mock_chroma, stored_ids = tracked_store
+    text = _paragraphs(5)
+    sync_source(text, "blog")
+    mock_chroma.return_value.add_texts.reset_mock()
+    
+    stats = sync_source(text, "blog")
+    
+    assert stats.up_to_date
+    assert stats.added == 0
+    mock_chroma.return_value.add_texts.assert_not_called()
+    mock_chroma.return_value.delete.assert_not_called()
+    print("\n✓ Up-to-date test passed: nothing embedded")
+
+def test_sync_source_replaces_ingested_text(tracked_store):
+    """Test that syncing a source removes the chunks stored for it by a plain ingestion"""
+    mock_chroma, stored_ids = tracked_store
+    process_and_store_text(_paragraphs(5, prefix="Antigo"), source="blog")
+    old_ids = set(stored_ids)
+    
+    stats = sync_source(_paragraphs(5, prefix="Novo"), "blog")
+    
+    assert stats.removed == len(old_ids)
+    assert not old_ids & stored_ids
+    assert len(stored_ids) == stats.chunks
+    print("\n✓ Sync after ingestion test passed: old chunks deleted")
+
+def test_sync_source_invalid_input():
+    """Test handling of empty text on sync"""
+    with pytest.raises(TextProcessorException) as exc_info:
+        sync_source("", "blog")
+    
+    assert "Invalid input" in str(exc_info.value)
+    print("\n✓ Invalid sync input test passed: correctly handled empty input")
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"]) 
\ No newline at end of file
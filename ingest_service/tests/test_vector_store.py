@@ -0,0 +1,106 @@
+import pytest
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.append(str(Path(__file__).parent.parent))
+from embedding_backend import EmbeddingBackendException, embedding_model_id
+from vector_store import chunk_id, store_chunks, delete_chunks, get_vector_store, reset_vector_store
+import generation
+from model_registry import clear_registry
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    """Fixture ensuring every test starts without a cached model or vector store"""
+    clear_registry()
+    reset_vector_store()
+    yield
+    clear_registry()
+    reset_vector_store()
+
+@pytest.fixture
+def mock_chroma():
+    """Fixture for a mocked Chroma store that remembers stored ids"""
+    stored_ids = set()
+    with patch('vector_store.Chroma') as mock_chroma, \
+         patch('model_registry.HuggingFaceEmbeddings'):
+        mock_chroma.return_value.get.side_effect = lambda ids, include: {
+            "ids": [id for id in ids if id in stored_ids]
+        }
+        mock_chroma.return_value.add_texts.side_effect = lambda texts, metadatas, ids: stored_ids.update(ids)
+        yield mock_chroma
+
+def test_chunk_id_is_deterministic():
+    """Test that chunk ids depend only on source and content"""
+    assert chunk_id("blog", "texto") == chunk_id("blog", "texto")
+    assert chunk_id("blog", "texto") != chunk_id("outro", "texto")
+    assert chunk_id("blog", "texto") != chunk_id("blog", "texto 2")
+    print("\n✓ Chunk id test passed: ids are content and source hashes")
+
+def test_get_vector_store_opened_once(mock_chroma):
+    """Test that the Chroma handle is shared across calls"""
+    assert get_vector_store() is get_vector_store()
+    mock_chroma.assert_called_once()
+    print("\n✓ Vector store test passed: handle opened once")
+
+def test_store_chunks_skips_existing(mock_chroma):
+    """Test that chunks already stored are not embedded again"""
+    first = store_chunks(["a", "b"], ["src", "src"])
+    second = store_chunks(["a", "b", "c"], ["src", "src", "src"])
+    
+    assert first == [True, True]
+    assert second == [False, False, True]
+    last_call = mock_chroma.return_value.add_texts.call_args_list[-1]
+    assert last_call.kwargs["texts"] == ["c"]
+    assert last_call.kwargs["ids"] == [chunk_id("src", "c")]
+    assert last_call.kwargs["metadatas"] == [{"source": "src"}]
+    print("\n✓ Skip test passed: only new chunks stored")
+
+def test_store_chunks_deduplicates_within_batch(mock_chroma):
+    """Test that duplicates inside one batch are stored once"""
+    inserted = store_chunks(["a", "a"], ["src", "src"], [{"i": 0}, {"i": 1}])
+    
+    assert inserted == [True, False]
+    call = mock_chroma.return_value.add_texts.call_args
+    assert call.kwargs["texts"] == ["a"]
+    assert call.kwargs["metadatas"] == [{"i": 0, "source": "src"}]
+    print("\n✓ In-batch dedup test passed: repeated chunk stored once")
+
+def test_store_chunks_all_existing(mock_chroma):
+    """Test that nothing is embedded when every chunk is already stored"""
+    store_chunks(["a"], ["src"])
+    mock_chroma.return_value.add_texts.reset_mock()
+    
+    assert store_chunks(["a"], ["src"]) == [False]
+    mock_chroma.return_value.add_texts.assert_not_called()
+    print("\n✓ No-op test passed: embedding skipped entirely")
+
+def test_writes_bump_generation(mock_chroma):
+    """Test that the shared generation advances on inserts and deletes, but not on no-op batches"""
+    marker = generation.GenerationMarker(generation.GENERATION_DB_PATH)
+
+    store_chunks(["a"], ["src"])
+    assert marker.read() == 1
+    store_chunks(["a"], ["src"])
+    assert marker.read() == 1
+    delete_chunks([chunk_id("src", "a")])
+    assert marker.read() == 2
+    delete_chunks([])
+    assert marker.read() == 2
+    print("\n✓ Generation test passed: only real writes bump the marker")
+
+def test_store_written_by_another_backend_rejected(mock_chroma):
+    """Test that vectors of a different embedding backend are never mixed into the store"""
+    store_chunks(["a"], ["src"])
+    marker = generation.GenerationMarker(generation.GENERATION_DB_PATH)
+    assert marker.embedding_model() == embedding_model_id()
+
+    marker.bump("intfloat/multilingual-e5-small@onnx-int8:avx2")
+    reset_vector_store()
+    with pytest.raises(EmbeddingBackendException) as exc_info:
+        store_chunks(["b"], ["src"])
+    assert "EMBEDDING_BACKEND" in str(exc_info.value)
+    print("\n✓ Backend mismatch test passed: write refused")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"]) 
@@ -1,23 +1,105 @@
+import hashlib
+from typing import Callable, NamedTuple, Optional
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
 
 from chunk_size_calculator import calculate_dynamic_chunk_params
-from constants import CHROMA_DB_PERSIST_DIRECTORY
+from constants import EMBEDDING_BATCH_SIZE
+from metrics import span
+from model_registry import get_embeddings
+from vector_store import store_chunks, delete_chunks, chunk_id
+from source_registry import get_source_registry, diff_chunks
+
+DEFAULT_TEXT_SOURCE = "ingest_text"
 
 class TextProcessorException(Exception):
     """Custom exception for text processing errors"""
     pass
 
-def process_and_store_text(text: str) -> int:
+class IngestStats(NamedTuple):
+    """Outcome of an ingestion: chunks created, and how many were new or already stored"""
+    chunks: int
+    inserted: int
+    skipped: int
+
+class SyncStats(NamedTuple):
+    """Outcome of re-ingesting a source against its previously stored version"""
+    version: str
+    chunks: int
+    added: int
+    removed: int
+    unchanged: int
+    up_to_date: bool
+
+def split_into_chunks(text: str) -> list[str]:
+    """
+    Split the text into chunks using the dynamic chunk parameters.
+    
+    Args:
+        text (str): The text to split.
+    
+    Returns:
+        list[str]: The chunks, possibly empty.
+        
+    Raises:
+        TextProcessorException: If chunk parameters cannot be computed or splitting fails
+    """
+    # Calculate chunk parameters
+    try:
+        with span("chunk_params"):
+            chunk_size, chunk_overlap = calculate_dynamic_chunk_params(text)
+    except Exception as e:
+        raise TextProcessorException(f"Error calculating chunk parameters: {str(e)}")
+
+    # Split text into chunks
+    try:
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len
+        )
+        with span("split_text"):
+            return text_splitter.split_text(text)
+    except Exception as e:
+        raise TextProcessorException(f"Error splitting text into chunks: {str(e)}")
+
+def store_source_chunks(texts: list[str], sources: list[str], metadatas: Optional[list[dict]] = None) -> list[bool]:
+    """
+    Store one batch of chunks like vector_store.store_chunks, and record them in
+    the source registry so a later sync_source of their source replaces them.
+    
+    Returns:
+        list[bool]: For each chunk, whether it was newly inserted.
+    """
+    inserted = store_chunks(texts, sources, metadatas)
+    ids_by_source: dict[str, list[str]] = {}
+    for text, source in zip(texts, sources):
+        ids_by_source.setdefault(source, []).append(chunk_id(source, text))
+    registry = get_source_registry()
+    for source, ids in ids_by_source.items():
+        registry.add_chunks(source, ids)
+    return inserted
+
+def process_and_store_text(
+    text: str,
+    source: str = DEFAULT_TEXT_SOURCE,
+    on_progress: Optional[Callable[[int, int], None]] = None
+) -> IngestStats:
     """
     Process the text into chunks and store in a vector database.
     
+    Chunks already stored for the same source are skipped before embedding,
+    so re-ingesting the same text is cheap and does not duplicate vectors.
+    Stored chunks are recorded in the source registry, so a later
+    sync_source of the same source replaces them.
+    
     Args:
         text (str): The text to process.
+        source (str): Where the text comes from (URL, document id...).
+        on_progress (Callable, optional): Called after each stored batch with
+            (chunks processed so far, total chunks).
     
     Returns:
-        int: Number of chunks created.
+        IngestStats: Number of chunks created, inserted and skipped.
         
     Raises:
         TextProcessorException: If there's an error during text processing or storage
@@ -26,45 +108,107 @@ def process_and_store_text(text: str) -> int:
         if not text or not isinstance(text, str):
             raise TextProcessorException("Invalid input: text must be a non-empty string")
 
-        # Calculate chunk parameters
+        chunks = split_into_chunks(text)
+        if not chunks:
+            raise TextProcessorException("No chunks were created from the input text")
+
+        # Load embeddings model
         try:
-            chunk_size, chunk_overlap = calculate_dynamic_chunk_params(text)
+            get_embeddings()
         except Exception as e:
-            raise TextProcessorException(f"Error calculating chunk parameters: {str(e)}")
+            raise TextProcessorException(f"Error initializing embeddings model: {str(e)}")
 
-        # Split text into chunks
+        # Store in vector database, one batch at a time so progress can be reported
+        inserted = 0
         try:
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=chunk_size,
-                chunk_overlap=chunk_overlap,
-                length_function=len
-            )
-            chunks = text_splitter.split_text(text)
+            for start in range(0, len(chunks), EMBEDDING_BATCH_SIZE):
+                batch = chunks[start:start + EMBEDDING_BATCH_SIZE]
+                inserted += sum(store_source_chunks(batch, [source] * len(batch)))
+                if on_progress:
+                    on_progress(start + len(batch), len(chunks))
         except Exception as e:
-            raise TextProcessorException(f"Error splitting text into chunks: {str(e)}")
+            raise TextProcessorException(f"Error storing chunks in vector database: {str(e)}")
+
+        return IngestStats(chunks=len(chunks), inserted=inserted, skipped=len(chunks) - inserted)
+
+    except TextProcessorException:
+        raise
+    except Exception as e:
+        raise TextProcessorException(f"Unexpected error during text processing: {str(e)}")
+
+def sync_source(
+    text: str,
+    source: str,
+    version: Optional[str] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None
+) -> SyncStats:
+    """
+    Re-ingest a source incrementally, touching only the chunks that changed.
+    
+    The chunk ids stored for the source are compared with the ids of the new
+    text: only added chunks are embedded, vectors of removed chunks are deleted
+    and unchanged chunks are left alone. If the version matches the last one
+    ingested, nothing is split or embedded at all.
+    
+    Args:
+        text (str): The current content of the source.
+        source (str): Source identifier (URL, document id...).
+        version (str, optional): Version marker (ETag, revision...). Defaults to a hash of the text.
+        on_progress (Callable, optional): Called after each stored batch with
+            (added chunks processed so far, total added chunks).
+    
+    Returns:
+        SyncStats: Version ingested and number of chunks added, removed and unchanged.
+        
+    Raises:
+        TextProcessorException: If there's an error during text processing or storage
+    """
+    try:
+        if not text or not isinstance(text, str):
+            raise TextProcessorException("Invalid input: text must be a non-empty string")
 
+        registry = get_source_registry()
+        version = version or hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if registry.get_version(source) == version:
+            unchanged = len(registry.get_chunk_ids(source))
+            return SyncStats(version=version, chunks=unchanged, added=0, removed=0, unchanged=unchanged, up_to_date=True)
+
+        chunks = split_into_chunks(text)
         if not chunks:
             raise TextProcessorException("No chunks were created from the input text")
 
-        # Generate embeddings
+        ids = [chunk_id(source, chunk) for chunk in chunks]
+        diff = diff_chunks(registry.get_chunk_ids(source), ids)
+        text_by_id = dict(zip(ids, chunks))
+        added_texts = [text_by_id[id] for id in diff.added]
+
+        # Load embeddings model
         try:
-            embeddings = HuggingFaceEmbeddings(model_name="intfloat/multilingual-e5-small")
+            get_embeddings()
         except Exception as e:
             raise TextProcessorException(f"Error initializing embeddings model: {str(e)}")
 
-        # Store in vector database
         try:
-            Chroma.from_texts(
-                texts=chunks,
-                embedding=embeddings,
-                persist_directory=CHROMA_DB_PERSIST_DIRECTORY
-            )
+            for start in range(0, len(added_texts), EMBEDDING_BATCH_SIZE):
+                batch = added_texts[start:start + EMBEDDING_BATCH_SIZE]
+                store_chunks(batch, [source] * len(batch))
+                if on_progress:
+                    on_progress(start + len(batch), len(added_texts))
+            delete_chunks(diff.removed)
         except Exception as e:
             raise TextProcessorException(f"Error storing chunks in vector database: {str(e)}")
 
-        return len(chunks)
+        registry.replace(source, version, ids)
+        return SyncStats(
+            version=version,
+            chunks=len(chunks),
+            added=len(diff.added),
+            removed=len(diff.removed),
+            unchanged=len(diff.unchanged),
+            up_to_date=False
+        )
 
     except TextProcessorException:
         raise
     except Exception as e:
-        raise TextProcessorException(f"Unexpected error during text processing: {str(e)}")
+        raise TextProcessorException(f"Unexpected error during text processing: {str(e)}")
\ No newline at end of file
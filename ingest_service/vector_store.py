@@ -0,0 +1,134 @@
+import hashlib
+import threading
+from typing import Optional
+
+from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+
+from chroma_client import get_chroma_client, max_batch_size
+from constants import CHROMA_COLLECTION_NAME
+from embedding_backend import EmbeddingBackendException, embedding_model_id
+from embedding_cache import CachedEmbeddings, get_embedding_cache
+from generation import bump_generation, stored_embedding_model
+from metrics import REGISTRY, span
+from model_registry import get_embeddings
+
+CHUNKS_STORED = REGISTRY.counter(
+    "chunks_total", "Chunks offered to the vector store: inserted, or skipped because already stored", ("outcome",)
+)
+
+class TimedEmbeddings(Embeddings):
+    """Embeddings wrapper timing each model call as the "embed" stage (cache hits never reach it)"""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        with span("embed"):
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        with span("embed"):
+            return self.embeddings.embed_query(text)
+
+_vector_store: Optional[Chroma] = None
+_lock = threading.Lock()
+
+def get_vector_store() -> Chroma:
+    """
+    Return the process-wide Chroma handle, opening it on first use.
+    
+    Returns:
+        Chroma: Vector store bound to the shared embeddings model, wrapped in
+        the on-disk embedding cache when it is enabled, on the configured
+        backend (embedded files or the remote Chroma server).
+        
+    Raises:
+        EmbeddingBackendException: If the store holds vectors of another model or backend
+        ChromaClientException: If the remote Chroma server cannot be reached
+    """
+    global _vector_store
+    if _vector_store is None:
+        with _lock:
+            if _vector_store is None:
+                model_id = embedding_model_id()
+                stored = stored_embedding_model()
+                if stored is not None and stored != model_id:
+                    raise EmbeddingBackendException(
+                        f"Vector store was written with '{stored}' but this service embeds with '{model_id}'; "
+                        "set EMBEDDING_BACKEND to match or re-ingest into an empty store"
+                    )
+                embeddings = TimedEmbeddings(get_embeddings())
+                cache = get_embedding_cache(model_id)
+                if cache is not None:
+                    embeddings = CachedEmbeddings(embeddings, cache)
+                _vector_store = Chroma(
+                    client=get_chroma_client(),
+                    collection_name=CHROMA_COLLECTION_NAME,
+                    embedding_function=embeddings
+                )
+    return _vector_store
+
+def reset_vector_store() -> None:
+    """Drop the cached handle so the next call reopens the store (mainly useful for tests)"""
+    global _vector_store
+    with _lock:
+        _vector_store = None
+
+
+def chunk_id(source: str, text: str) -> str:
+    """Deterministic chunk id derived from its source and content"""
+    return hashlib.sha256(f"{source}\x00{text}".encode("utf-8")).hexdigest()
+
+def store_chunks(texts: list[str], sources: list[str], metadatas: Optional[list[dict]] = None) -> list[bool]:
+    """
+    Embed and store one batch of chunks in a single vector store call, skipping
+    chunks that are already stored (same source and content). The shared
+    generation marker is bumped when anything was inserted.
+    
+    Args:
+        texts (list[str]): Chunk contents.
+        sources (list[str]): Source of each chunk (URL, document id...).
+        metadatas (list[dict], optional): Extra metadata of each chunk.
+    
+    Returns:
+        list[bool]: For each chunk, True if it was inserted, False if it was skipped.
+    """
+    ids = [chunk_id(source, text) for source, text in zip(sources, texts)]
+    if not ids:
+        return []
+
+    vector_store = get_vector_store()
+    with span("dedup_lookup"):
+        seen = set(vector_store.get(ids=list(set(ids)), include=[])["ids"])
+
+    inserted = []
+    new_texts, new_ids, new_metadatas = [], [], []
+    for index, (id, text) in enumerate(zip(ids, texts)):
+        if id in seen:
+            inserted.append(False)
+            continue
+        seen.add(id)
+        inserted.append(True)
+        new_texts.append(text)
+        new_ids.append(id)
+        new_metadatas.append({**(metadatas[index] if metadatas else {}), "source": sources[index]})
+
+    # Only new chunks reach the embeddings model, in calls no larger than the store accepts
+    if new_texts:
+        batch_size = max_batch_size(get_chroma_client())
+        # Includes the "embed" stage of the chunks not found in the embedding cache
+        with span("vector_store_add"):
+            for start in range(0, len(new_texts), batch_size):
+                window = slice(start, start + batch_size)
+                vector_store.add_texts(texts=new_texts[window], metadatas=new_metadatas[window], ids=new_ids[window])
+        bump_generation()
+    CHUNKS_STORED.inc(len(new_texts), outcome="inserted")
+    CHUNKS_STORED.inc(len(ids) - len(new_texts), outcome="skipped")
+    return inserted
+
+def delete_chunks(ids: list[str]) -> None:
+    """Remove chunks from the vector store by id, bumping the shared generation marker"""
+    if ids:
+        get_vector_store().delete(ids=ids)
+        bump_generation()
\ No newline at end of file
@@ -0,0 +1,165 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+class OverloadedException(Exception):
+    """Raised when an LLM call is rejected to keep latency bounded"""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class AdmissionTicket:
+    """A held LLM slot; release() is idempotent"""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(time.monotonic() - self._acquired_at)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+class AdmissionController:
+    """
+    Admission control in front of the LLM.
+
+    At most `max_concurrent` calls run at once and at most `max_waiting` wait
+    for a slot, in FIFO order. A request arriving when the wait queue is full
+    is rejected immediately (429), and one that waited `queue_timeout` seconds
+    without getting a slot gives up (503). Both carry a Retry-After estimated
+    from the recent time a slot is held.
+
+    Waiting happens on the event loop, so queued requests do not hold worker
+    threads. Not thread-safe: use it from the event loop only.
+    """
+
+    def __init__(self, max_concurrent: int, max_waiting: int, queue_timeout: float, default_retry_after: float = 5.0):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.hold_seconds = default_retry_after
+        self._waiters: "deque[asyncio.Future]" = deque()
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up for a new request"""
+        turns = (len(self._waiters) + 1) / self.max_concurrent
+        return max(1, math.ceil(self.hold_seconds * turns))
+
+    async def acquire(self) -> AdmissionTicket:
+        """
+        Wait for an LLM slot.
+
+        Returns:
+            AdmissionTicket: Use as `async with` or call release() when the LLM call ends.
+
+        Raises:
+            OverloadedException: If the wait queue is full or the wait timed out
+        """
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return AdmissionTicket(self)
+
+        if len(self._waiters) >= self.max_waiting:
+            self.rejected += 1
+            raise OverloadedException("Too many questions waiting for the LLM", 429, self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait([waiter], timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        if not waiter.done():
+            self._abandon(waiter)
+            self.timed_out += 1
+            raise OverloadedException("Timed out waiting for the LLM", 503, self.retry_after())
+        # The slot was handed over by the releasing request, `active` already counts it
+        self.admitted += 1
+        return AdmissionTicket(self)
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            # Got a slot just as the wait was given up: pass it on
+            self._release(None)
+        else:
+            self._waiters.remove(waiter)
+            waiter.cancel()
+
+    def _release(self, held_seconds: Optional[float]) -> None:
+        if held_seconds is not None:
+            self.hold_seconds = 0.8 * self.hold_seconds + 0.2 * held_seconds
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_waiting": self.max_waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_hold_seconds": self.hold_seconds,
+        }
+
+class SingleFlight:
+    """
+    Merges concurrent calls with the same key: the first caller runs the call
+    and every caller arriving before it finishes awaits the same result.
+
+    The call runs in its own task, so a caller going away does not cancel it
+    for the others.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self.merged = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run func() once for all concurrent callers with the same key.
+
+        Returns:
+            Any: The result of the shared call (its exception is raised to every caller).
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.merged += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
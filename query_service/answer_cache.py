@@ -0,0 +1,75 @@
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_question(question: str) -> str:
+    """
+    Canonical form of a question for exact matching: Unicode-normalized,
+    case-folded, whitespace collapsed and trailing punctuation dropped.
+    """
+    text = unicodedata.normalize("NFKC", question).casefold()
+    text = _WHITESPACE.sub(" ", text).strip()
+    return text.rstrip(" ?!.")
+
+class AnswerCache:
+    """
+    Exact-match answer cache keyed by the normalized question and the settings
+    the answer was produced with (retrieval parameters, model), so changing
+    either never serves an answer computed under other conditions. The least
+    recently used entries are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(question: str, settings: Hashable) -> tuple:
+        return (normalize_question(question), settings)
+
+    def get(self, question: str, settings: Hashable) -> Optional[str]:
+        """Cached answer for the question under these settings, if any"""
+        key = self._key(question, settings)
+        with self._lock:
+            answer = self._entries.get(key)
+            if answer is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return answer
+
+    def put(self, question: str, settings: Hashable, answer: str) -> None:
+        key = self._key(question, settings)
+        with self._lock:
+            self._entries[key] = answer
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry, keeping the statistics"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit-rate statistics since startup, plus current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "capacity": self.max_entries,
+                "evictions": self.evictions,
+            }
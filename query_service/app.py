@@ -1,7 +1,39 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
+from typing import Optional
+from contextlib import aclosing
+from functools import partial
+import asyncio
+import json
+import threading
 
-from rag_chain import QueryRequest, QueryResponse, RAGException, HotmartRAGSystem
+from langchain_core.documents import Document
+
+from rag_chain import (
+    CacheLookup,
+    HotmartRAGSystem,
+    QueryBatchItem,
+    QueryBatchRequest,
+    QueryBatchResponse,
+    QueryRequest,
+    QueryResponse,
+    RAGException,
+    RetrieveRequest,
+    RetrieveResponse,
+    RetrievedChunk,
+)
+from model_router import ModelTimeoutException
+from admission import AdmissionController, OverloadedException, SingleFlight
+from executor import run_blocking, shutdown_executor
+from metrics import CONTENT_TYPE, REGISTRY, Sample, TraceMiddleware
+from constants import (
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_QUEUE,
+    LLM_QUEUE_TIMEOUT_SECONDS,
+    OLLAMA_KEEP_ALIVE_PING_SECONDS,
+)
 
 app = FastAPI(
     title="Hotmart RAG Query Service",
@@ -15,10 +47,220 @@ app = FastAPI(
         "email": "layrfpf@gmail.com",
     },
 )
+# Trace id per request (X-Trace-Id) and request latency metrics
+app.add_middleware(TraceMiddleware)
 
 class HealthResponse(BaseModel):
     status: str = Field(..., description="Health status")
 
+class ReadinessResponse(BaseModel):
+    ready: bool = Field(..., description="Whether the RAG system is built and warmed up")
+
+class AnswerCacheStatsResponse(BaseModel):
+    enabled: bool = Field(..., description="Whether answers are cached by exact (normalized) question")
+    generation: int = Field(0, description="Vector store generation the cached answers belong to")
+    invalidations: int = Field(0, description="Times the caches were dropped because new content was ingested")
+    hits: int = Field(0, description="Questions answered from the cache since startup")
+    misses: int = Field(0, description="Questions not found in the cache")
+    hit_rate: float = Field(0.0, description="hits / (hits + misses)")
+    entries: int = Field(0, description="Answers currently cached")
+    capacity: int = Field(0, description="Maximum number of cached answers")
+    evictions: int = Field(0, description="Entries evicted to stay within the limit")
+
+class EmbeddingBatcherStatsResponse(BaseModel):
+    enabled: bool = Field(..., description="Whether query embeddings are micro-batched across requests")
+    max_batch_size: int = Field(0, description="Maximum questions per forward pass")
+    max_wait_ms: float = Field(0.0, description="How long the first question of a batch waits for others")
+    batches: int = Field(0, description="Forward passes run since startup")
+    embedded: int = Field(0, description="Questions embedded since startup")
+    avg_batch_size: float = Field(0.0, description="embedded / batches")
+    largest_batch: int = Field(0, description="Largest batch embedded so far")
+
+class SemanticCacheStatsResponse(BaseModel):
+    enabled: bool = Field(..., description="Whether answers are cached by question similarity")
+    hits: int = Field(0, description="Questions answered from the cache since startup")
+    misses: int = Field(0, description="Questions that went through retrieval and generation")
+    hit_rate: float = Field(0.0, description="hits / (hits + misses)")
+    entries: int = Field(0, description="Answers currently cached")
+    capacity: int = Field(0, description="Maximum number of cached answers")
+    bytes_used: int = Field(0, description="Memory used by cached vectors, questions and answers")
+    max_bytes: int = Field(0, description="Memory budget of the cache")
+    evictions: int = Field(0, description="Entries evicted to stay within the limits")
+    expirations: int = Field(0, description="Entries dropped after their TTL")
+
+class ContextStatsResponse(BaseModel):
+    enabled: bool = Field(..., description="Whether retrieved chunks are merged, deduplicated and budgeted before the prompt")
+    max_tokens: int = Field(0, description="Token budget of the prompt context")
+    queries: int = Field(0, description="Contexts compressed since startup")
+    tokens_before: int = Field(0, description="Estimated context tokens of the retrieved chunks")
+    tokens_after: int = Field(0, description="Estimated context tokens sent to the LLM")
+    tokens_saved: int = Field(0, description="tokens_before - tokens_after")
+    avg_tokens_saved: float = Field(0.0, description="Prompt tokens saved per query")
+    saved_ratio: float = Field(0.0, description="tokens_saved / tokens_before")
+    merged: int = Field(0, description="Overlapping chunks merged into a neighbour")
+    duplicates: int = Field(0, description="Near-duplicate passages dropped")
+    truncated: int = Field(0, description="Contexts cut to fit the budget")
+
+class SnapshotStatsResponse(BaseModel):
+    enabled: bool = Field(..., description="Whether searches may use the snapshot published by the ingest service")
+    loaded: Optional[str] = Field(None, description="Snapshot currently mapped in memory")
+    generation: Optional[int] = Field(None, description="Vector store generation the loaded snapshot holds")
+    chunks: Optional[int] = Field(None, description="Chunks in the loaded snapshot")
+    in_use: bool = Field(False, description="Whether the loaded snapshot is up to date and serves searches now")
+    swaps: int = Field(0, description="Snapshots switched to since startup")
+    load_errors: int = Field(0, description="Published snapshots that could not be opened")
+    snapshot_searches: int = Field(0, description="Searches served by the snapshot")
+    chroma_searches: int = Field(0, description="Searches served by Chroma")
+
+class AdmissionStatsResponse(BaseModel):
+    active: int = Field(..., description="LLM generations running now")
+    waiting: int = Field(..., description="Requests waiting for an LLM slot")
+    max_concurrent: int = Field(..., description="Maximum concurrent LLM generations")
+    max_waiting: int = Field(..., description="Maximum requests waiting before new ones are rejected")
+    admitted: int = Field(..., description="Requests that got an LLM slot since startup")
+    rejected: int = Field(..., description="Requests rejected with 429 because the wait queue was full")
+    timed_out: int = Field(..., description="Requests rejected with 503 after waiting too long")
+    merged: int = Field(..., description="Requests that shared the generation of an identical in-flight question")
+    in_flight: int = Field(..., description="Distinct questions being generated now")
+    avg_hold_seconds: float = Field(..., description="Moving average of the time an LLM slot is held")
+
+class ModelStats(BaseModel):
+    name: str = Field(..., description="Ollama model")
+    role: str = Field(..., description="primary or fallback")
+    latency_seconds: float = Field(..., description="Moving average of the generation latency")
+    in_flight: int = Field(..., description="Generations running now")
+    calls: int = Field(..., description="Generations since startup")
+    failures: int = Field(..., description="Generations that failed")
+    tokens: int = Field(0, description="Chunks streamed by the model since startup (about one token each)")
+
+class ModelRouterStatsResponse(BaseModel):
+    enabled: bool = Field(..., description="Whether the RAG system (and its router) is built")
+    deadline_seconds: Optional[float] = Field(None, description="Latency the primary model is expected to meet")
+    hedge_after_seconds: Optional[float] = Field(None, description="Delay before racing the fallback model (null when disabled)")
+    fallbacks: int = Field(0, description="Requests routed to the fallback model")
+    hedges: int = Field(0, description="Requests raced against the fallback model")
+    hedges_skipped: int = Field(0, description="Hedges not started because every generation thread was busy")
+    timeouts: int = Field(0, description="Requests no model answered in time")
+    models: list[ModelStats] = Field(default_factory=list)
+
+class ResidentModel(BaseModel):
+    name: str = Field(..., description="Ollama model")
+    resident: bool = Field(..., description="Whether the last warm-up or ping left the model loaded")
+    load_seconds: float = Field(..., description="Time Ollama took the last time it had to load the model")
+    last_ping: Optional[float] = Field(None, description="Unix time of the last successful ping")
+
+class ModelResidencyResponse(BaseModel):
+    enabled: bool = Field(..., description="Whether the RAG system (and its model keeper) is built")
+    keep_alive: Optional[str] = Field(None, description="How long Ollama keeps a model loaded after a request")
+    num_ctx: Optional[int] = Field(None, description="Context window every request asks for")
+    ping_interval_seconds: Optional[float] = Field(None, description="Time between keep-alive pings (null when disabled)")
+    pings: int = Field(0, description="Warm-up and keep-alive loads sent to Ollama since startup")
+    failures: int = Field(0, description="Loads that failed")
+    reloads: int = Field(0, description="Times a ping found a model unloaded and loaded it again")
+    models: list[ResidentModel] = Field(default_factory=list)
+
+# Bounds the load on the single Ollama instance; identical questions in flight share one generation
+llm_admission = AdmissionController(LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT_SECONDS)
+single_flight = SingleFlight()
+
+_rag_system: Optional[HotmartRAGSystem] = None
+_rag_system_lock = threading.Lock()
+_keep_alive_task: Optional[asyncio.Task] = None
+
+def get_rag_system() -> HotmartRAGSystem:
+    """
+    Return the long-lived RAG system, building and warming it up on first use.
+    
+    Raises:
+        RAGException: If the RAG system cannot be initialized
+    """
+    global _rag_system
+    if _rag_system is None:
+        with _rag_system_lock:
+            if _rag_system is None:
+                rag_system = HotmartRAGSystem()
+                rag_system.warm_up()
+                _rag_system = rag_system
+    return _rag_system
+
+def reset_rag_system() -> None:
+    """Drop the current RAG system so the next request builds a new one"""
+    global _rag_system
+    with _rag_system_lock:
+        _rag_system = None
+
+def collect_metrics() -> list[Sample]:
+    """Figures the components already keep (admission queue, caches, models), read when /metrics is scraped"""
+    admission = llm_admission.stats()
+    samples = [
+        Sample("llm_active_generations", "gauge", "LLM generations running now", {}, admission["active"]),
+        Sample("llm_queue_depth", "gauge", "Requests waiting for an LLM slot", {}, admission["waiting"]),
+        Sample("llm_rejected_total", "counter", "Requests rejected because the wait queue was full", {}, admission["rejected"]),
+        Sample("llm_queue_timeouts_total", "counter", "Requests that waited too long for an LLM slot", {}, admission["timed_out"]),
+        Sample("single_flight_merged_total", "counter", "Requests that shared an identical in-flight generation", {}, single_flight.merged),
+    ]
+    rag_system = _rag_system
+    if rag_system is None:
+        return samples
+    caches = [("answer", rag_system.answer_cache), ("semantic", rag_system.semantic_cache)]
+    for name, cache in caches:
+        if cache is not None:
+            stats = cache.stats()
+            samples.append(Sample("cache_hits_total", "counter", "Questions answered from a cache", {"cache": name}, stats["hits"]))
+            samples.append(Sample("cache_misses_total", "counter", "Questions not found in a cache", {"cache": name}, stats["misses"]))
+    if rag_system.embedding_batcher is not None:
+        stats = rag_system.embedding_batcher.stats()
+        samples.append(Sample("embedding_batches_total", "counter", "Forward passes embedding questions", {}, stats["batches"]))
+        samples.append(Sample("embedded_questions_total", "counter", "Questions embedded", {}, stats["embedded"]))
+    if rag_system.context_compressor is not None:
+        stats = rag_system.context_compressor.stats()
+        samples.append(Sample("context_tokens_saved_total", "counter", "Estimated prompt tokens saved by context compression", {}, stats["tokens_saved"]))
+    for store, count in (("snapshot", rag_system.snapshot_searches), ("chroma", rag_system.chroma_searches)):
+        samples.append(Sample("vector_searches_total", "counter", "Vector searches by the store that served them", {"store": store}, count))
+    for model in rag_system.router.stats()["models"]:
+        labels = {"model": model["name"], "role": model["role"]}
+        samples.append(Sample("llm_generations_total", "counter", "Generations per model", labels, model["calls"]))
+        samples.append(Sample("llm_generation_failures_total", "counter", "Failed generations per model", labels, model["failures"]))
+        samples.append(Sample("llm_generated_tokens_total", "counter", "Chunks streamed per model (about one token each)", labels, model["tokens"]))
+        samples.append(Sample("llm_latency_seconds", "gauge", "Moving average of the generation latency", labels, model["latency_seconds"]))
+    for model in rag_system.model_keeper.stats()["models"]:
+        samples.append(Sample("llm_resident", "gauge", "Whether the model was loaded in Ollama at the last ping", {"model": model["name"]}, int(model["resident"])))
+    return samples
+
+REGISTRY.register_collector(collect_metrics)
+
+async def keep_models_loaded(interval: float) -> None:
+    """Ping the LLMs every `interval` seconds so Ollama does not unload them while the service is idle"""
+    while True:
+        await asyncio.sleep(interval)
+        if _rag_system is None:
+            continue
+        try:
+            await run_blocking(_rag_system.model_keeper.ping)
+        except Exception as e:
+            print(f"Warning: keep-alive ping failed: {str(e)}")
+
+@app.on_event("startup")
+async def startup_event():
+    """Build and warm up the RAG system once, before serving queries, and start the keep-alive pings"""
+    global _keep_alive_task
+    try:
+        await run_blocking(get_rag_system)
+    except Exception as e:
+        # Not fatal: the system will be built on the first query and /ready stays false until then
+        print(f"Warning: could not initialize RAG system: {str(e)}")
+    if OLLAMA_KEEP_ALIVE_PING_SECONDS > 0:
+        _keep_alive_task = asyncio.create_task(keep_models_loaded(OLLAMA_KEEP_ALIVE_PING_SECONDS))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the keep-alive pings, wait for in-flight queries and release the worker pool"""
+    global _keep_alive_task
+    if _keep_alive_task is not None:
+        _keep_alive_task.cancel()
+        _keep_alive_task = None
+    shutdown_executor()
+
 @app.get(
         '/health',
         response_model=HealthResponse,
@@ -29,9 +271,158 @@ class HealthResponse(BaseModel):
 async def health():
     return HealthResponse(status="ok")
 
+@app.get(
+        '/ready',
+        response_model=ReadinessResponse,
+        tags=["Health"],
+        summary="Check if the RAG system is ready",
+        description="Returns whether the RAG system has been built and warmed up (503 while it is not)"
+)
+async def ready():
+    is_ready = _rag_system is not None
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content=ReadinessResponse(ready=is_ready).model_dump()
+    )
+
+@app.get(
+        '/metrics',
+        tags=["Health"],
+        summary="Prometheus metrics",
+        description="Stage and request latencies, cache hits, LLM queue depth and generated tokens in the Prometheus text format",
+        response_class=Response,
+)
+async def metrics():
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get(
+        '/admission/stats',
+        response_model=AdmissionStatsResponse,
+        tags=["Health"],
+        summary="LLM admission statistics",
+        description="Concurrency, wait queue and rejections of the admission control in front of Ollama"
+)
+async def admission_stats():
+    return AdmissionStatsResponse(
+        merged=single_flight.merged,
+        in_flight=single_flight.in_flight(),
+        **llm_admission.stats()
+    )
+
+@app.get(
+        '/models/stats',
+        response_model=ModelRouterStatsResponse,
+        tags=["Health"],
+        summary="Model routing statistics",
+        description="Latency and load of each model, and how often requests were routed to the fallback or hedged"
+)
+async def model_router_stats():
+    if _rag_system is None:
+        return ModelRouterStatsResponse(enabled=False)
+    return ModelRouterStatsResponse(enabled=True, **_rag_system.router.stats())
+
+@app.get(
+        '/models/residency',
+        response_model=ModelResidencyResponse,
+        tags=["Health"],
+        summary="Model residency in Ollama",
+        description="Whether the LLMs are loaded in Ollama, how long they took to load, and the keep-alive pings that keep them loaded"
+)
+async def model_residency():
+    if _rag_system is None:
+        return ModelResidencyResponse(enabled=False)
+    return ModelResidencyResponse(
+        enabled=True,
+        ping_interval_seconds=OLLAMA_KEEP_ALIVE_PING_SECONDS or None,
+        **_rag_system.model_keeper.stats()
+    )
+
+@app.get(
+        '/answer_cache/stats',
+        response_model=AnswerCacheStatsResponse,
+        tags=["Health"],
+        summary="Answer cache statistics",
+        description="Hit rate and occupancy of the exact-match answer cache, and the vector store generation it follows"
+)
+async def answer_cache_stats():
+    cache = _rag_system.answer_cache if _rag_system is not None else None
+    if cache is None:
+        return AnswerCacheStatsResponse(enabled=False)
+    return AnswerCacheStatsResponse(
+        enabled=True,
+        generation=_rag_system.generation,
+        invalidations=_rag_system.invalidations,
+        **cache.stats()
+    )
+
+@app.get(
+        '/embeddings/stats',
+        response_model=EmbeddingBatcherStatsResponse,
+        tags=["Health"],
+        summary="Query embedding batching statistics",
+        description="How many questions were embedded per forward pass by the micro-batcher"
+)
+async def embedding_batcher_stats():
+    batcher = _rag_system.embedding_batcher if _rag_system is not None else None
+    if batcher is None:
+        return EmbeddingBatcherStatsResponse(enabled=False)
+    return EmbeddingBatcherStatsResponse(enabled=True, **batcher.stats())
+
+@app.get(
+        '/snapshot/stats',
+        response_model=SnapshotStatsResponse,
+        response_model_exclude_none=True,
+        tags=["Health"],
+        summary="Vector store snapshot statistics",
+        description="Which memory-mapped snapshot is loaded, whether it is up to date, and how many searches it served"
+)
+async def snapshot_stats():
+    snapshots = _rag_system.snapshots if _rag_system is not None else None
+    if snapshots is None:
+        return SnapshotStatsResponse(enabled=False)
+    snapshot = await run_blocking(snapshots.current)
+    return SnapshotStatsResponse(
+        enabled=True,
+        loaded=snapshot.name if snapshot is not None else None,
+        generation=snapshot.generation if snapshot is not None else None,
+        chunks=snapshot.count if snapshot is not None else None,
+        in_use=await run_blocking(_rag_system.snapshot_in_use),
+        swaps=snapshots.swaps,
+        load_errors=snapshots.load_errors,
+        snapshot_searches=_rag_system.snapshot_searches,
+        chroma_searches=_rag_system.chroma_searches
+    )
+
+@app.get(
+        '/context/stats',
+        response_model=ContextStatsResponse,
+        tags=["Health"],
+        summary="Prompt context compression statistics",
+        description="Prompt tokens saved by merging overlapping chunks, dropping duplicates and budgeting the context"
+)
+async def context_stats():
+    compressor = _rag_system.context_compressor if _rag_system is not None else None
+    if compressor is None:
+        return ContextStatsResponse(enabled=False)
+    return ContextStatsResponse(enabled=True, **compressor.stats())
+
+@app.get(
+        '/semantic_cache/stats',
+        response_model=SemanticCacheStatsResponse,
+        tags=["Health"],
+        summary="Semantic cache statistics",
+        description="Hit rate and occupancy of the semantic answer cache in this process"
+)
+async def semantic_cache_stats():
+    cache = _rag_system.semantic_cache if _rag_system is not None else None
+    if cache is None:
+        return SemanticCacheStatsResponse(enabled=False)
+    return SemanticCacheStatsResponse(enabled=True, **cache.stats())
+
 @app.post(
     "/query",
     response_model=QueryResponse,
+    response_model_exclude_none=True,
     tags=["Query"],
     summary="Query the knowledge base",
     description="Process a question and generate a response using the RAG system"
@@ -40,19 +431,158 @@ async def query_knowledge(request: QueryRequest):
     """
     Process a question and generate a response:
     - Validates the input question
+    - Answers from the caches when possible
+    - Merges identical questions already being generated into one generation
+    - Waits for an LLM slot, or is rejected if too many requests are waiting
     - Retrieves relevant context from the vector store
-    - Generates a response using the LLM
+    - Generates a response using the LLM chosen by the model router
     
     Returns:
-        - QueryResponse with the generated answer
+        - QueryResponse with the generated answer and the model that answered
+        - HTTPException 429/503 with Retry-After if the LLM is overloaded
+        - HTTPException 504 if no model answered within the timeout
         - HTTPException if processing fails
     """
     try:
-        rag_system = HotmartRAGSystem()
-        result = rag_system.generate_response(request.question)
+        rag_system = await run_blocking(get_rag_system)
+        lookup = await run_blocking(rag_system.lookup_cached_answer, request.question)
+        if lookup.answer is not None:
+            return QueryResponse(answer=lookup.answer)
+
+        result = await single_flight.do(
+            rag_system.request_key(request.question),
+            partial(_generate, rag_system, request.question, lookup, request.timeout_seconds)
+        )
         
-        return QueryResponse(answer=result["answer"])
+        return QueryResponse(answer=result["answer"], model=result.get("model"))
         
+    except OverloadedException as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ModelTimeoutException as e:
+        raise HTTPException(
+            status_code=504,
+            detail=str(e)
+        )
+    except RAGException as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+async def _generate(
+    rag_system: HotmartRAGSystem,
+    question: str,
+    lookup: CacheLookup,
+    timeout_seconds: Optional[float]
+) -> dict:
+    async with await llm_admission.acquire():
+        return await run_blocking(rag_system.generate_response, question, lookup, timeout_seconds)
+
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post(
+    "/query/stream",
+    response_class=StreamingResponse,
+    tags=["Query"],
+    summary="Query the knowledge base, streaming the answer",
+    description="Same as /query, but the answer is sent as Server-Sent Events while it is generated"
+)
+async def query_knowledge_stream(request: QueryRequest):
+    """
+    Process a question and stream the response as Server-Sent Events:
+    - `context`: the retrieved chunks (source and preview), before generation starts
+    - `token`: each piece of text as the LLM generates it
+    - `done`: the full answer
+    - `error`: sent instead of `done` if generation fails midway
+    
+    If the client disconnects, the stream is closed and the Ollama generation
+    is cancelled, so abandoned requests stop using the model. Uncached
+    questions hold an LLM slot for the whole stream.
+    
+    Returns:
+        - A text/event-stream response
+        - HTTPException 429/503 with Retry-After if the LLM is overloaded
+        - HTTPException if the RAG system cannot be initialized
+    """
+    try:
+        rag_system = await run_blocking(get_rag_system)
+        lookup = await run_blocking(rag_system.lookup_cached_answer, request.question)
+        ticket = await llm_admission.acquire() if lookup.answer is None else None
+    except OverloadedException as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except RAGException as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+    def release_slot():
+        if ticket is not None:
+            ticket.release()
+
+    async def events():
+        try:
+            async with aclosing(rag_system.stream_response(request.question, lookup)) as stream:
+                async for event in stream:
+                    yield _sse(event.event, event.data)
+        except RAGException as e:
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            release_slot()
+
+    # The background task releases the slot if the client left before the stream started
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(release_slot)
+    )
+
+
+@app.post(
+    "/retrieve",
+    response_model=RetrieveResponse,
+    tags=["Query"],
+    summary="Retrieve relevant chunks",
+    description="Return the stored chunks most similar to a question, with their scores and metadata, without calling the LLM"
+)
+async def retrieve(request: RetrieveRequest):
+    """
+    Retrieve the chunks most relevant to a question:
+    - Embeds the question (micro-batched with concurrent requests)
+    - Searches the vector store for the k closest chunks
+    
+    Returns:
+        - RetrieveResponse with the chunks, closest first
+        - HTTPException if retrieval fails
+    """
+    try:
+        rag_system = await run_blocking(get_rag_system)
+        results = await run_blocking(rag_system.retrieve, request.question, request.k)
+        return RetrieveResponse(chunks=[
+            RetrievedChunk(content=document.page_content, score=score, metadata=document.metadata)
+            for document, score in results
+        ])
     except RAGException as e:
         raise HTTPException(
             status_code=400,
@@ -62,4 +592,81 @@ async def query_knowledge(request: QueryRequest):
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@app.post(
+    "/query_batch",
+    response_model=QueryBatchResponse,
+    response_model_exclude_none=True,
+    tags=["Query"],
+    summary="Answer many questions",
+    description="Answer a list of questions in one call, embedding and retrieving for all of them at once"
+)
+async def query_batch(request: QueryBatchRequest):
+    """
+    Answer many questions in one call:
+    - Embeds every distinct question in a single forward pass
+    - Answers from the caches when possible, and searches the vector store for the rest
+    - Generates the remaining answers through the same admission control as /query,
+      with at most LLM_MAX_CONCURRENCY of the batch waiting for or holding an LLM slot
+    
+    A question that cannot be answered (overload, timeout, LLM error) gets an
+    `error` instead of an `answer`; the other questions are still answered.
+    
+    Returns:
+        - QueryBatchResponse with one result per question, in request order
+        - HTTPException if embedding or retrieval fails for the batch
+    """
+    try:
+        rag_system = await run_blocking(get_rag_system)
+        prepared = await run_blocking(rag_system.prepare_batch, request.questions)
+    except RAGException as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+    # A large batch must not fill the admission queue and starve interactive /query requests
+    batch_slots = asyncio.Semaphore(llm_admission.max_concurrent)
+    distinct = dict(zip(request.questions, prepared))
+    items = await asyncio.gather(*(
+        _answer_batch_item(rag_system, batch_slots, question, lookup, documents, request.timeout_seconds)
+        for question, (lookup, documents) in distinct.items()
+    ))
+    answers = dict(zip(distinct, items))
+    return QueryBatchResponse(results=[answers[question] for question in request.questions])
+
+async def _answer_batch_item(
+    rag_system: HotmartRAGSystem,
+    batch_slots: asyncio.Semaphore,
+    question: str,
+    lookup: CacheLookup,
+    documents: list[Document],
+    timeout_seconds: Optional[float]
+) -> QueryBatchItem:
+    if lookup.answer is not None:
+        return QueryBatchItem(question=question, answer=lookup.answer)
+    try:
+        async with batch_slots:
+            result = await single_flight.do(
+                rag_system.request_key(question),
+                partial(_generate_from_documents, rag_system, question, lookup, documents, timeout_seconds)
+            )
+        return QueryBatchItem(question=question, answer=result["answer"], model=result.get("model"))
+    except Exception as e:
+        return QueryBatchItem(question=question, error=str(e))
+
+async def _generate_from_documents(
+    rag_system: HotmartRAGSystem,
+    question: str,
+    lookup: CacheLookup,
+    documents: list[Document],
+    timeout_seconds: Optional[float]
+) -> dict:
+    async with await llm_admission.acquire():
+        return await run_blocking(rag_system.generate_from_documents, question, lookup, documents, timeout_seconds)
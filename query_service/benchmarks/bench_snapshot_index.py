@@ -0,0 +1,156 @@
+"""
+Compare retrieval from a memory-mapped snapshot (exact NumPy search, and the
+HNSW index shipped with large snapshots) with Chroma's persistent HNSW index
+on synthetic normalized vectors: build/open time, size on disk, search
+latency and recall@k against the exact top k.
+
+Loading 1M vectors into Chroma takes a long time; pass --skip-chroma-above
+to only time the snapshot on the largest sizes.
+
+Usage (from query_service/):
+    python -m benchmarks.bench_snapshot_index --sizes 10000 100000 1000000 --queries 200
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import closing
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+from snapshot_index import SnapshotIndex
+
+DIM = 384
+PAGE = 50_000
+
+def synthetic_vectors(count: int, dim: int, seed: int) -> np.ndarray:
+    """Clustered unit vectors, closer to real embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(count // 200, 1), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.5 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def write_snapshot(directory: str, vectors: np.ndarray, ann: bool) -> None:
+    """Write vectors and placeholder chunks in the layout of ingest_service/snapshot.py"""
+    os.makedirs(directory)
+    vectors.tofile(os.path.join(directory, "vectors.f32"))
+    with closing(sqlite3.connect(os.path.join(directory, "chunks.sqlite3"))) as chunks:
+        chunks.execute("CREATE TABLE chunks (row INTEGER PRIMARY KEY, id TEXT NOT NULL, content TEXT NOT NULL, metadata TEXT NOT NULL)")
+        for start in range(0, len(vectors), PAGE):
+            chunks.executemany(
+                "INSERT INTO chunks VALUES (?, ?, ?, '{}')",
+                [(row, f"id-{row}", f"Trecho {row}") for row in range(start, min(start + PAGE, len(vectors)))]
+            )
+        chunks.commit()
+    manifest = {"generation": 1, "embedding_model": "synthetic", "chunks": len(vectors), "dim": vectors.shape[1]}
+    if ann:
+        # Same parameters as the ingest service defaults (SNAPSHOT_ANN_M, SNAPSHOT_ANN_EF_CONSTRUCTION)
+        import hnswlib
+        index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        index.init_index(max_elements=len(vectors), ef_construction=100, M=16)
+        index.add_items(vectors, np.arange(len(vectors)))
+        index.save_index(os.path.join(directory, "index.hnsw"))
+        manifest["ann"] = {"file": "index.hnsw", "space": "ip", "M": 16, "ef_construction": 100}
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file)
+
+def directory_mb(directory: str) -> float:
+    return sum(path.stat().st_size for path in Path(directory).rglob("*") if path.is_file()) / 2**20
+
+def percentiles(timings: list[float]) -> tuple[float, float]:
+    quantiles = statistics.quantiles(timings, n=20)
+    return quantiles[9] * 1000, quantiles[18] * 1000
+
+def bench_snapshot(root: str, vectors: np.ndarray, queries: np.ndarray, k: int, ann: bool) -> tuple[dict, list[set]]:
+    directory = os.path.join(root, "snapshot-hnsw" if ann else "snapshot")
+    start = time.perf_counter()
+    write_snapshot(directory, vectors, ann)
+    write_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = SnapshotIndex(directory)
+    index.search(queries[0].tolist(), k)
+    open_seconds = time.perf_counter() - start
+
+    timings, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results = index.search(query.tolist(), k)
+        timings.append(time.perf_counter() - start)
+        found.append({document.id for document, _ in results})
+    index.close()
+    p50, p95 = percentiles(timings)
+    return {"build": write_seconds, "open": open_seconds, "mb": directory_mb(directory), "p50": p50, "p95": p95}, found
+
+def bench_chroma(root: str, vectors: np.ndarray, queries: np.ndarray, k: int, exact: list[set]) -> dict:
+    import chromadb
+
+    directory = os.path.join(root, "chroma")
+    client = chromadb.PersistentClient(path=directory)
+    collection = client.create_collection("bench")
+    batch = client.get_max_batch_size()
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), batch):
+        end = min(offset + batch, len(vectors))
+        collection.add(
+            ids=[f"id-{row}" for row in range(offset, end)],
+            embeddings=vectors[offset:end].tolist(),
+            documents=[f"Trecho {row}" for row in range(offset, end)]
+        )
+    build_seconds = time.perf_counter() - start
+
+    # A fresh client measures opening the persisted index, like a restarted query service
+    del collection, client
+    start = time.perf_counter()
+    client = chromadb.PersistentClient(path=directory)
+    collection = client.get_collection("bench")
+    collection.query(query_embeddings=[queries[0].tolist()], n_results=k)
+    open_seconds = time.perf_counter() - start
+
+    timings, recall = [], []
+    for query, expected in zip(queries, exact):
+        start = time.perf_counter()
+        ids = collection.query(query_embeddings=[query.tolist()], n_results=k, include=["documents", "distances"])["ids"][0]
+        timings.append(time.perf_counter() - start)
+        recall.append(len(expected & set(ids)) / k)
+    p50, p95 = percentiles(timings)
+    return {
+        "build": build_seconds, "open": open_seconds, "mb": directory_mb(directory),
+        "p50": p50, "p95": p95, "recall": statistics.mean(recall)
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=DIM)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--skip-chroma-above", type=int, default=None)
+    args = parser.parse_args()
+
+    print(f"{'chunks':>9} {'store':<9} {'build':>8} {'open':>8} {'disk':>9} {'p50':>9} {'p95':>9} {'recall@k':>9}")
+    for size in args.sizes:
+        vectors = synthetic_vectors(size, args.dim, seed=size)
+        # Queries near stored vectors, as real questions land near their answers
+        queries = synthetic_vectors(args.queries, args.dim, seed=1) * 0.3 + vectors[:args.queries]
+        with tempfile.TemporaryDirectory() as root:
+            exact, exact_ids = bench_snapshot(root, vectors, queries, args.k, ann=False)
+            hnsw, hnsw_ids = bench_snapshot(root, vectors, queries, args.k, ann=True)
+            hnsw["recall"] = statistics.mean(len(a & b) / args.k for a, b in zip(exact_ids, hnsw_ids))
+            rows = [("exact", exact), ("hnsw", hnsw)]
+            if args.skip_chroma_above is None or size <= args.skip_chroma_above:
+                rows.append(("chroma", bench_chroma(root, vectors, queries, args.k, exact_ids)))
+        for store, result in rows:
+            print(
+                f"{size:>9} {store:<9} {result['build']:>7.1f}s {result['open'] * 1000:>6.0f}ms {result['mb']:>7.0f}MB "
+                f"{result['p50']:>7.2f}ms {result['p95']:>7.2f}ms {result.get('recall', 1.0):>9.3f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Time to first token of the query service's LLM calls against a local mock
+Ollama (benchmarks/mock_ollama.py) whose load and prompt evaluation costs are
+set on the command line:
+
+- cold: the model was unloaded while the service was idle (keep_alive expired);
+- warm: the same idle period, with a ModelKeeper ping in between;
+- warm, question first: a prompt that starts with the question, so nothing
+  is shared with the previous prompt and its KV cache is not reused;
+- warm, stable prefix: the service's prompt (PROMPT_TEMPLATE), whose
+  instructions are evaluated once and reused by the next questions.
+
+Usage (from query_service/):
+    python -m benchmarks.bench_ttft --load-seconds 2 --prompt-ms-per-char 0.5 --requests 5
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from langchain_ollama.llms import OllamaLLM
+
+sys.path.append(str(Path(__file__).parent.parent))
+from benchmarks.mock_ollama import MockOllama
+from model_residency import ModelKeeper
+from rag_chain import PROMPT_INSTRUCTIONS, PROMPT_TEMPLATE
+
+MODEL = "mistral"
+NUM_CTX = 4096
+KEEP_ALIVE = "30m"
+
+def question_first(context: str, question: str) -> str:
+    return f"Pergunta: {question}\n" + PROMPT_INSTRUCTIONS + f"Contexto: {context}"
+
+def stable_prefix(context: str, question: str) -> str:
+    return PROMPT_TEMPLATE.format(context=context, question=question)
+
+def time_to_first_token(llm: OllamaLLM, prompt: str) -> float:
+    start = time.perf_counter()
+    tokens = llm.stream(prompt)
+    next(tokens)
+    elapsed = time.perf_counter() - start
+    tokens.close()
+    return elapsed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--load-seconds", type=float, default=2.0)
+    parser.add_argument("--prompt-ms-per-char", type=float, default=0.5)
+    parser.add_argument("--context-chars", type=int, default=800)
+    parser.add_argument("--requests", type=int, default=5)
+    args = parser.parse_args()
+
+    with MockOllama(load_seconds=args.load_seconds, prompt_seconds_per_char=args.prompt_ms_per_char / 1000) as ollama:
+        llm = OllamaLLM(base_url=ollama.base_url, model=MODEL, num_ctx=NUM_CTX, keep_alive=KEEP_ALIVE)
+        keeper = ModelKeeper(ollama.base_url, [MODEL], keep_alive=KEEP_ALIVE, num_ctx=NUM_CTX)
+        questions = [
+            (f"Trecho {i} do blog da Hotmart. " * (args.context_chars // 30), f"Pergunta número {i}?")
+            for i in range(args.requests)
+        ]
+
+        def run(layout, idle) -> list[float]:
+            timings = []
+            for context, question in questions:
+                idle()
+                timings.append(time_to_first_token(llm, layout(context, question)))
+            return timings
+
+        def expire() -> None:
+            ollama.unload(MODEL)
+
+        def expire_and_ping() -> None:
+            ollama.unload(MODEL)
+            keeper.ping()
+
+        rows = [
+            ("cold", run(stable_prefix, expire)),
+            ("warm", run(stable_prefix, expire_and_ping)),
+            ("warm, question first", run(question_first, lambda: None)),
+            ("warm, stable prefix", run(stable_prefix, lambda: None)),
+        ]
+
+    print(f"{'scenario':<22} {'p50':>9} {'max':>9}")
+    for name, timings in rows:
+        print(f"{name:<22} {statistics.median(timings) * 1000:>7.0f}ms {max(timings) * 1000:>7.0f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Local stand-in for the parts of the Ollama HTTP API the query service uses
+(/api/generate, streamed or not, and /api/ps), with the latencies that matter
+for time-to-first-token:
+
+- a model that is not loaded, whose keep_alive expired or that is asked for
+  another num_ctx is loaded first (`load_seconds`);
+- the prompt is evaluated at `prompt_seconds_per_char`, except for the prefix
+  it shares with the previous prompt of that model (the KV cache Ollama keeps);
+- tokens are then streamed every `token_seconds`.
+"""
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+DEFAULT_KEEP_ALIVE_SECONDS = 300.0
+DEFAULT_NUM_CTX = 2048
+_DURATION = re.compile(r"^(-?\d+(?:\.\d+)?)(ms|s|m|h)$")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+def keep_alive_seconds(value) -> float:
+    """Seconds a model stays loaded for a keep_alive sent by a client (negative: forever)"""
+    if value is None:
+        return DEFAULT_KEEP_ALIVE_SECONDS
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        match = _DURATION.match(value)
+        if match is None:
+            raise ValueError(f"invalid keep_alive '{value}'")
+        seconds = float(match.group(1)) * _UNITS[match.group(2)]
+    return float("inf") if seconds < 0 else seconds
+
+def _common_prefix(first: str, second: str) -> int:
+    length = min(len(first), len(second))
+    for index in range(length):
+        if first[index] != second[index]:
+            return index
+    return length
+
+def _timestamp(seconds: float) -> str:
+    if seconds == float("inf"):
+        seconds = 2**31
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat().replace("+00:00", "Z")
+
+class MockOllama:
+    """Mock Ollama server on a free local port; use as a context manager or call start()/stop()"""
+
+    def __init__(
+        self,
+        load_seconds: float = 1.0,
+        prompt_seconds_per_char: float = 0.0,
+        token_seconds: float = 0.0,
+        answer: tuple[str, ...] = ("A ", "Hotmart ", "é ", "uma ", "plataforma."),
+    ):
+        self.load_seconds = load_seconds
+        self.prompt_seconds_per_char = prompt_seconds_per_char
+        self.token_seconds = token_seconds
+        self.answer = answer
+
+        self._lock = threading.Lock()
+        # model -> (expires at, num_ctx)
+        self._loaded: dict[str, tuple[float, int]] = {}
+        self._cached_prompt: dict[str, str] = {}
+        # Every /api/generate body received, with what the server did: "cold" and "cached_chars"
+        self.requests: list[dict] = []
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllama":
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path != "/api/ps":
+                    self.send_error(404)
+                    return
+                self._send_json({"models": mock.loaded_models()})
+
+            def do_POST(self):
+                if self.path != "/api/generate":
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                mock.generate(body, self)
+
+            def _send_json(self, payload: dict) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "MockOllama":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def unload(self, model: Optional[str] = None) -> None:
+        """Unload one model (or all), as when its keep_alive expires"""
+        with self._lock:
+            for name in [model] if model is not None else list(self._loaded):
+                self._loaded.pop(name, None)
+                self._cached_prompt.pop(name, None)
+
+    def loaded_models(self) -> list[dict]:
+        now = time.time()
+        with self._lock:
+            return [
+                {"model": name, "name": name, "expires_at": _timestamp(expires)}
+                for name, (expires, _) in self._loaded.items() if expires > now
+            ]
+
+    def _load(self, model: str, num_ctx: int) -> float:
+        """Load the model if needed; returns the seconds spent loading"""
+        with self._lock:
+            loaded = self._loaded.get(model)
+            cold = loaded is None or loaded[0] <= time.time() or loaded[1] != num_ctx
+            if cold:
+                self._cached_prompt.pop(model, None)
+        if cold:
+            time.sleep(self.load_seconds)
+        return self.load_seconds if cold else 0.0
+
+    def generate(self, body: dict, handler: BaseHTTPRequestHandler) -> None:
+        model = body["model"]
+        prompt = body.get("prompt") or ""
+        num_ctx = (body.get("options") or {}).get("num_ctx") or DEFAULT_NUM_CTX
+        load_seconds = self._load(model, num_ctx)
+
+        with self._lock:
+            cached = _common_prefix(self._cached_prompt.get(model, ""), prompt)
+            if prompt:
+                self._cached_prompt[model] = prompt
+            self.requests.append({**body, "cold": load_seconds > 0, "cached_chars": cached})
+        time.sleep((len(prompt) - cached) * self.prompt_seconds_per_char)
+
+        stream = body.get("stream", True) and bool(prompt)
+        # HTTP/1.0 without Content-Length: the body (one JSON object per line) ends when the connection closes
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson" if stream else "application/json")
+        handler.end_headers()
+
+        def write(payload: dict) -> None:
+            handler.wfile.write((json.dumps(payload) + "\n").encode("utf-8"))
+            handler.wfile.flush()
+
+        created_at = _timestamp(time.time())
+        tokens = self.answer if prompt else ()
+        try:
+            if stream:
+                for token in tokens:
+                    write({"model": model, "created_at": created_at, "response": token, "done": False})
+                    time.sleep(self.token_seconds)
+            write({
+                "model": model,
+                "created_at": created_at,
+                "response": "" if stream else "".join(tokens),
+                "done": True,
+                "done_reason": "stop" if prompt else "load",
+                "load_duration": int(load_seconds * 1e9),
+                "prompt_eval_count": len(prompt) - cached,
+            })
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream early, which stops the generation
+            pass
+
+        # keep_alive counts from the end of the request
+        expires = time.time() + keep_alive_seconds(body.get("keep_alive"))
+        with self._lock:
+            if expires > time.time():
+                self._loaded[model] = (expires, num_ctx)
+            else:
+                self._loaded.pop(model, None)
+                self._cached_prompt.pop(model, None)
@@ -0,0 +1,114 @@
+import threading
+from typing import Optional
+
+import chromadb
+from chromadb.api import ClientAPI
+from chromadb.config import Settings
+from langchain_core.documents import Document
+
+from constants import (
+    CHROMA_DB_PERSIST_DIRECTORY,
+    CHROMA_HOST,
+    CHROMA_PORT,
+    CHROMA_SSL,
+    VECTOR_STORE_BACKEND,
+)
+
+STORE_EMBEDDED = "embedded"
+STORE_REMOTE = "remote"
+VECTOR_STORE_BACKENDS = (STORE_EMBEDDED, STORE_REMOTE)
+
+class ChromaClientException(Exception):
+    """Custom exception for vector store connection errors"""
+    pass
+
+_client: Optional[ClientAPI] = None
+_lock = threading.Lock()
+
+def create_chroma_client(
+    backend: str = VECTOR_STORE_BACKEND,
+    path: str = CHROMA_DB_PERSIST_DIRECTORY,
+    host: str = CHROMA_HOST,
+    port: int = CHROMA_PORT,
+    ssl: bool = CHROMA_SSL,
+) -> ClientAPI:
+    """
+    Open a Chroma client for the configured backend.
+
+    The embedded backend reads and writes the SQLite/HNSW files under `path`
+    in this process. The remote backend talks to a Chroma server over HTTP;
+    its client keeps one pooled keep-alive session, so it is meant to be
+    created once per process (see get_chroma_client).
+
+    Raises:
+        ChromaClientException: If the backend is unknown or the server cannot be reached
+    """
+    if backend not in VECTOR_STORE_BACKENDS:
+        raise ChromaClientException(
+            f"Unknown vector store backend '{backend}' (expected one of: {', '.join(VECTOR_STORE_BACKENDS)})"
+        )
+    settings = Settings(anonymized_telemetry=False)
+    try:
+        if backend == STORE_REMOTE:
+            # Connecting validates the tenant and database, so an unreachable server fails here
+            return chromadb.HttpClient(host=host, port=port, ssl=ssl, settings=settings)
+        return chromadb.PersistentClient(path=path, settings=settings)
+    except Exception as e:
+        target = f"{host}:{port}" if backend == STORE_REMOTE else path
+        raise ChromaClientException(f"Failed to open the {backend} vector store at {target}: {str(e)}")
+
+def get_chroma_client() -> ClientAPI:
+    """
+    Return the process-wide Chroma client, opening it on first use. A failed
+    connection is not remembered, so the next call retries (the server may
+    still be starting).
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = create_chroma_client(
+                    VECTOR_STORE_BACKEND, CHROMA_DB_PERSIST_DIRECTORY, CHROMA_HOST, CHROMA_PORT, CHROMA_SSL
+                )
+    return _client
+
+def reset_chroma_client() -> None:
+    """Drop the cached client so the next call reconnects (mainly useful for tests)"""
+    global _client
+    with _lock:
+        _client = None
+
+def max_batch_size(client: ClientAPI) -> int:
+    """Largest number of records the store accepts in one add or query call"""
+    return client.get_max_batch_size()
+
+def query_by_vectors(collection, vectors: list[list[float]], k: int, batch_size: int) -> list[list[tuple[Document, float]]]:
+    """
+    Nearest chunks of several vectors, with one query call per batch of
+    vectors instead of one per vector (a single HTTP round trip on the remote
+    backend).
+
+    Args:
+        collection: Chroma collection to search.
+        vectors (list[list[float]]): Query embeddings.
+        k (int): Number of chunks per vector.
+        batch_size (int): Most vectors sent in one call.
+
+    Returns:
+        list[list[tuple[Document, float]]]: For each vector, its chunks and distances, closest first.
+    """
+    results = []
+    for start in range(0, len(vectors), batch_size):
+        response = collection.query(
+            query_embeddings=vectors[start:start + batch_size],
+            n_results=k,
+            include=["documents", "metadatas", "distances"],
+        )
+        for ids, documents, metadatas, distances in zip(
+            response["ids"], response["documents"], response["metadatas"], response["distances"]
+        ):
+            results.append([
+                (Document(id=id, page_content=document, metadata=metadata or {}), distance)
+                for id, document, metadata, distance in zip(ids, documents, metadatas, distances)
+            ])
+    return results
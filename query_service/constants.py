@@ -1 +1,69 @@
+import os
+
 CHROMA_DB_PERSIST_DIRECTORY = "./chroma_db"
+# embedded (Chroma files under CHROMA_DB_PERSIST_DIRECTORY) or remote (the Chroma server of docker-compose)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "embedded")
+CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+CHROMA_SSL = os.getenv("CHROMA_SSL", "false").lower() == "true"
+CHROMA_COLLECTION_NAME = os.getenv("CHROMA_COLLECTION_NAME", "langchain")
+GENERATION_DB_PATH = os.getenv("GENERATION_DB_PATH", os.path.join(CHROMA_DB_PERSIST_DIRECTORY, "generation.sqlite3"))
+# Search the snapshot published by the ingest service instead of Chroma while it is up to date
+SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "true").lower() == "true"
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(CHROMA_DB_PERSIST_DIRECTORY, "snapshots"))
+# Candidate list size of HNSW searches in snapshots that ship an index (higher: better recall, slower)
+SNAPSHOT_ANN_EF = int(os.getenv("SNAPSHOT_ANN_EF", "64"))
+
+EMBEDDING_MODEL_NAME = "intfloat/multilingual-e5-small"
+# torch, onnx or onnx-int8; must match the ingest service so vectors stay comparable
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "./onnx_models")
+EMBEDDING_ONNX_QUANTIZATION = os.getenv("EMBEDDING_ONNX_QUANTIZATION", "avx2")
+
+QUERY_MAX_WORKERS = int(os.getenv("QUERY_MAX_WORKERS", "4"))
+QUERY_BATCH_MAX_QUESTIONS = int(os.getenv("QUERY_BATCH_MAX_QUESTIONS", "64"))
+RETRIEVE_MAX_K = int(os.getenv("RETRIEVE_MAX_K", "50"))
+
+# 1 disables micro-batching of query embeddings
+QUERY_EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("QUERY_EMBEDDING_MAX_BATCH_SIZE", "32"))
+QUERY_EMBEDDING_BATCH_WAIT_MS = float(os.getenv("QUERY_EMBEDDING_BATCH_WAIT_MS", "2"))
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://ollama:11434")
+# How long Ollama keeps a model loaded after a request: a duration ("30m") or seconds ("-1": until Ollama stops)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Context window of the LLMs; must hold the instructions, CONTEXT_MAX_TOKENS of context, the question and the answer
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "4096"))
+# Models are pinged this often so they stay loaded while idle (0 disables the pings)
+OLLAMA_KEEP_ALIVE_PING_SECONDS = float(os.getenv("OLLAMA_KEEP_ALIVE_PING_SECONDS", "300"))
+LLM_PRIMARY_MODEL = os.getenv("LLM_PRIMARY_MODEL", "mistral")
+# Empty disables routing to a smaller model
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "tinyllama")
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "20"))
+# Race the fallback model after this many seconds; 0 (default) disables hedging, which can double Ollama's load
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_PROBE_INTERVAL_SECONDS = float(os.getenv("LLM_PROBE_INTERVAL_SECONDS", "30"))
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "16"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "60"))
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+
+# Merge overlapping chunks, drop near-duplicates and fit the prompt context into a token budget
+CONTEXT_COMPRESSION_ENABLED = os.getenv("CONTEXT_COMPRESSION_ENABLED", "true").lower() == "true"
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "1024"))
+CONTEXT_DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.8"))
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+SEMANTIC_CACHE_MAX_MB = int(os.getenv("SEMANTIC_CACHE_MAX_MB", "32"))
+
+# Prometheus metrics on /metrics; disabling them leaves only the endpoint (with collected stats)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "hotmart_query")
+# Print every timed stage as a JSON line with the request's trace id
+METRICS_LOG_SPANS = os.getenv("METRICS_LOG_SPANS", "false").lower() == "true"
@@ -0,0 +1,209 @@
+import math
+import re
+import threading
+from typing import NamedTuple, Optional
+
+from langchain_core.documents import Document
+
+# Rough size of a token of Portuguese prose for Mistral's tokenizer; only used to budget the context
+CHARS_PER_TOKEN = 4.0
+# Shortest shared text considered a chunk overlap (the ingest service overlaps chunks by up to 250 characters)
+MIN_OVERLAP_CHARS = 20
+# A chunk cut to fit the budget is kept only if at least this much of it fits
+MIN_TRUNCATED_TOKENS = 32
+# Separator the "stuff" prompt puts between chunks
+CONTEXT_SEPARATOR = "\n\n"
+
+_WORD = re.compile(r"\w+")
+
+class ContextCompressorException(Exception):
+    """Custom exception for context compression errors"""
+    pass
+
+class CompressedContext(NamedTuple):
+    """Chunks to put in the prompt and the prompt tokens they save"""
+    documents: list[Document]
+    tokens_before: int
+    tokens_after: int
+
+def estimate_tokens(text: str) -> int:
+    """Estimated number of LLM tokens of a text"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _overlap(first: str, second: str) -> int:
+    """Length of the longest suffix of `first` that is a prefix of `second` (0 below MIN_OVERLAP_CHARS)"""
+    probe = second[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    start = first.find(probe, max(len(first) - len(second), 0))
+    while start != -1:
+        # The earliest match is the longest overlap
+        if second.startswith(first[start:]):
+            return len(first) - start
+        start = first.find(probe, start + 1)
+    return 0
+
+def _shingles(text: str) -> set:
+    words = _WORD.findall(text.casefold())
+    return {tuple(words[i:i + 3]) for i in range(max(len(words) - 2, 1))}
+
+def _truncate(text: str, max_chars: int) -> str:
+    """Cut a text to at most max_chars, at the end of a sentence if possible, otherwise of a word"""
+    cut = text[:max_chars]
+    sentence = max(cut.rfind(". "), cut.rfind(".\n"), cut.rfind("! "), cut.rfind("? "))
+    if sentence >= max_chars // 2:
+        return cut[:sentence + 1]
+    space = cut.rfind(" ")
+    return cut[:space] if space > 0 else cut
+
+class ContextCompressor:
+    """
+    Shrinks the chunks retrieved for a question before they go into the prompt.
+
+    Chunks are split with overlapping windows, so neighbouring chunks of the
+    same source repeat up to a few hundred characters and several of them are
+    often retrieved together. The compressor:
+
+    1. merges chunks of the same source whose end and start overlap (or that
+       contain one another) into one passage, written once;
+    2. drops passages that are near-duplicates of a more relevant one (Jaccard
+       similarity of their word trigrams at or above `duplicate_threshold`,
+       e.g. the same post ingested under two URLs);
+    3. keeps passages in relevance order until the token budget is used,
+       cutting the last one at a sentence boundary.
+
+    Counters of tokens before and after compression are kept for the stats endpoint.
+    """
+
+    def __init__(self, max_tokens: int, duplicate_threshold: float):
+        if max_tokens < 1:
+            raise ContextCompressorException("Context token budget must be positive")
+        if not 0 < duplicate_threshold <= 1:
+            raise ContextCompressorException("Duplicate threshold must be in (0, 1]")
+        self.max_tokens = max_tokens
+        self.duplicate_threshold = duplicate_threshold
+
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.merged = 0
+        self.duplicates = 0
+        self.truncated = 0
+
+    @property
+    def settings(self) -> tuple:
+        """Everything that changes which context a question gets (part of the answer cache key)"""
+        return (self.max_tokens, self.duplicate_threshold)
+
+    @staticmethod
+    def _join(first: str, second: str) -> Optional[str]:
+        """One passage covering both texts if they overlap or contain one another, None otherwise"""
+        if second in first:
+            return first
+        if first in second:
+            return second
+        overlap = _overlap(first, second)
+        if overlap:
+            return first + second[overlap:]
+        overlap = _overlap(second, first)
+        if overlap:
+            return second + first[overlap:]
+        return None
+
+    def _merge_overlapping(self, documents: list[Document]) -> tuple[list[Document], int]:
+        # (rank, document) pairs; a merged passage keeps the rank of its most relevant chunk
+        passages: list[tuple[int, Document]] = []
+        merged = 0
+        for rank, document in enumerate(documents):
+            source = document.metadata.get("source")
+            text = document.page_content
+            # Chunks of unknown origin are never merged
+            absorbed = source is not None
+            while absorbed:
+                absorbed = False
+                for index, (other_rank, other) in enumerate(passages):
+                    if other.metadata.get("source") != source:
+                        continue
+                    joined = self._join(other.page_content, text)
+                    if joined is not None:
+                        passages.pop(index)
+                        rank, document, text = other_rank, other, joined
+                        merged += 1
+                        absorbed = True
+                        break
+            passages.append((rank, Document(id=document.id, page_content=text, metadata=document.metadata)))
+        passages.sort(key=lambda passage: passage[0])
+        return [document for _, document in passages], merged
+
+    def _drop_duplicates(self, documents: list[Document]) -> tuple[list[Document], int]:
+        kept, kept_shingles = [], []
+        for document in documents:
+            shingles = _shingles(document.page_content)
+            if any(
+                len(shingles & other) / len(shingles | other) >= self.duplicate_threshold
+                for other in kept_shingles
+            ):
+                continue
+            kept.append(document)
+            kept_shingles.append(shingles)
+        return kept, len(documents) - len(kept)
+
+    def _fit_budget(self, documents: list[Document]) -> tuple[list[Document], bool]:
+        fitted, used = [], 0
+        for document in documents:
+            separator = estimate_tokens(CONTEXT_SEPARATOR) if fitted else 0
+            tokens = estimate_tokens(document.page_content)
+            if used + separator + tokens <= self.max_tokens:
+                fitted.append(document)
+                used += separator + tokens
+                continue
+            remaining = self.max_tokens - used - separator
+            if remaining >= MIN_TRUNCATED_TOKENS:
+                text = _truncate(document.page_content, int(remaining * CHARS_PER_TOKEN))
+                fitted.append(Document(id=document.id, page_content=text, metadata=document.metadata))
+            return fitted, True
+        return fitted, False
+
+    def compress(self, documents: list[Document]) -> CompressedContext:
+        """
+        Merge, deduplicate and budget the chunks retrieved for one question.
+
+        Args:
+            documents (list[Document]): Retrieved chunks, most relevant first.
+
+        Returns:
+            CompressedContext: The passages to put in the prompt, most relevant
+            first, and the estimated context tokens before and after.
+        """
+        tokens_before = estimate_tokens(CONTEXT_SEPARATOR.join(document.page_content for document in documents))
+        passages, merged = self._merge_overlapping(documents)
+        passages, duplicates = self._drop_duplicates(passages)
+        passages, truncated = self._fit_budget(passages)
+        tokens_after = estimate_tokens(CONTEXT_SEPARATOR.join(document.page_content for document in passages))
+
+        with self._lock:
+            self.queries += 1
+            self.tokens_before += tokens_before
+            self.tokens_after += tokens_after
+            self.merged += merged
+            self.duplicates += duplicates
+            self.truncated += int(truncated)
+        return CompressedContext(passages, tokens_before, tokens_after)
+
+    def stats(self) -> dict:
+        """Prompt tokens saved since startup"""
+        with self._lock:
+            saved = self.tokens_before - self.tokens_after
+            return {
+                "max_tokens": self.max_tokens,
+                "queries": self.queries,
+                "tokens_before": self.tokens_before,
+                "tokens_after": self.tokens_after,
+                "tokens_saved": saved,
+                "avg_tokens_saved": saved / self.queries if self.queries else 0.0,
+                "saved_ratio": saved / self.tokens_before if self.tokens_before else 0.0,
+                "merged": self.merged,
+                "duplicates": self.duplicates,
+                "truncated": self.truncated,
+            }
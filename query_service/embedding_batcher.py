@@ -0,0 +1,103 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+
+from langchain_core.embeddings import Embeddings
+
+class EmbeddingBatcher(Embeddings):
+    """
+    Embeddings wrapper that micro-batches query embeddings across concurrent
+    requests.
+
+    Each embed_query call is queued and a single worker thread embeds the
+    queue in one batched forward pass: it takes the questions that arrived
+    within `max_wait` seconds of the first one, up to `max_batch_size`, and
+    hands every vector back to its caller. Questions arriving while a batch is
+    being embedded form the next batch, so batches grow with load while a lone
+    question only waits for the (short) window.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int, max_wait: float):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.embedded = 0
+        self.largest_batch = 0
+        self._condition = threading.Condition()
+        self._pending: list[tuple[str, Future]] = []
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+
+    def embed_query(self, text: str) -> list[float]:
+        future: Future = Future()
+        with self._condition:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+            self._pending.append((text, future))
+            self._condition.notify()
+        return future.result()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        # Callers passing many texts already batch on their own
+        return self.embeddings.embed_documents(texts)
+
+    def _next_batch(self) -> Optional[list[tuple[str, Future]]]:
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                return None
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                if len(texts) == 1:
+                    vectors = {texts[0]: self.embeddings.embed_query(texts[0])}
+                else:
+                    vectors = dict(zip(texts, self.embeddings.embed_documents(texts)))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            with self._condition:
+                self.batches += 1
+                self.embedded += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+            for text, future in batch:
+                future.set_result(vectors[text])
+
+    def close(self) -> None:
+        """Stop the worker thread; pending questions fail"""
+        with self._condition:
+            self._closed = True
+            pending, self._pending = self._pending, []
+            self._condition.notify_all()
+        for _, future in pending:
+            future.set_exception(RuntimeError("Embedding batcher closed"))
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "batches": self.batches,
+                "embedded": self.embedded,
+                "avg_batch_size": self.embedded / self.batches if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+            }
@@ -0,0 +1,51 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from constants import QUERY_MAX_WORKERS
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Return the shared thread pool used for retrieval and generation.
+    
+    A thread pool is used (not processes) because the RAG system holds the
+    embeddings model, vector store and LLM client, which are shared in memory.
+    """
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=QUERY_MAX_WORKERS, thread_name_prefix="query-worker")
+    return _executor
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a blocking function in the shared pool without blocking the event loop.
+    
+    The function runs in a copy of the caller's context, so the request's
+    trace id stays current in the worker thread.
+    
+    Args:
+        func (Callable): The blocking function.
+        *args, **kwargs: Arguments forwarded to the function.
+    
+    Returns:
+        Any: Whatever the function returns.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), partial(context.run, func, *args, **kwargs))
+
+def shutdown_executor() -> None:
+    """Shut down the shared pool, waiting for running tasks to finish"""
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
@@ -0,0 +1,57 @@
+import os
+import sqlite3
+import threading
+from typing import Optional
+
+class GenerationMarker:
+    """
+    Read side of the generation counter the ingest service bumps after every
+    write to the shared vector store (see ingest_service/generation.py).
+
+    The marker database is opened read-only, so the query service never creates
+    or locks it, and the connection is kept open: a check is a single indexed
+    SELECT of a few microseconds. A missing marker means nothing was ingested yet.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def read(self) -> int:
+        """Current generation (0 if the ingest service never wrote one)"""
+        with self._lock:
+            try:
+                if self._connection is None:
+                    if not os.path.exists(self.db_path):
+                        return 0
+                    self._connection = sqlite3.connect(
+                        f"file:{self.db_path}?mode=ro", uri=True, timeout=30, check_same_thread=False
+                    )
+                row = self._connection.execute("SELECT value FROM generation WHERE id = 0").fetchone()
+            except sqlite3.OperationalError:
+                # Marker file created but its table not committed yet
+                return 0
+            return row[0] if row else 0
+
+    def embedding_model(self) -> Optional[str]:
+        """Embedding model id the ingest service last wrote with (None if unknown)"""
+        with self._lock:
+            try:
+                if self._connection is None:
+                    if not os.path.exists(self.db_path):
+                        return None
+                    self._connection = sqlite3.connect(
+                        f"file:{self.db_path}?mode=ro", uri=True, timeout=30, check_same_thread=False
+                    )
+                row = self._connection.execute("SELECT value FROM meta WHERE name = 'embedding_model'").fetchone()
+            except sqlite3.OperationalError:
+                # Marker written by an ingest service that predates the meta table
+                return None
+            return row[0] if row else None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
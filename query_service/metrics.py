@@ -0,0 +1,299 @@
+import json
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from constants import METRICS_ENABLED, METRICS_LOG_SPANS, METRICS_NAMESPACE
+
+# Header carrying the trace id of a request; sent back on every response
+TRACE_HEADER = "X-Trace-Id"
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds, from a cache lookup to a cold LLM generation
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_TRACE_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+class MetricsException(Exception):
+    """Custom exception for metrics errors"""
+    pass
+
+_trace_id: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+def current_trace_id() -> Optional[str]:
+    """Trace id of the request being handled, if any"""
+    return _trace_id.get()
+
+def set_trace_id(trace_id: Optional[str]) -> Token:
+    """Make `trace_id` the current trace id; pass the returned token to reset_trace_id"""
+    return _trace_id.set(trace_id)
+
+def reset_trace_id(token: Token) -> None:
+    _trace_id.reset(token)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Iterable[tuple[str, str]]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in labels]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.labelnames) or any(name not in labels for name in self.labelnames):
+            raise MetricsException(f"Metric '{self.name}' takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def drain(self) -> dict:
+        """Values recorded since the last drain (see MetricsRegistry.drain)"""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+class Counter(_Metric):
+    """Monotonic count, optionally per label values"""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def merge(self, values: dict) -> None:
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0.0) + value
+
+    def lines(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(zip(self.labelnames, key))} {_format_value(value)}" for key, value in values.items()]
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, optionally per label values"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state is not None else 0
+
+    def merge(self, values: dict) -> None:
+        with self._lock:
+            for key, (counts, total, count) in values.items():
+                state = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+                state[0] = [a + b for a, b in zip(state[0], counts)]
+                state[1] += total
+                state[2] += count
+
+    def lines(self) -> list[str]:
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        lines = []
+        for key, (counts, total, count) in values.items():
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+class Sample(NamedTuple):
+    """One value reported by a collector: metric name (without namespace), type, help, labels and value"""
+    name: str
+    kind: str
+    help: str
+    labels: dict
+    value: float
+
+class MetricsRegistry:
+    """
+    Metrics of this process, rendered in the Prometheus text format on scrape.
+
+    Hot paths only update counters and histogram buckets in memory. Values
+    that components already keep (cache hits, queue depths...) are read by
+    collectors, which run only when /metrics is scraped.
+    """
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], Iterable[Sample]]] = []
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        full_name = f"{self.namespace}_{name}"
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = self._metrics[full_name] = cls(full_name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise MetricsException(f"Metric '{full_name}' is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labelnames, buckets)
+
+    def register_collector(self, collect: Callable[[], Iterable[Sample]]) -> None:
+        """Add a function called on every scrape, returning samples read from other components"""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def drain(self) -> dict:
+        """Take the values recorded since the last drain, e.g. in a worker process, to merge them elsewhere"""
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {name: values for name, metric in metrics.items() if (values := metric.drain())}
+
+    def merge(self, drained: dict) -> None:
+        """Add values drained from another registry with the same metrics"""
+        with self._lock:
+            metrics = dict(self._metrics)
+        for name, values in drained.items():
+            if name in metrics:
+                metrics[name].merge(values)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.lines())
+
+        collected: dict[str, list[Sample]] = {}
+        for collect in collectors:
+            try:
+                for sample in collect():
+                    collected.setdefault(sample.name, []).append(sample)
+            except Exception as e:
+                print(f"Warning: metrics collector failed: {str(e)}")
+        for name, samples in collected.items():
+            full_name = f"{self.namespace}_{name}"
+            lines.append(f"# HELP {full_name} {samples[0].help}")
+            lines.append(f"# TYPE {full_name} {samples[0].kind}")
+            lines.extend(
+                f"{full_name}{_format_labels(sorted(sample.labels.items()))} {_format_value(sample.value)}"
+                for sample in samples
+            )
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry(METRICS_NAMESPACE)
+STAGE_SECONDS = REGISTRY.histogram(
+    "stage_duration_seconds", "Time spent in each processing stage (a stage may include others)", ("stage",)
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to handle an HTTP request, until its response headers", ("method", "route", "status")
+)
+
+@contextmanager
+def span(stage: str):
+    """
+    Time a processing stage into the stage duration histogram. With
+    METRICS_LOG_SPANS, each span is also printed as a JSON line with the
+    current trace id.
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if METRICS_LOG_SPANS:
+            print(json.dumps({"trace_id": current_trace_id(), "stage": stage, "seconds": round(elapsed, 6)}))
+
+class TraceMiddleware:
+    """
+    ASGI middleware giving every HTTP request a trace id and timing it.
+
+    The id comes from the X-Trace-Id request header when it is valid (so a
+    client can follow one operation across both services) or is generated,
+    is current while the request is handled, and is returned in the response
+    headers. Requests are timed per route template to keep label values few.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = dict(scope.get("headers") or []).get(TRACE_HEADER.lower().encode("latin-1"), b"").decode("latin-1")
+        trace_id = header if _TRACE_ID.match(header) else new_trace_id()
+        start = time.perf_counter()
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers") or []) + [
+                    (TRACE_HEADER.lower().encode("latin-1"), trace_id.encode("latin-1"))
+                ]
+                if METRICS_ENABLED:
+                    route = scope.get("route")
+                    HTTP_REQUEST_SECONDS.observe(
+                        time.perf_counter() - start,
+                        method=scope["method"],
+                        route=getattr(route, "path", "unmatched"),
+                        status=status,
+                    )
+            await send(message)
+
+        token = set_trace_id(trace_id)
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        finally:
+            reset_trace_id(token)
@@ -0,0 +1,142 @@
+import threading
+import time
+from typing import Optional, Union
+
+from ollama import Client
+
+class ModelResidencyException(Exception):
+    """Custom exception for model residency errors"""
+    pass
+
+def parse_keep_alive(value: str) -> Union[int, str]:
+    """
+    Ollama keep_alive from its environment variable: a duration ("30m", "1h")
+    or a number of seconds ("-1" keeps the model loaded until Ollama stops,
+    "0" unloads it after every request).
+
+    Raises:
+        ModelResidencyException: If the value is empty
+    """
+    value = value.strip()
+    if not value:
+        raise ModelResidencyException("keep_alive must be a duration or a number of seconds")
+    try:
+        # Ollama only parses strings with a unit, so plain numbers are sent as numbers
+        return int(value)
+    except ValueError:
+        return value
+
+def _same_model(loaded: Optional[str], model: str) -> bool:
+    """Whether a model listed by /api/ps is `model` ("mistral" is listed as "mistral:latest")"""
+    return loaded is not None and (loaded == model or (":" not in model and loaded == f"{model}:latest"))
+
+class ModelKeeper:
+    """
+    Keeps the LLMs loaded in Ollama so no request waits for a cold load.
+
+    Ollama unloads a model `keep_alive` after its last request, and reloads it
+    if a request asks for another `num_ctx`; the next question then waits for
+    the weights to be read again and for the prompt to be evaluated without
+    its KV cache. The keeper loads every model once at startup and then pings
+    them periodically with an empty prompt (which loads a model without
+    generating), always with the keep_alive and num_ctx the generations use.
+
+    Models found unloaded by a ping (evicted, or Ollama restarted) are counted
+    as reloads.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        models: list[str],
+        keep_alive: Union[int, str],
+        num_ctx: int,
+        timeout: Optional[float] = None,
+    ):
+        if not models:
+            raise ModelResidencyException("At least one model must be kept loaded")
+        if num_ctx < 1:
+            raise ModelResidencyException("num_ctx must be positive")
+        self.models = list(models)
+        self.keep_alive = keep_alive
+        self.num_ctx = num_ctx
+        self.client = Client(host=base_url, timeout=timeout)
+
+        self._lock = threading.Lock()
+        self.pings = 0
+        self.failures = 0
+        self.reloads = 0
+        self._resident: dict[str, bool] = {model: False for model in self.models}
+        self._load_seconds: dict[str, float] = {model: 0.0 for model in self.models}
+        self._last_ping: dict[str, Optional[float]] = {model: None for model in self.models}
+
+    def load(self, model: str) -> float:
+        """
+        Load a model (or extend its keep_alive if it is loaded).
+
+        Returns:
+            float: Seconds Ollama spent loading it (0 when it was already loaded).
+
+        Raises:
+            ModelResidencyException: If Ollama cannot load the model
+        """
+        try:
+            response = self.client.generate(
+                model=model, prompt="", keep_alive=self.keep_alive, options={"num_ctx": self.num_ctx}
+            )
+        except Exception as e:
+            raise ModelResidencyException(f"Failed to load model '{model}': {str(e)}")
+        return (response.load_duration or 0) / 1e9
+
+    def _loaded_models(self) -> Optional[list[str]]:
+        try:
+            return [loaded.model for loaded in self.client.ps().models]
+        except Exception:
+            return None
+
+    def ping(self) -> None:
+        """Load every model that is not loaded and extend the keep_alive of the others; errors are counted, not raised"""
+        loaded = self._loaded_models()
+        for model in self.models:
+            was_resident = loaded is not None and any(_same_model(name, model) for name in loaded)
+            try:
+                load_seconds = self.load(model)
+                failed = False
+            except ModelResidencyException as e:
+                print(f"Warning: {str(e)}")
+                load_seconds, failed = 0.0, True
+            with self._lock:
+                self.pings += 1
+                if failed:
+                    self.failures += 1
+                    self._resident[model] = False
+                    continue
+                if loaded is not None and not was_resident and self._last_ping[model] is not None:
+                    self.reloads += 1
+                self._resident[model] = True
+                self._last_ping[model] = time.time()
+                if load_seconds:
+                    self._load_seconds[model] = load_seconds
+
+    def warm_up(self) -> None:
+        """Load every model before the first request (failures are not fatal: the router still answers with the others)"""
+        self.ping()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "keep_alive": str(self.keep_alive),
+                "num_ctx": self.num_ctx,
+                "pings": self.pings,
+                "failures": self.failures,
+                "reloads": self.reloads,
+                "models": [
+                    {
+                        "name": model,
+                        "resident": self._resident[model],
+                        "load_seconds": self._load_seconds[model],
+                        "last_ping": self._last_ping[model],
+                    }
+                    for model in self.models
+                ],
+            }
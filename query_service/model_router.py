@@ -0,0 +1,334 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import aclosing, closing, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, NamedTuple, Optional
+
+from langchain_core.language_models.llms import LLM
+from pydantic import ConfigDict
+
+from metrics import REGISTRY, span
+
+TOKENS_PER_SECOND = REGISTRY.histogram(
+    "llm_tokens_per_second", "Generation speed of each completed generation (streamed chunks per second)", ("model",),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200)
+)
+
+class ModelRouterException(Exception):
+    """Custom exception for model routing errors"""
+    pass
+
+class ModelTimeoutException(ModelRouterException):
+    """Raised when no model answered within the request timeout"""
+    pass
+
+class RoutedAnswer(NamedTuple):
+    """Generated text and the model that produced it"""
+    text: str
+    model: str
+    hedged: bool
+
+class ModelRoute:
+    """One model served by Ollama, with its recent generation latency and load"""
+
+    def __init__(self, name: str, llm: Any):
+        self.name = name
+        self.llm = llm
+        self.latency = 0.0
+        self.last_sample = 0.0
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.tokens = 0
+
+class RouteRequest:
+    """Per-request routing options (in) and outcome (out)"""
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self.model: Optional[str] = None
+        self.hedged = False
+
+_current_request: ContextVar[Optional[RouteRequest]] = ContextVar("route_request", default=None)
+
+@contextmanager
+def route_request(timeout: Optional[float] = None):
+    """
+    Scope the LLM calls made in this context (e.g. by a chain) to one request.
+
+    Yields:
+        RouteRequest: Filled with the model that answered once the call returns.
+    """
+    request = RouteRequest(timeout)
+    token = _current_request.set(request)
+    try:
+        yield request
+    finally:
+        _current_request.reset(token)
+
+class ModelRouter:
+    """
+    Latency-aware routing between a primary and an optional smaller fallback model.
+
+    Each model's generation latency is tracked as an exponential moving average,
+    and its expected latency is that average times the requests already in
+    flight plus one. A request goes to the fallback when the primary is expected
+    to miss the deadline and the fallback is expected to be faster. The primary
+    is probed again every `probe_interval` seconds so it can win traffic back
+    once it recovers.
+
+    With hedging enabled, a request still running on the primary after
+    `hedge_after` seconds (or failing) is raced against the fallback; the first
+    answer wins and the other generation is cancelled by closing its stream.
+    Every request is bounded by a timeout.
+
+    Generations run on at most `max_workers` threads, which bounds what reaches
+    Ollama even while cancelled generations wait for their next token to stop;
+    further attempts wait for a thread, and a hedge is only started when one
+    is free.
+    """
+
+    def __init__(
+        self,
+        primary: ModelRoute,
+        fallback: Optional[ModelRoute] = None,
+        deadline: float = 20.0,
+        hedge_after: Optional[float] = None,
+        timeout: float = 120.0,
+        probe_interval: float = 30.0,
+        smoothing: float = 0.2,
+        max_workers: int = 4,
+    ):
+        self.primary = primary
+        self.fallback = fallback
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.timeout = timeout
+        self.probe_interval = probe_interval
+        self.smoothing = smoothing
+        self.max_workers = max_workers
+        self.fallbacks = 0
+        self.hedges = 0
+        self.timeouts = 0
+        self.hedges_skipped = 0
+        # Generations submitted to the executor and not finished, running or waiting for a thread
+        self._attempts = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def routes(self) -> list[ModelRoute]:
+        """The primary model, then the fallback if there is one"""
+        return [self.primary] + ([self.fallback] if self.fallback is not None else [])
+
+    def is_fallback(self, model: Optional[str]) -> bool:
+        """Whether the answer came from the fallback model"""
+        return self.fallback is not None and model == self.fallback.name
+
+    def _estimate(self, route: ModelRoute) -> float:
+        return route.latency * (route.in_flight + 1)
+
+    def choose(self) -> ModelRoute:
+        """Model expected to answer a new request within the deadline"""
+        with self._lock:
+            if self.fallback is None:
+                return self.primary
+            now = time.monotonic()
+            if now - self.primary.last_sample >= self.probe_interval:
+                self.primary.last_sample = now
+                return self.primary
+            primary_estimate = self._estimate(self.primary)
+            if primary_estimate <= self.deadline or self._estimate(self.fallback) >= primary_estimate:
+                return self.primary
+            self.fallbacks += 1
+            return self.fallback
+
+    def _record(self, route: ModelRoute, elapsed: float, completed: bool, failed: bool, tokens: int) -> None:
+        if completed and elapsed > 0:
+            TOKENS_PER_SECOND.observe(tokens / elapsed, model=route.name)
+        with self._lock:
+            route.in_flight -= 1
+            route.calls += 1
+            route.tokens += tokens
+            if failed:
+                route.failures += 1
+                return
+            # A cancelled generation took at least `elapsed`: only let it raise the average
+            if completed or elapsed > route.latency:
+                route.latency = elapsed if route.latency == 0 else \
+                    (1 - self.smoothing) * route.latency + self.smoothing * elapsed
+                route.last_sample = time.monotonic()
+
+    def _generate(self, route: ModelRoute, prompt: str, cancel: threading.Event) -> Optional[str]:
+        try:
+            if cancel.is_set():
+                # Given up on while waiting for a thread: never reaches Ollama
+                return None
+            return self._stream(route, prompt, cancel)
+        finally:
+            with self._lock:
+                self._attempts -= 1
+
+    def _stream(self, route: ModelRoute, prompt: str, cancel: threading.Event) -> Optional[str]:
+        with self._lock:
+            route.in_flight += 1
+        start = time.monotonic()
+        completed = failed = False
+        parts = []
+        try:
+            # Leaving the stream early closes the HTTP request, which stops the generation in Ollama
+            with closing(route.llm.stream(prompt)) as chunks:
+                for chunk in chunks:
+                    if cancel.is_set():
+                        return None
+                    parts.append(chunk)
+            completed = True
+            return "".join(parts)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            # The closing chunk of a stream carries no text
+            self._record(route, time.monotonic() - start, completed, failed, sum(1 for part in parts if part))
+
+    def _start(self, attempts: dict, route: ModelRoute, prompt: str) -> None:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="model-router")
+        with self._lock:
+            self._attempts += 1
+        cancel = threading.Event()
+        future = self._executor.submit(self._generate, route, prompt, cancel)
+        attempts[future] = (route, cancel)
+
+    def invoke(self, prompt: str) -> RoutedAnswer:
+        """
+        Generate a completion, routing and hedging as configured.
+
+        The timeout of the enclosing route_request() applies when set, otherwise
+        the router's default one.
+
+        Returns:
+            RoutedAnswer: The text and the model that produced it.
+
+        Raises:
+            ModelTimeoutException: If no model answered within the timeout
+            ModelRouterException: If every model that was tried failed
+        """
+        with span("llm_generation"):
+            return self._invoke(prompt)
+
+    def _invoke(self, prompt: str) -> RoutedAnswer:
+        request = _current_request.get()
+        timeout = request.timeout if request is not None and request.timeout else self.timeout
+        route = self.choose()
+        started = time.monotonic()
+        deadline = started + timeout
+        can_hedge = self.fallback is not None and route is self.primary and self.hedge_after is not None
+        hedge_at = started + self.hedge_after if can_hedge else None
+        hedged = False
+
+        attempts: dict[Future, tuple[ModelRoute, threading.Event]] = {}
+        self._start(attempts, route, prompt)
+        last_error: Optional[Exception] = None
+        try:
+            while True:
+                wake = min(deadline, hedge_at) if hedge_at is not None else deadline
+                done, _ = wait(list(attempts), timeout=max(0.0, wake - time.monotonic()), return_when=FIRST_COMPLETED)
+                for future in done:
+                    attempt_route, _ = attempts.pop(future)
+                    try:
+                        text = future.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    answer = RoutedAnswer(text, attempt_route.name, hedged)
+                    if request is not None:
+                        request.model = answer.model
+                        request.hedged = answer.hedged
+                    return answer
+
+                if hedge_at is not None and (not attempts or time.monotonic() >= hedge_at):
+                    hedge_at = None
+                    with self._lock:
+                        # Only race when a thread is free, so hedges do not add load on a saturated Ollama
+                        can_start = not attempts or self._attempts < self.max_workers
+                        if can_start:
+                            self.hedges += 1
+                        else:
+                            self.hedges_skipped += 1
+                    if can_start:
+                        # The primary is slow or failed: race the fallback
+                        hedged = True
+                        self._start(attempts, self.fallback, prompt)
+                    continue
+                if not attempts:
+                    raise ModelRouterException(f"Generation failed: {str(last_error)}")
+                if time.monotonic() >= deadline:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise ModelTimeoutException(f"No model answered within {timeout:g}s")
+        finally:
+            for _, cancel in attempts.values():
+                cancel.set()
+
+    async def astream(self, route: ModelRoute, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream a completion from the given route (see choose()), tracking its
+        latency. Streams are not hedged: tokens already sent cannot be taken back.
+        """
+        with self._lock:
+            route.in_flight += 1
+        start = time.monotonic()
+        completed = failed = False
+        count = 0
+        try:
+            with span("llm_generation"):
+                async with aclosing(route.llm.astream(prompt)) as tokens:
+                    async for token in tokens:
+                        if token:
+                            count += 1
+                        yield token
+            completed = True
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._record(route, time.monotonic() - start, completed, failed, count)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "deadline_seconds": self.deadline,
+                "hedge_after_seconds": self.hedge_after,
+                "fallbacks": self.fallbacks,
+                "hedges": self.hedges,
+                "hedges_skipped": self.hedges_skipped,
+                "timeouts": self.timeouts,
+                "models": [
+                    {
+                        "name": route.name,
+                        "role": "primary" if route is self.primary else "fallback",
+                        "latency_seconds": route.latency,
+                        "in_flight": route.in_flight,
+                        "calls": route.calls,
+                        "failures": route.failures,
+                        "tokens": route.tokens,
+                    }
+                    for route in self.routes()
+                ],
+            }
+
+class RoutedLLM(LLM):
+    """LangChain LLM delegating every call to a ModelRouter, so chains can use it unchanged"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    router: ModelRouter
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed-ollama"
+
+    def _call(self, prompt: str, stop: Optional[list[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        return self.router.invoke(prompt).text
@@ -1,16 +1,86 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, StringConstraints
+from typing import Annotated, AsyncIterator, Iterator, NamedTuple, Optional
+from contextlib import aclosing, contextmanager
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
 from langchain_ollama.llms import OllamaLLM
 from langchain.prompts import PromptTemplate
 from langchain.chains import RetrievalQA
+from langchain_core.documents import Document
+import threading
 
-from constants import CHROMA_DB_PERSIST_DIRECTORY
+from answer_cache import AnswerCache, normalize_question
+from generation import GenerationMarker
+from semantic_cache import SemanticCache, RecentQueryEmbeddings
+from embedding_batcher import EmbeddingBatcher
+from snapshot_index import SnapshotIndex, SnapshotRetriever, SnapshotStore
+from chroma_client import get_chroma_client, max_batch_size, query_by_vectors
+from context_compressor import ContextCompressor
+from embedding_backend import embedding_model_id, embeddings_kwargs
+from executor import run_blocking
+from metrics import span
+from model_router import ModelRoute, ModelRouter, ModelTimeoutException, RoutedLLM, route_request
+from model_residency import ModelKeeper, parse_keep_alive
+from constants import (
+    CHROMA_COLLECTION_NAME,
+    GENERATION_DB_PATH,
+    SNAPSHOT_ENABLED,
+    SNAPSHOT_DIR,
+    QUERY_EMBEDDING_MAX_BATCH_SIZE,
+    QUERY_EMBEDDING_BATCH_WAIT_MS,
+    OLLAMA_BASE_URL,
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_NUM_CTX,
+    LLM_PRIMARY_MODEL,
+    LLM_FALLBACK_MODEL,
+    LLM_DEADLINE_SECONDS,
+    LLM_HEDGE_AFTER_SECONDS,
+    LLM_TIMEOUT_SECONDS,
+    LLM_PROBE_INTERVAL_SECONDS,
+    LLM_MAX_CONCURRENCY,
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_MAX_ENTRIES,
+    CONTEXT_COMPRESSION_ENABLED,
+    CONTEXT_MAX_TOKENS,
+    CONTEXT_DUPLICATE_THRESHOLD,
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_TTL_SECONDS,
+    SEMANTIC_CACHE_MAX_MB,
+    QUERY_BATCH_MAX_QUESTIONS,
+    RETRIEVE_MAX_K,
+)
+
+# Characters of each retrieved chunk sent ahead of a streamed answer
+CONTEXT_PREVIEW_CHARS = 200
+
+# Instructions shared by every prompt. They come first and never change, byte for
+# byte, so Ollama reuses their KV cache and only evaluates the context and question
+PROMPT_INSTRUCTIONS = (
+    "Responda a pergunta em português e com base no contexto fornecido.\n"
+    "Se não souber, não invente.\n"
+    "\n"
+    "Por favor, traga o contexto que lhe foi oferecido também.\n"
+    "\n"
+)
+PROMPT_TEMPLATE = PROMPT_INSTRUCTIONS + "Contexto: {context}\nPergunta: {question}"
 
 class RAGException(Exception):
     """Custom exception for RAG system errors"""
     pass
 
+class CacheLookup(NamedTuple):
+    """Outcome of looking a question up in the answer caches"""
+    generation: int
+    question_vector: Optional[list[float]]
+    answer: Optional[str] = None
+
+class StreamEvent(NamedTuple):
+    """One event of a streamed answer: context, token, done or error"""
+    event: str
+    data: dict
+
 class QueryResponse(BaseModel):
     """Response model for RAG queries"""
     answer: str = Field(
@@ -18,6 +88,11 @@ class QueryResponse(BaseModel):
         description="The answer generated by the RAG system",
         example="A Hotmart é uma plataforma que permite a criação e venda de produtos digitais."
     )
+    model: Optional[str] = Field(
+        None,
+        description="The model that generated the answer (absent when it came from a cache)",
+        example="mistral"
+    )
 
 class QueryRequest(BaseModel):
     """Request model for RAG queries"""
@@ -28,73 +103,548 @@ class QueryRequest(BaseModel):
         description="The question to be answered by the RAG system",
         example="Como funciona a Hotmart?"
     )
+    timeout_seconds: Optional[float] = Field(
+        None,
+        gt=0,
+        le=600,
+        description="Maximum time to wait for the LLM; defaults to LLM_TIMEOUT_SECONDS",
+        example=30
+    )
+
+class RetrieveRequest(BaseModel):
+    """Request model for retrieval-only queries"""
+    question: str = Field(
+        ...,
+        min_length=1,
+        max_length=500,
+        description="The question to retrieve relevant chunks for",
+        example="Como funciona a Hotmart?"
+    )
+    k: Optional[int] = Field(
+        None,
+        ge=1,
+        le=RETRIEVE_MAX_K,
+        description="Number of chunks to return; defaults to the k used to answer questions",
+        example=4
+    )
+
+class RetrievedChunk(BaseModel):
+    """A stored chunk relevant to a question"""
+    content: str = Field(..., description="Text of the chunk")
+    score: float = Field(..., description="Distance to the question in the vector store (lower is more similar)")
+    metadata: dict = Field(default_factory=dict, description="Metadata stored with the chunk (source, ...)")
+
+class RetrieveResponse(BaseModel):
+    """Response model for retrieval-only queries"""
+    chunks: list[RetrievedChunk] = Field(..., description="The most similar chunks, most similar first")
+
+# Same limits as QueryRequest.question
+BatchQuestion = Annotated[str, StringConstraints(min_length=1, max_length=500)]
+
+class QueryBatchRequest(BaseModel):
+    """Request model for answering many questions in one call"""
+    questions: list[BatchQuestion] = Field(
+        ...,
+        min_length=1,
+        max_length=QUERY_BATCH_MAX_QUESTIONS,
+        description="The questions to be answered",
+        example=["Como funciona a Hotmart?", "Como me tornar afiliado?"]
+    )
+    timeout_seconds: Optional[float] = Field(
+        None,
+        gt=0,
+        le=600,
+        description="Maximum time to wait for the LLM on each question; defaults to LLM_TIMEOUT_SECONDS",
+        example=60
+    )
+
+class QueryBatchItem(BaseModel):
+    """Outcome of one question of a batch"""
+    question: str = Field(..., description="The question, as sent")
+    answer: Optional[str] = Field(None, description="The answer, absent if this question failed")
+    model: Optional[str] = Field(None, description="The model that generated the answer (absent when it came from a cache)")
+    error: Optional[str] = Field(None, description="Why this question could not be answered")
+
+class QueryBatchResponse(BaseModel):
+    """Response model for batched queries"""
+    results: list[QueryBatchItem] = Field(..., description="One result per question, in request order")
 
 class HotmartRAGSystem:
     def __init__(self):
         """Initialize the RAG system with necessary components"""
         try:
-            self.llm = OllamaLLM(base_url="http://ollama:11434", model="mistral", temperature=0.3)
-            self.embeddings = HuggingFaceEmbeddings(model_name="intfloat/multilingual-e5-small")
+            self.llm_model = LLM_PRIMARY_MODEL
+            self.llm_temperature = 0.3
+            self.keep_alive = parse_keep_alive(OLLAMA_KEEP_ALIVE)
+            # Requests go to a smaller model when the primary would miss the latency deadline
+            self.router = ModelRouter(
+                primary=self._model_route(LLM_PRIMARY_MODEL),
+                fallback=self._model_route(LLM_FALLBACK_MODEL) if LLM_FALLBACK_MODEL else None,
+                deadline=LLM_DEADLINE_SECONDS,
+                hedge_after=LLM_HEDGE_AFTER_SECONDS or None,
+                timeout=LLM_TIMEOUT_SECONDS,
+                probe_interval=LLM_PROBE_INTERVAL_SECONDS,
+                # One generation per admitted request, plus one hedge each when hedging is enabled
+                max_workers=LLM_MAX_CONCURRENCY * (2 if LLM_HEDGE_AFTER_SECONDS else 1),
+            )
+            self.llm = RoutedLLM(router=self.router)
+            # Loads the models at startup and keeps them loaded between requests (see ModelKeeper)
+            self.model_keeper = ModelKeeper(
+                OLLAMA_BASE_URL,
+                [route.name for route in self.router.routes()],
+                keep_alive=self.keep_alive,
+                num_ctx=OLLAMA_NUM_CTX,
+                timeout=LLM_TIMEOUT_SECONDS,
+            )
+            # Must be the backend the ingest service embeds with (see check_embedding_model)
+            self.embedding_model = embedding_model_id()
+            self.embeddings = HuggingFaceEmbeddings(**embeddings_kwargs())
             
+            # Questions of concurrent requests are embedded together in one forward pass
+            self.embedding_batcher = EmbeddingBatcher(
+                self.embeddings,
+                max_batch_size=QUERY_EMBEDDING_MAX_BATCH_SIZE,
+                max_wait=QUERY_EMBEDDING_BATCH_WAIT_MS / 1000,
+            ) if QUERY_EMBEDDING_MAX_BATCH_SIZE > 1 else None
+            # The retriever reuses the question vector computed for the semantic cache lookup
+            self.query_embeddings = RecentQueryEmbeddings(self.embedding_batcher or self.embeddings)
+            # Embedded Chroma files or the remote Chroma server, through one long-lived client
+            self.chroma_client = get_chroma_client()
             self.vector_store = Chroma(
-                persist_directory=CHROMA_DB_PERSIST_DIRECTORY,
-                embedding_function=self.embeddings,
+                client=self.chroma_client,
+                collection_name=CHROMA_COLLECTION_NAME,
+                embedding_function=self.query_embeddings,
             )
             
-            self.retriever = self.vector_store.as_retriever(
-                search_kwargs={"k": 4},
-                search_type="similarity"
+            self.search_type = "similarity"
+            self.search_k = 4
+            self.chroma_retriever = self.vector_store.as_retriever(
+                search_kwargs={"k": self.search_k},
+                search_type=self.search_type
             )
+            # Searches go to the ingest service's memory-mapped snapshot while it matches the store
+            self.snapshots = SnapshotStore(SNAPSHOT_DIR) if SNAPSHOT_ENABLED else None
+            self.snapshot_searches = 0
+            self.chroma_searches = 0
+            # Overlapping chunks are merged and the context budgeted before it reaches the prompt
+            self.context_compressor = ContextCompressor(
+                max_tokens=CONTEXT_MAX_TOKENS,
+                duplicate_threshold=CONTEXT_DUPLICATE_THRESHOLD,
+            ) if CONTEXT_COMPRESSION_ENABLED else None
+            self.retriever = SnapshotRetriever(search=self._retrieve_documents)
             
-            self.prompt_template = """Responda a pergunta em português e com base no contexto fornecido.
-                Se não souber, não invente.
+            self.prompt_template = PROMPT_TEMPLATE
 
-                Por favor, traga o contexto que lhe foi oferecido também.
+            # The chain holds no per-request state, so it is built once and shared across requests
+            self.prompt = PromptTemplate(
+                template=self.prompt_template,
+                input_variables=["context", "question"]
+            )
+            self.qa_chain = RetrievalQA.from_chain_type(
+                llm=self.llm,
+                chain_type="stuff",
+                retriever=self.retriever,
+                chain_type_kwargs={"prompt": self.prompt}
+            )
+            
+            # Everything besides the question that shapes an answer is part of the cache key
+            self.cache_settings = (
+                self.search_type, self.search_k, self.llm_model, self.llm_temperature,
+                self.context_compressor.settings if self.context_compressor is not None else None
+            )
+            self.answer_cache = AnswerCache(ANSWER_CACHE_MAX_ENTRIES) if ANSWER_CACHE_ENABLED else None
+            self.semantic_cache = SemanticCache(
+                threshold=SEMANTIC_CACHE_THRESHOLD,
+                max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+                ttl_seconds=SEMANTIC_CACHE_TTL_SECONDS,
+                max_bytes=SEMANTIC_CACHE_MAX_MB * 1024 * 1024,
+            ) if SEMANTIC_CACHE_ENABLED else None
 
-                Contexto: {context}
-                Pergunta: {question}"""
+            # Cached answers are only valid for the vector store generation they were computed at
+            self.generation_marker = GenerationMarker(GENERATION_DB_PATH)
+            self.generation = self.generation_marker.read()
+            self.invalidations = 0
+            self._generation_lock = threading.Lock()
+            self.check_embedding_model()
         except Exception as e:
             raise RAGException(f"Failed to initialize RAG system: {str(e)}")
+
+    def _model_route(self, model: str) -> ModelRoute:
+        # Every request carries the same num_ctx and keep_alive: a different num_ctx makes Ollama
+        # reload the model, and a context too small for the prompt drops its (cached) beginning
+        return ModelRoute(model, OllamaLLM(
+            base_url=OLLAMA_BASE_URL,
+            model=model,
+            temperature=self.llm_temperature,
+            num_ctx=OLLAMA_NUM_CTX,
+            keep_alive=self.keep_alive,
+        ))
+
+    def warm_up(self) -> None:
+        """
+        Run a dummy embedding and load the LLMs in Ollama so model weights are
+        loaded before the first request. An LLM that cannot be loaded is only
+        reported: Ollama may still be starting, and the keep-alive pings retry.
+        
+        Raises:
+            RAGException: If the embeddings model cannot be run
+        """
+        try:
+            self.embeddings.embed_query("warm-up")
+        except Exception as e:
+            raise RAGException(f"Failed to warm up RAG system: {str(e)}")
+        self.model_keeper.warm_up()
+
+    def check_embedding_model(self) -> None:
+        """
+        Make sure questions are embedded like the stored chunks were.
+        
+        Raises:
+            RAGException: If the ingest service wrote the vector store with another model or backend
+        """
+        stored = self.generation_marker.embedding_model()
+        if stored is not None and stored != self.embedding_model:
+            raise RAGException(
+                f"Vector store was written with '{stored}' but questions are embedded with "
+                f"'{self.embedding_model}'; set the same EMBEDDING_BACKEND on both services"
+            )
     
-    def generate_response(self, question: str) -> dict:
+    def sync_generation(self) -> int:
+        """
+        Compare the vector store generation with the one the caches were filled
+        at, dropping every cached answer when new content was ingested.
+        
+        Returns:
+            int: The current generation.
+        """
+        with self._generation_lock:
+            generation = self.generation_marker.read()
+            if generation != self.generation:
+                self.check_embedding_model()
+                self.generation = generation
+                self.invalidations += 1
+                if self.answer_cache is not None:
+                    self.answer_cache.clear()
+                if self.semantic_cache is not None:
+                    self.semantic_cache.clear()
+        return generation
+
+    def _cache_answer(self, question: str, question_vector, answer: str, generation: int, model: Optional[str]) -> None:
+        # Answers of the fallback model are served once, not kept in place of the primary's
+        if self.router.is_fallback(model):
+            return
+        with self._generation_lock:
+            # Content changed while generating: the answer may already be stale
+            if generation != self.generation:
+                return
+            if self.answer_cache is not None:
+                self.answer_cache.put(question, self.cache_settings, answer)
+            if self.semantic_cache is not None and question_vector is not None:
+                self.semantic_cache.put(question, question_vector, answer)
+
+    def lookup_cached_answer(self, question: str, question_vector: Optional[list[float]] = None) -> CacheLookup:
+        """
+        Look the question up in the exact-match cache, then in the semantic cache.
+        
+        Args:
+            question (str): The question asked
+            question_vector (list[float], optional): Its embedding, if already computed
+        
+        Returns:
+            CacheLookup: The generation the lookup was made at, the question vector
+            (when given or needed by the semantic cache) and the cached answer, if any.
+        """
+        generation = self.sync_generation()
+        if self.answer_cache is not None:
+            answer = self.answer_cache.get(question, self.cache_settings)
+            if answer is not None:
+                return CacheLookup(generation, question_vector, answer)
+
+        if self.semantic_cache is not None:
+            if question_vector is None:
+                question_vector = self.query_embeddings.embed_query(question)
+            hit = self.semantic_cache.lookup(question_vector)
+            if hit is not None:
+                return CacheLookup(generation, question_vector, hit.answer)
+        return CacheLookup(generation, question_vector)
+
+    def request_key(self, question: str) -> tuple:
+        """Key identifying requests that would produce the same answer"""
+        return (normalize_question(question), self.cache_settings)
+
+    def _reuse_lookup(self, question: str, lookup: Optional[CacheLookup]) -> CacheLookup:
+        if lookup is None:
+            return self.lookup_cached_answer(question)
+        # The lookup may have run in another worker thread: hand its vector to the retriever
+        if lookup.question_vector is not None:
+            self.query_embeddings.remember(question, lookup.question_vector)
+        return lookup
+
+    @contextmanager
+    def usable_snapshot(self) -> Iterator[Optional[SnapshotIndex]]:
+        """
+        The published snapshot, if it holds the current generation of the store
+        and our embedding model (None otherwise), kept open until the block ends.
+        """
+        if self.snapshots is None:
+            yield None
+            return
+        with self.snapshots.use() as snapshot:
+            if snapshot is not None and snapshot.embedding_model != self.embedding_model:
+                snapshot = None
+            # A snapshot behind the store would miss content that invalidated the caches
+            if snapshot is not None and snapshot.generation != self.generation_marker.read():
+                snapshot = None
+            yield snapshot
+
+    def snapshot_in_use(self) -> bool:
+        """Whether searches are currently served by the snapshot"""
+        with self.usable_snapshot() as snapshot:
+            return snapshot is not None
+
+    def _search(self, question_vector: list[float], k: Optional[int]) -> list[tuple[Document, float]]:
+        with self.usable_snapshot() as snapshot, span("vector_search"):
+            if snapshot is not None:
+                self.snapshot_searches += 1
+                return snapshot.search(question_vector, k or self.search_k)
+            self.chroma_searches += 1
+            return self.vector_store.similarity_search_by_vector_with_relevance_scores(question_vector, k=k or self.search_k)
+
+    def _search_many(self, question_vectors: list[list[float]], k: int) -> list[list[tuple[Document, float]]]:
+        if not question_vectors:
+            return []
+        with self.usable_snapshot() as snapshot, span("vector_search"):
+            if snapshot is not None:
+                self.snapshot_searches += len(question_vectors)
+                return [snapshot.search(vector, k) for vector in question_vectors]
+            self.chroma_searches += len(question_vectors)
+            # One query call for the whole batch (one round trip to a remote server)
+            return query_by_vectors(
+                self.vector_store._collection, question_vectors, k, max_batch_size(self.chroma_client)
+            )
+
+    def _compress(self, documents: list[Document]) -> list[Document]:
+        if self.context_compressor is None:
+            return documents
+        with span("compress_context"):
+            return self.context_compressor.compress(documents).documents
+
+    def _retrieve_documents(self, question: str) -> list[Document]:
+        with self.usable_snapshot() as snapshot:
+            if snapshot is not None:
+                question_vector = self.query_embeddings.embed_query(question)
+                with span("vector_search"):
+                    self.snapshot_searches += 1
+                    documents = [document for document, _ in snapshot.search(question_vector, self.search_k)]
+            else:
+                # Includes embedding the question, unless the cache lookup already did
+                with span("vector_search"):
+                    self.chroma_searches += 1
+                    documents = self.chroma_retriever.invoke(question)
+        return self._compress(documents)
+
+    def retrieve(self, question: str, k: Optional[int] = None) -> list[tuple[Document, float]]:
+        """
+        Retrieve the chunks most similar to the question, without generating an answer.
+        
+        Args:
+            question (str): The question to retrieve chunks for
+            k (int, optional): Number of chunks; defaults to the k used to answer questions
+            
+        Returns:
+            list[tuple[Document, float]]: Chunks and their distance to the question, closest first
+            
+        Raises:
+            RAGException: If embedding or the vector search fails
+        """
+        try:
+            return self._search(self.query_embeddings.embed_query(question), k)
+        except Exception as e:
+            raise RAGException(f"Error retrieving chunks: {str(e)}")
+
+    def prepare_batch(self, questions: list[str]) -> list[tuple[CacheLookup, list[Document]]]:
+        """
+        Embed every distinct question in one forward pass, look each one up in
+        the caches, then search the vector store for all misses in one call.
+        
+        Args:
+            questions (list[str]): The questions of the batch
+            
+        Returns:
+            list[tuple[CacheLookup, list[Document]]]: For each question, in order,
+            its cache lookup and the retrieved chunks (empty when cached).
+            
+        Raises:
+            RAGException: If embedding or a vector search fails
+        """
+        try:
+            distinct = list(dict.fromkeys(questions))
+            vectors = dict(zip(distinct, self.embeddings.embed_documents(distinct)))
+            lookups = {question: self.lookup_cached_answer(question, vectors[question]) for question in distinct}
+            misses = [question for question in distinct if lookups[question].answer is None]
+            results = self._search_many([lookups[question].question_vector for question in misses], self.search_k)
+            documents = {
+                question: self._compress([document for document, _ in result])
+                for question, result in zip(misses, results)
+            }
+            return [(lookups[question], documents.get(question, [])) for question in questions]
+        except RAGException:
+            raise
+        except Exception as e:
+            raise RAGException(f"Error preparing batch: {str(e)}")
+
+    def _prompt_for(self, question: str, documents: list[Document]) -> str:
+        # Same layout as the "stuff" chain: chunk contents separated by blank lines
+        return self.prompt.format(
+            context="\n\n".join(document.page_content for document in documents),
+            question=question
+        )
+
+    def generate_from_documents(
+        self,
+        question: str,
+        lookup: CacheLookup,
+        documents: list[Document],
+        timeout_seconds: Optional[float] = None
+    ) -> dict:
+        """
+        Generate an answer from chunks already retrieved (see prepare_batch).
+        
+        Returns:
+            dict: Contains the generated answer and the model that generated it
+            
+        Raises:
+            ModelTimeoutException: If no model answered within the timeout
+            RAGException: If generation fails
+        """
+        try:
+            with route_request(timeout_seconds) as routing:
+                answer = self.llm.invoke(self._prompt_for(question, documents))
+            if not answer:
+                raise RAGException("No valid response generated")
+            self._cache_answer(question, lookup.question_vector, answer, lookup.generation, routing.model)
+            return {"answer": answer, "model": routing.model}
+        except (RAGException, ModelTimeoutException):
+            raise
+        except Exception as e:
+            raise RAGException(f"Error generating response: {str(e)}")
+
+    def prepare_stream(self, question: str, lookup: Optional[CacheLookup] = None) -> tuple[CacheLookup, list[Document]]:
+        """Cache lookup (unless given) and, on a miss, retrieval, embedding the question once"""
+        lookup = self._reuse_lookup(question, lookup)
+        if lookup.answer is not None:
+            return lookup, []
+        return lookup, self.retriever.invoke(question)
+
+    async def stream_response(self, question: str, lookup: Optional[CacheLookup] = None) -> AsyncIterator[StreamEvent]:
+        """
+        Stream a response: a context event describing the retrieved chunks, one
+        token event per piece of text generated by the LLM, and a done event
+        with the full answer.
+        
+        Closing the iterator (e.g. when the client disconnects) closes the LLM
+        stream, which cancels the generation in Ollama. Only answers streamed to
+        completion are cached.
+        
+        Args:
+            question (str): The question to be answered
+            lookup (CacheLookup, optional): Result of lookup_cached_answer, if already done
+            
+        Yields:
+            StreamEvent: The events of the answer, in order
+            
+        Raises:
+            RAGException: If retrieval or generation fails
+        """
+        if not question or not isinstance(question, str):
+            raise RAGException("Invalid question format")
+        try:
+            lookup, documents = await run_blocking(self.prepare_stream, question, lookup)
+            if lookup.answer is not None:
+                yield StreamEvent("context", {"cached": True, "documents": []})
+                yield StreamEvent("token", {"text": lookup.answer})
+                yield StreamEvent("done", {"answer": lookup.answer, "cached": True})
+                return
+
+            route = self.router.choose()
+            yield StreamEvent("context", {
+                "cached": False,
+                "model": route.name,
+                "documents": [
+                    {"source": document.metadata.get("source"), "preview": document.page_content[:CONTEXT_PREVIEW_CHARS]}
+                    for document in documents
+                ]
+            })
+
+            prompt = self._prompt_for(question, documents)
+            parts = []
+            async with aclosing(self.router.astream(route, prompt)) as tokens:
+                async for token in tokens:
+                    parts.append(token)
+                    yield StreamEvent("token", {"text": token})
+
+            answer = "".join(parts)
+            if not answer:
+                raise RAGException("No valid response generated")
+            self._cache_answer(question, lookup.question_vector, answer, lookup.generation, route.name)
+            yield StreamEvent("done", {"answer": answer, "cached": False, "model": route.name})
+        except RAGException:
+            raise
+        except Exception as e:
+            raise RAGException(f"Error generating response: {str(e)}")
+
+    def generate_response(
+        self,
+        question: str,
+        lookup: Optional[CacheLookup] = None,
+        timeout_seconds: Optional[float] = None
+    ) -> dict:
         """
         Generate a response using the RAG system
         
+        Repeated questions are served from the exact-match answer cache, and
+        questions similar enough to a previously answered one from the semantic
+        cache, both without retrieval or generation. Both caches are dropped
+        whenever the ingest service writes to the vector store.
+        
+        Generation goes through the model router, which may answer with the
+        fallback model to meet the latency deadline.
+        
         Args:
             question (str): The question to be answered
+            lookup (CacheLookup, optional): Result of lookup_cached_answer, if already done
+            timeout_seconds (float, optional): Generation timeout for this request
             
         Returns:
-            dict: Contains the generated answer
+            dict: Contains the generated answer and the model that generated it
+            (absent for cached answers)
             
         Raises:
+            ModelTimeoutException: If no model answered within the timeout
             RAGException: If there's an error during response generation
         """
         try:
             if not question or not isinstance(question, str):
                 raise RAGException("Invalid question format")
 
-            prompt = PromptTemplate(
-                template=self.prompt_template, 
-                input_variables=["context", "question"]
-            )
-            
-            qa_chain = RetrievalQA.from_chain_type(
-                llm=self.llm,
-                chain_type="stuff",
-                retriever=self.retriever,
-                chain_type_kwargs={"prompt": prompt}
-            )
-            
-            result = qa_chain.invoke({"query": question})
+            lookup = self._reuse_lookup(question, lookup)
+            if lookup.answer is not None:
+                return {"answer": lookup.answer}
+
+            with route_request(timeout_seconds) as routing:
+                result = self.qa_chain.invoke({"query": question})
             
             if not result or "result" not in result:
                 raise RAGException("No valid response generated")
+            
+            self._cache_answer(question, lookup.question_vector, result["result"], lookup.generation, routing.model)
                 
             return {
-                "answer": result["result"]
+                "answer": result["result"],
+                "model": routing.model
             }
             
-        except RAGException:
+        except (RAGException, ModelTimeoutException):
             raise
         except Exception as e:
             raise RAGException(f"Error generating response: {str(e)}")
\ No newline at end of file
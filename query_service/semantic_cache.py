@@ -0,0 +1,184 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from metrics import span
+
+class SemanticCacheException(Exception):
+    """Custom exception for semantic cache errors"""
+    pass
+
+class CacheHit(NamedTuple):
+    """A cached answer for a question similar to the one asked"""
+    question: str
+    answer: str
+    similarity: float
+
+class _Entry(NamedTuple):
+    question: str
+    answer: str
+    size: int
+
+class SemanticCache:
+    """
+    Answer cache keyed by question embeddings.
+
+    Question vectors are kept L2-normalized in one preallocated NumPy matrix,
+    so a lookup is a single matrix-vector product followed by an argmax. An
+    answer is reused when the cosine similarity of the best match reaches the
+    threshold. Entries expire after a TTL and the least recently used ones are
+    evicted to stay within both an entry count and a memory budget (vectors
+    plus question and answer text).
+    """
+
+    def __init__(self, threshold: float, max_entries: int, ttl_seconds: float, max_bytes: int):
+        if not 0 < threshold <= 1:
+            raise SemanticCacheException("Similarity threshold must be in (0, 1]")
+        if max_entries < 1:
+            raise SemanticCacheException("Semantic cache needs room for at least one entry")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._valid: Optional[np.ndarray] = None
+        self._created: Optional[np.ndarray] = None
+        self._free: list[int] = []
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self.capacity = 0
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _allocate(self, dim: int) -> None:
+        vector_bytes = dim * np.dtype(np.float32).itemsize
+        self.capacity = max(min(self.max_entries, self.max_bytes // vector_bytes), 1)
+        self._matrix = np.zeros((self.capacity, dim), dtype=np.float32)
+        self._valid = np.zeros(self.capacity, dtype=bool)
+        self._created = np.zeros(self.capacity, dtype=np.float64)
+        self._free = list(range(self.capacity - 1, -1, -1))
+        self._entries.clear()
+        self.bytes_used = 0
+
+    @staticmethod
+    def _normalize(vector: list[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm > 0 else array
+
+    def _remove(self, slot: int) -> None:
+        entry = self._entries.pop(slot)
+        self.bytes_used -= entry.size
+        self._valid[slot] = False
+        self._free.append(slot)
+
+    def _expire(self, now: float) -> None:
+        expired = np.flatnonzero(self._valid & (now - self._created > self.ttl_seconds))
+        for slot in expired:
+            self._remove(int(slot))
+        self.expirations += len(expired)
+
+    def lookup(self, vector: list[float]) -> Optional[CacheHit]:
+        """
+        Find the cached answer of the most similar question.
+
+        Args:
+            vector (list[float]): Embedding of the incoming question.
+
+        Returns:
+            Optional[CacheHit]: The best match if it reaches the threshold, None otherwise.
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            if self._matrix is not None and self._entries and query.shape[0] == self._matrix.shape[1]:
+                self._expire(time.monotonic())
+                if self._entries:
+                    scores = self._matrix @ query
+                    scores[~self._valid] = -np.inf
+                    slot = int(np.argmax(scores))
+                    similarity = float(scores[slot])
+                    if similarity >= self.threshold:
+                        self._entries.move_to_end(slot)
+                        self.hits += 1
+                        entry = self._entries[slot]
+                        return CacheHit(entry.question, entry.answer, similarity)
+            self.misses += 1
+            return None
+
+    def put(self, question: str, vector: list[float], answer: str) -> None:
+        """Cache an answer, evicting expired and least recently used entries as needed"""
+        normalized = self._normalize(vector)
+        size = normalized.nbytes + len(question.encode("utf-8")) + len(answer.encode("utf-8"))
+        with self._lock:
+            if self._matrix is None or normalized.shape[0] != self._matrix.shape[1]:
+                self._allocate(normalized.shape[0])
+            if size > self.max_bytes:
+                return
+            self._expire(time.monotonic())
+            while self._entries and (not self._free or self.bytes_used + size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+            slot = self._free.pop()
+            self._matrix[slot] = normalized
+            self._valid[slot] = True
+            self._created[slot] = time.monotonic()
+            self._entries[slot] = _Entry(question, answer, size)
+            self.bytes_used += size
+
+    def clear(self) -> None:
+        """Drop every entry, keeping the statistics"""
+        with self._lock:
+            if self._matrix is not None:
+                self._allocate(self._matrix.shape[1])
+
+    def stats(self) -> dict:
+        """Hit-rate statistics since startup, plus current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "capacity": self.capacity or self.max_entries,
+                "bytes_used": self.bytes_used,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+class RecentQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper remembering the last query embedded by each thread, so the
+    retriever reuses the vector already computed for the cache lookup.
+    """
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self._local = threading.local()
+
+    def remember(self, text: str, vector: list[float]) -> None:
+        """Reuse a vector computed in another thread for the next embedding of the text in this one"""
+        self._local.recent = (text, vector)
+
+    def embed_query(self, text: str) -> list[float]:
+        recent = getattr(self._local, "recent", None)
+        if recent is not None and recent[0] == text:
+            return recent[1]
+        with span("embed_question"):
+            vector = self.embeddings.embed_query(text)
+        self._local.recent = (text, vector)
+        return vector
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        with span("embed_question"):
+            return self.embeddings.embed_documents(texts)
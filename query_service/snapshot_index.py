@@ -0,0 +1,225 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from constants import SNAPSHOT_ANN_EF
+
+# Layout written by the ingest service (see ingest_service/snapshot.py)
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.f32"
+CHUNKS_FILE = "chunks.sqlite3"
+
+class SnapshotIndexException(Exception):
+    """Custom exception for vector store snapshot errors"""
+    pass
+
+class SnapshotIndex:
+    """
+    Read-only snapshot of the vector store published by the ingest service.
+
+    Vectors were L2-normalized when the snapshot was written and are
+    memory-mapped from one contiguous float32 file, so loading is instant and
+    pages are shared with the OS cache. A search is an exact, vectorized
+    matrix-vector product followed by a partial sort; large snapshots ship a
+    prebuilt HNSW index, searched instead when hnswlib is available. Only the
+    k winning chunks are read from the SQLite chunk table.
+
+    Searches hold the index with acquire()/release(); a replaced index is
+    retired and closed once the last of them releases it.
+    """
+
+    def __init__(self, directory: str, ann_ef: int = SNAPSHOT_ANN_EF):
+        self.directory = directory
+        self.ann_ef = ann_ef
+        try:
+            with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as manifest_file:
+                manifest = json.load(manifest_file)
+            self.name = os.path.basename(directory)
+            self.generation = manifest["generation"]
+            self.embedding_model = manifest["embedding_model"]
+            self.count = manifest["chunks"]
+            self.dim = manifest["dim"]
+            self.vectors = np.memmap(
+                os.path.join(directory, VECTORS_FILE), dtype=np.float32, mode="r", shape=(self.count, self.dim)
+            ) if self.count else np.zeros((0, self.dim), dtype=np.float32)
+            self._chunks = sqlite3.connect(
+                f"file:{os.path.join(directory, CHUNKS_FILE)}?mode=ro", uri=True, check_same_thread=False
+            )
+            self.ann = self._load_ann(manifest.get("ann"), ann_ef)
+        except Exception as e:
+            raise SnapshotIndexException(f"Failed to open snapshot '{directory}': {str(e)}")
+        self._lock = threading.Lock()
+        self._users = 0
+        self._retired = False
+        self.closed = False
+
+    def _load_ann(self, ann: Optional[dict], ef: int):
+        if not ann:
+            return None
+        try:
+            import hnswlib
+        except ImportError:
+            return None
+        index = hnswlib.Index(space=ann["space"], dim=self.dim)
+        index.load_index(os.path.join(self.directory, ann["file"]), max_elements=self.count)
+        index.set_ef(ef)
+        return index
+
+    def _top_rows(self, query: np.ndarray, k: int) -> tuple[list[int], np.ndarray]:
+        if self.ann is not None and k <= self.ann_ef:
+            labels, distances = self.ann.knn_query(query, k=k)
+            # Inner product distance is 1 - cosine
+            return [int(row) for row in labels[0]], 1.0 - distances[0]
+        scores = self.vectors @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [int(row) for row in top], scores[top]
+
+    def search(self, vector: list[float], k: int) -> list[tuple[Document, float]]:
+        """
+        Find the k chunks closest to a vector.
+
+        Args:
+            vector (list[float]): Embedding of the question.
+            k (int): Number of chunks to return.
+
+        Returns:
+            list[tuple[Document, float]]: Chunks and their squared L2 distance to
+            the normalized question (Chroma's default metric), closest first.
+        """
+        if self.count == 0 or k < 1:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        rows, scores = self._top_rows(query, min(k, self.count))
+        with self._lock:
+            chunks = {
+                row: (id, content, metadata) for row, id, content, metadata in self._chunks.execute(
+                    f"SELECT row, id, content, metadata FROM chunks WHERE row IN ({','.join('?' * len(rows))})", rows
+                )
+            }
+        return [
+            (
+                Document(id=chunks[row][0], page_content=chunks[row][1], metadata=json.loads(chunks[row][2])),
+                float(2.0 - 2.0 * score)
+            )
+            for row, score in zip(rows, scores)
+        ]
+
+    def acquire(self) -> bool:
+        """Hold the index open for a search; False if it was retired, so the caller should use the new one"""
+        with self._lock:
+            if self._retired:
+                return False
+            self._users += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._users -= 1
+            if self._retired and self._users == 0:
+                self._close()
+
+    def retire(self) -> None:
+        """Close the index once the searches holding it are done, refusing new ones"""
+        with self._lock:
+            self._retired = True
+            if self._users == 0:
+                self._close()
+
+    def _close(self) -> None:
+        if self.closed:
+            return
+        self._chunks.close()
+        # Unmaps the files as soon as nothing references them, so a pruned snapshot frees its disk space
+        self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self.ann = None
+        self.closed = True
+
+    def close(self) -> None:
+        with self._lock:
+            self._retired = True
+            self._close()
+
+class SnapshotStore:
+    """
+    Follows the snapshot the ingest service publishes in a directory.
+
+    The CURRENT pointer is replaced atomically on every publish, so checking
+    for a new snapshot is one stat() call. A new snapshot is opened next to
+    the current one and swapped in with a single reference assignment;
+    searches already running (see use()) keep the snapshot they started
+    with, which is closed when the last of them ends.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._index: Optional[SnapshotIndex] = None
+        self._pointer: Optional[tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self.swaps = 0
+        self.load_errors = 0
+
+    def current(self) -> Optional[SnapshotIndex]:
+        """The latest published snapshot, or None if none was published (or it cannot be opened)"""
+        pointer_path = os.path.join(self.root, CURRENT_FILE)
+        try:
+            stat = os.stat(pointer_path)
+        except FileNotFoundError:
+            return self._index
+        pointer = (stat.st_ino, stat.st_mtime_ns)
+        if pointer == self._pointer:
+            return self._index
+
+        with self._lock:
+            if pointer != self._pointer:
+                try:
+                    with open(pointer_path, encoding="utf-8") as pointer_file:
+                        name = pointer_file.read().strip()
+                    if self._index is None or name != self._index.name:
+                        previous, self._index = self._index, SnapshotIndex(os.path.join(self.root, name))
+                        self.swaps += 1
+                        if previous is not None:
+                            previous.retire()
+                except (OSError, SnapshotIndexException) as e:
+                    # Keep serving the previous snapshot until the ingest service publishes another one
+                    self.load_errors += 1
+                    print(f"Warning: could not load vector store snapshot: {str(e)}")
+                self._pointer = pointer
+        return self._index
+
+    @contextmanager
+    def use(self) -> Iterator[Optional[SnapshotIndex]]:
+        """The latest snapshot (or None), held open until the block ends"""
+        while True:
+            index = self.current()
+            if index is None:
+                yield None
+                return
+            if index.acquire():
+                break
+            # Retired between current() and acquire(): the store already points at its successor
+        try:
+            yield index
+        finally:
+            index.release()
+
+class SnapshotRetriever(BaseRetriever):
+    """LangChain retriever delegating to a search function (snapshot or Chroma, see HotmartRAGSystem)"""
+
+    search: Callable[[str], list[Document]]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        return self.search(query)
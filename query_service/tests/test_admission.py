@@ -0,0 +1,153 @@
+import asyncio
+import sys
+import pytest
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from admission import AdmissionController, OverloadedException, SingleFlight
+
+def test_concurrency_capped_and_waiters_served_in_order():
+    """Test that at most max_concurrent calls run and waiters get slots first come, first served"""
+    admission = AdmissionController(max_concurrent=2, max_waiting=10, queue_timeout=5)
+    running, peak, order = 0, 0, []
+
+    async def call(index):
+        nonlocal running, peak
+        async with await admission.acquire():
+            running += 1
+            peak = max(peak, running)
+            order.append(index)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+    async def scenario():
+        tasks = []
+        for index in range(6):
+            tasks.append(asyncio.create_task(call(index)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert peak == 2
+    assert order == list(range(6))
+    assert admission.stats()["active"] == 0
+    assert admission.stats()["admitted"] == 6
+    print("\n✓ Admission test passed: 2 concurrent calls, FIFO order")
+
+def test_full_queue_rejected_with_retry_after():
+    """Test that requests beyond the wait queue are rejected immediately with 429"""
+    admission = AdmissionController(max_concurrent=1, max_waiting=1, queue_timeout=5, default_retry_after=4)
+
+    async def scenario():
+        holder = await admission.acquire()
+        waiter = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(OverloadedException) as exc_info:
+            await admission.acquire()
+        holder.release()
+        (await waiter).release()
+        return exc_info.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 429
+    assert error.retry_after == 8
+    assert admission.stats()["rejected"] == 1
+    assert admission.stats()["active"] == 0
+    print("\n✓ Rejection test passed: 429 with Retry-After when the queue is full")
+
+def test_wait_timeout_rejected_with_503():
+    """Test that a request waiting longer than the queue timeout gives up with 503"""
+    admission = AdmissionController(max_concurrent=1, max_waiting=5, queue_timeout=0.05)
+
+    async def scenario():
+        holder = await admission.acquire()
+        with pytest.raises(OverloadedException) as exc_info:
+            await admission.acquire()
+        assert admission.stats()["waiting"] == 0
+        holder.release()
+        return exc_info.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert admission.stats()["timed_out"] == 1
+    assert admission.stats()["active"] == 0
+    print("\n✓ Timeout test passed: 503 after waiting too long")
+
+def test_cancelled_waiter_does_not_leak_slot():
+    """Test that a waiter going away neither keeps its place nor loses the slot"""
+    admission = AdmissionController(max_concurrent=1, max_waiting=5, queue_timeout=5)
+
+    async def scenario():
+        holder = await admission.acquire()
+        abandoned = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        abandoned.cancel()
+        await asyncio.sleep(0)
+        holder.release()
+        holder.release()
+        async with await admission.acquire():
+            assert admission.stats()["active"] == 1
+
+    asyncio.run(scenario())
+    assert admission.stats()["active"] == 0
+    assert admission.stats()["waiting"] == 0
+    print("\n✓ Cancellation test passed: slot accounting intact")
+
+def test_single_flight_merges_identical_calls():
+    """Test that concurrent calls with the same key share one execution"""
+    single_flight = SingleFlight()
+    calls = []
+
+    async def generate(key):
+        calls.append(key)
+        await asyncio.sleep(0.05)
+        return f"answer {key}"
+
+    async def scenario():
+        return await asyncio.gather(
+            *(single_flight.do("a", lambda: generate("a")) for _ in range(5)),
+            single_flight.do("b", lambda: generate("b"))
+        )
+
+    results = asyncio.run(scenario())
+    assert results == ["answer a"] * 5 + ["answer b"]
+    assert calls == ["a", "b"]
+    assert single_flight.merged == 4
+    assert single_flight.in_flight() == 0
+    print("\n✓ Single-flight test passed: 5 identical calls, 1 execution")
+
+def test_single_flight_survives_caller_cancellation():
+    """Test that one caller going away does not cancel the call shared with others"""
+    single_flight = SingleFlight()
+
+    async def generate():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def scenario():
+        first = asyncio.create_task(single_flight.do("a", generate))
+        second = asyncio.create_task(single_flight.do("a", generate))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "answer"
+    print("\n✓ Single-flight cancellation test passed")
+
+def test_single_flight_shares_errors():
+    """Test that a failed call raises the same error to every merged caller"""
+    single_flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise OverloadedException("busy", 429, 1)
+
+    async def scenario():
+        return await asyncio.gather(*(single_flight.do("a", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, OverloadedException) for result in results)
+    print("\n✓ Single-flight error test passed")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,54 @@
+import sys
+import pytest
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from answer_cache import AnswerCache, normalize_question
+
+SETTINGS = ("similarity", 4, "mistral", 0.3)
+
+def test_normalize_question():
+    """Test that case, spacing and trailing punctuation do not change the key"""
+    assert normalize_question("  Como   funciona a HOTMART?? ") == "como funciona a hotmart"
+    assert normalize_question("Como funciona a Hotmart") == normalize_question("como funciona a hotmart?")
+    assert normalize_question("O que é a Hotmart?") != normalize_question("O que e a Hotmart?")
+    print("\n✓ Normalization test passed")
+
+def test_exact_match_hit_and_miss():
+    """Test that only the same normalized question under the same settings hits"""
+    cache = AnswerCache(max_entries=10)
+    cache.put("Como funciona a Hotmart?", SETTINGS, "Resposta")
+
+    assert cache.get("como funciona a hotmart", SETTINGS) == "Resposta"
+    assert cache.get("Como funciona a Hotmart?", ("similarity", 8, "mistral", 0.3)) is None
+    assert cache.get("Quanto custa?", SETTINGS) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    print("\n✓ Exact match test passed: settings are part of the key")
+
+def test_least_recently_used_evicted():
+    """Test that the entry limit evicts the least recently used answer"""
+    cache = AnswerCache(max_entries=2)
+    cache.put("a", SETTINGS, "A")
+    cache.put("b", SETTINGS, "B")
+    cache.get("a", SETTINGS)
+    cache.put("c", SETTINGS, "C")
+
+    assert cache.get("b", SETTINGS) is None
+    assert cache.get("a", SETTINGS) == "A"
+    assert cache.stats()["evictions"] == 1
+    print("\n✓ LRU test passed")
+
+def test_clear():
+    """Test that clearing drops every answer"""
+    cache = AnswerCache(max_entries=2)
+    cache.put("a", SETTINGS, "A")
+    cache.clear()
+    assert cache.get("a", SETTINGS) is None
+    assert cache.stats()["entries"] == 0
+    print("\n✓ Clear test passed")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,20 +1,41 @@
 import sys
+import json
+import time
+import asyncio
+import httpx
+import pytest
 from pathlib import Path
 from fastapi.testclient import TestClient
 from unittest.mock import patch
 
 sys.path.append(str(Path(__file__).parent.parent))
-from app import app
-from rag_chain import RAGException
+from app import app, reset_rag_system
+from admission import AdmissionController
+from rag_chain import CacheLookup, RAGException, StreamEvent
+from langchain_core.documents import Document
+from model_router import ModelTimeoutException
 
 client = TestClient(app)
 
+def miss_caches(mock_rag):
+    """Configure a mocked RAG system whose caches never hold the answer"""
+    mock_rag.return_value.lookup_cached_answer.return_value = CacheLookup(generation=0, question_vector=None)
+    mock_rag.return_value.request_key.side_effect = lambda question: question
+
+@pytest.fixture(autouse=True)
+def fresh_rag_system():
+    """Fixture ensuring every test starts without a long-lived RAG system"""
+    reset_rag_system()
+    yield
+    reset_rag_system()
+
 def test_query_knowledge_success():
     """Test successful query response"""
     test_question = "Como funciona a Hotmart?"
     expected_answer = "A Hotmart é uma plataforma de produtos digitais."
     
     with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
         mock_rag.return_value.generate_response.return_value = {
             "answer": expected_answer
         }
@@ -33,6 +54,7 @@ def test_query_knowledge_success():
 def test_query_knowledge_rag_error():
     """Test handling of RAG system errors"""
     with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
         mock_rag.return_value.generate_response.side_effect = RAGException("Failed to generate response")
         
         response = client.post(
@@ -77,6 +99,7 @@ def test_query_knowledge_long_question():
 def test_query_knowledge_system_error():
     """Test handling of unexpected system errors"""
     with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
         mock_rag.return_value.generate_response.side_effect = Exception("Unexpected error")
         
         response = client.post(
@@ -88,6 +111,479 @@ def test_query_knowledge_system_error():
         assert "Internal server error" in response.json()["detail"]
         print("\n✓ System error test passed: unexpected error properly handled")
 
+def test_query_knowledge_reuses_rag_system():
+    """Test that the RAG system is built once and shared across requests"""
+    with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
+        mock_rag.return_value.generate_response.return_value = {"answer": "Resposta"}
+        
+        client.post("/query", json={"question": "Pergunta 1"})
+        client.post("/query", json={"question": "Pergunta 2"})
+        
+        mock_rag.assert_called_once()
+        mock_rag.return_value.warm_up.assert_called_once()
+        assert mock_rag.return_value.generate_response.call_count == 2
+        print("\n✓ Reuse test passed: RAG system built only once")
+
+def test_ready_before_and_after_warm_up():
+    """Test that readiness stays false until the RAG system is warmed up"""
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json() == {"ready": False}
+    
+    with patch('app.HotmartRAGSystem'):
+        from app import startup_event
+        import asyncio
+        asyncio.run(startup_event())
+    
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json() == {"ready": True}
+    print("\n✓ Readiness test passed: ready only after warm-up")
+
+def test_startup_event_initialization_failure():
+    """Test that a failed warm-up keeps the service not ready without crashing"""
+    with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
+        mock_rag.return_value.warm_up.side_effect = RAGException("Model unavailable")
+        from app import startup_event
+        import asyncio
+        asyncio.run(startup_event())
+    
+    response = client.get("/ready")
+    assert response.status_code == 503
+    print("\n✓ Startup failure test passed: service stays not ready")
+
+def test_health_responsive_during_slow_generation():
+    """Test that a slow generation does not block other requests"""
+    def slow_generation(question, lookup=None, timeout_seconds=None):
+        time.sleep(1.0)
+        return {"answer": "Resposta"}
+    
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            query = asyncio.create_task(
+                async_client.post("/query", json={"question": "Pergunta"})
+            )
+            await asyncio.sleep(0.1)
+            
+            start = time.perf_counter()
+            health_response = await async_client.get("/health")
+            health_elapsed = time.perf_counter() - start
+            
+            query_response = await query
+            return health_response, health_elapsed, query_response
+    
+    with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
+        mock_rag.return_value.generate_response.side_effect = slow_generation
+        health_response, health_elapsed, query_response = asyncio.run(scenario())
+    
+    assert health_response.status_code == 200
+    assert health_elapsed < 0.5
+    assert query_response.json() == {"answer": "Resposta"}
+    print(f"\n✓ Responsiveness test passed: /health answered in {health_elapsed:.3f}s during generation")
+
+def test_semantic_cache_stats():
+    """Test that cache statistics are reported once the RAG system exists"""
+    response = client.get("/semantic_cache/stats")
+    assert response.status_code == 200
+    assert response.json()["enabled"] is False
+
+    with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
+        mock_rag.return_value.generate_response.return_value = {"answer": "Resposta"}
+        mock_rag.return_value.semantic_cache.stats.return_value = {
+            "hits": 3, "misses": 1, "hit_rate": 0.75, "entries": 1, "capacity": 1000,
+            "bytes_used": 2048, "max_bytes": 33554432, "evictions": 0, "expirations": 0
+        }
+        client.post("/query", json={"question": "Pergunta teste"})
+        response = client.get("/semantic_cache/stats")
+
+    assert response.json()["enabled"] is True
+    assert response.json()["hit_rate"] == 0.75
+    print("\n✓ Semantic cache stats test passed")
+
+def test_answer_cache_stats():
+    """Test that answer cache statistics include the followed generation"""
+    assert client.get("/answer_cache/stats").json()["enabled"] is False
+
+    with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
+        mock_rag.return_value.generate_response.return_value = {"answer": "Resposta"}
+        mock_rag.return_value.generation = 7
+        mock_rag.return_value.invalidations = 2
+        mock_rag.return_value.answer_cache.stats.return_value = {
+            "hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1, "capacity": 5000, "evictions": 0
+        }
+        client.post("/query", json={"question": "Pergunta teste"})
+        response = client.get("/answer_cache/stats")
+
+    assert response.json()["enabled"] is True
+    assert response.json()["generation"] == 7
+    assert response.json()["invalidations"] == 2
+    print("\n✓ Answer cache stats test passed")
+
+class FakeStream:
+    """Stands in for HotmartRAGSystem.stream_response, recording whether the stream was closed"""
+    
+    def __init__(self, tokens, delay=0.0, error=None):
+        self.tokens = tokens
+        self.delay = delay
+        self.error = error
+        self.yielded = 0
+        self.closed = False
+    
+    async def __call__(self, question, lookup=None):
+        try:
+            yield StreamEvent("context", {"cached": False, "documents": [{"source": "blog", "preview": "..."}]})
+            for token in self.tokens:
+                await asyncio.sleep(self.delay)
+                self.yielded += 1
+                yield StreamEvent("token", {"text": token})
+            if self.error:
+                raise RAGException(self.error)
+            yield StreamEvent("done", {"answer": "".join(self.tokens), "cached": False})
+        finally:
+            self.closed = True
+
+def parse_sse(body: str) -> list[tuple[str, dict]]:
+    """Split a text/event-stream body into (event, data) pairs"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+def test_query_stream_sends_events():
+    """Test that the streaming endpoint sends context, tokens and the final answer as SSE"""
+    with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
+        mock_rag.return_value.stream_response = FakeStream(["A Hotmart ", "é uma plataforma."])
+        response = client.post("/query/stream", json={"question": "Como funciona a Hotmart?"})
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert [event for event, _ in events] == ["context", "token", "token", "done"]
+    assert events[-1][1]["answer"] == "A Hotmart é uma plataforma."
+    print("\n✓ SSE test passed: context, tokens and answer streamed")
+
+def test_query_stream_reports_midway_errors():
+    """Test that a failure after streaming started is sent as an error event"""
+    with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
+        mock_rag.return_value.stream_response = FakeStream(["Parcial"], error="Ollama unavailable")
+        response = client.post("/query/stream", json={"question": "Pergunta"})
+    
+    events = parse_sse(response.text)
+    assert events[-1] == ("error", {"detail": "Ollama unavailable"})
+    print("\n✓ SSE error test passed")
+
+def test_query_stream_validates_question():
+    """Test that the streaming endpoint validates input like /query"""
+    assert client.post("/query/stream", json={"question": ""}).status_code == 422
+    print("\n✓ SSE validation test passed")
+
+def test_query_stream_cancelled_on_disconnect():
+    """Test that a client disconnect stops the stream instead of generating every token"""
+    fake_stream = FakeStream([f"t{i} " for i in range(200)], delay=0.01)
+    
+    async def scenario():
+        body = json.dumps({"question": "Pergunta"}).encode()
+        disconnected = asyncio.Event()
+        messages = []
+        request_sent = False
+        
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+        
+        async def send(message):
+            messages.append(message)
+            # The client goes away after the first few tokens
+            if sum(b"event: token" in m.get("body", b"") for m in messages) >= 3:
+                disconnected.set()
+        
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "POST", "scheme": "http", "path": "/query/stream", "raw_path": b"/query/stream",
+            "query_string": b"", "root_path": "", "server": ("test", 80), "client": ("test", 1234),
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        }
+        await asyncio.wait_for(app(scope, receive, send), timeout=5)
+    
+    with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
+        mock_rag.return_value.stream_response = fake_stream
+        asyncio.run(scenario())
+    
+    assert fake_stream.closed
+    assert fake_stream.yielded < 20
+    print(f"\n✓ Disconnect test passed: generation stopped after {fake_stream.yielded} of 200 tokens")
+
+def concurrent_queries(questions):
+    """Post the questions concurrently and return the responses"""
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            return await asyncio.gather(*(
+                async_client.post("/query", json={"question": question}) for question in questions
+            ))
+    return asyncio.run(scenario())
+
+def test_identical_concurrent_questions_share_one_generation():
+    """Test that identical questions in flight are merged into a single generation"""
+    def slow_generation(question, lookup=None, timeout_seconds=None):
+        time.sleep(0.3)
+        return {"answer": f"Resposta: {question}"}
+    
+    with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
+        mock_rag.return_value.generate_response.side_effect = slow_generation
+        responses = concurrent_queries(["Pergunta"] * 5 + ["Outra pergunta"])
+    
+    assert [response.json()["answer"] for response in responses] == ["Resposta: Pergunta"] * 5 + ["Resposta: Outra pergunta"]
+    assert mock_rag.return_value.generate_response.call_count == 2
+    print("\n✓ Single-flight test passed: 6 requests, 2 generations")
+
+def test_overload_rejected_with_retry_after():
+    """Test that requests beyond the LLM wait queue get 429 with Retry-After"""
+    def slow_generation(question, lookup=None, timeout_seconds=None):
+        time.sleep(0.3)
+        return {"answer": "Resposta"}
+    
+    with patch('app.HotmartRAGSystem') as mock_rag, \
+         patch('app.llm_admission', AdmissionController(max_concurrent=1, max_waiting=1, queue_timeout=5)):
+        miss_caches(mock_rag)
+        mock_rag.return_value.generate_response.side_effect = slow_generation
+        responses = concurrent_queries(["Pergunta 1", "Pergunta 2", "Pergunta 3"])
+    
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200, 200, 429]
+    rejected = next(response for response in responses if response.status_code == 429)
+    assert int(rejected.headers["Retry-After"]) >= 1
+    print("\n✓ Overload test passed: third request rejected with Retry-After")
+
+def test_cached_answer_bypasses_admission():
+    """Test that cached answers are served even when the LLM queue is full"""
+    with patch('app.HotmartRAGSystem') as mock_rag, \
+         patch('app.llm_admission', AdmissionController(max_concurrent=1, max_waiting=0, queue_timeout=5)) as admission:
+        mock_rag.return_value.lookup_cached_answer.return_value = CacheLookup(0, None, "Resposta em cache")
+        admission.active = 1
+        response = client.post("/query", json={"question": "Pergunta"})
+    
+    assert response.json() == {"answer": "Resposta em cache"}
+    mock_rag.return_value.generate_response.assert_not_called()
+    print("\n✓ Cache bypass test passed")
+
+def test_stream_releases_llm_slot():
+    """Test that a finished stream gives its LLM slot back"""
+    admission = AdmissionController(max_concurrent=1, max_waiting=0, queue_timeout=5)
+    with patch('app.HotmartRAGSystem') as mock_rag, patch('app.llm_admission', admission):
+        miss_caches(mock_rag)
+        mock_rag.return_value.stream_response = FakeStream(["Resposta"])
+        first = client.post("/query/stream", json={"question": "Pergunta"})
+        second = client.post("/query/stream", json={"question": "Pergunta"})
+    
+    assert first.status_code == second.status_code == 200
+    assert admission.stats()["active"] == 0
+    assert admission.stats()["admitted"] == 2
+    print("\n✓ Stream slot test passed")
+
+def test_query_reports_model_and_times_out():
+    """Test that the answering model is returned and that LLM timeouts map to 504"""
+    with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
+        mock_rag.return_value.generate_response.return_value = {"answer": "Resposta", "model": "tinyllama"}
+        response = client.post("/query", json={"question": "Pergunta", "timeout_seconds": 5})
+        assert response.json() == {"answer": "Resposta", "model": "tinyllama"}
+        assert mock_rag.return_value.generate_response.call_args.args[2] == 5
+        
+        mock_rag.return_value.generate_response.side_effect = ModelTimeoutException("No model answered within 5s")
+        response = client.post("/query", json={"question": "Outra pergunta", "timeout_seconds": 5})
+    
+    assert response.status_code == 504
+    print("\n✓ Model report test passed: model returned, timeout mapped to 504")
+
+def test_embedding_batcher_stats():
+    """Test that batching statistics are reported once the RAG system exists"""
+    assert client.get("/embeddings/stats").json()["enabled"] is False
+    
+    with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
+        mock_rag.return_value.generate_response.return_value = {"answer": "Resposta"}
+        mock_rag.return_value.embedding_batcher.stats.return_value = {
+            "max_batch_size": 32, "max_wait_ms": 2.0, "batches": 2, "embedded": 10,
+            "avg_batch_size": 5.0, "largest_batch": 8
+        }
+        client.post("/query", json={"question": "Pergunta"})
+        response = client.get("/embeddings/stats")
+    
+    assert response.json()["enabled"] is True
+    assert response.json()["avg_batch_size"] == 5.0
+    print("\n✓ Embedding batcher stats test passed")
+
+def test_context_stats():
+    """Test that context compression statistics report the prompt tokens saved"""
+    assert client.get("/context/stats").json()["enabled"] is False
+    
+    with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
+        mock_rag.return_value.generate_response.return_value = {"answer": "Resposta"}
+        mock_rag.return_value.context_compressor.stats.return_value = {
+            "max_tokens": 1024, "queries": 2, "tokens_before": 1200, "tokens_after": 900, "tokens_saved": 300,
+            "avg_tokens_saved": 150.0, "saved_ratio": 0.25, "merged": 3, "duplicates": 1, "truncated": 0
+        }
+        client.post("/query", json={"question": "Pergunta"})
+        response = client.get("/context/stats")
+    
+    assert response.json()["enabled"] is True
+    assert response.json()["avg_tokens_saved"] == 150.0
+    print("\n✓ Context stats test passed")
+
+def test_model_residency_and_keep_alive_pings():
+    """Test that the keep-alive loop pings the models periodically and residency is reported"""
+    assert client.get("/models/residency").json()["enabled"] is False
+    
+    with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
+        mock_rag.return_value.generate_response.return_value = {"answer": "Resposta"}
+        mock_rag.return_value.model_keeper.stats.return_value = {
+            "keep_alive": "30m", "num_ctx": 4096, "pings": 2, "failures": 0, "reloads": 0,
+            "models": [{"name": "mistral", "resident": True, "load_seconds": 3.5, "last_ping": 1700000000.0}]
+        }
+        client.post("/query", json={"question": "Pergunta"})
+        from app import keep_models_loaded
+        
+        async def run_briefly():
+            task = asyncio.create_task(keep_models_loaded(0.05))
+            await asyncio.sleep(0.2)
+            task.cancel()
+        
+        asyncio.run(run_briefly())
+        response = client.get("/models/residency")
+    
+    assert mock_rag.return_value.model_keeper.ping.call_count >= 2
+    assert response.json()["enabled"] is True
+    assert response.json()["models"][0]["load_seconds"] == 3.5
+    print("\n✓ Model residency test passed")
+
+def test_metrics_endpoint():
+    """Test that /metrics serves the Prometheus text format with the LLM queue depth, and requests get a trace id"""
+    response = client.get("/health", headers={"X-Trace-Id": "client-trace-1"})
+    assert response.headers["X-Trace-Id"] == "client-trace-1"
+    assert len(client.get("/health").headers["X-Trace-Id"]) == 32
+    
+    metrics = client.get("/metrics")
+    
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert "# TYPE hotmart_query_llm_queue_depth gauge" in metrics.text
+    assert "hotmart_query_llm_queue_depth 0" in metrics.text
+    assert 'hotmart_query_http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in metrics.text
+    print("\n✓ Metrics endpoint test passed")
+
+def test_snapshot_stats():
+    """Test that snapshot statistics report the loaded snapshot and where searches went"""
+    assert client.get("/snapshot/stats").json()["enabled"] is False
+    
+    with patch('app.HotmartRAGSystem') as mock_rag:
+        miss_caches(mock_rag)
+        mock_rag.return_value.generate_response.return_value = {"answer": "Resposta"}
+        snapshot = mock_rag.return_value.snapshots.current.return_value
+        snapshot.name, snapshot.generation, snapshot.count = "snapshot-00000004-1", 4, 1200
+        mock_rag.return_value.snapshot_in_use.return_value = True
+        mock_rag.return_value.snapshots.swaps = 1
+        mock_rag.return_value.snapshots.load_errors = 0
+        mock_rag.return_value.snapshot_searches = 9
+        mock_rag.return_value.chroma_searches = 1
+        client.post("/query", json={"question": "Pergunta"})
+        response = client.get("/snapshot/stats")
+    
+    assert response.json() == {
+        "enabled": True, "loaded": "snapshot-00000004-1", "generation": 4, "chunks": 1200, "in_use": True,
+        "swaps": 1, "load_errors": 0, "snapshot_searches": 9, "chroma_searches": 1
+    }
+    print("\n✓ Snapshot stats test passed")
+
+def test_retrieve_endpoint():
+    """Test that /retrieve returns chunks with scores and metadata and never generates"""
+    with patch('app.HotmartRAGSystem') as mock_rag:
+        mock_rag.return_value.retrieve.return_value = [
+            (Document(page_content="A Hotmart é uma plataforma.", metadata={"source": "blog"}), 0.21)
+        ]
+        response = client.post("/retrieve", json={"question": "Como funciona a Hotmart?", "k": 3})
+        invalid = client.post("/retrieve", json={"question": "Pergunta", "k": 0})
+    
+    assert response.status_code == 200
+    assert response.json() == {"chunks": [
+        {"content": "A Hotmart é uma plataforma.", "score": 0.21, "metadata": {"source": "blog"}}
+    ]}
+    mock_rag.return_value.retrieve.assert_called_once_with("Como funciona a Hotmart?", 3)
+    mock_rag.return_value.generate_response.assert_not_called()
+    assert invalid.status_code == 422
+    print("\n✓ Retrieve endpoint test passed")
+
+def test_query_batch_answers_in_order_within_limits():
+    """Test that /query_batch answers every question in order, merging duplicates and bounding concurrency"""
+    running = []
+    peak = []
+    def generate(question, lookup, documents, timeout_seconds=None):
+        running.append(question)
+        peak.append(len(running))
+        time.sleep(0.05)
+        running.remove(question)
+        if question == "Falha":
+            raise RAGException("No valid response generated")
+        return {"answer": f"Resposta: {question}", "model": "mistral"}
+    
+    questions = ["Em cache", "P1", "P2", "P1", "P3", "Falha"]
+    with patch('app.HotmartRAGSystem') as mock_rag, \
+         patch('app.llm_admission', AdmissionController(max_concurrent=2, max_waiting=0, queue_timeout=5)):
+        mock_rag.return_value.request_key.side_effect = lambda question: question
+        mock_rag.return_value.prepare_batch.return_value = [
+            (CacheLookup(0, None, "Resposta em cache"), []) if question == "Em cache" else (CacheLookup(0, None), [])
+            for question in questions
+        ]
+        mock_rag.return_value.generate_from_documents.side_effect = generate
+        response = client.post("/query_batch", json={"questions": questions, "timeout_seconds": 30})
+    
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["question"] for result in results] == questions
+    assert results[0] == {"question": "Em cache", "answer": "Resposta em cache"}
+    assert results[1] == results[3] == {"question": "P1", "answer": "Resposta: P1", "model": "mistral"}
+    assert results[5]["error"] == "No valid response generated"
+    assert "answer" not in results[5]
+    mock_rag.return_value.prepare_batch.assert_called_once_with(questions)
+    # One generation per distinct uncached question, never more than the LLM slots at once
+    assert mock_rag.return_value.generate_from_documents.call_count == 4
+    assert max(peak) <= 2
+    assert mock_rag.return_value.generate_from_documents.call_args.args[3] == 30
+    print("\n✓ Batch endpoint test passed: ordered results, per-question errors, bounded concurrency")
+
+def test_query_batch_validation():
+    """Test that empty batches, and empty or too long questions, are rejected"""
+    assert client.post("/query_batch", json={"questions": []}).status_code == 422
+    assert client.post("/query_batch", json={"questions": ["Como funciona a Hotmart?", ""]}).status_code == 422
+    response = client.post("/query_batch", json={"questions": ["a" * 501]})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "questions", 0]
+    print("\n✓ Batch validation test passed")
+
+def test_admission_stats():
+    """Test that admission statistics are exposed"""
+    response = client.get("/admission/stats")
+    assert response.status_code == 200
+    assert response.json()["active"] == 0
+    assert "merged" in response.json()
+    print("\n✓ Admission stats test passed")
+
 if __name__ == "__main__":
-    import pytest
     pytest.main([__file__, "-v"])
@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+import chroma_client
+from chroma_client import STORE_EMBEDDED, STORE_REMOTE, ChromaClientException, create_chroma_client, query_by_vectors
+
+@pytest.fixture
+def collection(tmp_path):
+    """Fixture for an embedded Chroma collection standing in for the server, with one chunk per axis"""
+    client = create_chroma_client(STORE_EMBEDDED, path=str(tmp_path / "chroma_db"))
+    collection = client.get_or_create_collection("test")
+    collection.add(
+        ids=[f"id-{i}" for i in range(8)],
+        embeddings=np.eye(8).tolist(),
+        documents=[f"Trecho {i}" for i in range(8)],
+        metadatas=[{"source": f"doc-{i}"} for i in range(8)]
+    )
+    return collection
+
+def test_query_by_vectors_in_batches(collection):
+    """Test that vectors are searched in as few calls as the batch size allows, results kept in order"""
+    vectors = np.eye(8)[[3, 0, 7, 5, 1]].tolist()
+    with patch.object(collection, "query", wraps=collection.query) as query:
+        results = query_by_vectors(collection, vectors, k=2, batch_size=2)
+
+    assert query.call_count == 3
+    assert [result[0][0].page_content for result in results] == ["Trecho 3", "Trecho 0", "Trecho 7", "Trecho 5", "Trecho 1"]
+    assert results[0][0][0].metadata == {"source": "doc-3"}
+    assert results[0][0][0].id == "id-3"
+    assert results[0][0][1] == pytest.approx(0.0, abs=1e-6)
+    assert all(len(result) == 2 for result in results)
+    print("\n✓ Batched query test passed: 5 searches in 3 calls")
+
+def test_remote_server_unreachable():
+    """Test that a remote backend without a server fails with ChromaClientException"""
+    with pytest.raises(ChromaClientException):
+        create_chroma_client(STORE_REMOTE, host="127.0.0.1", port=9)
+    with pytest.raises(ChromaClientException):
+        create_chroma_client("sqlite")
+    print("\n✓ Connection error test passed")
+
+def test_client_shared_by_process(tmp_path, monkeypatch):
+    """Test that the process-wide client is opened once and reopened after a reset"""
+    monkeypatch.setattr(chroma_client, "CHROMA_DB_PERSIST_DIRECTORY", str(tmp_path / "chroma_db"))
+    chroma_client.reset_chroma_client()
+    try:
+        client = chroma_client.get_chroma_client()
+        assert chroma_client.get_chroma_client() is client
+        chroma_client.reset_chroma_client()
+        with patch('chroma_client.create_chroma_client') as mock_create:
+            assert chroma_client.get_chroma_client() is mock_create.return_value
+    finally:
+        chroma_client.reset_chroma_client()
+    print("\n✓ Shared client test passed")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
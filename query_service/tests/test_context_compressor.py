@@ -0,0 +1,105 @@
+import sys
+from pathlib import Path
+
+import pytest
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+sys.path.append(str(Path(__file__).parent.parent))
+from context_compressor import (
+    ContextCompressor,
+    ContextCompressorException,
+    estimate_tokens,
+)
+
+ARTICLE = " ".join(
+    f"A Hotmart oferece a ferramenta {i} para produtores digitais venderem cursos online e acompanharem suas vendas."
+    for i in range(30)
+)
+
+def split(text, chunk_size=400, chunk_overlap=120):
+    """Chunks as the ingest service creates them: fixed-size windows overlapping their neighbours"""
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap).split_text(text)
+
+@pytest.fixture
+def compressor():
+    """Fixture for a compressor with a budget larger than any test context"""
+    return ContextCompressor(max_tokens=10_000, duplicate_threshold=0.8)
+
+def test_neighbouring_chunks_merged_back(compressor):
+    """Test that overlapping chunks of one source become a single passage without repeated text"""
+    chunks = split(ARTICLE)
+    # Retrieved out of order, as similarity ranks them
+    retrieved = [Document(page_content=chunks[i], metadata={"source": "blog/a"}) for i in (3, 2, 4)]
+
+    result = compressor.compress(retrieved)
+
+    assert len(result.documents) == 1
+    passage = result.documents[0].page_content
+    assert passage in ARTICLE
+    assert all(chunks[i] in passage for i in (2, 3, 4))
+    assert result.tokens_after < result.tokens_before
+    assert result.tokens_after == estimate_tokens(passage)
+    assert compressor.stats()["merged"] == 2
+    print(f"\n✓ Merge test passed: {result.tokens_before} -> {result.tokens_after} tokens")
+
+def test_other_sources_and_distant_chunks_kept_in_order(compressor):
+    """Test that chunks that do not overlap, or come from other sources, stay separate and ranked"""
+    chunks = split(ARTICLE)
+    retrieved = [
+        Document(page_content=chunks[5], metadata={"source": "blog/a"}),
+        Document(page_content="Afiliados recebem comissões por cada venda indicada.", metadata={"source": "blog/b"}),
+        Document(page_content=chunks[0], metadata={"source": "blog/a"}),
+        Document(page_content=chunks[6], metadata={"source": "blog/c"}),
+    ]
+
+    result = compressor.compress(retrieved)
+
+    assert [document.page_content for document in result.documents] == [document.page_content for document in retrieved]
+    assert result.tokens_after == result.tokens_before
+    print("\n✓ Separation test passed")
+
+def test_near_duplicates_dropped(compressor):
+    """Test that the same text under another source is dropped, keeping the more relevant copy"""
+    text = split(ARTICLE)[1]
+    retrieved = [
+        Document(page_content=text, metadata={"source": "https://hotmart.com/pt-br/blog/a"}),
+        Document(page_content="Conteúdo diferente sobre assinaturas e pagamentos recorrentes na plataforma.", metadata={"source": "x"}),
+        Document(page_content=text.replace("cursos", "Cursos", 1), metadata={"source": "https://hotmart.com/blog/a"}),
+    ]
+
+    result = compressor.compress(retrieved)
+
+    assert [document.metadata["source"] for document in result.documents] == ["https://hotmart.com/pt-br/blog/a", "x"]
+    assert compressor.stats()["duplicates"] == 1
+    print("\n✓ Duplicate test passed")
+
+def test_context_fits_budget():
+    """Test that passages are kept by relevance until the budget, the last one cut at a sentence"""
+    compressor = ContextCompressor(max_tokens=150, duplicate_threshold=0.8)
+    chunks = split(ARTICLE)
+    retrieved = [Document(page_content=chunks[i], metadata={"source": f"s{i}"}) for i in (0, 4, 8)]
+
+    result = compressor.compress(retrieved)
+
+    assert result.tokens_after <= 150
+    assert result.documents[0].page_content == chunks[0]
+    assert result.documents[-1].page_content.endswith(".")
+    assert chunks[4].startswith(result.documents[-1].page_content)
+    assert len(result.documents) == 2
+    stats = compressor.stats()
+    assert stats["truncated"] == 1
+    assert stats["tokens_saved"] == result.tokens_before - result.tokens_after
+    assert stats["avg_tokens_saved"] == stats["tokens_saved"]
+    print(f"\n✓ Budget test passed: {result.tokens_before} -> {result.tokens_after} tokens")
+
+def test_invalid_settings_rejected():
+    """Test that a compressor needs a positive budget and a threshold in (0, 1]"""
+    with pytest.raises(ContextCompressorException):
+        ContextCompressor(max_tokens=0, duplicate_threshold=0.8)
+    with pytest.raises(ContextCompressorException):
+        ContextCompressor(max_tokens=100, duplicate_threshold=1.5)
+    print("\n✓ Settings validation test passed")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
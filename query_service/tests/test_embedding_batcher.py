@@ -0,0 +1,103 @@
+import sys
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from langchain_core.embeddings import Embeddings
+
+sys.path.append(str(Path(__file__).parent.parent))
+from embedding_batcher import EmbeddingBatcher
+
+class SlowEmbeddings(Embeddings):
+    """Fake model whose forward pass costs a fixed overhead plus a little per text"""
+
+    def __init__(self, overhead=0.05, per_text=0.001, fail=False):
+        self.overhead = overhead
+        self.per_text = per_text
+        self.fail = fail
+        self.calls: list[list[str]] = []
+        self.lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self.lock:
+            self.calls.append(list(texts))
+        time.sleep(self.overhead + self.per_text * len(texts))
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return [[float(len(text)), float(sum(map(ord, text)))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+@pytest.fixture
+def model():
+    return SlowEmbeddings()
+
+def test_concurrent_questions_embedded_in_batches(model):
+    """Test that concurrent questions share forward passes and each gets its own vector"""
+    batcher = EmbeddingBatcher(model, max_batch_size=32, max_wait=0.01)
+    questions = [f"pergunta {i}" for i in range(32)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        vectors = list(executor.map(batcher.embed_query, questions))
+    elapsed = time.perf_counter() - start
+    batcher.close()
+    passes = len(model.calls)
+
+    assert vectors == [model.embed_query(question) for question in questions]
+    assert passes <= 4
+    assert elapsed < 32 * model.overhead / 4
+    assert batcher.stats()["embedded"] == 32
+    print(f"\n✓ Batching test passed: 32 questions in {batcher.stats()['batches']} forward passes, {elapsed:.2f}s")
+
+def test_batch_size_capped(model):
+    """Test that no forward pass embeds more than max_batch_size questions"""
+    batcher = EmbeddingBatcher(model, max_batch_size=4, max_wait=0.02)
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        list(executor.map(batcher.embed_query, [f"q{i}" for i in range(10)]))
+    batcher.close()
+
+    assert max(len(call) for call in model.calls) <= 4
+    assert batcher.stats()["largest_batch"] <= 4
+    print("\n✓ Batch cap test passed")
+
+def test_single_question_adds_little_latency(model):
+    """Test that a lone question only waits for the short window"""
+    batcher = EmbeddingBatcher(model, max_batch_size=32, max_wait=0.002)
+    batcher.embed_query("aquecimento")
+
+    start = time.perf_counter()
+    batcher.embed_query("pergunta")
+    elapsed = time.perf_counter() - start
+    batcher.close()
+
+    assert elapsed < model.overhead + 0.02
+    print(f"\n✓ Low-load test passed: {elapsed * 1000:.1f}ms for a {model.overhead * 1000:.0f}ms forward pass")
+
+def test_duplicate_questions_embedded_once(model):
+    """Test that identical questions in one batch are embedded once"""
+    batcher = EmbeddingBatcher(model, max_batch_size=8, max_wait=0.05)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        vectors = list(executor.map(batcher.embed_query, ["mesma"] * 4))
+    batcher.close()
+
+    assert len({tuple(vector) for vector in vectors}) == 1
+    assert sum(len(call) for call in model.calls) == 1
+    print("\n✓ Dedup test passed")
+
+def test_errors_reach_every_caller():
+    """Test that a failed forward pass raises in every waiting request"""
+    batcher = EmbeddingBatcher(SlowEmbeddings(overhead=0.01, fail=True), max_batch_size=8, max_wait=0.02)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(batcher.embed_query, f"q{i}") for i in range(3)]
+    batcher.close()
+
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result()
+    print("\n✓ Error test passed")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
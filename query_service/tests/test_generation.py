@@ -0,0 +1,53 @@
+import sqlite3
+import sys
+import pytest
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from generation import GenerationMarker
+
+def write_generation(db_path: str, value: int, embedding_model: str = None) -> None:
+    """Write the marker the way the ingest service does"""
+    connection = sqlite3.connect(db_path)
+    with connection:
+        connection.execute("CREATE TABLE IF NOT EXISTS generation (id INTEGER PRIMARY KEY CHECK (id = 0), value INTEGER NOT NULL)")
+        connection.execute("INSERT OR REPLACE INTO generation (id, value) VALUES (0, ?)", (value,))
+        if embedding_model is not None:
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            connection.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('embedding_model', ?)", (embedding_model,))
+    connection.close()
+
+def test_missing_marker_reads_zero(tmp_path):
+    """Test that a marker never written by the ingest service reads as generation 0"""
+    db_path = tmp_path / "generation.sqlite3"
+    assert GenerationMarker(str(db_path)).read() == 0
+    assert not db_path.exists()
+    print("\n✓ Missing marker test passed: nothing created")
+
+def test_marker_follows_ingest_writes(tmp_path):
+    """Test that an open marker sees generations written by another connection"""
+    db_path = str(tmp_path / "generation.sqlite3")
+    marker = GenerationMarker(db_path)
+
+    write_generation(db_path, 1)
+    assert marker.read() == 1
+    write_generation(db_path, 2)
+    assert marker.read() == 2
+    marker.close()
+    print("\n✓ Marker test passed: new generations observed")
+
+def test_marker_reports_embedding_model(tmp_path):
+    """Test that the embedding model recorded by the ingest service is read, if any"""
+    db_path = str(tmp_path / "generation.sqlite3")
+    marker = GenerationMarker(db_path)
+    assert marker.embedding_model() is None
+
+    write_generation(db_path, 1)
+    assert marker.embedding_model() is None
+    write_generation(db_path, 2, "intfloat/multilingual-e5-small@onnx")
+    assert marker.embedding_model() == "intfloat/multilingual-e5-small@onnx"
+    marker.close()
+    print("\n✓ Embedding model test passed")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
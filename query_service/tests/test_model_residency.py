@@ -0,0 +1,117 @@
+import socket
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from langchain_ollama.llms import OllamaLLM
+
+sys.path.append(str(Path(__file__).parent.parent))
+from benchmarks.mock_ollama import MockOllama
+from model_residency import ModelKeeper, ModelResidencyException, parse_keep_alive
+from rag_chain import PROMPT_INSTRUCTIONS, PROMPT_TEMPLATE
+
+MODELS = ["mistral", "tinyllama"]
+NUM_CTX = 4096
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def time_to_first_token(llm: OllamaLLM, prompt: str) -> float:
+    start = time.perf_counter()
+    tokens = llm.stream(prompt)
+    next(tokens)
+    elapsed = time.perf_counter() - start
+    tokens.close()
+    return elapsed
+
+@pytest.fixture
+def ollama():
+    """Fixture for a local mock Ollama server with a noticeable cold load"""
+    with MockOllama(load_seconds=0.3) as server:
+        yield server
+
+@pytest.fixture
+def keeper(ollama):
+    """Fixture for a model keeper of both models, with the options the generations use"""
+    return ModelKeeper(ollama.base_url, MODELS, keep_alive="30m", num_ctx=NUM_CTX)
+
+def llm_for(ollama, model="mistral"):
+    """OllamaLLM configured like the RAG system's routes"""
+    return OllamaLLM(base_url=ollama.base_url, model=model, num_ctx=NUM_CTX, keep_alive="30m")
+
+def test_warm_up_loads_every_model(ollama, keeper):
+    """Test that warm-up loads each model with an empty prompt and the generations' keep_alive and num_ctx"""
+    keeper.warm_up()
+
+    assert [request["model"] for request in ollama.requests] == MODELS
+    assert all(request["prompt"] == "" for request in ollama.requests)
+    assert all(request["keep_alive"] == "30m" for request in ollama.requests)
+    assert all(request["options"] == {"num_ctx": NUM_CTX} for request in ollama.requests)
+    stats = keeper.stats()
+    assert [model["resident"] for model in stats["models"]] == [True, True]
+    assert stats["models"][0]["load_seconds"] == pytest.approx(0.3)
+    assert stats["reloads"] == 0
+    print("\n✓ Warm-up test passed")
+
+def test_ping_reloads_unloaded_model(ollama, keeper):
+    """Test that a ping loads a model Ollama unloaded, counting it as a reload, and only refreshes the others"""
+    keeper.warm_up()
+    ollama.unload("mistral")
+
+    keeper.ping()
+
+    assert [request["cold"] for request in ollama.requests[2:]] == [True, False]
+    assert keeper.stats()["reloads"] == 1
+    assert keeper.stats()["pings"] == 4
+    print("\n✓ Reload test passed")
+
+def test_unreachable_ollama_counted_not_raised():
+    """Test that pings to an Ollama that is not running are counted as failures"""
+    keeper = ModelKeeper(f"http://127.0.0.1:{free_port()}", MODELS, keep_alive="30m", num_ctx=NUM_CTX, timeout=2)
+
+    keeper.ping()
+
+    stats = keeper.stats()
+    assert stats["failures"] == 2
+    assert [model["resident"] for model in stats["models"]] == [False, False]
+    print("\n✓ Unreachable Ollama test passed")
+
+def test_time_to_first_token_cold_vs_warm(ollama, keeper):
+    """Test that a generation after a keep-alive ping does not wait for the model to load"""
+    llm = llm_for(ollama)
+    prompt = PROMPT_TEMPLATE.format(context="A Hotmart é uma plataforma.", question="O que é a Hotmart?")
+
+    cold = time_to_first_token(llm, prompt)
+    ollama.unload()
+    keeper.ping()
+    warm = time_to_first_token(llm, prompt)
+
+    assert cold >= 0.3
+    assert warm < 0.15
+    # The ping asked for the generation's num_ctx, so the generation did not reload the model
+    assert ollama.requests[-1]["cold"] is False
+    print(f"\n✓ Time to first token test passed: cold {cold * 1000:.0f}ms, warm {warm * 1000:.0f}ms")
+
+def test_instruction_prefix_reused_across_questions(ollama):
+    """Test that consecutive prompts share the instructions as a prefix Ollama can keep in its KV cache"""
+    llm = llm_for(ollama)
+    llm.invoke(PROMPT_TEMPLATE.format(context="Afiliados recebem comissões.", question="Como ser afiliado?"))
+    llm.invoke(PROMPT_TEMPLATE.format(context="Produtores vendem cursos.", question="O que é um produtor?"))
+
+    assert ollama.requests[-1]["cached_chars"] >= len(PROMPT_INSTRUCTIONS)
+    print(f"\n✓ Prefix test passed: {ollama.requests[-1]['cached_chars']} characters reused")
+
+def test_parse_keep_alive():
+    """Test that numbers of seconds are sent as numbers and durations as strings"""
+    assert parse_keep_alive("-1") == -1
+    assert parse_keep_alive("300") == 300
+    assert parse_keep_alive(" 30m ") == "30m"
+    with pytest.raises(ModelResidencyException):
+        parse_keep_alive("")
+    print("\n✓ keep_alive parsing test passed")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,298 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from langchain_ollama.llms import OllamaLLM
+
+sys.path.append(str(Path(__file__).parent.parent))
+from model_router import (
+    ModelRoute,
+    ModelRouter,
+    ModelRouterException,
+    ModelTimeoutException,
+    RoutedLLM,
+    route_request,
+)
+
+class FakeOllamaState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Per model: tokens to stream, delay before each token, or an HTTP error status
+        self.models = {
+            "mistral": {"tokens": ["Resposta ", "do ", "mistral"], "delay": 0.0},
+            "tinyllama": {"tokens": ["Resposta ", "do ", "tinyllama"], "delay": 0.0},
+        }
+        self.requests: list[str] = []
+        self.aborted: list[str] = []
+        self.completed: list[str] = []
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Minimal /api/generate endpoint streaming NDJSON like Ollama does"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        state: FakeOllamaState = self.server.state
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        model = body["model"]
+        config = state.models[model]
+        with state.lock:
+            state.requests.append(model)
+
+        if config.get("status"):
+            payload = json.dumps({"error": "model failed"}).encode()
+            self.send_response(config["status"])
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in config["tokens"]:
+                time.sleep(config["delay"])
+                self._write_chunk({"model": model, "response": token, "done": False})
+            self._write_chunk({"model": model, "response": "", "done": True, "done_reason": "stop"})
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+            with state.lock:
+                state.completed.append(model)
+        except (BrokenPipeError, ConnectionResetError):
+            with state.lock:
+                state.aborted.append(model)
+            self.close_connection = True
+
+    def _write_chunk(self, data: dict):
+        line = (json.dumps(data) + "\n").encode()
+        self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+@pytest.fixture
+def fake_ollama():
+    """Fixture for a local fake Ollama server; yields its base URL and state"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+    server.daemon_threads = True
+    server.state = FakeOllamaState()
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", server.state
+    server.shutdown()
+    server.server_close()
+
+def make_router(base_url, **kwargs):
+    primary = ModelRoute("mistral", OllamaLLM(base_url=base_url, model="mistral"))
+    fallback = ModelRoute("tinyllama", OllamaLLM(base_url=base_url, model="tinyllama"))
+    kwargs.setdefault("probe_interval", 3600)
+    return ModelRouter(primary, fallback, **kwargs)
+
+def wait_for(condition, timeout=3.0):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    return condition()
+
+def test_fast_primary_answers(fake_ollama):
+    """Test that the primary model answers while it meets the deadline"""
+    base_url, state = fake_ollama
+    router = make_router(base_url, deadline=5)
+
+    answer = router.invoke("Pergunta")
+
+    assert answer.text == "Resposta do mistral"
+    assert answer.model == "mistral"
+    assert not answer.hedged
+    assert router.stats()["models"][0]["calls"] == 1
+    print("\n✓ Primary test passed: fast primary answered")
+
+def test_slow_primary_routed_to_fallback(fake_ollama):
+    """Test that once the primary is measured above the deadline, requests go to the fallback"""
+    base_url, state = fake_ollama
+    state.models["mistral"]["delay"] = 0.1
+    router = make_router(base_url, deadline=0.15)
+
+    assert router.invoke("Pergunta 1").model == "mistral"
+    answer = router.invoke("Pergunta 2")
+
+    assert answer.model == "tinyllama"
+    assert answer.text == "Resposta do tinyllama"
+    assert router.stats()["fallbacks"] == 1
+    print("\n✓ Routing test passed: slow primary bypassed")
+
+def test_queue_depth_counts_towards_deadline(fake_ollama):
+    """Test that a fast primary is bypassed when enough requests are already in flight"""
+    base_url, _ = fake_ollama
+    router = make_router(base_url, deadline=1.0)
+    router.primary.latency = 0.4
+    router.primary.last_sample = time.monotonic()
+
+    assert router.choose() is router.primary
+    router.primary.in_flight = 2
+    assert router.choose() is router.fallback
+    print("\n✓ Queue depth test passed: 3 x 0.4s expected > 1s deadline")
+
+def test_primary_probed_after_interval(fake_ollama):
+    """Test that the primary gets a request again after the probe interval"""
+    base_url, _ = fake_ollama
+    router = make_router(base_url, deadline=1.0, probe_interval=0.05)
+    router.primary.latency = 5.0
+    router.primary.last_sample = time.monotonic()
+
+    assert router.choose() is router.fallback
+    time.sleep(0.06)
+    assert router.choose() is router.primary
+    assert router.choose() is router.fallback
+    print("\n✓ Probe test passed: primary retried once per interval")
+
+def test_hedged_request_won_by_fallback_cancels_primary(fake_ollama):
+    """Test that a slow primary is raced against the fallback and its generation is cancelled"""
+    base_url, state = fake_ollama
+    state.models["mistral"]["tokens"] = ["t "] * 40
+    state.models["mistral"]["delay"] = 0.05
+    router = make_router(base_url, deadline=60, hedge_after=0.2)
+
+    start = time.perf_counter()
+    with route_request() as request:
+        answer = router.invoke("Pergunta")
+    elapsed = time.perf_counter() - start
+
+    assert answer.model == "tinyllama"
+    assert answer.hedged
+    assert request.model == "tinyllama"
+    assert elapsed < 1.0
+    assert router.stats()["hedges"] == 1
+    assert wait_for(lambda: "mistral" in state.aborted)
+    assert "mistral" not in state.completed
+    print(f"\n✓ Hedging test passed: fallback answered in {elapsed:.2f}s, primary generation aborted")
+
+def test_hedge_skipped_when_generation_threads_busy(fake_ollama):
+    """Test that a hedge is not started while every generation thread is taken, so Ollama gets no extra load"""
+    base_url, state = fake_ollama
+    state.models["mistral"]["delay"] = 0.1
+    router = make_router(base_url, deadline=60, hedge_after=0.05, max_workers=1)
+
+    answer = router.invoke("Pergunta")
+
+    assert answer.model == "mistral"
+    assert not answer.hedged
+    assert state.requests == ["mistral"]
+    assert router.stats()["hedges_skipped"] == 1
+    print("\n✓ Bounded hedging test passed: the only thread kept the primary")
+
+def test_abandoned_attempt_never_reaches_ollama(fake_ollama):
+    """Test that an attempt given up on while waiting for a thread is not sent to Ollama"""
+    base_url, state = fake_ollama
+    state.models["mistral"]["delay"] = 0.1
+    router = make_router(base_url, deadline=60, max_workers=1)
+
+    with pytest.raises(ModelTimeoutException):
+        with route_request(timeout=0.05):
+            router.invoke("Primeira")
+    with pytest.raises(ModelTimeoutException):
+        with route_request(timeout=0.05):
+            router.invoke("Segunda")
+
+    assert wait_for(lambda: router._attempts == 0)
+    assert state.requests == ["mistral"]
+    print("\n✓ Abandoned attempt test passed: queued generation was dropped")
+
+def test_failed_primary_falls_back(fake_ollama):
+    """Test that a failing primary is retried on the fallback when hedging is enabled"""
+    base_url, state = fake_ollama
+    state.models["mistral"]["status"] = 500
+    router = make_router(base_url, deadline=60, hedge_after=10)
+
+    answer = router.invoke("Pergunta")
+
+    assert answer.model == "tinyllama"
+    assert router.primary.failures == 1
+    print("\n✓ Failure test passed: fallback answered")
+
+def test_failure_without_fallback_raises(fake_ollama):
+    """Test that a failing model without fallback surfaces an error"""
+    base_url, state = fake_ollama
+    state.models["mistral"]["status"] = 500
+    router = ModelRouter(ModelRoute("mistral", OllamaLLM(base_url=base_url, model="mistral")))
+
+    with pytest.raises(ModelRouterException):
+        router.invoke("Pergunta")
+    print("\n✓ Failure without fallback test passed")
+
+def test_per_request_timeout(fake_ollama):
+    """Test that a request timeout bounds the wait even when every model is slow"""
+    base_url, state = fake_ollama
+    for model in state.models.values():
+        model["tokens"] = ["t "] * 40
+        model["delay"] = 0.05
+    router = make_router(base_url, deadline=60, hedge_after=0.05, timeout=30)
+
+    start = time.perf_counter()
+    with pytest.raises(ModelTimeoutException):
+        with route_request(timeout=0.2):
+            router.invoke("Pergunta")
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.6
+    assert router.stats()["timeouts"] == 1
+    assert wait_for(lambda: sorted(state.aborted) == ["mistral", "tinyllama"])
+    print(f"\n✓ Timeout test passed: gave up after {elapsed:.2f}s and cancelled both generations")
+
+def test_routed_llm_reports_model_to_request(fake_ollama):
+    """Test that a chain using RoutedLLM exposes the model that answered"""
+    base_url, _ = fake_ollama
+    llm = RoutedLLM(router=make_router(base_url))
+
+    with route_request() as request:
+        text = llm.invoke("Pergunta")
+
+    assert text == "Resposta do mistral"
+    assert request.model == "mistral"
+    print("\n✓ LangChain integration test passed")
+
+def test_astream_tracks_latency(fake_ollama):
+    """Test that streamed generations go to the chosen model and update its latency"""
+    base_url, state = fake_ollama
+    state.models["tinyllama"]["delay"] = 0.02
+    router = make_router(base_url)
+
+    async def consume():
+        return [token async for token in router.astream(router.fallback, "Pergunta")]
+
+    assert "".join(asyncio.run(consume())) == "Resposta do tinyllama"
+    assert router.fallback.latency >= 0.06
+    assert router.fallback.in_flight == 0
+    print("\n✓ Streaming test passed")
+
+def test_generated_tokens_measured(fake_ollama):
+    """Test that generations are timed as a stage and their tokens counted, with the tokens per second"""
+    from metrics import STAGE_SECONDS
+    from model_router import TOKENS_PER_SECOND
+    base_url, state = fake_ollama
+    router = make_router(base_url, deadline=5)
+    generations_before = STAGE_SECONDS.count(stage="llm_generation")
+    speeds_before = TOKENS_PER_SECOND.count(model="mistral")
+
+    router.invoke("Pergunta")
+
+    async def consume():
+        return [token async for token in router.astream(router.primary, "Pergunta")]
+
+    asyncio.run(consume())
+    assert router.stats()["models"][0]["tokens"] == 6
+    assert STAGE_SECONDS.count(stage="llm_generation") == generations_before + 2
+    assert TOKENS_PER_SECOND.count(model="mistral") == speeds_before + 2
+    print("\n✓ Token metrics test passed")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,33 +1,91 @@
 import sys
 from pathlib import Path
+import zlib
+import time
+import asyncio
+import numpy as np
 import pytest
 from unittest.mock import Mock, patch
 
 # Add parent directory to system path
 sys.path.append(str(Path(__file__).parent.parent))
-from rag_chain import HotmartRAGSystem
+from langchain_core.documents import Document
+from rag_chain import PROMPT_INSTRUCTIONS, HotmartRAGSystem, RAGException
+from test_generation import write_generation
+from test_snapshot_index import write_snapshot_files
+
+@pytest.fixture(autouse=True)
+def generation_db(tmp_path):
+    """Fixture pointing the RAG system at a generation marker in a temporary directory"""
+    db_path = str(tmp_path / "generation.sqlite3")
+    with patch('rag_chain.GENERATION_DB_PATH', db_path):
+        yield db_path
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path):
+    """Fixture pointing the RAG system at a snapshot directory in a temporary directory"""
+    snapshot_dir = tmp_path / "snapshots"
+    snapshot_dir.mkdir()
+    with patch('rag_chain.SNAPSHOT_DIR', str(snapshot_dir)):
+        yield str(snapshot_dir)
 
 @pytest.fixture
 def mock_vector_store():
     """Fixture for mocking Chroma vector store"""
-    with patch('rag_chain.Chroma') as mock_chroma:
+    with patch('rag_chain.Chroma') as mock_chroma, \
+         patch('rag_chain.get_chroma_client') as mock_client:
         mock_chroma.return_value.as_retriever.return_value = Mock()
+        mock_client.return_value.get_max_batch_size.return_value = 1000
         yield mock_chroma
 
+def fake_embedding(text: str) -> list[float]:
+    """Deterministic pseudo-random unit vector per text (different texts are nearly orthogonal)"""
+    rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+    vector = rng.standard_normal(64)
+    return (vector / np.linalg.norm(vector)).tolist()
+
 @pytest.fixture
 def mock_embeddings():
     """Fixture for mocking HuggingFace embeddings"""
     with patch('rag_chain.HuggingFaceEmbeddings') as mock_embeddings:
+        mock_embeddings.return_value.embed_query.side_effect = fake_embedding
         yield mock_embeddings
 
+class FakeStreamingLLM:
+    """Stands in for OllamaLLM.astream: yields tokens slowly and records whether the stream was closed"""
+    
+    def __init__(self, tokens, delay=0.0):
+        self.tokens = tokens
+        self.delay = delay
+        self.prompts = []
+        self.yielded = 0
+        self.closed = False
+    
+    async def __call__(self, prompt):
+        self.prompts.append(prompt)
+        try:
+            for token in self.tokens:
+                await asyncio.sleep(self.delay)
+                self.yielded += 1
+                yield token
+        finally:
+            self.closed = True
+
 @pytest.fixture
 def mock_llm():
-    """Fixture for mocking Ollama LLM"""
-    with patch('rag_chain.OllamaLLM') as mock_llm:
+    """Fixture for mocking Ollama LLM (and the keeper that loads it)"""
+    with patch('rag_chain.OllamaLLM') as mock_llm, \
+         patch('rag_chain.ModelKeeper'):
         yield mock_llm
 
 @pytest.fixture
-def rag_system(mock_vector_store, mock_embeddings, mock_llm):
+def mock_qa():
+    """Fixture for mocking the RetrievalQA chain"""
+    with patch('rag_chain.RetrievalQA') as mock_qa:
+        yield mock_qa
+
+@pytest.fixture
+def rag_system(mock_vector_store, mock_embeddings, mock_llm, mock_qa):
     """Fixture for RAG system with mocked dependencies"""
     return HotmartRAGSystem()
 
@@ -38,20 +96,340 @@ def test_rag_system_initialization(rag_system):
     assert "pergunta" in rag_system.prompt_template.lower()
     print("\n✓ Initialization test passed: prompt template properly set")
 
-def test_generate_response_success(rag_system):
+def test_generate_response_success(rag_system, mock_qa):
     """Test successful response generation"""
     test_response = "Resposta de teste"
     
-    with patch('rag_chain.RetrievalQA') as mock_qa:
-        mock_qa.from_chain_type.return_value.invoke.return_value = {
-            "result": test_response
-        }
-        
-        result = rag_system.generate_response("Como funciona a Hotmart?")
-        
-        assert result["answer"] == test_response
-        mock_qa.from_chain_type.assert_called_once()
-        print("\n✓ Response generation test passed: correct answer received")
+    mock_qa.from_chain_type.return_value.invoke.return_value = {
+        "result": test_response
+    }
+    
+    result = rag_system.generate_response("Como funciona a Hotmart?")
+    
+    assert result["answer"] == test_response
+    mock_qa.from_chain_type.assert_called_once()
+    print("\n✓ Response generation test passed: correct answer received")
+
+def test_chain_built_once(rag_system, mock_qa):
+    """Test that the QA chain is compiled at initialization and reused"""
+    mock_qa.from_chain_type.return_value.invoke.return_value = {"result": "Resposta"}
+    
+    rag_system.generate_response("Pergunta 1")
+    rag_system.generate_response("Pergunta 2")
+    
+    mock_qa.from_chain_type.assert_called_once()
+    assert mock_qa.from_chain_type.return_value.invoke.call_count == 2
+    print("\n✓ Chain reuse test passed: chain compiled only once")
+
+def test_warm_up(rag_system, mock_embeddings):
+    """Test that warm-up runs the embeddings model and loads the LLMs"""
+    rag_system.warm_up()
+    
+    mock_embeddings.return_value.embed_query.assert_called_once()
+    rag_system.model_keeper.warm_up.assert_called_once()
+    print("\n✓ Warm-up test passed: embeddings model exercised")
+
+def test_prompts_share_instruction_prefix(rag_system, mock_llm):
+    """Test that every prompt starts with the same instructions and every model gets the same num_ctx and keep_alive"""
+    first = rag_system._prompt_for("Como ser afiliado?", [Document(page_content="Afiliados recebem comissões.")])
+    second = rag_system._prompt_for("O que é a Hotmart?", [Document(page_content="A Hotmart é uma plataforma.")])
+    
+    assert first.startswith(PROMPT_INSTRUCTIONS) and second.startswith(PROMPT_INSTRUCTIONS)
+    assert first.endswith("Pergunta: Como ser afiliado?")
+    options = [(call.kwargs["num_ctx"], call.kwargs["keep_alive"]) for call in mock_llm.call_args_list]
+    assert len(options) == 2 and len(set(options)) == 1
+    print("\n✓ Prompt prefix test passed")
+
+def test_similar_question_served_from_semantic_cache(rag_system, mock_qa, mock_embeddings):
+    """Test that a near-duplicate question reuses the stored answer without generation"""
+    invoke = mock_qa.from_chain_type.return_value.invoke
+    invoke.return_value = {"result": "A Hotmart é uma plataforma."}
+    base = np.array(fake_embedding("Como funciona a Hotmart?"))
+    variation = base + 0.05 * np.array(fake_embedding("ruído"))
+    vectors = {"Como funciona a Hotmart?": base.tolist(), "Como a Hotmart funciona?": variation.tolist()}
+    mock_embeddings.return_value.embed_query.side_effect = lambda text: vectors.get(text) or fake_embedding(text)
+    
+    first = rag_system.generate_response("Como funciona a Hotmart?")
+    second = rag_system.generate_response("Como a Hotmart funciona?")
+    rag_system.generate_response("Quais as formas de pagamento?")
+    
+    assert first["answer"] == second["answer"] == "A Hotmart é uma plataforma."
+    assert invoke.call_count == 2
+    stats = rag_system.semantic_cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    print("\n✓ Semantic cache test passed: near-duplicate answered from cache")
+
+def test_question_embedded_once_per_miss(rag_system, mock_qa, mock_embeddings, mock_vector_store):
+    """Test that the retriever reuses the vector computed for the cache lookup"""
+    embedding_function = mock_vector_store.call_args.kwargs["embedding_function"]
+    assert embedding_function is rag_system.query_embeddings
+    
+    # The retriever embeds the question through the vector store's embedding function
+    def retrieve_and_answer(inputs):
+        embedding_function.embed_query(inputs["query"])
+        return {"result": "Resposta"}
+    mock_qa.from_chain_type.return_value.invoke.side_effect = retrieve_and_answer
+    
+    rag_system.generate_response("Pergunta única")
+    
+    mock_embeddings.return_value.embed_query.assert_called_once_with("Pergunta única")
+    print("\n✓ Embedding reuse test passed: one embedding per uncached question")
+
+def test_repeated_question_served_from_answer_cache(rag_system, mock_qa, mock_embeddings):
+    """Test that the same question, up to case and spacing, skips embedding and generation"""
+    invoke = mock_qa.from_chain_type.return_value.invoke
+    invoke.return_value = {"result": "Resposta"}
+    
+    rag_system.generate_response("Como funciona a Hotmart?")
+    embed_calls = mock_embeddings.return_value.embed_query.call_count
+    result = rag_system.generate_response("  como funciona a   hotmart ")
+    
+    assert result == {"answer": "Resposta"}
+    assert invoke.call_count == 1
+    assert mock_embeddings.return_value.embed_query.call_count == embed_calls
+    assert rag_system.answer_cache.stats()["hits"] == 1
+    print("\n✓ Answer cache test passed: repeated question answered from cache")
+
+def test_ingest_write_invalidates_cached_answers(rag_system, mock_qa, generation_db):
+    """Test that answers cached before new content was ingested are not served"""
+    invoke = mock_qa.from_chain_type.return_value.invoke
+    invoke.return_value = {"result": "Resposta antiga"}
+    rag_system.generate_response("Como funciona a Hotmart?")
+    
+    write_generation(generation_db, 1)
+    invoke.return_value = {"result": "Resposta nova"}
+    result = rag_system.generate_response("Como funciona a Hotmart?")
+    
+    assert result["answer"] == "Resposta nova"
+    assert invoke.call_count == 2
+    assert rag_system.invalidations == 1
+    assert rag_system.generate_response("Como funciona a Hotmart?") == {"answer": "Resposta nova"}
+    assert invoke.call_count == 2
+    print("\n✓ Invalidation test passed: new content produced a fresh answer")
+
+def test_store_of_another_embedding_backend_rejected(mock_vector_store, mock_embeddings, mock_llm, mock_qa, generation_db):
+    """Test that questions are never embedded with another backend than the stored chunks"""
+    write_generation(generation_db, 1, "intfloat/multilingual-e5-small@onnx-int8:avx2")
+    with pytest.raises(RAGException) as exc_info:
+        HotmartRAGSystem()
+    assert "EMBEDDING_BACKEND" in str(exc_info.value)
+
+    write_generation(generation_db, 2, "intfloat/multilingual-e5-small")
+    rag_system = HotmartRAGSystem()
+    mock_qa.from_chain_type.return_value.invoke.return_value = {"result": "Resposta"}
+    rag_system.generate_response("Como funciona a Hotmart?")
+
+    write_generation(generation_db, 3, "intfloat/multilingual-e5-small@onnx")
+    with pytest.raises(RAGException):
+        rag_system.generate_response("Como funciona a Hotmart?")
+    print("\n✓ Backend mismatch test passed: mixed vectors refused")
+
+def test_answer_generated_across_ingest_not_cached(rag_system, mock_qa, generation_db):
+    """Test that an answer whose generation overlapped an ingest write is not cached"""
+    invoke = mock_qa.from_chain_type.return_value.invoke
+    def answer_while_ingesting(inputs):
+        write_generation(generation_db, 1)
+        return {"result": "Resposta"}
+    invoke.side_effect = answer_while_ingesting
+    
+    rag_system.generate_response("Pergunta")
+    invoke.side_effect = None
+    invoke.return_value = {"result": "Resposta"}
+    rag_system.generate_response("Pergunta")
+    
+    assert invoke.call_count == 2
+    assert rag_system.answer_cache.stats()["entries"] == 1
+    print("\n✓ Race test passed: possibly stale answer discarded")
+
+def test_fallback_answers_reported_and_not_cached(rag_system, mock_llm, mock_qa):
+    """Test that answers of the fallback model name it and are not cached"""
+    def stream(prompt):
+        yield from ["Resposta ", "rápida"]
+    mock_llm.return_value.stream.side_effect = stream
+    mock_qa.from_chain_type.return_value.invoke.side_effect = lambda inputs: {"result": rag_system.llm.invoke(inputs["query"])}
+    rag_system.router.primary.latency = 100.0
+    rag_system.router.primary.last_sample = time.monotonic()
+    
+    first = rag_system.generate_response("Pergunta")
+    second = rag_system.generate_response("Pergunta")
+    
+    assert first == {"answer": "Resposta rápida", "model": "tinyllama"}
+    assert second["model"] == "tinyllama"
+    assert mock_qa.from_chain_type.return_value.invoke.call_count == 2
+    print("\n✓ Fallback test passed: fallback answer reported and not cached")
+
+def test_retrieve_skips_generation(rag_system, mock_vector_store, mock_embeddings, mock_qa, mock_llm):
+    """Test that retrieval returns scored chunks without touching the LLM"""
+    search = mock_vector_store.return_value.similarity_search_by_vector_with_relevance_scores
+    search.return_value = [(Document(page_content="Trecho", metadata={"source": "blog"}), 0.12)]
+    
+    results = rag_system.retrieve("Como funciona a Hotmart?", k=2)
+    
+    assert results == search.return_value
+    assert search.call_args.args[0] == fake_embedding("Como funciona a Hotmart?")
+    assert search.call_args.kwargs["k"] == 2
+    rag_system.retrieve("Outra pergunta")
+    assert search.call_args.kwargs["k"] == rag_system.search_k
+    mock_qa.from_chain_type.return_value.invoke.assert_not_called()
+    mock_llm.return_value.stream.assert_not_called()
+    print("\n✓ Retrieve test passed: chunks returned without generation")
+
+def test_retrieval_stages_timed(rag_system, mock_vector_store):
+    """Test that embedding the question and the vector search are timed as separate stages"""
+    from metrics import STAGE_SECONDS
+    search = mock_vector_store.return_value.similarity_search_by_vector_with_relevance_scores
+    search.return_value = [(Document(page_content="Trecho"), 0.12)]
+    embeds_before = STAGE_SECONDS.count(stage="embed_question")
+    searches_before = STAGE_SECONDS.count(stage="vector_search")
+
+    rag_system.retrieve("Quanto custa vender na Hotmart?")
+
+    assert STAGE_SECONDS.count(stage="embed_question") == embeds_before + 1
+    assert STAGE_SECONDS.count(stage="vector_search") == searches_before + 1
+    print("\n✓ Retrieval stages test passed")
+
+def test_current_snapshot_searched_instead_of_chroma(rag_system, mock_vector_store, snapshot_dir, generation_db):
+    """Test that an up-to-date snapshot serves searches, and a stale one falls back to Chroma"""
+    search = mock_vector_store.return_value.similarity_search_by_vector_with_relevance_scores
+    search.return_value = [(Document(page_content="Do Chroma"), 0.5)]
+    questions = ["Como funciona a Hotmart?", "O que é um produtor?", "Como vender online?"]
+    write_generation(generation_db, 1, rag_system.embedding_model)
+    write_snapshot_files(
+        snapshot_dir, [fake_embedding(q) for q in questions], ["Hotmart", "Produtor", "Vendas"],
+        generation=1, embedding_model=rag_system.embedding_model
+    )
+    
+    results = rag_system.retrieve("O que é um produtor?", k=2)
+    documents = rag_system.retriever.invoke("Como vender online?")
+    
+    assert results[0][0].page_content == "Produtor"
+    assert results[0][1] == pytest.approx(0.0, abs=1e-5)
+    assert len(results) == 2
+    assert documents[0].page_content == "Vendas"
+    search.assert_not_called()
+    assert rag_system.snapshot_searches == 2
+    
+    write_generation(generation_db, 2, rag_system.embedding_model)
+    assert rag_system.retrieve("O que é um produtor?") == search.return_value
+    assert rag_system.chroma_searches == 1
+    print("\n✓ Snapshot test passed: current snapshot searched, stale one skipped")
+
+def test_retrieved_context_compressed(rag_system, mock_vector_store):
+    """Test that overlapping chunks of one source reach the prompt as one passage"""
+    text = " ".join(f"A Hotmart oferece o recurso {i} para produtores digitais." for i in range(12))
+    chunks = [text[:300], text[200:500]]
+    rag_system.chroma_retriever.invoke.return_value = [
+        Document(page_content=chunk, metadata={"source": "blog"}) for chunk in chunks
+    ]
+    
+    documents = rag_system.retriever.invoke("O que é a Hotmart?")
+    
+    assert [document.page_content for document in documents] == [text[:500]]
+    assert rag_system.context_compressor.stats()["tokens_saved"] > 0
+    assert rag_system.context_compressor.settings in rag_system.cache_settings
+    print("\n✓ Context compression test passed: overlapping chunks merged before the prompt")
+
+def test_batch_embeds_once_then_generates_from_chunks(rag_system, mock_vector_store, mock_embeddings, mock_llm):
+    """Test that a batch embeds its distinct questions in one call and generates from the retrieved chunks"""
+    mock_embeddings.return_value.embed_documents.side_effect = lambda texts: [fake_embedding(text) for text in texts]
+    query = mock_vector_store.return_value._collection.query
+    query.side_effect = lambda query_embeddings, n_results, include: {
+        "ids": [[f"id-{i}"] for i in range(len(query_embeddings))],
+        "documents": [[f"Trecho {i + 1}"] for i in range(len(query_embeddings))],
+        "metadatas": [[{"source": "blog"}] for _ in query_embeddings],
+        "distances": [[0.1] for _ in query_embeddings],
+    }
+    def stream(prompt):
+        yield from ["Resposta"]
+    mock_llm.return_value.stream.side_effect = stream
+    
+    prepared = rag_system.prepare_batch(["Pergunta A", "Pergunta B", "Pergunta A"])
+    
+    mock_embeddings.return_value.embed_documents.assert_called_once_with(["Pergunta A", "Pergunta B"])
+    mock_embeddings.return_value.embed_query.assert_not_called()
+    query.assert_called_once()
+    assert query.call_args.kwargs["query_embeddings"] == [fake_embedding("Pergunta A"), fake_embedding("Pergunta B")]
+    assert prepared[0] == prepared[2]
+    lookup, documents = prepared[1]
+    assert documents[0].page_content == "Trecho 2"
+    
+    result = rag_system.generate_from_documents("Pergunta B", lookup, documents)
+    assert result == {"answer": "Resposta", "model": "mistral"}
+    assert "Trecho 2" in mock_llm.return_value.stream.call_args.args[0]
+    
+    # The generated answer is cached: the next batch finds it without searching
+    again = rag_system.prepare_batch(["Pergunta B"])
+    assert again[0][0].answer == "Resposta"
+    assert again[0][1] == []
+    query.assert_called_once()
+    print("\n✓ Batch test passed: one embedding call, one search call for the distinct questions, answers cached")
+
+def collect(stream):
+    """Consume a response stream into a list of events"""
+    async def consume():
+        return [event async for event in stream]
+    return asyncio.run(consume())
+
+def test_stream_response_sends_context_then_tokens(rag_system, mock_llm, mock_vector_store):
+    """Test that retrieved context comes first, then tokens, then the full answer"""
+    retriever = mock_vector_store.return_value.as_retriever.return_value
+    retriever.invoke.return_value = [
+        Document(page_content="A Hotmart é uma plataforma.", metadata={"source": "blog"})
+    ]
+    fake_llm = FakeStreamingLLM(["A Hotmart ", "é uma ", "plataforma."])
+    mock_llm.return_value.astream = fake_llm
+    
+    events = collect(rag_system.stream_response("Como funciona a Hotmart?"))
+    
+    assert [event.event for event in events] == ["context", "token", "token", "token", "done"]
+    assert events[0].data["documents"] == [{"source": "blog", "preview": "A Hotmart é uma plataforma."}]
+    assert events[-1].data == {"answer": "A Hotmart é uma plataforma.", "cached": False, "model": "mistral"}
+    assert "A Hotmart é uma plataforma." in fake_llm.prompts[0]
+    assert "Como funciona a Hotmart?" in fake_llm.prompts[0]
+    print("\n✓ Streaming test passed: context, tokens and final answer in order")
+
+def test_streamed_answer_cached(rag_system, mock_llm, mock_vector_store, mock_qa):
+    """Test that a completed stream fills the caches used by both endpoints"""
+    mock_vector_store.return_value.as_retriever.return_value.invoke.return_value = []
+    mock_llm.return_value.astream = FakeStreamingLLM(["Resposta"])
+    collect(rag_system.stream_response("Pergunta"))
+    
+    events = collect(rag_system.stream_response("Pergunta"))
+    
+    assert [event.event for event in events] == ["context", "token", "done"]
+    assert events[-1].data == {"answer": "Resposta", "cached": True}
+    assert rag_system.generate_response("Pergunta") == {"answer": "Resposta"}
+    mock_qa.from_chain_type.return_value.invoke.assert_not_called()
+    print("\n✓ Streaming cache test passed: repeated question answered without generation")
+
+def test_closing_stream_cancels_generation(rag_system, mock_llm, mock_vector_store):
+    """Test that abandoning the stream closes the LLM stream and caches nothing"""
+    mock_vector_store.return_value.as_retriever.return_value.invoke.return_value = []
+    fake_llm = FakeStreamingLLM([f"t{i} " for i in range(100)], delay=0.001)
+    mock_llm.return_value.astream = fake_llm
+    
+    async def read_a_few_tokens():
+        stream = rag_system.stream_response("Pergunta")
+        async for event in stream:
+            if event.event == "token" and event.data["text"] == "t2 ":
+                break
+        await stream.aclose()
+    asyncio.run(read_a_few_tokens())
+    
+    assert fake_llm.closed
+    assert fake_llm.yielded == 3
+    assert rag_system.answer_cache.stats()["entries"] == 0
+    print("\n✓ Cancellation test passed: LLM stream closed after 3 of 100 tokens")
+
+def test_stream_error_raised_as_rag_exception(rag_system, mock_llm, mock_vector_store):
+    """Test that failures while generating surface as RAGException"""
+    mock_vector_store.return_value.as_retriever.return_value.invoke.side_effect = Exception("Chroma offline")
+    
+    with pytest.raises(RAGException) as exc_info:
+        collect(rag_system.stream_response("Pergunta"))
+    assert "Chroma offline" in str(exc_info.value)
+    print("\n✓ Streaming error test passed")
 
 # def test_generate_response_error(rag_system):
 #     """Test error handling in response generation"""
@@ -0,0 +1,130 @@
+import sys
+import time
+import numpy as np
+import pytest
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+sys.path.append(str(Path(__file__).parent.parent))
+from semantic_cache import SemanticCache, SemanticCacheException, RecentQueryEmbeddings
+
+DIM = 32
+
+def unit(seed: int) -> list[float]:
+    vector = np.random.default_rng(seed).standard_normal(DIM)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+def near(vector: list[float], noise: float, seed: int = 99) -> list[float]:
+    return (np.array(vector) + noise * np.array(unit(seed))).tolist()
+
+@pytest.fixture
+def cache():
+    """Fixture for a cache with a generous budget"""
+    return SemanticCache(threshold=0.9, max_entries=100, ttl_seconds=60, max_bytes=1024 * 1024)
+
+def test_similar_question_hits_and_different_question_misses(cache):
+    """Test that only questions above the similarity threshold reuse an answer"""
+    cache.put("Como funciona a Hotmart?", unit(1), "Resposta 1")
+
+    hit = cache.lookup(near(unit(1), 0.1))
+    assert hit is not None
+    assert hit.answer == "Resposta 1"
+    assert hit.similarity >= 0.9
+
+    assert cache.lookup(unit(2)) is None
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+    print("\n✓ Threshold test passed: similar hit, unrelated miss")
+
+def test_best_match_is_returned(cache):
+    """Test that the most similar cached question wins"""
+    cache.put("A", unit(1), "Resposta A")
+    cache.put("B", near(unit(1), 0.3), "Resposta B")
+    assert cache.lookup(unit(1)).answer == "Resposta A"
+    print("\n✓ Best match test passed")
+
+def test_least_recently_used_entry_evicted_at_capacity():
+    """Test that the entry count limit evicts the least recently used entry"""
+    cache = SemanticCache(threshold=0.99, max_entries=2, ttl_seconds=60, max_bytes=1024 * 1024)
+    cache.put("A", unit(1), "A")
+    cache.put("B", unit(2), "B")
+    cache.lookup(unit(1))
+    cache.put("C", unit(3), "C")
+
+    assert cache.lookup(unit(2)) is None
+    assert cache.lookup(unit(1)).answer == "A"
+    assert cache.lookup(unit(3)).answer == "C"
+    assert cache.stats()["evictions"] == 1
+    print("\n✓ LRU test passed: recently used entry survived eviction")
+
+def test_memory_budget_respected():
+    """Test that entries are evicted to keep vectors and text within the byte budget"""
+    entry_bytes = DIM * 4 + 1 + 1000
+    cache = SemanticCache(threshold=0.99, max_entries=100, ttl_seconds=60, max_bytes=3 * entry_bytes)
+    for seed in range(10):
+        cache.put(str(seed), unit(seed), "x" * 1000)
+
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["bytes_used"] <= 3 * entry_bytes
+    assert cache.lookup(unit(9)) is not None
+    assert cache.lookup(unit(0)) is None
+    print("\n✓ Memory budget test passed: oldest entries evicted")
+
+def test_entries_expire_after_ttl(cache):
+    """Test that entries older than the TTL are no longer served"""
+    with patch('semantic_cache.time.monotonic', return_value=1000.0):
+        cache.put("A", unit(1), "A")
+    with patch('semantic_cache.time.monotonic', return_value=1030.0):
+        assert cache.lookup(unit(1)) is not None
+    with patch('semantic_cache.time.monotonic', return_value=1061.0):
+        assert cache.lookup(unit(1)) is None
+
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["entries"] == 0
+    print("\n✓ TTL test passed: expired entry dropped")
+
+def test_clear_drops_entries(cache):
+    """Test that clearing the cache forgets every answer"""
+    cache.put("A", unit(1), "A")
+    cache.clear()
+    assert cache.lookup(unit(1)) is None
+    assert cache.stats()["entries"] == 0
+    print("\n✓ Clear test passed")
+
+def test_invalid_configuration_rejected():
+    """Test that thresholds outside (0, 1] are rejected"""
+    with pytest.raises(SemanticCacheException):
+        SemanticCache(threshold=1.5, max_entries=10, ttl_seconds=60, max_bytes=1024)
+    print("\n✓ Configuration test passed")
+
+def test_lookup_scales_to_full_cache():
+    """Test that a lookup over thousands of entries stays fast (one matrix product)"""
+    cache = SemanticCache(threshold=0.99, max_entries=10000, ttl_seconds=600, max_bytes=64 * 1024 * 1024)
+    vectors = np.random.default_rng(0).standard_normal((10000, DIM))
+    for index, vector in enumerate(vectors):
+        cache.put(str(index), vector.tolist(), "resposta")
+
+    start = time.perf_counter()
+    for index in range(100):
+        assert cache.lookup(vectors[index].tolist()).question == str(index)
+    elapsed = (time.perf_counter() - start) / 100
+
+    assert elapsed < 0.01
+    print(f"\n✓ Scale test passed: {elapsed * 1000:.2f}ms per lookup over 10,000 entries")
+
+def test_recent_query_embeddings_reuse_last_vector():
+    """Test that embedding the same question twice in a row calls the model once"""
+    model = Mock()
+    model.embed_query.side_effect = lambda text: unit(len(text))
+    embeddings = RecentQueryEmbeddings(model)
+
+    assert embeddings.embed_query("abc") == embeddings.embed_query("abc")
+    embeddings.embed_query("abcd")
+    assert model.embed_query.call_count == 2
+    print("\n✓ Query embedding reuse test passed")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
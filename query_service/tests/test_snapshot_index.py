@@ -0,0 +1,171 @@
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from pathlib import Path
+from unittest.mock import Mock
+
+import hnswlib
+import numpy as np
+import pytest
+
+# Add parent directory to system path
+sys.path.append(str(Path(__file__).parent.parent))
+from snapshot_index import SnapshotIndex, SnapshotIndexException, SnapshotStore
+
+MODEL = "intfloat/multilingual-e5-small"
+
+def write_snapshot_files(root, vectors, contents, generation, embedding_model=MODEL, metadatas=None, ann=False):
+    """Write a snapshot in the layout of ingest_service/snapshot.py (optionally with an HNSW index) and point CURRENT at it"""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    name = f"snapshot-{generation:08d}-{time.time_ns()}"
+    directory = os.path.join(root, name)
+    os.makedirs(directory)
+    matrix.tofile(os.path.join(directory, "vectors.f32"))
+    with closing(sqlite3.connect(os.path.join(directory, "chunks.sqlite3"))) as chunks:
+        chunks.execute("CREATE TABLE chunks (row INTEGER PRIMARY KEY, id TEXT NOT NULL, content TEXT NOT NULL, metadata TEXT NOT NULL)")
+        chunks.executemany(
+            "INSERT INTO chunks VALUES (?, ?, ?, ?)",
+            [
+                (row, f"id-{row}", content, json.dumps((metadatas or {}).get(row, {})))
+                for row, content in enumerate(contents)
+            ]
+        )
+        chunks.commit()
+    manifest = {"generation": generation, "embedding_model": embedding_model, "chunks": len(contents), "dim": matrix.shape[1]}
+    if ann:
+        index = hnswlib.Index(space="ip", dim=matrix.shape[1])
+        index.init_index(max_elements=len(matrix), ef_construction=100, M=16)
+        index.add_items(matrix, np.arange(len(matrix)))
+        index.save_index(os.path.join(directory, "index.hnsw"))
+        manifest["ann"] = {"file": "index.hnsw", "space": "ip", "M": 16, "ef_construction": 100}
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file)
+    with open(os.path.join(root, ".CURRENT.tmp"), "w", encoding="utf-8") as pointer_file:
+        pointer_file.write(name)
+    os.replace(os.path.join(root, ".CURRENT.tmp"), os.path.join(root, "CURRENT"))
+    return name
+
+def random_vectors(count, dim=32, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_search_matches_brute_force(tmp_path):
+    """Test that the top k chunks and their distances match an exact search"""
+    vectors = random_vectors(500)
+    contents = [f"Trecho {row}" for row in range(500)]
+    name = write_snapshot_files(str(tmp_path), vectors, contents, generation=3, metadatas={7: {"source": "blog"}})
+    index = SnapshotIndex(str(tmp_path / name))
+    query = vectors[7] * 3 + random_vectors(1, seed=1)[0] * 0.1
+
+    results = index.search(query.tolist(), k=10)
+
+    normalized = query / np.linalg.norm(query)
+    expected = np.argsort(-(vectors @ normalized))[:10]
+    assert [document.page_content for document, _ in results] == [f"Trecho {row}" for row in expected]
+    assert results[0][0].metadata == {"source": "blog"}
+    assert results[0][0].id == "id-7"
+    distances = [distance for _, distance in results]
+    assert distances == sorted(distances)
+    assert np.allclose(distances, np.sum((vectors[expected] - normalized) ** 2, axis=1), atol=1e-5)
+    assert index.generation == 3 and index.embedding_model == MODEL and index.count == 500
+    print("\n✓ Exact search test passed: same order and distances as brute force")
+
+def test_ann_index_used_when_shipped(tmp_path):
+    """Test that a snapshot with an HNSW index finds the same neighbours, with exact search past its ef"""
+    vectors = random_vectors(2000)
+    name = write_snapshot_files(str(tmp_path), vectors, [f"Trecho {row}" for row in range(2000)], generation=1, ann=True)
+    index = SnapshotIndex(str(tmp_path / name), ann_ef=32)
+    assert index.ann is not None
+
+    queries = vectors[:50] + random_vectors(50, seed=3) * 0.2
+    recall = []
+    for query in queries:
+        normalized = query / np.linalg.norm(query)
+        expected = {f"Trecho {row}" for row in np.argsort(-(vectors @ normalized))[:5]}
+        results = index.search(query.tolist(), k=5)
+        recall.append(len(expected & {document.page_content for document, _ in results}) / 5)
+        distances = [distance for _, distance in results]
+        assert distances == sorted(distances)
+    assert np.mean(recall) >= 0.95
+
+    index.ann = Mock()
+    assert len(index.search(queries[0].tolist(), k=40)) == 40
+    index.ann.knn_query.assert_not_called()
+    print(f"\n✓ HNSW test passed: recall@5 {np.mean(recall):.3f}")
+
+def test_small_and_empty_snapshots(tmp_path):
+    """Test that k is capped by the snapshot size and an empty snapshot finds nothing"""
+    name = write_snapshot_files(str(tmp_path), random_vectors(3), ["a", "b", "c"], generation=1)
+    assert len(SnapshotIndex(str(tmp_path / name)).search(random_vectors(1)[0].tolist(), k=10)) == 3
+
+    empty = tmp_path / "snapshot-empty"
+    empty.mkdir()
+    with closing(sqlite3.connect(str(empty / "chunks.sqlite3"))) as chunks:
+        chunks.execute("CREATE TABLE chunks (row INTEGER PRIMARY KEY, id TEXT, content TEXT, metadata TEXT)")
+    (empty / "manifest.json").write_text(json.dumps({"generation": 0, "embedding_model": MODEL, "chunks": 0, "dim": 0}))
+    assert SnapshotIndex(str(empty)).search([1.0, 0.0], k=4) == []
+
+    with pytest.raises(SnapshotIndexException):
+        SnapshotIndex(str(tmp_path / "missing"))
+    print("\n✓ Edge case test passed")
+
+def test_store_follows_published_snapshots(tmp_path):
+    """Test that the store loads the published snapshot and swaps when a new one is published"""
+    store = SnapshotStore(str(tmp_path))
+    assert store.current() is None
+
+    write_snapshot_files(str(tmp_path), random_vectors(4), ["a", "b", "c", "d"], generation=1)
+    first = store.current()
+    assert first.generation == 1
+    assert store.current() is first
+
+    with store.use() as in_use:
+        time.sleep(0.01)
+        write_snapshot_files(str(tmp_path), random_vectors(5, seed=2), ["a", "b", "c", "d", "e"], generation=2)
+        second = store.current()
+        assert second.generation == 2 and second.count == 5
+        assert store.swaps == 2
+        # A search that started on the old snapshot still completes
+        assert in_use is first and not first.closed
+        assert len(first.search(random_vectors(1)[0].tolist(), k=2)) == 2
+    assert first.closed
+    print("\n✓ Swap test passed: new snapshot picked up after publish")
+
+def test_replaced_snapshots_closed(tmp_path):
+    """Test that every replaced snapshot is closed, and a retired one is never handed out"""
+    store = SnapshotStore(str(tmp_path))
+    indexes = []
+    for generation in range(1, 5):
+        time.sleep(0.01)
+        write_snapshot_files(str(tmp_path), random_vectors(4, seed=generation), ["a", "b", "c", "d"], generation=generation)
+        with store.use() as index:
+            assert index.generation == generation
+            assert len(index.search(random_vectors(1)[0].tolist(), k=2)) == 2
+        indexes.append(index)
+
+    assert [index.closed for index in indexes] == [True, True, True, False]
+    assert not indexes[0].acquire()
+    assert store.swaps == 4
+    print("\n✓ Retirement test passed: old snapshots released after each swap")
+
+def test_broken_snapshot_keeps_previous(tmp_path):
+    """Test that a pointer to an unreadable snapshot keeps the previous one in use"""
+    store = SnapshotStore(str(tmp_path))
+    write_snapshot_files(str(tmp_path), random_vectors(4), ["a", "b", "c", "d"], generation=1)
+    loaded = store.current()
+
+    time.sleep(0.01)
+    (tmp_path / ".CURRENT.tmp").write_text("snapshot-gone")
+    os.replace(tmp_path / ".CURRENT.tmp", tmp_path / "CURRENT")
+
+    assert store.current() is loaded
+    assert store.current() is loaded
+    assert store.load_errors == 1
+    print("\n✓ Broken snapshot test passed: previous snapshot kept, load attempted once")
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])